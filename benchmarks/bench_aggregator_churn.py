@@ -0,0 +1,63 @@
+'''
+Measures LifespanSystem.update after heavy entity churn with a sparse and a
+dense ZonedAggregator. Entities are created, then most of them are removed at
+random so the sparse aggregator is left full of holes, and the update loop
+is timed. The time spent churning is also reported for both.
+
+Usage: python bench_aggregator_churn.py [count] [ticks]
+'''
+import sys
+import random
+from bench_utils import make_gameworld, timed, report
+from kivent_core.systems.lifespan import LifespanSystem
+
+LIVE_FRACTION = .1
+
+
+def churn(dense, count, ticks):
+    gameworld = make_gameworld(
+        [(LifespanSystem, {'dense_aggregator': dense})],
+        zones={'general': count})
+    lifespan = gameworld.system_manager['lifespan']
+    rng = random.Random(0)
+    entity_ids = []
+
+    def create():
+        gameworld.clear_entities()
+        entity_ids[:] = gameworld.init_entities_bulk(
+            {'lifespan': {'lifespan': 1e9}}, ['lifespan'], count)
+
+    def remove():
+        rng.seed(0)
+        rng.shuffle(entity_ids)
+        live = int(count * LIVE_FRACTION)
+        gameworld.queue_remove_entities(entity_ids[live:])
+        gameworld.remove_entities()
+        del entity_ids[live:]
+
+    def run():
+        update = lifespan.update
+        for i in range(ticks):
+            update(1. / 60.)
+
+    churn_time = timed(remove, setup=create, repeat=1)
+    update_time = timed(run)
+    return churn_time, update_time
+
+
+def main(count, ticks):
+    live = int(count * LIVE_FRACTION)
+    results = {}
+    for dense in (False, True):
+        name = 'dense' if dense else 'sparse'
+        churn_time, update_time = results[dense] = churn(dense, count, ticks)
+        report('{} remove {}'.format(name, count - live), churn_time,
+            count - live)
+        report('{} update {} live of {}'.format(name, live, count),
+            update_time, live * ticks)
+    print('update speedup: {:.2f}x'.format(results[False][1] / results[True][1]))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 60)
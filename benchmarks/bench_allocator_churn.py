@@ -0,0 +1,61 @@
+'''
+Measures entity churn, removing random entities and creating replacements
+every step, with each of the StaticMemGameSystem allocators.
+
+Usage: python bench_allocator_churn.py [count] [steps]
+'''
+import sys
+import random
+from bench_utils import make_gameworld, timed, report
+from kivent_core.systems.position_systems import PositionSystem2D
+from kivent_core.systems.rotate_systems import RotateSystem2D
+
+
+def churn(allocator, count, steps):
+    system_args = {'allocator': allocator}
+    gameworld = make_gameworld(
+        [(PositionSystem2D, system_args), (RotateSystem2D, system_args)],
+        zones={'general': count})
+    component_order = ['position', 'rotate']
+    per_step = count // 10
+    rng = random.Random(0)
+    entity_ids = []
+
+    def setup():
+        gameworld.clear_entities()
+        rng.seed(0)
+        entity_ids[:] = gameworld.init_entities_bulk(
+            {'position': [(0., 0.)] * (count - per_step), 'rotate': 0.},
+            component_order, count - per_step)
+
+    def run():
+        init_entities_bulk = gameworld.init_entities_bulk
+        positions = [(0., 0.)] * per_step
+        for step in range(steps):
+            for i in range(per_step):
+                index = rng.randrange(len(entity_ids))
+                gameworld.queue_remove_entity(entity_ids[index])
+                entity_ids[index] = entity_ids[-1]
+                entity_ids.pop()
+            gameworld.remove_entities()
+            entity_ids.extend(init_entities_bulk(
+                {'position': positions, 'rotate': 0.}, component_order,
+                per_step))
+
+    return timed(run, setup=setup, repeat=3)
+
+
+def main(count, steps):
+    operations = (count // 10) * steps * 2
+    results = {}
+    for allocator in ('first_fit', 'bitmap', 'size_class'):
+        results[allocator] = churn(allocator, count, steps)
+        report('{} churn'.format(allocator), results[allocator], operations)
+    for allocator in ('bitmap', 'size_class'):
+        print('{} speedup: {:.2f}x'.format(
+            allocator, results['first_fit'] / results[allocator]))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20)
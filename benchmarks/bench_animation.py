@@ -0,0 +1,71 @@
+'''
+Measures AnimationSystem.update for many animated sprites. Every animation
+switches to a frame with another model every tick, the worst case for the
+system. In the first run every frame shares a texture, in the second every
+frame has its own texture so every switch also moves the entity to another
+batch. The grouped runs put every entity in one AnimationGroup, so the
+frame is switched once per tick for all of them.
+
+Usage: python bench_animation.py [count] [ticks]
+'''
+import sys
+from bench_utils import make_gameworld, timed, report, load_texture
+from kivent_core.systems.position_systems import PositionSystem2D
+from kivent_core.systems.renderers import Renderer
+from kivent_core.systems.animation_sys import AnimationSystem
+
+DT = 1. / 60.
+FRAME_COUNT = 4
+
+
+def load_frames(gameworld, name, shared_texture):
+    model_manager = gameworld.model_manager
+    frames = []
+    for i in range(FRAME_COUNT):
+        frame_name = '{}_{}'.format(name, i)
+        if shared_texture:
+            texture_name = name
+        else:
+            texture_name = frame_name
+        load_texture(texture_name)
+        model_key = model_manager.load_textured_rectangle('vertex_format_4f',
+            8. + i, 8., texture_name, frame_name)
+        frames.append({'texture': texture_name, 'model': model_key,
+            'duration': DT * 1000 * .5})
+    gameworld.animation_manager.load_animation(name, FRAME_COUNT, frames)
+    return frames[0]['texture']
+
+
+def bench_animation(count, ticks, name, shared_texture, group=None):
+    gameworld = make_gameworld([(PositionSystem2D, {}),
+        (Renderer, {'max_batches': count // 2000 + FRAME_COUNT * 2}),
+        (AnimationSystem, {})], zones={'general': count},
+        size_of_gameworld=64 * 1024)
+    texture = load_frames(gameworld, name, shared_texture)
+    gameworld.init_entities_bulk({'position': [(float(i), 0.)
+        for i in range(count)], 'renderer': {'texture': texture},
+        'animation': [{'name': name, 'loop': True, 'group': group}
+        for i in range(count)]},
+        ['position', 'renderer', 'animation'], count)
+    update = gameworld.system_manager['animation'].update
+
+    def run():
+        for i in range(ticks):
+            update(DT)
+
+    if group is not None:
+        name += ' grouped'
+    report('animation {} {}'.format(name, count), timed(run, repeat=3),
+        ticks * count)
+
+
+def main(count, ticks):
+    bench_animation(count, ticks, 'shared_texture', True)
+    bench_animation(count, ticks, 'textures', False)
+    bench_animation(count, ticks, 'shared_texture', True, 'bench')
+    bench_animation(count, ticks, 'textures', False, 'bench')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 60)
@@ -0,0 +1,49 @@
+'''
+Compares creating short lived entities one at a time through
+GameWorld.init_entity with spawning them from an archetype registered with
+GameWorld.register_archetype, the way projectiles and particles are created.
+
+Usage: python bench_archetypes.py [count]
+'''
+import sys
+from bench_utils import make_gameworld, timed, report
+from kivent_core.systems.position_systems import PositionSystem2D
+from kivent_core.systems.rotate_systems import RotateSystem2D
+from kivent_core.systems.scale_systems import ScaleSystem2D
+from kivent_core.systems.color_systems import ColorSystem
+from kivent_core.systems.lifespan import LifespanSystem
+
+
+def main(count):
+    gameworld = make_gameworld([
+        (PositionSystem2D, {}), (RotateSystem2D, {}), (ScaleSystem2D, {}),
+        (ColorSystem, {}), (LifespanSystem, {}),
+        ], zones={'general': count})
+    component_order = ['position', 'rotate', 'scale', 'color', 'lifespan']
+    positions = [(float(i), float(i)) for i in range(count)]
+    gameworld.register_archetype('bullet', component_order, {
+        'position': (0., 0.), 'rotate': 0., 'scale': 1.,
+        'color': (255, 255, 255, 255), 'lifespan': {'lifespan': 2.}})
+
+    def loop():
+        init_entity = gameworld.init_entity
+        for i in range(count):
+            init_entity({'position': positions[i], 'rotate': 0.,
+                'scale': 1., 'color': (255, 255, 255, 255),
+                'lifespan': {'lifespan': 2.}}, component_order)
+
+    def spawn():
+        spawn = gameworld.spawn
+        for i in range(count):
+            spawn('bullet', {'position': positions[i]})
+
+    clear = gameworld.clear_entities
+    loop_time = timed(loop, setup=clear)
+    report('init_entity loop', loop_time, count)
+    spawn_time = timed(spawn, setup=clear)
+    report('spawn loop', spawn_time, count)
+    print('speedup: {:.2f}x'.format(loop_time / spawn_time))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
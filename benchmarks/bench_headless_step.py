@@ -0,0 +1,53 @@
+'''
+Steps a headless GameWorld from a plain Python loop and reports the tick
+rate, with and without a Renderer filling its frame buffers. No window or GL
+context is created, so this runs on machines without a display.
+
+Usage: python bench_headless_step.py [entity_count] [ticks]
+'''
+import sys
+from bench_utils import make_gameworld, timed, report
+from kivent_core.systems.position_systems import PositionSystem2D
+from kivent_core.systems.rotate_systems import RotateSystem2D
+from kivent_core.systems.renderers import RotateRenderer
+
+DT = 1. / 60.
+
+
+def bench_step(count, ticks, with_renderer):
+    systems = [(PositionSystem2D, {}), (RotateSystem2D, {})]
+    component_order = ['position', 'rotate']
+    if with_renderer:
+        systems.append((RotateRenderer, {'max_batches': count // 1000 + 1,
+            'size_of_batches': 128}))
+        component_order.append('rotate_renderer')
+    gameworld = make_gameworld(systems, zones={'general': count},
+        size_of_gameworld=64*1024)
+    components = {'position': [(i % 1000 * 20., i // 1000 * 20.)
+        for i in range(count)], 'rotate': [0.] * count}
+    if with_renderer:
+        model_manager = gameworld.model_manager
+        model_key = model_manager.load_model('vertex_format_4f', 4, 6, 'quad')
+        model_manager.models[model_key].set_textured_rectangle(16., 16.,
+            [0., 0., 1., 1.])
+        components['rotate_renderer'] = {'model_key': model_key}
+    gameworld.init_entities_bulk(components, component_order, count)
+    update = gameworld.update
+
+    def run():
+        for i in range(ticks):
+            update(DT)
+
+    name = 'with renderer' if with_renderer else 'without renderer'
+    report('headless step {} {}'.format(name, count), timed(run, repeat=3),
+        ticks)
+
+
+def main(count, ticks):
+    bench_step(count, ticks, False)
+    bench_step(count, ticks, True)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 100)
@@ -0,0 +1,53 @@
+'''
+Compares creating entities one at a time through GameWorld.init_entity with
+creating them in one call through GameWorld.init_entities_bulk.
+
+Usage: python bench_init_entities.py [count]
+'''
+import sys
+from bench_utils import make_gameworld, timed, report
+from kivent_core.systems.position_systems import PositionSystem2D
+from kivent_core.systems.rotate_systems import RotateSystem2D
+from kivent_core.systems.scale_systems import ScaleSystem2D
+from kivent_core.systems.color_systems import ColorSystem
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def main(count):
+    gameworld = make_gameworld([
+        (PositionSystem2D, {}), (RotateSystem2D, {}), (ScaleSystem2D, {}),
+        (ColorSystem, {}),
+        ], zones={'general': count})
+    component_order = ['position', 'rotate', 'scale', 'color']
+    positions = [(float(i), float(i)) for i in range(count)]
+    colors = [(255, 255, 255, 255)] * count
+
+    def loop():
+        init_entity = gameworld.init_entity
+        for i in range(count):
+            init_entity({'position': positions[i], 'rotate': 0.,
+                'scale': 1., 'color': colors[i]}, component_order)
+
+    def bulk(position_args):
+        gameworld.init_entities_bulk({'position': position_args,
+            'rotate': 0., 'scale': 1., 'color': colors}, component_order,
+            count)
+
+    clear = gameworld.clear_entities
+    loop_time = timed(loop, setup=clear)
+    report('init_entity loop', loop_time, count)
+    bulk_time = timed(bulk, positions, setup=clear)
+    report('init_entities_bulk (lists)', bulk_time, count)
+    if numpy is not None:
+        array = numpy.array(positions, dtype=numpy.float64)
+        bulk_time = timed(bulk, array, setup=clear)
+        report('init_entities_bulk (numpy)', bulk_time, count)
+    print('speedup: {:.1f}x'.format(loop_time / bulk_time))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,119 @@
+'''
+Compares loading the tiles of a large TMX map by parsing it with the tmx
+library, as map_utils.parse_tmx does, against loading the compiled map
+written by map_utils.compile_tmx with read_map_cache and
+MapManager.load_compiled_map. The map is examples/assets/maps/orthogonal.tmx
+repeated to the requested size. Textures are registered headless so only the
+map loading is measured.
+
+Usage: python bench_map_cache.py [map_size]
+'''
+import sys
+import os
+import tempfile
+import tmx
+from xml.etree import ElementTree
+from bench_utils import make_gameworld, timed, report, load_texture
+from kivent_core.systems.position_systems import PositionSystem2D
+from kivent_maps.map_system import MapSystem
+from kivent_maps.map_manager import read_map_cache
+from kivent_maps import map_utils
+
+SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+    'examples', 'assets', 'maps', 'orthogonal.tmx')
+
+
+def write_large_tmx(filename, size):
+    #the map is written with ElementTree rather than tmx.TileMap.save, which
+    #fails on tilesets with animated tiles in some tmx releases
+    tree = ElementTree.parse(SOURCE)
+    root = tree.getroot()
+    width, height = int(root.get('width')), int(root.get('height'))
+    for image in root.iter('image'):
+        image.set('source', os.path.join(os.path.dirname(SOURCE),
+            image.get('source')))
+    for layer in root.iter('layer'):
+        data = layer.find('data')
+        gids = [tile.get('gid', '0') for tile in data.findall('tile')]
+        data.clear()
+        data.set('encoding', 'csv')
+        data.text = ','.join([gids[(j % height) * width + i % width]
+            for j in range(size) for i in range(size)])
+        layer.set('width', str(size))
+        layer.set('height', str(size))
+    root.set('width', str(size))
+    root.set('height', str(size))
+    tree.write(filename, encoding='UTF-8', xml_declaration=True)
+
+
+def load_headless_atlas(atlas_data, kind, dirname):
+    for image in atlas_data:
+        for name, (px, py, tw, th) in atlas_data[image].items():
+            load_texture(name, (tw, th))
+
+
+def make_map_world(size, layers):
+    return make_gameworld([(PositionSystem2D, {}),
+        (MapSystem, {'memory_required': size * size * layers * 32 +
+            1024 * 1024})],
+        zones={'general': 1000}, size_of_gameworld=size * size * layers * 32 //
+            1024 + 64 * 1024)
+
+
+def load_parsed(gameworld, filename, name):
+    model_manager = gameworld.model_manager
+    tilemap = tmx.TileMap.load(filename)
+    tiles, tiles_z, objects, objects_z, tile_ids, objmodels = \
+        map_utils._load_tile_map(tilemap.layers, tilemap.width,
+            map_utils._load_tile_properties(tilemap.tilesets))
+    map_utils._load_tilesets(tilemap.tilesets, os.path.dirname(filename),
+        tile_ids, load_headless_atlas,
+        model_manager.load_textured_rectangle,
+        gameworld.managers['animation_manager'].load_animation)
+    gameworld.managers['map_manager'].load_map(name, tilemap.width,
+        tilemap.height, tiles, len(tiles_z))
+
+
+def load_compiled(gameworld, filename, cache_filename, name):
+    model_manager = gameworld.model_manager
+    tables, tiles = read_map_cache(cache_filename, filename)
+    map_utils._load_tileset_data(tables['atlas'], tables['models'],
+        tables['animations'], os.path.dirname(filename), load_headless_atlas,
+        model_manager.load_textured_rectangle,
+        gameworld.managers['animation_manager'].load_animation)
+    del tables['objects'][:]
+    gameworld.managers['map_manager'].load_compiled_map(name, tables, tiles)
+
+
+def main(size):
+    directory = tempfile.mkdtemp()
+    filename = os.path.join(directory, 'large.tmx')
+    cache_filename = os.path.join(directory, 'large.kvmap')
+    write_large_tmx(filename, size)
+    layers = len([layer for layer in tmx.TileMap.load(SOURCE).layers
+        if isinstance(layer, tmx.Layer)])
+
+    report('compile_tmx {}x{}'.format(size, size),
+        timed(map_utils.compile_tmx, filename, cache_filename, repeat=1),
+        size * size)
+    print('tmx {} KiB, compiled {} KiB'.format(
+        os.path.getsize(filename) // 1024,
+        os.path.getsize(cache_filename) // 1024))
+
+    gameworld = make_map_world(size, layers)
+    report('parse tmx {}x{}'.format(size, size),
+        timed(load_parsed, gameworld, filename, 'parsed', repeat=1),
+        size * size)
+    gameworld = make_map_world(size, layers)
+    report('compiled map {}x{}'.format(size, size),
+        timed(load_compiled, gameworld, filename, cache_filename,
+            'compiled', repeat=1), size * size)
+    gameworld = make_map_world(size, layers)
+    os.utime(filename, None)
+    report('compiled map, new mtime {}x{}'.format(size, size),
+        timed(load_compiled, gameworld, filename, cache_filename,
+            'compiled', repeat=1), size * size)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 512)
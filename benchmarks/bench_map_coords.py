@@ -0,0 +1,106 @@
+'''
+Compares converting tiles to pixels and pixels to tiles one point at a time
+with TileMap.get_tile_position and get_tile_index against the batched
+get_tile_positions and get_tile_indices, for every map orientation. The
+batched results are first checked against the scalar ones.
+
+Usage: python bench_map_coords.py [map_size] [point_count]
+'''
+import sys
+import random
+from array import array
+from bench_utils import make_gameworld, timed, report
+from kivent_core.systems.position_systems import PositionSystem2D
+from kivent_maps.map_system import MapSystem
+
+MAPS = [
+    ('orthogonal', {}),
+    ('isometric', {}),
+    ('staggered', {'stagger_axis': 'y', 'stagger_index': 'odd'}),
+    ('staggered', {'stagger_axis': 'x', 'stagger_index': 'even'}),
+    ('hexagonal', {'stagger_axis': 'y', 'stagger_index': 'odd',
+        'hex_side_length': 16}),
+    ('hexagonal', {'stagger_axis': 'x', 'stagger_index': 'even',
+        'hex_side_length': 16}),
+]
+
+
+def make_tile_map(gameworld, name, size, orientation, properties):
+    map_manager = gameworld.managers['map_manager']
+    map_manager.load_map(name, size, size, orientation=orientation)
+    tile_map = map_manager.maps[name]
+    tile_map.tile_size = (64, 32)
+    for key in properties:
+        setattr(tile_map, key, properties[key])
+    return tile_map
+
+
+def scalar_index(tile_map, x, y):
+    try:
+        return tile_map.get_tile_index(x, y)
+    except UnboundLocalError:
+        # The pixel is in none of the tiles checked, see get_tile_indices
+        return (-1, -1)
+
+
+def check(tile_map, cols, rows, xs, ys):
+    out_x, out_y = tile_map.get_tile_positions(cols, rows)
+    for n in range(len(cols)):
+        x, y = tile_map.get_tile_position(cols[n], rows[n])
+        assert abs(out_x[n] - x) < 1e-6 and abs(out_y[n] - y) < 1e-6, (
+            tile_map.name, cols[n], rows[n], (x, y), (out_x[n], out_y[n]))
+    out_cols, out_rows = tile_map.get_tile_indices(xs, ys)
+    for n in range(len(xs)):
+        col, row = scalar_index(tile_map, xs[n], ys[n])
+        assert (out_cols[n], out_rows[n]) == (col, row), (
+            tile_map.name, xs[n], ys[n], (col, row),
+            (out_cols[n], out_rows[n]))
+
+
+def main(size, count):
+    gameworld = make_gameworld([(PositionSystem2D, {}),
+        (MapSystem, {'memory_required': len(MAPS) * size * size * 32 +
+            1024 * 1024})], zones={'general': 1000},
+        size_of_gameworld=len(MAPS) * size * size * 32 // 1024 + 32 * 1024)
+    rng = random.Random(4)
+    cols = array('i', [rng.randrange(size) for n in range(count)])
+    rows = array('i', [rng.randrange(size) for n in range(count)])
+    out_x = array('d', [0.]) * count
+    out_y = array('d', [0.]) * count
+    out_cols = array('i', [0]) * count
+    out_rows = array('i', [0]) * count
+
+    for n, (orientation, properties) in enumerate(MAPS):
+        name = '{} {}'.format(orientation, properties.get('stagger_axis',
+            '')).strip()
+        tile_map = make_tile_map(gameworld, 'map_{}'.format(n), size,
+            orientation, properties)
+        w, h = tile_map.size_on_screen
+        xs = array('d', [rng.uniform(0, w) for i in range(count)])
+        ys = array('d', [rng.uniform(0, h) for i in range(count)])
+        check(tile_map, cols, rows, xs, ys)
+
+        def scalar_positions():
+            get_tile_position = tile_map.get_tile_position
+            for i in range(count):
+                get_tile_position(cols[i], rows[i])
+
+        def scalar_indices():
+            for i in range(count):
+                scalar_index(tile_map, xs[i], ys[i])
+
+        report('{} get_tile_position'.format(name),
+            timed(scalar_positions), count)
+        report('{} get_tile_positions'.format(name),
+            timed(tile_map.get_tile_positions, cols, rows, out_x, out_y),
+            count)
+        report('{} get_tile_index'.format(name),
+            timed(scalar_indices), count)
+        report('{} get_tile_indices'.format(name),
+            timed(tile_map.get_tile_indices, xs, ys, out_cols, out_rows),
+            count)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 256,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 100000)
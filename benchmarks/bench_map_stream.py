@@ -0,0 +1,109 @@
+'''
+Compares creating an entity for every tile of a large TileMap with
+map_utils.init_entities_from_map against baking the tiles into one model per
+chunk with map_utils.init_baked_entities_from_map, timing both the load and
+a Renderer update, and against streaming the map with
+MapSystem.start_streaming around an 800x600 view. The streaming runs pan the
+view across the map, loading every chunk that comes into view without a time
+budget, and report the number of entities they needed.
+
+Usage: python bench_map_stream.py [map_size] [pan_ticks]
+'''
+import sys
+from bench_utils import make_gameworld, timed, report, load_texture
+from kivent_core.systems.position_systems import PositionSystem2D
+from kivent_core.systems.renderers import Renderer
+from kivent_maps.map_system import MapSystem
+from kivent_maps import map_utils
+
+TILE_SIZE = 32
+TEXTURES = 4
+VIEW = (400., 300.)
+
+
+def make_map_world(size, zone_size, bake_static=False):
+    gameworld = make_gameworld([(PositionSystem2D, {}),
+        (MapSystem, {'memory_required': size * size * 32 + 1024 * 1024,
+            'stream_budget': 1., 'bake_static': bake_static}),
+        (Renderer, {'system_id': 'map_layer0',
+            'system_names': ['map_layer0', 'position'],
+            'dirty_tracking': True,
+            'max_batches': zone_size // 2000 + TEXTURES * 2})],
+        zones={'general': zone_size}, size_of_gameworld=224 * 1024,
+        model_format_allocations={'vertex_format_4f': (
+            size * size * 64 + 1024 * 1024, size * size * 12 + 1024 * 1024)})
+    model_manager = gameworld.model_manager
+    for i in range(TEXTURES):
+        texture = 'tile_{}'.format(i)
+        load_texture(texture, (TILE_SIZE, TILE_SIZE))
+        model_manager.load_textured_rectangle('vertex_format_4f',
+            TILE_SIZE, TILE_SIZE, texture, texture)
+    tiles = [[[{'model': 'tile_{}'.format((i + j) % TEXTURES),
+        'texture': 'tile_{}'.format((i + j) % TEXTURES), 'layer': 0}]
+        for j in range(size)] for i in range(size)]
+    map_manager = gameworld.managers['map_manager']
+    map_manager.load_map('bench', size, size, tiles)
+    tile_map = map_manager.maps['bench']
+    tile_map.tile_size = (TILE_SIZE, TILE_SIZE)
+    tile_map.z_index_map = [0]
+    return gameworld
+
+
+def bench_full(size, ticks, bake):
+    gameworld = make_map_world(size, size * size)
+    tile_map = gameworld.managers['map_manager'].maps['bench']
+    if bake:
+        name = 'baked'
+        load = timed(map_utils.init_baked_entities_from_map, tile_map,
+            gameworld, repeat=1)
+    else:
+        name = 'full'
+        load = timed(map_utils.init_entities_from_map, tile_map,
+            gameworld.init_entity, repeat=1)
+    report('map {} {}x{}'.format(name, size, size), load, size * size)
+    update = gameworld.system_manager['map_layer0'].update
+
+    def run():
+        for i in range(ticks):
+            update(False, 1. / 60.)
+
+    report('map {} render {} ticks'.format(name, ticks),
+        timed(run, repeat=1), ticks)
+
+
+def bench_stream(size, ticks, bake):
+    gameworld = make_map_world(size, 8192, bake)
+    map_system = gameworld.system_manager['tile_map']
+    width, height = gameworld.managers['map_manager'].maps['bench'].\
+        size_on_screen
+
+    def start():
+        map_system.start_streaming('bench')
+        map_system.update_stream(VIEW[0], VIEW[1], VIEW[0], VIEW[1])
+
+    def pan():
+        for i in range(ticks):
+            t = float(i) / ticks
+            map_system.update_stream(VIEW[0] + t * (width - 2 * VIEW[0]),
+                VIEW[1] + t * (height - 2 * VIEW[1]), VIEW[0], VIEW[1])
+
+    name = 'baked stream' if bake else 'stream'
+    report('map {} start {}x{}'.format(name, size, size),
+        timed(start, repeat=1), 1)
+    report('map {} pan {} ticks'.format(name, ticks),
+        timed(pan, repeat=1), ticks)
+    print('entities {} for {} tiles, {} chunks loaded, {} pooled'.format(
+        map_system.streamed_entity_count, size * size,
+        map_system.loaded_chunk_count, map_system.pooled_entity_count))
+
+
+def main(size, ticks):
+    bench_full(min(size, 256), 60, False)
+    bench_full(min(size, 256), 60, True)
+    bench_stream(size, ticks, False)
+    bench_stream(size, ticks, True)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 600)
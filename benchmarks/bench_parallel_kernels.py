@@ -0,0 +1,76 @@
+'''
+Times LifespanSystem.update and LastPositionSystem2D.update with their
+run_kernel chunks on one thread and spread across threads with OpenMP.
+kivent_core has to be built with KIVENT_USE_OPENMP set for the parallel
+runs to use more than one thread, OMP_NUM_THREADS picks how many. The
+lifespans expire during the run, and the entities left alive are first
+checked to be the same either way.
+
+Usage: python bench_parallel_kernels.py [count] [ticks] [chunk_size]
+'''
+import sys
+import random
+from bench_utils import make_gameworld, timed, report
+from kivent_core.systems.position_systems import (PositionSystem2D,
+    LastPositionSystem2D)
+from kivent_core.systems.lifespan import LifespanSystem
+
+DT = 1. / 60.
+
+
+def make_world(count, parallel, chunk_size):
+    system_kwargs = {'parallel': parallel, 'kernel_chunk_size': chunk_size}
+    gameworld = make_gameworld([(PositionSystem2D, {}),
+        (LastPositionSystem2D, system_kwargs),
+        (LifespanSystem, system_kwargs)], zones={'general': count},
+        size_of_gameworld=count * 128 // 1024 + 8 * 1024)
+    rng = random.Random(2)
+    entity_ids = gameworld.init_entities_bulk({
+        'position': [(rng.uniform(0, 1000), rng.uniform(0, 1000))
+            for i in range(count)],
+        'last_position': [(0., 0.)] * count,
+        'lifespan': [{'lifespan': rng.uniform(.5, 10.)}
+            for i in range(count)]},
+        ['position', 'last_position', 'lifespan'], count)
+    return gameworld, entity_ids
+
+
+def check(count, ticks, chunk_size):
+    results = []
+    for parallel in (False, True):
+        gameworld, entity_ids = make_world(count, parallel, chunk_size)
+        for i in range(ticks):
+            gameworld.update(DT)
+        results.append([(entity_id,
+            gameworld.entities[entity_id].lifespan.current_time)
+            for entity_id in entity_ids
+            if gameworld.entities[entity_id].load_order])
+    assert results[0] == results[1], 'parallel kernels differ from serial'
+
+
+def main(count, ticks, chunk_size):
+    check(min(count, 20000), ticks, chunk_size)
+    results = {}
+    for parallel in (False, True):
+        name = 'parallel' if parallel else 'serial'
+        gameworld, entity_ids = make_world(count, parallel, chunk_size)
+        systems = gameworld.system_manager
+        for system_id in ('last_position', 'lifespan'):
+            update = systems[system_id].update
+
+            def run():
+                for i in range(ticks):
+                    update(DT)
+
+            results[parallel, system_id] = seconds = timed(run, repeat=1)
+            report('{} {} {}'.format(system_id, name, count), seconds,
+                count * ticks)
+    for system_id in ('last_position', 'lifespan'):
+        print('{} speedup: {:.2f}x'.format(system_id,
+            results[False, system_id] / results[True, system_id]))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 60,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 4096)
@@ -0,0 +1,104 @@
+'''
+Steps a headless GameWorld of several independent LifespanSystems, one
+per component, with the ScheduleManager disabled and then enabled with an
+increasing number of threads. The LifespanSystems touch different
+components so the ScheduleManager updates them all in a single stage, and
+their kernels release the GIL. Expired entities are replaced every tick, so
+entity_ids are reused. A short run is first checked to leave every world
+with exactly the same entities and lifespans as the serial one.
+
+Usage: python bench_parallel_systems.py [entity_count] [ticks] [systems]
+'''
+import sys
+import os
+import random
+from bench_utils import make_gameworld, timed, report
+from kivent_core.systems.lifespan import LifespanSystem
+from kivent_core.entity import NoComponentActiveError
+
+DT = 1. / 60.
+
+
+def make_world(count, system_count, workers):
+    names = ['lifespan_{}'.format(n) for n in range(system_count)]
+    gameworld = make_gameworld([(LifespanSystem, {'system_id': name,
+        'system_names': [name], 'thread_safe': True}) for name in names],
+        zones={'general': count}, size_of_gameworld=64*1024)
+    scheduler = gameworld.schedule_manager
+    scheduler.enabled = workers > 0
+    scheduler.worker_count = workers
+    return gameworld, names
+
+
+def spawn(gameworld, names, rng, count):
+    if count == 0:
+        return []
+    components = {name: [{'lifespan': rng.uniform(.5, 10.)}
+        for i in range(count)] for name in names}
+    return gameworld.init_entities_bulk(components, names, count)
+
+
+def run_world(count, ticks, system_count, workers):
+    gameworld, names = make_world(count, system_count, workers)
+    entity_manager = gameworld.entity_manager
+    rng = random.Random(1)
+    spawned = spawn(gameworld, names, rng, count)
+    update = gameworld.update
+
+    def run():
+        for i in range(ticks):
+            update(DT)
+            spawned.extend(spawn(gameworld, names, rng,
+                count - entity_manager.get_active_entity_count()))
+
+    return gameworld, names, spawned, run
+
+
+def get_state(gameworld, names, spawned):
+    entities = gameworld.entities
+    state = []
+    for entity_id in sorted(set(spawned)):
+        entity = entities[entity_id]
+        for name in names:
+            try:
+                component = getattr(entity, name)
+            except NoComponentActiveError:
+                state.append(None)
+                continue
+            state.append((component.entity_id, component.current_time))
+    return spawned, state
+
+
+def check(system_count, worker_counts):
+    states = []
+    for workers in [0] + worker_counts:
+        gameworld, names, spawned, run = run_world(2000, 120, system_count,
+            workers)
+        run()
+        states.append(get_state(gameworld, names, spawned))
+    print('stages: {}'.format(gameworld.schedule_manager.get_stages()))
+    for state in states[1:]:
+        assert state == states[0], 'parallel update differs from serial'
+
+
+def main(count, ticks, system_count):
+    cpus = os.cpu_count() or 1
+    worker_counts = [n for n in (1, 2, 4, 8, 16) if n <= cpus]
+    check(system_count, worker_counts)
+    results = {}
+    for workers in [0] + worker_counts:
+        gameworld, names, spawned, run = run_world(count, ticks,
+            system_count, workers)
+        results[workers] = seconds = timed(run, repeat=1)
+        name = '{} threads'.format(workers) if workers else 'serial'
+        report('{} x {} lifespan {}'.format(system_count, count, name),
+            seconds, ticks)
+    for workers in worker_counts:
+        print('{} threads speedup: {:.2f}x'.format(workers,
+            results[0] / results[workers]))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 60,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 8)
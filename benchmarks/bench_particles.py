@@ -0,0 +1,72 @@
+'''
+Compares spawning particles through GameWorld.init_entity, the default for
+ParticleSystem, with ParticleSystem's pool mode, which reactivates parked
+particle entities in C, and with the pool mode's structure of arrays
+integration, serial and across threads, and the pool mode drawn with
+PointParticleRenderer's one compact record per particle instead of
+ParticleRenderer's 4 vertices and 6 indices. A single emitter spawns rate
+particles per second and the GameWorld is stepped at 60 ticks per second, so
+about rate * life_span particles are alive once it settles.
+
+Usage: python bench_particles.py [rate] [ticks]
+'''
+import sys
+from bench_utils import make_gameworld, timed, report, load_texture
+from kivent_core.systems.position_systems import PositionSystem2D
+from kivent_core.systems.rotate_systems import RotateSystem2D
+from kivent_core.systems.scale_systems import ScaleSystem2D
+from kivent_core.systems.color_systems import ColorSystem
+from kivent_particles.particle import ParticleSystem
+from kivent_particles.emitter import EmitterSystem
+from kivent_particles.particle_renderers import (ParticleRenderer,
+    PointParticleRenderer)
+
+DT = 1. / 60.
+LIFE_SPAN = 1.
+
+
+def bench_particles(rate, ticks, name, particle_args,
+    renderer_cls=ParticleRenderer):
+    capacity = int(rate * LIFE_SPAN * 2) + 100
+    max_batches = capacity // 1000 + 2
+    gameworld = make_gameworld([(PositionSystem2D, {}), (RotateSystem2D, {}),
+        (ScaleSystem2D, {}), (ColorSystem, {}),
+        (ParticleSystem, particle_args), (EmitterSystem, {}),
+        (renderer_cls, {'max_batches': max_batches,
+        'size_of_batches': 256})],
+        zones={'general': 10, 'particles': capacity},
+        size_of_gameworld=max_batches * 1536 + capacity // 2 + 16 * 1024)
+    system_manager = gameworld.system_manager
+    emitters = system_manager['emitters']
+    emitters.particle_system = system_manager['particles']
+    load_texture('particle')
+    emitters.load_effect_from_data({'number_of_particles': rate * LIFE_SPAN,
+        'life_span': LIFE_SPAN, 'texture': 'particle', 'paused': False,
+        'pos_variance': (150., 150.), 'speed': 100., 'speed_variance': 50.},
+        'bench_effect')
+    gameworld.init_entity({'position': (200., 200.), 'rotate': 0.,
+        'emitters': ['bench_effect']}, ['position', 'rotate', 'emitters'],
+        zone='general')
+    update = gameworld.update
+
+    def run():
+        for i in range(ticks):
+            update(DT)
+
+    report('particles {} {}/s'.format(name, rate), timed(run, repeat=3),
+        ticks)
+
+
+def main(rate, ticks):
+    bench_particles(rate, ticks, 'init_entity', {})
+    bench_particles(rate, ticks, 'pooled', {'pooled': True})
+    bench_particles(rate, ticks, 'soa', {'pooled': True, 'soa': True})
+    bench_particles(rate, ticks, 'soa parallel', {'pooled': True,
+        'soa': True, 'parallel': True})
+    bench_particles(rate, ticks, 'pooled point', {'pooled': True},
+        PointParticleRenderer)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 300)
@@ -0,0 +1,43 @@
+'''
+Compares removing entities one at a time through GameWorld.remove_entity
+with queueing them through GameWorld.queue_remove_entities and flushing the
+queue once, as GameWorld.update does.
+
+Usage: python bench_remove_entities.py [count]
+'''
+import sys
+from bench_utils import make_gameworld, timed, report
+from kivent_core.systems.position_systems import PositionSystem2D
+from kivent_core.systems.rotate_systems import RotateSystem2D
+
+
+def main(count):
+    gameworld = make_gameworld([(PositionSystem2D, {}), (RotateSystem2D, {})],
+        zones={'general': count})
+    component_order = ['position', 'rotate']
+    positions = [(float(i), float(i)) for i in range(count)]
+    entity_ids = []
+
+    def create():
+        gameworld.clear_entities()
+        entity_ids[:] = gameworld.init_entities_bulk(
+            {'position': positions, 'rotate': 0.}, component_order, count)
+
+    def loop():
+        remove_entity = gameworld.remove_entity
+        for entity_id in entity_ids:
+            remove_entity(entity_id)
+
+    def queued():
+        gameworld.queue_remove_entities(entity_ids)
+        gameworld.remove_entities()
+
+    loop_time = timed(loop, setup=create)
+    report('remove_entity loop', loop_time, count)
+    queued_time = timed(queued, setup=create)
+    report('queue_remove_entities + flush', queued_time, count)
+    print('speedup: {:.1f}x'.format(loop_time / queued_time))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,69 @@
+'''
+Compares reloading a GameWorld of positioned, rotated and rendered entities
+by clearing it and creating every entity again with
+GameWorld.init_entities_bulk with restoring a snapshot taken by the
+SnapshotManager. Restoring also rebuilds the Renderer's batches. Before
+timing, entities are moved, removed and added after taking a snapshot, and
+restoring it is checked to bring back exactly the entities and positions
+it was taken with.
+
+Usage: python bench_snapshot.py [count]
+'''
+import sys
+from bench_utils import make_gameworld, timed, report
+from kivent_core.systems.position_systems import PositionSystem2D
+from kivent_core.systems.rotate_systems import RotateSystem2D
+from kivent_core.systems.renderers import RotateRenderer
+from kivent_core.memory_handlers.utils import memrange
+
+
+def get_positions(gameworld):
+    components = gameworld.system_manager['position'].components
+    return [(component.entity_id, component.x, component.y)
+        for component in memrange(components)]
+
+
+def main(count):
+    gameworld = make_gameworld([(PositionSystem2D, {}),
+        (RotateSystem2D, {}), (RotateRenderer, {
+            'max_batches': count // 1000 + 1, 'size_of_batches': 128})],
+        zones={'general': count + 1000}, size_of_gameworld=64*1024)
+    component_order = ['position', 'rotate', 'rotate_renderer']
+    model_manager = gameworld.model_manager
+    model_key = model_manager.load_model('vertex_format_4f', 4, 6, 'quad')
+    model_manager.models[model_key].set_textured_rectangle(16., 16.,
+        [0., 0., 1., 1.])
+    components = {'position': [(i % 1000 * 20., i // 1000 * 20.)
+        for i in range(count)], 'rotate': [0.] * count,
+        'rotate_renderer': {'model_key': model_key}}
+    snapshot_manager = gameworld.snapshot_manager
+
+    def load():
+        gameworld.init_entities_bulk(components, component_order, count)
+
+    load()
+    expected = get_positions(gameworld)
+    data = snapshot_manager.snapshot()
+    entities = gameworld.entities
+    for entity_id in range(0, count, 2):
+        entities[entity_id].position.x += 1.
+    for entity_id in range(1, count, 3):
+        gameworld.remove_entity(entity_id)
+    gameworld.init_entities_bulk({'position': [(0., 0.)] * 1000,
+        'rotate': [0.] * 1000, 'rotate_renderer': {'model_key': model_key}},
+        component_order, 1000)
+    snapshot_manager.restore(data)
+    assert get_positions(gameworld) == expected, 'restore differs'
+    print('snapshot size: {:.1f} KiB'.format(len(data) / 1024.))
+
+    load_time = timed(load, setup=gameworld.clear_entities)
+    report('clear and init_entities_bulk', load_time, count)
+    snapshot_time = timed(snapshot_manager.snapshot)
+    report('snapshot', snapshot_time, count)
+    restore_time = timed(snapshot_manager.restore, data)
+    report('restore', restore_time, count)
+    print('speedup: {:.2f}x'.format(load_time / restore_time))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
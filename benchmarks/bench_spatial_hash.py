@@ -0,0 +1,108 @@
+'''
+Compares box queries through the SpatialHashSystem against
+CymunkPhysics.query_bb and against scanning every PositionComponent2D. The
+cymunk comparison is skipped if kivent_cymunk is not installed.
+
+Usage: python bench_spatial_hash.py [query_count]
+'''
+import sys
+import random
+from array import array
+from bench_utils import make_gameworld, timed, report
+from kivent_core.systems.position_systems import PositionSystem2D
+from kivent_core.systems.rotate_systems import RotateSystem2D
+from kivent_core.systems.spatial_hash import SpatialHashSystem
+
+try:
+    from kivent_cymunk.physics import CymunkPhysics
+except ImportError:
+    CymunkPhysics = None
+
+WORLD_SIZE = 20000.
+BOX_SIZE = 200.
+RADIUS = 10.
+
+
+def make_boxes(query_count):
+    rng = random.Random(1)
+    boxes = []
+    for i in range(query_count):
+        x = rng.uniform(0., WORLD_SIZE - BOX_SIZE)
+        y = rng.uniform(0., WORLD_SIZE - BOX_SIZE)
+        boxes.append((x, y, x + BOX_SIZE, y + BOX_SIZE))
+    return boxes
+
+
+def make_positions(count):
+    rng = random.Random(0)
+    return [(rng.uniform(0., WORLD_SIZE), rng.uniform(0., WORLD_SIZE))
+        for i in range(count)]
+
+
+def bench_spatial_hash(count, positions, boxes):
+    gameworld = make_gameworld([(PositionSystem2D, {}),
+        (SpatialHashSystem, {'cell_size': BOX_SIZE})],
+        zones={'general': count})
+    gameworld.init_entities_bulk({'position': positions,
+        'spatial_hash': {'radius': RADIUS}}, ['position', 'spatial_hash'],
+        count)
+    spatial_hash = gameworld.system_manager['spatial_hash']
+    report('spatial_hash rebuild {}'.format(count),
+        timed(spatial_hash.update, 0.), count)
+    out = array('I', [0]) * count
+
+    def run():
+        query_aabb = spatial_hash.query_aabb
+        for x0, y0, x1, y1 in boxes:
+            query_aabb(x0, y0, x1, y1, out)
+
+    report('spatial_hash query_aabb {}'.format(count), timed(run),
+        len(boxes))
+
+    def scan():
+        components = gameworld.system_manager['position'].components
+        for x0, y0, x1, y1 in boxes[:len(boxes) // 10]:
+            [c.entity_id for c in components if c is not None and
+                x0 <= c.x <= x1 and y0 <= c.y <= y1]
+
+    report('position scan {}'.format(count), timed(scan, repeat=1),
+        len(boxes) // 10)
+
+
+def bench_query_bb(count, positions, boxes):
+    gameworld = make_gameworld([(PositionSystem2D, {}), (RotateSystem2D, {}),
+        (CymunkPhysics, {})], zones={'general': count})
+    init_entity = gameworld.init_entity
+    for pos in positions:
+        shape = {'shape_type': 'circle', 'elasticity': .5,
+            'collision_type': 1, 'friction': 1.0, 'shape_info': {
+            'inner_radius': 0, 'outer_radius': RADIUS, 'mass': 50,
+            'offset': (0, 0)}}
+        init_entity({'position': pos, 'rotate': 0., 'cymunk_physics': {
+            'main_shape': 'circle', 'velocity': (0, 0), 'position': pos,
+            'angle': 0., 'angular_velocity': 0., 'vel_limit': 250,
+            'ang_vel_limit': 1., 'mass': 50, 'col_shapes': [shape]}},
+            ['position', 'rotate', 'cymunk_physics'])
+    physics = gameworld.system_manager['cymunk_physics']
+
+    def run():
+        query_bb = physics.query_bb
+        for box in boxes:
+            query_bb(list(box))
+
+    report('cymunk query_bb {}'.format(count), timed(run), len(boxes))
+
+
+def main(query_count):
+    boxes = make_boxes(query_count)
+    for count in (10000, 100000):
+        positions = make_positions(count)
+        bench_spatial_hash(count, positions, boxes)
+        if CymunkPhysics is not None:
+            bench_query_bb(count, positions, boxes)
+        else:
+            print('kivent_cymunk not installed, skipping query_bb')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,86 @@
+'''
+Shared helpers for the KivEnt benchmark scripts. The benchmarks construct a
+GameWorld directly instead of running an App, so they only measure the cost
+of the operations being compared. The GameWorld is headless so the benchmarks
+also run without a display.
+'''
+import os
+os.environ.setdefault('KIVENT_HEADLESS', '1')
+from time import perf_counter
+from kivent_core.gameworld import GameWorld
+from kivent_core.managers.resource_managers import texture_manager
+
+
+class HeadlessTexture(object):
+    '''Takes the place of a Texture for headless renderers, which only need
+    its size.'''
+
+    def __init__(self, size):
+        self.size = size
+
+
+def make_gameworld(systems, zones=None, size_of_gameworld=32*1024,
+    **kwargs):
+    '''Creates and allocates a GameWorld with the given GameSystem classes.
+
+    Args:
+        systems (list): list of (GameSystem class, kwargs dict) pairs.
+
+        zones (dict): zone name and count pairings for the GameWorld, defaults
+        to {'general': 100000}.
+
+        size_of_gameworld (int): size in kibibytes of the GameWorld's static
+        allocation.
+
+        Any other kwargs are set on the GameWorld, such as
+        model_format_allocations.
+
+    Return:
+        GameWorld: the allocated GameWorld.
+    '''
+    if zones is None:
+        zones = {'general': 100000}
+    gameworld = GameWorld(zones=zones, size_of_gameworld=size_of_gameworld,
+        **kwargs)
+    zone_names = list(zones.keys())
+    for system_cls, system_kwargs in systems:
+        system_kwargs = dict(system_kwargs)
+        system_kwargs.setdefault('zones', zone_names)
+        #gameworld goes last so that on_gameworld sees the other kwargs
+        system_kwargs['gameworld'] = gameworld
+        gameworld.add_system(system_cls(**system_kwargs))
+    gameworld.allocate()
+    return gameworld
+
+
+def load_texture(name, size=(8, 8)):
+    '''Registers a HeadlessTexture with the texture_manager so that
+    renderer components can refer to name, unless it is already loaded.
+
+    Return:
+        int: the texkey of the texture.
+    '''
+    if name not in texture_manager.loaded_textures:
+        texture_manager.load_texture(name, HeadlessTexture(size))
+    return texture_manager.get_texkey_from_name(name)
+
+
+def timed(func, *args, repeat=5, setup=None, **kwargs):
+    '''Calls func(*args, **kwargs) repeat times and returns the best wall
+    time in seconds. If setup is provided it is called before every run and
+    is not included in the timing.'''
+    best = None
+    for i in range(repeat):
+        if setup is not None:
+            setup()
+        start = perf_counter()
+        func(*args, **kwargs)
+        elapsed = perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def report(name, seconds, count):
+    print('{:<40} {:>10.3f} ms {:>12.0f} per second'.format(
+        name, seconds * 1000., count / seconds))
@@ -0,0 +1,64 @@
+---VERTEX SHADER---
+#ifdef GL_ES
+    precision highp float;
+#endif
+
+/* Outputs to the fragment shader */
+varying vec4 frag_color;
+varying vec4 uv_rect;
+varying vec2 extent;
+varying vec2 rotation;
+
+/* vertex attributes */
+attribute vec2     center;
+attribute float    rotate;
+attribute float    scale;
+attribute vec4     v_color;
+attribute float    uv_index;
+
+/* uniform variables */
+uniform mat4       modelview_mat;
+uniform mat4       projection_mat;
+uniform vec4       color;
+uniform float      opacity;
+uniform vec4       uv_rects[32];
+uniform vec2       sprite_sizes[32];
+
+void main (void) {
+  int sprite = int(uv_index);
+  vec2 size = sprite_sizes[sprite] * scale;
+  float diameter = length(size);
+  frag_color = v_color;
+  uv_rect = uv_rects[sprite];
+  extent = size / max(diameter, 0.0001);
+  rotation = vec2(cos(rotate), sin(rotate));
+  gl_Position = projection_mat * modelview_mat * vec4(center, 0.0, 1.0);
+  gl_PointSize = diameter * length(modelview_mat[0].xy);
+}
+
+
+---FRAGMENT SHADER---
+#ifdef GL_ES
+    precision highp float;
+#endif
+
+/* Outputs from the vertex shader */
+varying vec4 frag_color;
+varying vec4 uv_rect;
+varying vec2 extent;
+varying vec2 rotation;
+
+/* uniform texture samplers */
+uniform sampler2D texture0;
+
+void main (void){
+    vec2 p = gl_PointCoord - vec2(0.5);
+    p.y = -p.y;
+    p = vec2(rotation.x * p.x + rotation.y * p.y,
+             rotation.x * p.y - rotation.y * p.x);
+    vec2 local = p / extent + vec2(0.5);
+    if (local.x < 0.0 || local.x > 1.0 || local.y < 0.0 || local.y > 1.0)
+        discard;
+    gl_FragColor = frag_color * texture2D(texture0,
+        mix(uv_rect.xy, uv_rect.zw, local));
+}
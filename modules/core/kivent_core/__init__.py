@@ -2,11 +2,21 @@ import os
 
 __VERSION__ = '2.1.0'
 
+# Set KIVENT_HEADLESS to run GameWorld without a window or GL context, see
+# GameWorld.headless. Kivy will then not load a window provider or a real GL
+# backend unless KIVY_WINDOW or KIVY_GL_BACKEND are set explicitly.
+headless = 'KIVENT_HEADLESS' in os.environ
+if headless:
+    os.environ.setdefault('KIVY_WINDOW', '')
+    os.environ.setdefault('KIVY_GL_BACKEND', 'mock')
+
 if 'KIVENT_PREVENT_INIT' not in os.environ:
-    from kivy.core.window import Window
+    if not headless:
+        from kivy.core.window import Window
     from kivent_core import memory_handlers
     from kivent_core import rendering
     from kivent_core import managers
     from kivent_core import entity
+    from kivent_core import rng
     from kivent_core import gameworld
     from kivent_core import systems
@@ -1,12 +1,13 @@
-# cython: profile=True
 # cython: embedsignature=True
 from kivy.uix.widget import Widget, WidgetException
 from kivy.properties import (StringProperty, ListProperty, NumericProperty,
 DictProperty, BooleanProperty, ObjectProperty)
 from kivy.clock import Clock
 from kivy.logger import Logger
+from kivy.base import EventLoop
 from functools import partial
-from kivy.graphics import RenderContext
+from kivy.graphics import RenderContext, Canvas
+import kivent_core
 from kivent_core.systems.gamesystem cimport GameSystem
 from kivent_core.systems.position_systems cimport PositionSystem2D
 from kivent_core.uix.cwidget cimport CWidget
@@ -22,6 +23,11 @@ from kivent_core.managers.resource_managers cimport ModelManager
 from kivent_core.managers.sound_manager import SoundManager
 from kivent_core.managers.resource_managers import texture_manager
 from kivent_core.managers.animation_manager import AnimationManager
+from kivent_core.managers.profile_manager cimport ProfileManager
+from kivent_core.managers.schedule_manager cimport ScheduleManager
+from kivent_core.managers.snapshot_manager import SnapshotManager
+from libc.stdlib cimport malloc, free
+from libc.math cimport fmod
 from kivy.logger import Logger
 debug = False
 
@@ -55,6 +61,80 @@ class GameManagerAlreadyRegistered(Exception):
 class GameManagerNotRegistered(Exception):
     pass
 
+class ArchetypeAlreadyRegistered(Exception):
+    pass
+
+
+cdef class Archetype:
+    '''
+    A creation plan for entities that share a component_order, built once by
+    GameWorld.register_archetype so that GameWorld.spawn does not have to
+    look up the GameSystems or inspect the component args of every entity
+    it creates.
+
+    **Attributes:**
+        **name** (str): The name the Archetype was registered under.
+
+        **component_order** (list): The system_id of the components, in the
+        order they are created.
+
+        **zone** (str): The zone entities are created in unless another is
+        passed to GameWorld.spawn.
+
+    **Attributes: (Cython Access Only)**
+        **systems** (list): The GameSystem for each component.
+
+        **default_args** (list): The creation args for each component.
+
+        **copied** (list): True for each component whose default args is an
+        Entity whose component will be copied.
+
+        **positions** (dict): Maps system_id to its index in
+        component_order.
+    '''
+    cdef str _name
+    cdef list _component_order
+    cdef str _zone
+    cdef list systems
+    cdef list default_args
+    cdef list copied
+    cdef dict positions
+
+    def __init__(self, str name, list component_order, list systems,
+        list default_args, str zone):
+        cdef unsigned int i
+        self._name = name
+        self._component_order = component_order
+        self.systems = systems
+        self.default_args = default_args
+        self._zone = zone
+        self.copied = [isinstance(args, Entity) for args in default_args]
+        self.positions = {}
+        for i in range(len(component_order)):
+            self.positions[component_order[i]] = i
+
+    property name:
+        def __get__(self):
+            return self._name
+
+    property component_order:
+        def __get__(self):
+            return list(self._component_order)
+
+    property zone:
+        def __get__(self):
+            return self._zone
+
+
+class HeadlessWindow(object):
+    '''Stand-in for the Kivy Window installed by a headless GameWorld when
+    no Window has been created, so that Kivy widgets can be instantiated
+    without a display.
+    '''
+    width = 0
+    height = 0
+    size = (0, 0)
+
 
 class GameWorld(Widget):
     '''GameWorld is the manager of all Entities and GameSystems in your Game.
@@ -77,7 +157,9 @@ class GameWorld(Widget):
         'systems_added','systems_removed', 'systems_paused', 'systems_unpaused'
 
         **entities_to_remove** (list): list of entity_ids that will be cleaned
-        up in the next cleanup update tick
+        up in the next cleanup update tick. Kept for compatibility, prefer
+        **queue_remove_entity** which uses the EntityManager's C-level removal
+        queue.
 
         **system_manager** (SystemManager): Registers all the GameSystem added
         to the GameWorld and contains information for allocation and use of
@@ -89,7 +171,33 @@ class GameWorld(Widget):
         **system_count** (NumericProperty): The number of systems that will
         have memory allocated for them in the entities array.
 
-        **update_time** (NumericProperty): The update interval.
+        **update_time** (NumericProperty): The update interval. When
+        **fixed_timestep** is True this is also the length of every step.
+
+        **fixed_timestep** (BooleanProperty): If True, **update** accumulates
+        the frame time and advances every GameSystem whose **fixed_step** is
+        True in lockstep, calling their update with **update_time** as many
+        times as the accumulated time allows. Systems that are not fixed_step,
+        such as the Renderers, are updated once per frame afterwards. If False
+        each GameSystem keeps its own accumulator in **_update**. Defaults to
+        False.
+
+        **max_steps_per_frame** (NumericProperty): When **fixed_timestep** is
+        True, the most steps that will be taken during a single **update**.
+        Time beyond that is dropped instead of being caught up on later, so
+        that a slow frame cannot cause ever slower frames. Defaults to 5.
+
+        **interpolation_alpha** (NumericProperty): When **fixed_timestep** is
+        True, the fraction of a step left in the accumulator after the last
+        **update**, between 0. and 1. Renderers can use it to draw entities
+        between their previous and current state, see
+        LerpScaledPolyRenderer. Always 1. when fixed_timestep is False.
+
+        **accumulated_time** (float): The time not yet consumed by a fixed
+        step.
+
+        **dropped_time** (float): Total time dropped because
+        **max_steps_per_frame** was reached.
 
         **size_of_entity_block** (NumericProperty): The size in kibibytes of
         the Entity MemoryBlocks.
@@ -110,6 +218,31 @@ class GameWorld(Widget):
         may register managers or remove them with the *register_mnanager*
         and *unregister_manager* fucntions.
 
+        **archetypes** (dict): The Archetype registered with
+        **register_archetype** under each name.
+
+        **profile_manager** (ProfileManager): Records the time taken by each
+        GameSystem during **update** while its **enabled** is True.
+
+        **schedule_manager** (ScheduleManager): While its **enabled** is
+        True, **update** runs GameSystems that touch different components
+        at the same time on a pool of threads.
+
+        **snapshot_manager** (SnapshotManager): Saves the state of every
+        entity and component with **snapshot** and puts it back with
+        **restore**.
+
+        **headless** (BooleanProperty): If True the GameWorld and its
+        GameSystems will not need a window or GL context, for instance to run
+        a simulation server or benchmarks. A HeadlessWindow is installed if
+        Kivy has no Window, plain Canvas are used instead of RenderContext,
+        and Renderers fill their frame buffers without creating any drawing
+        instructions. Must be passed to the constructor, before any
+        GameSystem is created. Defaults to True if the KIVENT_HEADLESS
+        environment variable was set when kivent_core was imported. Step
+        the world yourself by calling **allocate** once and then **update**
+        instead of **init_gameworld**.
+
     '''
     state = StringProperty('initial')
     gamescreenmanager = ObjectProperty(None)
@@ -117,23 +250,35 @@ class GameWorld(Widget):
     size_of_gameworld = NumericProperty(1024)
     size_of_entity_block = NumericProperty(16)
     update_time = NumericProperty(1./60.)
+    fixed_timestep = BooleanProperty(False)
+    max_steps_per_frame = NumericProperty(5)
+    interpolation_alpha = NumericProperty(1.)
     system_count = NumericProperty(DEFAULT_SYSTEM_COUNT)
     model_format_allocations = DictProperty({})
+    headless = BooleanProperty(False)
 
 
     def __init__(self, **kwargs):
-        self.canvas = RenderContext(use_parent_projection=True,
-            use_parent_modelview=True)
+        if kwargs.setdefault('headless', kivent_core.headless):
+            if not EventLoop.window:
+                EventLoop.window = HeadlessWindow()
+            self.canvas = Canvas()
+        else:
+            self.canvas = RenderContext(use_parent_projection=True,
+                use_parent_modelview=True)
         self.systems_to_add = []
         super(GameWorld, self).__init__(**kwargs)
         self.states = {}
         self.state_callbacks = {}
         self.managers = {}
+        self.archetypes = {}
         self.entity_manager = None
         self.entities = None
         self._last_state = 'initial'
         self._system_count = DEFAULT_SYSTEM_COUNT
         self.entities_to_remove = []
+        self.accumulated_time = 0.
+        self.dropped_time = 0.
         self.system_manager = SystemManager()
         self.manager_order = []
         self.register_manager("system_manager", self.system_manager)
@@ -148,6 +293,12 @@ class GameWorld(Widget):
         self.texture_manager = texture_manager
         self.animation_manager = AnimationManager()
         self.register_manager("animation_manager", self.animation_manager)
+        self.profile_manager = ProfileManager()
+        self.register_manager("profile_manager", self.profile_manager)
+        self.schedule_manager = ScheduleManager()
+        self.register_manager("schedule_manager", self.schedule_manager)
+        self.snapshot_manager = SnapshotManager()
+        self.register_manager("snapshot_manager", self.snapshot_manager)
 
 
 
@@ -421,13 +572,11 @@ class GameWorld(Widget):
         cdef SystemManager system_manager = self.system_manager
         entity.system_manager = system_manager
         cdef object component_args
-        cdef unsigned int system_id
         cdef Entity entity_to_copy
         if debug:
             debug_str = 'KivEnt: Entity {entity_id} created with components: '
         for component in component_order:
             system = system_manager[component]
-            system_id = system_manager.get_system_index(component)
             component_args = components_to_use[component]
             if isinstance(component_args, Entity):
                 entity_to_copy = component_args
@@ -443,6 +592,194 @@ class GameWorld(Widget):
             Logger.debug((debug_str).format(entity_id=str(entity_id)))
         return entity_id
 
+    def register_archetype(self, str name, list component_order,
+        dict default_args, zone='general'):
+        '''
+        Args:
+            name (str): The name to spawn the archetype by. If it is already
+            registered an ArchetypeAlreadyRegistered exception will be raised.
+
+            component_order (list): The system_id of the components of the
+            entities, in the order they will be initialized.
+
+            default_args (dict): The creation args for each system_id in
+            component_order, as for **init_entity**.
+
+            zone (str): The zone **spawn** creates entities in by default.
+
+        Registers a template for entities that are created often with the
+        same components, such as projectiles or particles. The GameSystems
+        are looked up and the args checked once here instead of on every
+        **init_entity**, **spawn** then only has to patch in the args that
+        differ for each entity.
+
+        Return:
+            Archetype: The registered Archetype.
+        '''
+        if name in self.archetypes:
+            raise ArchetypeAlreadyRegistered(
+                "{} is already registered".format(name))
+        cdef SystemManager system_manager = self.system_manager
+        cdef list systems = []
+        cdef list args = []
+        for component in component_order:
+            systems.append(system_manager[component])
+            args.append(default_args[component])
+        archetype = Archetype(name, list(component_order), systems, args,
+            zone)
+        self.archetypes[name] = archetype
+        return archetype
+
+    def unregister_archetype(self, str name):
+        '''
+        Args:
+            name (str): The name of a registered archetype, which will be
+            forgotten.
+        '''
+        del self.archetypes[name]
+
+    def spawn(self, str archetype_name, dict overrides=None, zone=None):
+        '''
+        Args:
+            archetype_name (str): The name of an archetype registered with
+            **register_archetype**.
+
+            overrides (dict): Optional creation args that differ from the
+            archetype's default_args, keyed by system_id. If both the
+            default and the override are dicts only the keys of the override
+            are replaced, otherwise the override is used instead of the
+            default. Neither is modified.
+
+            zone (str): The zone to create the entity in, the archetype's
+            zone if None.
+
+        Creates an entity from an archetype, like **init_entity** with the
+        archetype's component_order and default_args patched by overrides.
+
+        Return:
+            unsigned int: The entity_id of the new entity.
+        '''
+        cdef Archetype archetype = self.archetypes[archetype_name]
+        cdef EntityManager entity_manager = self.entity_manager
+        cdef list systems = archetype.systems
+        cdef list args = archetype.default_args
+        cdef list copied = archetype.copied
+        cdef unsigned int i, position
+        cdef Entity entity_to_copy
+        cdef dict patched
+        if zone is None:
+            zone = archetype._zone
+        if overrides:
+            args = list(args)
+            copied = list(copied)
+            for component in overrides:
+                position = archetype.positions[component]
+                override = overrides[component]
+                default = args[position]
+                if isinstance(override, dict) and isinstance(default, dict):
+                    patched = dict(default)
+                    patched.update(override)
+                    args[position] = patched
+                else:
+                    args[position] = override
+                    copied[position] = isinstance(override, Entity)
+        cdef unsigned int entity_id = entity_manager.generate_entity(zone)
+        cdef Entity entity = self.entities[entity_id]
+        entity.load_order = list(archetype._component_order)
+        entity.system_manager = self.system_manager
+        for i in range(len(systems)):
+            system = systems[i]
+            if copied[i]:
+                entity_to_copy = args[i]
+                system.copy_component(entity_id,
+                    entity_to_copy.get_component_index(
+                        archetype._component_order[i]))
+            else:
+                system.create_component(entity_id, zone, args[i])
+        if debug:
+            Logger.debug('KivEnt: Entity {entity_id} spawned from '
+                '{archetype}'.format(entity_id=entity_id,
+                archetype=archetype_name))
+        return entity_id
+
+    def init_entities_bulk(self, dict components_to_use, list component_order,
+        unsigned int count, zone='general'):
+        '''
+        Args:
+            components_to_use (dict): A dict where keys are the system_id and
+            values correspond to the component creation args for that
+            GameSystem for all of the new entities.
+
+            component_order (list): Should contain all system_id in
+            components_to_use arg, ordered in the order you want component
+            initialization to happen.
+
+            count (unsigned int): The number of entities to create.
+
+        Creates count entities sharing the same component_order at once,
+        returning a list of the new entity_id. The entity slots are reserved
+        in a single pass and each GameSystem then creates all of its
+        components together through its **create_components** function, so
+        that systems storing their data in C arrays can fill them directly.
+
+        The values of components_to_use are columnar: a dict will be shared
+        by every entity, an Entity will have its component copied onto every
+        entity as in **init_entity**, anything else must be indexable with
+        one entry per entity (a list of args, or for the built in position,
+        rotate, scale, and color systems a numpy array of the right shape).
+
+        Components are initialized system by system rather than entity by
+        entity, every entity will have all of the components earlier in
+        component_order by the time a system is asked to create its own.
+
+        If a GameSystem raises while creating its components, the components
+        already created and the new entities are removed with
+        **remove_entities_bulk** before the exception is raised again.
+        '''
+        cdef EntityManager entity_manager = self.entity_manager
+        cdef SystemManager system_manager = self.system_manager
+        cdef IndexedMemoryZone entities = self.entities
+        cdef unsigned int i
+        cdef Entity entity
+        cdef Entity entity_to_copy
+        cdef list entity_ids
+        if count == 0:
+            return []
+        cdef unsigned int* ids = <unsigned int*>malloc(
+            sizeof(unsigned int) * count)
+        if ids == NULL:
+            raise MemoryError()
+        try:
+            entity_manager.generate_entities(zone, count, ids)
+            entity_ids = [ids[i] for i in range(count)]
+        finally:
+            free(ids)
+        for entity_id in entity_ids:
+            entity = entities[entity_id]
+            entity.load_order = list(component_order)
+            entity.system_manager = system_manager
+        try:
+            for component in component_order:
+                system = system_manager[component]
+                component_args = components_to_use[component]
+                if isinstance(component_args, Entity):
+                    entity_to_copy = component_args
+                    component_id = entity_to_copy.get_component_index(
+                        component)
+                    for entity_id in entity_ids:
+                        system.copy_component(entity_id, component_id)
+                else:
+                    system.create_components(entity_ids, zone, component_args)
+        except:
+            #components are only removed where the entity still has one
+            self.remove_entities_bulk(entity_ids)
+            raise
+        if debug:
+            Logger.debug('KivEnt: {count} entities created with components: '
+                '{components}'.format(count=count,
+                components=', '.join(component_order)))
+        return entity_ids
+
     def timed_remove_entity(self, unsigned int entity_id, dt):
         '''
         Args:
@@ -458,7 +795,46 @@ class GameWorld(Widget):
             Clock.schedule_once(partial(
                 gameworld.timed_remove_entity, entity_id))
         '''
-        self.entities_to_remove.append(entity_id)
+        self.queue_remove_entity(entity_id)
+
+    def queue_remove_entity(self, unsigned int entity_id):
+        '''
+        Args:
+            entity_id (unsigned int): The entity_id of the Entity to be removed
+            from the GameWorld.
+
+        Queues the entity for removal at the end of the next **update**. All
+        queued entities are removed together by **remove_entities**, which is
+        much cheaper than calling **remove_entity** for each when many
+        entities die in the same frame. Queueing an entity that is already
+        waiting to be removed does nothing.
+
+        Return:
+            bool: True if the entity was queued, False if it already was.
+        '''
+        cdef EntityManager entity_manager = self.entity_manager
+        cdef ScheduleManager scheduler = self.schedule_manager
+        if scheduler.running:
+            return scheduler.defer_removal(entity_id)
+        return entity_manager.queue_removal(entity_id)
+
+    def queue_remove_entities(self, entity_ids):
+        '''
+        Args:
+            entity_ids (iterable): The entity_ids of the Entities to be removed
+            from the GameWorld.
+
+        Queues every entity in entity_ids for removal at the end of the next
+        **update**, see **queue_remove_entity**.
+        '''
+        cdef EntityManager entity_manager = self.entity_manager
+        cdef ScheduleManager scheduler = self.schedule_manager
+        cdef unsigned int entity_id
+        for entity_id in entity_ids:
+            if scheduler.running:
+                scheduler.defer_removal(entity_id)
+            else:
+                entity_manager.queue_removal(entity_id)
 
     def remove_entity(self, unsigned int entity_id):
         '''
@@ -501,33 +877,223 @@ class GameWorld(Widget):
         Call the update function in order to advance time in your gameworld.
         Any GameSystem that is updateable and not paused will be updated.
         Typically you will call this function using either Clock.schedule_once
-        or Clock.schedule_interval
+        or Clock.schedule_interval. If **fixed_timestep** is True the work is
+        handed to **update_fixed**. If the **profile_manager** is enabled
+        each GameSystem's update is timed. If the **schedule_manager** is
+        enabled GameSystems that do not depend on each other are updated at
+        the same time.
         '''
+        if self.fixed_timestep:
+            self.update_fixed(dt)
+            return
         cdef SystemManager system_manager = self.system_manager
         cdef list systems = system_manager.systems
         cdef GameSystem system
+        cdef ProfileManager profiler = self.profile_manager
+        cdef bint profiling = profiler.enabled
+        cdef ScheduleManager scheduler = self.schedule_manager
+        cdef list scheduled = []
+        cdef double start
+        if profiling:
+            profiler.begin_tick(len(systems))
         for system_index in system_manager._update_order:
             system = systems[system_index]
             if system.updateable and not system.paused:
-                system._update(dt)
+                if scheduler.enabled:
+                    scheduled.append(system)
+                elif profiling:
+                    start = profiler.begin_system()
+                    system._update(dt)
+                    profiler.end_system(system_index, start)
+                else:
+                    system._update(dt)
+        if scheduler.enabled:
+            scheduler.run(scheduled, dt, False,
+                profiler if profiling else None)
+        self.remove_entities()
+        if profiling:
+            profiler.end_tick()
+
+    def update_fixed(self, double dt):
+        '''
+        Advances the gameworld with a single accumulator shared by all
+        systems. dt is added to **accumulated_time**, then while a whole
+        **update_time** is available and fewer than **max_steps_per_frame**
+        steps have been taken, every updateable, unpaused GameSystem with
+        **fixed_step** True has its update called with update_time, in
+        update order, and removed entities are flushed. Whole steps left
+        over after the budget is spent are dropped and added to
+        **dropped_time**. **interpolation_alpha** is then set to the
+        remaining fraction of a step, and the systems that are not
+        fixed_step have their **_update** called once with dt. If the
+        **schedule_manager** is enabled it runs the systems of every step,
+        and then the systems updated once per frame.
+
+        Args:
+            dt (float): Time since the last update.
+
+        Return:
+            int: The number of fixed steps taken.
+        '''
+        cdef SystemManager system_manager = self.system_manager
+        cdef list systems = system_manager.systems
+        cdef list stepped = []
+        cdef list per_frame = []
+        cdef GameSystem system
+        cdef double step = self.update_time
+        cdef double accumulated = self.accumulated_time + dt
+        cdef double dropped
+        cdef int max_steps = self.max_steps_per_frame
+        cdef int steps = 0
+        cdef ProfileManager profiler = self.profile_manager
+        cdef bint profiling = profiler.enabled
+        cdef ScheduleManager scheduler = self.schedule_manager
+        cdef bint scheduling = scheduler.enabled
+        cdef double start
+        if profiling:
+            profiler.begin_tick(len(systems))
+        for system_index in system_manager._update_order:
+            system = systems[system_index]
+            if system.updateable and not system.paused:
+                if system.fixed_step:
+                    stepped.append(system)
+                else:
+                    per_frame.append(system)
+        while accumulated >= step and steps < max_steps:
+            if scheduling:
+                scheduler.run(stepped, step, True,
+                    profiler if profiling else None)
+            else:
+                for system in stepped:
+                    if profiling:
+                        start = profiler.begin_system()
+                        system.update(step)
+                        profiler.end_system(system.system_index, start)
+                    else:
+                        system.update(step)
+            self.remove_entities()
+            accumulated -= step
+            steps += 1
+        if accumulated >= step:
+            dropped = accumulated - fmod(accumulated, step)
+            self.dropped_time += dropped
+            accumulated -= dropped
+        self.accumulated_time = accumulated
+        self.interpolation_alpha = accumulated / step
+        if scheduling:
+            scheduler.run(per_frame, dt, False,
+                profiler if profiling else None)
+        else:
+            for system in per_frame:
+                if profiling:
+                    start = profiler.begin_system()
+                    system._update(dt)
+                    profiler.end_system(system.system_index, start)
+                else:
+                    system._update(dt)
         self.remove_entities()
+        if profiling:
+            profiler.end_tick()
+        return steps
+
+    def on_fixed_timestep(self, instance, value):
+        self.accumulated_time = 0.
+        self.interpolation_alpha = 1.
 
     def remove_entities(self):
-        '''Used internally to remove entities as part of the update tick'''
-        original_ent_remove = self.entities_to_remove
-        if len(original_ent_remove) == 0:
-            return
-        entities_to_remove = [entity_id for entity_id in original_ent_remove]
-        remove_entity = self.remove_entity
-        er = original_ent_remove.remove
-        for entity_id in entities_to_remove:
-            remove_entity(entity_id)
-            er(entity_id)
+        '''Used internally to flush the removal queue as part of the update
+        tick. Entities queued while the flush is running, for instance by a
+        GameSystem's remove_component, are removed in the same flush.'''
+        cdef EntityManager entity_manager = self.entity_manager
+        cdef list legacy_remove = self.entities_to_remove
+        cdef unsigned int entity_id
+        if len(legacy_remove) > 0:
+            for entity_id in legacy_remove:
+                entity_manager.queue_removal(entity_id)
+            del legacy_remove[:]
+        while entity_manager.removal_count > 0:
+            self.remove_entities_bulk(entity_manager.pop_removals())
+
+    def remove_entities_bulk(self, list entity_ids):
+        '''
+        Args:
+            entity_ids (list): The entity_ids of the Entities to be removed
+            from the GameWorld.
+
+        Immediately removes many entities from the gameworld. Instead of
+        removing each entity in turn, the components are grouped by
+        GameSystem and every GameSystem receives a single
+        **remove_components** call with all of its components. Systems are
+        visited in the reverse of the entities' load_order. Inactive entities
+        are skipped, as are entities removed by another GameSystem while the
+        removal is in progress.
+        '''
+        cdef EntityManager entity_manager = self.entity_manager
+        cdef SystemManager system_manager = self.system_manager
+        cdef IndexedMemoryZone entities = self.entities
+        cdef MemoryZone entity_memory = entities.memory_zone
+        cdef dict system_entities = {}
+        cdef list system_order = []
+        cdef list removed = []
+        cdef list last_order = None
+        cdef list targets = None
+        cdef list grouped, component_indices, load_order
+        cdef dict copied
+        cdef unsigned int entity_id, system_index, component_index
+        cdef unsigned int* entity_pointer
+        cdef Entity entity
+        cdef GameSystem system
+        for entity_id in entity_ids:
+            entity_pointer = <unsigned int*>entity_memory.get_pointer(
+                entity_id)
+            if entity_pointer[0] != entity_id:
+                entity_manager.unqueue_removal(entity_id)
+                continue
+            entity = entities[entity_id]
+            load_order = entity._load_order
+            if load_order != last_order:
+                #most entities removed together share a load_order, only
+                #resolve the systems when it changes
+                last_order = load_order
+                targets = []
+                for system_name in reversed(load_order):
+                    grouped = system_entities.get(system_name)
+                    if grouped is None:
+                        grouped = system_entities[system_name] = []
+                        system_order.append(system_name)
+                    system = system_manager[system_name]
+                    targets.append((grouped, system.copied_components))
+            for grouped, copied in targets:
+                if copied and entity_id in copied:
+                    del copied[entity_id]
+                else:
+                    grouped.append(entity_id)
+            removed.append(entity)
+        for system_name in system_order:
+            system_index = system_manager.get_system_index(system_name)
+            component_indices = []
+            for entity_id in system_entities[system_name]:
+                entity_pointer = <unsigned int*>entity_memory.get_pointer(
+                    entity_id)
+                component_index = entity_pointer[system_index+1]
+                if (entity_pointer[0] == entity_id and
+                    component_index != <unsigned int>-1):
+                    component_indices.append(component_index)
+            system_manager[system_name].remove_components(component_indices)
+            if debug:
+                Logger.debug(('Removed {count} {system_name} components'
+                    ).format(count=len(component_indices),
+                    system_name=system_name))
+        for entity in removed:
+            entity_id = entity._id
+            entity_pointer = <unsigned int*>entity_memory.get_pointer(
+                entity_id)
+            if entity_pointer[0] == entity_id:
+                entity.load_order = []
+                entity_manager.remove_entity(entity_id)
 
     def clear_entities(self, zones=[]):
         '''Used to clear every entity in the GameWorld.'''
-        entities = self.entities
-        er = self.remove_entity
         if zones == []:
             entities_to_remove = [
                 entity.entity_id for entity in memrange(self.entities)
@@ -538,8 +1104,7 @@ class GameWorld(Widget):
             for zone in zones:
                 rem_ex([entity.entity_id for entity in memrange(
                         self.entities, zone=zone)])
-        for entity_id in entities_to_remove:
-            er(entity_id)
+        self.remove_entities_bulk(entities_to_remove)
 
     def delete_system(self, system_id):
         '''
@@ -550,6 +1115,11 @@ class GameWorld(Widget):
         Used to delete a GameSystem from the GameWorld'''
         cdef SystemManager system_manager = self.system_manager
         system = system_manager[system_id]
+        cdef Archetype archetype
+        for name in list(self.archetypes):
+            archetype = self.archetypes[name]
+            if system_id in archetype.positions:
+                del self.archetypes[name]
         system.on_delete_system()
         system_manager.remove_system(system_id)
         self.remove_widget(system)
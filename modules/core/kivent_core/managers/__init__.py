@@ -3,3 +3,4 @@ from kivent_core.managers import entity_manager
 from kivent_core.managers import system_manager
 from kivent_core.managers import sound_manager
 from kivent_core.managers import game_manager
+from kivent_core.managers import profile_manager
@@ -1,16 +1,30 @@
 from kivent_core.memory_handlers.indexing cimport IndexedMemoryZone
 from kivent_core.managers.game_manager cimport GameManager
+from kivent_core.memory_handlers.block cimport MemoryBlock
 
 cdef class EntityManager(GameManager):
     cdef IndexedMemoryZone memory_index
     cdef unsigned int system_count
+    cdef MemoryBlock removal_block
+    cdef unsigned int* removal_queue
+    cdef unsigned char* removal_flags
+    cdef unsigned int removal_count
+    cdef unsigned int entity_capacity
 
     cdef void clear_entity(self, unsigned int entity_id)
     cdef void set_component(self, unsigned int entity_id,
         unsigned int component_id, unsigned int system_id)
     cdef unsigned int generate_entity(self, str zone) except -1
+    cdef unsigned int generate_entities(self, str zone, unsigned int count,
+        unsigned int* entity_ids) except -1
     cdef void remove_entity(self, unsigned int entity_id)
     cdef void set_entity_active(self, unsigned int entity_id)
     cdef unsigned int get_size(self)
+    cdef bint queue_removal(self, unsigned int entity_id) except -1
+    cdef bint is_queued_for_removal(self, unsigned int entity_id)
+    cdef void unqueue_removal(self, unsigned int entity_id)
+    cdef list pop_removals(self)
+    cdef tuple get_snapshot_state(self)
+    cdef int set_snapshot_state(self, tuple state) except 0
     cpdef unsigned int get_active_entity_count(self)
     cpdef unsigned int get_active_entity_count_in_zone(self, str zone) except <unsigned int>-1
\ No newline at end of file
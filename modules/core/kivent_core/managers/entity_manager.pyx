@@ -1,9 +1,14 @@
 # cython: embedsignature=True
-from kivent_core.memory_handlers.membuffer cimport Buffer
+from kivent_core.memory_handlers.membuffer cimport (Buffer,
+    ALLOCATOR_BITMAP)
 from kivent_core.memory_handlers.zone cimport MemoryZone
 from kivent_core.memory_handlers.indexing cimport IndexedMemoryZone
 from kivent_core.entity cimport Entity
 from kivent_core.managers.game_manager cimport GameManager
+from kivent_core.memory_handlers.block cimport MemoryBlock
+from libc.string cimport memset, memcpy
+from array import array
+import json
 
 cdef class EntityManager(GameManager):
     '''
@@ -34,13 +39,29 @@ cdef class EntityManager(GameManager):
         first entry is used internally to determine whether an entity is
         active.
 
+        **removal_block** (MemoryBlock): Holds the deferred removal queue,
+        **entity_capacity** entity_ids followed by a bitset with one bit per
+        entity used to avoid queueing the same entity twice.
+
+        **removal_queue** (unsigned int*): The entity_ids waiting to be
+        removed, the first **removal_count** entries are in use.
+
+        **removal_flags** (unsigned char*): Bitset marking every entity that
+        is currently waiting to be removed.
+
+        **removal_count** (unsigned int): The number of entries in
+        **removal_queue**.
+
+        **entity_capacity** (unsigned int): The total number of entities that
+        can be active across all zones.
+
     '''
     def __cinit__(self):
         '''
         '''
         pass
 
-    def allocate(self, master_buffer, gameworld):
+    def allocate(self, Buffer master_buffer, gameworld):
         cdef dict zones_dict = {}
         zones = gameworld.zones
         system_manager = gameworld.managers['system_manager']
@@ -53,8 +74,19 @@ cdef class EntityManager(GameManager):
         self.memory_index = IndexedMemoryZone(
             master_buffer, gameworld.size_of_entity_block, 
             sizeof(unsigned int)*self.system_count, zones_dict,
-            Entity)
+            Entity, ALLOCATOR_BITMAP)
         gameworld.entities = self.memory_index
+        cdef unsigned int capacity = self.memory_index.memory_zone.count
+        cdef unsigned int flag_bytes = capacity // 8 + 1
+        cdef unsigned int queue_bytes = capacity * sizeof(unsigned int)
+        self.entity_capacity = capacity
+        self.removal_block = MemoryBlock(queue_bytes + flag_bytes, 1, 1)
+        self.removal_block.allocate_memory_with_buffer(master_buffer)
+        self.removal_queue = <unsigned int*>self.removal_block.data
+        self.removal_flags = (
+            <unsigned char*>self.removal_block.data + queue_bytes)
+        memset(self.removal_flags, 0, flag_bytes)
+        self.removal_count = 0
         return self.get_size()
 
 
@@ -75,9 +107,9 @@ cdef class EntityManager(GameManager):
 
     cdef unsigned int get_size(self):
         '''
-        Returns the size of the IndexedMemoryZone in bytes.
+        Returns the size of the IndexedMemoryZone and removal queue in bytes.
         '''
-        return self.memory_index.get_size()
+        return self.memory_index.get_size() + self.removal_block.real_size
 
     cdef void set_component(self, unsigned int entity_id,
         unsigned int component_id, unsigned int system_id):
@@ -140,6 +172,38 @@ cdef class EntityManager(GameManager):
         self.set_entity_active(new_id)
         return new_id
 
+    cdef unsigned int generate_entities(self, str zone, unsigned int count,
+        unsigned int* entity_ids) except -1:
+        '''
+        Activates count new entities in zone of **memory_index** in a single
+        pass. Typically called internally as part of
+        GameWorld.init_entities_bulk.
+
+        Args:
+            zone (str): The zone to initialize the entities in.
+
+            count (unsigned int): The number of entities to activate.
+
+            entity_ids (unsigned int*): Array of at least count entries that
+            will receive the new entity_ids.
+
+        Return:
+            count (unsigned int): The number of entities activated.
+
+        '''
+        cdef MemoryZone memory_zone = self.memory_index.memory_zone
+        cdef unsigned int system_count = self.system_count
+        cdef unsigned int i, j, entity_id
+        cdef unsigned int* pointer
+        memory_zone.get_free_slots(zone, count, entity_ids)
+        for i in range(count):
+            entity_id = entity_ids[i]
+            pointer = <unsigned int*>memory_zone.get_pointer(entity_id)
+            pointer[0] = entity_id
+            for j in range(1, system_count):
+                pointer[j] = -1
+        return count
+
     def get_entity_entry(self, entity_id):
         '''Will return a list of **system_count** items corresponding to all
         the indices that make up the entity. If a value is 4,294,967,295,
@@ -166,9 +230,175 @@ cdef class EntityManager(GameManager):
             entity_id (unsigned int): The identity of the entity to remove
         '''
         self.clear_entity(entity_id)
+        self.unqueue_removal(entity_id)
         cdef MemoryZone memory_zone = self.memory_index.memory_zone
         memory_zone.free_slot(entity_id)
 
+    cdef bint queue_removal(self, unsigned int entity_id) except -1:
+        '''Adds an entity to the deferred removal queue. An entity already
+        waiting in the queue will not be added again. The queue is emptied
+        by GameWorld.remove_entities once per update.
+
+        Args:
+            entity_id (unsigned int): The id of the entity to remove.
+
+        Return:
+            bint: 1 if the entity was queued, 0 if it already was.
+        '''
+        cdef unsigned char bit = 1 << (entity_id & 7)
+        cdef unsigned int* queue = self.removal_queue
+        cdef unsigned char* flags = self.removal_flags
+        cdef unsigned int i, queued
+        cdef unsigned int kept = 0
+        if entity_id >= self.entity_capacity:
+            raise IndexError('Entity {} does not exist'.format(entity_id))
+        if flags[entity_id >> 3] & bit:
+            return 0
+        if self.removal_count == self.entity_capacity:
+            #entries of entities removed immediately are still in the queue,
+            #drop them and any duplicates before adding another
+            for i in range(self.removal_count):
+                queued = queue[i]
+                if flags[queued >> 3] & (1 << (queued & 7)):
+                    flags[queued >> 3] &= ~(1 << (queued & 7))
+                    queue[kept] = queued
+                    kept += 1
+            for i in range(kept):
+                queued = queue[i]
+                flags[queued >> 3] |= 1 << (queued & 7)
+            self.removal_count = kept
+        flags[entity_id >> 3] |= bit
+        queue[self.removal_count] = entity_id
+        self.removal_count += 1
+        return 1
+
+    cdef bint is_queued_for_removal(self, unsigned int entity_id):
+        '''Checks whether an entity is waiting in the deferred removal queue.
+
+        Args:
+            entity_id (unsigned int): The id of the entity to check.
+
+        Return:
+            bint: 1 if the entity is queued, else 0.
+        '''
+        return self.removal_flags[entity_id >> 3] & (1 << (entity_id & 7))
+
+    cdef void unqueue_removal(self, unsigned int entity_id):
+        '''Marks an entity as no longer waiting in the deferred removal queue,
+        its entry will be skipped by **pop_removals**.
+
+        Args:
+            entity_id (unsigned int): The id of the entity.
+        '''
+        self.removal_flags[entity_id >> 3] &= ~(1 << (entity_id & 7))
+
+    cdef list pop_removals(self):
+        '''Empties the deferred removal queue, returning the entities still
+        waiting to be removed. Entities removed immediately with
+        **remove_entity** while in the queue are skipped. The returned
+        entities stay marked as queued until **remove_entity** is called on
+        them, so queueing them again while they are being removed does
+        nothing.
+
+        Return:
+            list: entity_ids in the order they were queued.
+        '''
+        cdef unsigned int* queue = self.removal_queue
+        cdef unsigned char* flags = self.removal_flags
+        cdef unsigned int count = self.removal_count
+        cdef unsigned int i, entity_id
+        cdef unsigned char bit
+        cdef list entity_ids = []
+        for i in range(count):
+            entity_id = queue[i]
+            bit = 1 << (entity_id & 7)
+            if flags[entity_id >> 3] & bit:
+                flags[entity_id >> 3] &= ~bit
+                entity_ids.append(entity_id)
+        for entity_id in entity_ids:
+            flags[entity_id >> 3] |= 1 << (entity_id & 7)
+        self.removal_count = 0
+        return entity_ids
+
+    cdef tuple get_snapshot_state(self):
+        '''Copies the entity data, the deferred removal queue and the
+        load_order of every active Entity for the SnapshotManager. The
+        different load_orders are saved once as JSON, followed by the index
+        of the load_order of each active entity.
+
+        Return:
+            tuple: The state of the EntityManager.
+        '''
+        cdef MemoryZone memory_zone = self.memory_index.memory_zone
+        cdef MemoryBlock removal_block = self.removal_block
+        cdef IndexedMemoryZone entities = self.memory_index
+        cdef Entity entity
+        cdef dict order_ids = {}
+        entity_ids = array('I', memory_zone.get_active_slots())
+        load_order_ids = array('I')
+        for entity_id in entity_ids:
+            entity = entities[entity_id]
+            load_order = tuple(entity._load_order)
+            if load_order not in order_ids:
+                order_ids[load_order] = len(order_ids)
+            load_order_ids.append(order_ids[load_order])
+        load_orders = sorted(order_ids, key=order_ids.get)
+        return (memory_zone.get_state(), removal_block.master_index,
+            (<char*>removal_block.data)[:removal_block.real_size],
+            self.removal_count, json.dumps(load_orders), entity_ids,
+            load_order_ids)
+
+    cdef int set_snapshot_state(self, tuple state) except 0:
+        '''Restores the result of **get_snapshot_state**. Entities that were
+        not active when the snapshot was taken are left with an empty
+        load_order.
+
+        Args:
+            state (tuple): The result of **get_snapshot_state**.
+        '''
+        cdef MemoryZone memory_zone = self.memory_index.memory_zone
+        cdef MemoryBlock removal_block = self.removal_block
+        cdef IndexedMemoryZone entities = self.memory_index
+        cdef Entity entity
+        cdef bytes removals
+        cdef unsigned int* queue
+        cdef unsigned int removal_count, i
+        zone_state, master_index, removals, removal_count, load_orders, \
+            entity_ids, load_order_ids = state
+        load_orders = json.loads(load_orders)
+        if (master_index != removal_block.master_index or
+            len(removals) != removal_block.real_size or
+            removal_count > self.entity_capacity or
+            len(entity_ids) != len(load_order_ids)):
+            raise ValueError(
+                'EntityManager state does not match this EntityManager')
+        queue = <unsigned int*><char*>removals
+        for i in range(removal_count):
+            if queue[i] >= self.entity_capacity:
+                raise ValueError(
+                    'EntityManager state does not match this EntityManager')
+        for entity_id, order_id in zip(entity_ids, load_order_ids):
+            if entity_id >= self.entity_capacity or order_id >= len(
+                load_orders) or not all([isinstance(system_name, str)
+                for system_name in load_orders[order_id]]):
+                raise ValueError(
+                    'EntityManager state does not match this EntityManager')
+        for entity_id in memory_zone.get_active_slots():
+            entity = entities[entity_id]
+            entity._load_order = []
+        memory_zone.set_state(zone_state)
+        memcpy(removal_block.data, <char*>removals, len(removals))
+        self.removal_count = removal_count
+        for entity_id, order_id in zip(entity_ids, load_order_ids):
+            entity = entities[entity_id]
+            entity._load_order = list(load_orders[order_id])
+        return 1
+
+    def get_queued_removal_count(self):
+        '''Returns the number of entries currently waiting in the deferred
+        removal queue.'''
+        return self.removal_count
+
     cpdef unsigned int get_active_entity_count(self):
         ''' Returns the number of all currently active entities.
 
@@ -0,0 +1,35 @@
+from kivent_core.managers.game_manager cimport GameManager
+
+
+ctypedef struct SystemProfile:
+    unsigned int tick
+    unsigned int system_index
+    unsigned int calls
+    double duration
+    unsigned int entity_count
+    unsigned int component_count
+    unsigned int batches_drawn
+    unsigned int vertices_written
+    unsigned long long bytes_uploaded
+
+
+cdef class ProfileManager(GameManager):
+    cdef SystemProfile* records
+    cdef unsigned int capacity
+    cdef unsigned int write_index
+    cdef unsigned int record_count
+    cdef unsigned int tick
+    cdef bint enabled
+    cdef double* durations
+    cdef unsigned int* calls
+    cdef unsigned int slot_count
+    cdef list touched
+    cdef dict system_ids
+    cdef object gameworld
+
+    cdef int begin_tick(self, unsigned int system_count) except -1
+    cdef double begin_system(self) except? -1
+    cdef int end_system(self, unsigned int system_index,
+        double start) except -1
+    cdef int end_tick(self) except -1
+    cdef SystemProfile* get_record(self, unsigned int index)
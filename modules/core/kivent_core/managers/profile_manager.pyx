@@ -0,0 +1,315 @@
+# cython: embedsignature=True
+from kivent_core.managers.game_manager cimport GameManager
+from kivent_core.managers.entity_manager cimport EntityManager
+from kivent_core.managers.system_manager cimport SystemManager
+from kivent_core.systems.gamesystem cimport GameSystem
+from libc.stdlib cimport malloc, realloc, free
+from libc.string cimport memset
+from time import perf_counter
+import csv
+import json
+
+PROFILE_FIELDS = ['tick', 'system_id', 'calls', 'duration', 'entity_count',
+    'component_count', 'batches_drawn', 'vertices_written', 'bytes_uploaded']
+
+
+cdef class ProfileManager(GameManager):
+    '''
+    The ProfileManager records how long each GameSystem takes to update,
+    without needing a build of KivEnt with cython profiling turned on. While
+    **enabled** is True, GameWorld.update times every GameSystem it updates
+    and at the end of the tick one SystemProfile per system is written to a
+    ring buffer of **capacity** records, overwriting the oldest records once
+    it is full. Each record also holds the number of active entities and
+    the GameSystem's active components, and Renderers add the batches drawn,
+    vertices written and bytes uploaded to the GPU since their last record.
+    When disabled the only cost is a single check per GameWorld.update.
+
+    The records can be read back with **get_records** or **get_last_tick**,
+    for instance to display a timing overlay, or written to disk with
+    **dump_json** and **dump_csv**.
+
+    **Attributes:**
+        **enabled** (bool): Whether the GameWorld is currently being
+        profiled, can be changed at any time.
+
+        **capacity** (unsigned int): The number of SystemProfile the ring
+        buffer can hold, change it with **resize**.
+
+        **tick** (unsigned int): The number of ticks profiled so far.
+
+        **record_count** (unsigned int): The number of records currently
+        held, at most **capacity**.
+
+    **Attributes: (Cython Access Only)**
+        **records** (SystemProfile*): The ring buffer.
+
+        **write_index** (unsigned int): The index the next record will be
+        written to.
+
+        **durations** (double*): Time spent in each GameSystem during the
+        current tick, indexed by system_index.
+
+        **calls** (unsigned int*): The number of times each GameSystem was
+        updated during the current tick, indexed by system_index.
+
+        **slot_count** (unsigned int): The size of **durations** and
+        **calls**.
+
+        **touched** (list): The system_index of the systems updated during
+        the current tick, in the order they were first updated.
+
+        **system_ids** (dict): Maps the system_index found in records to the
+        system_id of the GameSystem at the time it was recorded.
+    '''
+
+    def __init__(self, unsigned int capacity=4096):
+        self.records = NULL
+        self.durations = NULL
+        self.calls = NULL
+        self.slot_count = 0
+        self.enabled = False
+        self.touched = []
+        self.system_ids = {}
+        self.gameworld = None
+        self.resize(capacity)
+
+    def __dealloc__(self):
+        if self.records != NULL:
+            free(self.records)
+            self.records = NULL
+        if self.durations != NULL:
+            free(self.durations)
+            self.durations = NULL
+        if self.calls != NULL:
+            free(self.calls)
+            self.calls = NULL
+
+    def allocate(self, master_buffer, gameworld):
+        '''
+        Keeps a reference to the GameWorld. The ring buffer is not taken from
+        the master_buffer so that it can be resized at any time.
+        '''
+        self.gameworld = gameworld
+        return 0
+
+    property enabled:
+        def __get__(self):
+            return self.enabled
+
+        def __set__(self, bint value):
+            self.enabled = value
+
+    property capacity:
+        def __get__(self):
+            return self.capacity
+
+    property tick:
+        def __get__(self):
+            return self.tick
+
+    property record_count:
+        def __get__(self):
+            return self.record_count
+
+    def resize(self, unsigned int capacity):
+        '''
+        Reallocates the ring buffer to hold capacity records, any records
+        already held are discarded.
+
+        Args:
+            capacity (unsigned int): The number of records to hold, must be
+            at least 1.
+        '''
+        if capacity == 0:
+            raise ValueError('capacity must be at least 1')
+        cdef SystemProfile* records = <SystemProfile*>malloc(
+            sizeof(SystemProfile) * capacity)
+        if records == NULL:
+            raise MemoryError()
+        if self.records != NULL:
+            free(self.records)
+        self.records = records
+        self.capacity = capacity
+        self.clear()
+
+    def clear(self):
+        '''
+        Discards all records and restarts the tick count.
+        '''
+        self.write_index = 0
+        self.record_count = 0
+        self.tick = 0
+        self.system_ids.clear()
+
+    cdef int begin_tick(self, unsigned int system_count) except -1:
+        '''
+        Called by GameWorld.update before any GameSystem is updated, makes
+        sure there is a slot for every system.
+
+        Args:
+            system_count (unsigned int): One more than the largest
+            system_index that may be updated this tick.
+        '''
+        cdef double* durations
+        cdef unsigned int* calls
+        if system_count > self.slot_count:
+            durations = <double*>realloc(self.durations,
+                sizeof(double) * system_count)
+            if durations == NULL:
+                raise MemoryError()
+            self.durations = durations
+            calls = <unsigned int*>realloc(self.calls,
+                sizeof(unsigned int) * system_count)
+            if calls == NULL:
+                raise MemoryError()
+            self.calls = calls
+            memset(&durations[self.slot_count], 0,
+                sizeof(double) * (system_count - self.slot_count))
+            memset(&calls[self.slot_count], 0,
+                sizeof(unsigned int) * (system_count - self.slot_count))
+            self.slot_count = system_count
+        return 1
+
+    cdef double begin_system(self) except? -1:
+        '''
+        Return:
+            double: The time to pass to **end_system** once the GameSystem
+            has been updated.
+        '''
+        return perf_counter()
+
+    cdef int end_system(self, unsigned int system_index,
+        double start) except -1:
+        '''
+        Adds the time since start to the GameSystem's total for this tick.
+
+        Args:
+            system_index (unsigned int): The system_index of the GameSystem.
+
+            start (double): The value returned by **begin_system**.
+        '''
+        cdef double elapsed = perf_counter() - start
+        if self.calls[system_index] == 0:
+            self.touched.append(system_index)
+        self.calls[system_index] += 1
+        self.durations[system_index] += elapsed
+        return 1
+
+    cdef int end_tick(self) except -1:
+        '''
+        Writes a SystemProfile for every GameSystem updated during this
+        tick to the ring buffer, asking each GameSystem to fill in its counts
+        with **GameSystem.fill_profile**.
+        '''
+        cdef SystemManager system_manager = self.gameworld.system_manager
+        cdef list systems = system_manager.systems
+        cdef EntityManager entity_manager = self.gameworld.entity_manager
+        cdef unsigned int entity_count = (
+            entity_manager.get_active_entity_count())
+        cdef unsigned int system_index
+        cdef SystemProfile* record
+        cdef GameSystem system
+        for system_index in self.touched:
+            system = systems[system_index]
+            record = &self.records[self.write_index]
+            memset(record, 0, sizeof(SystemProfile))
+            record.tick = self.tick
+            record.system_index = system_index
+            record.calls = self.calls[system_index]
+            record.duration = self.durations[system_index]
+            record.entity_count = entity_count
+            system.fill_profile(record)
+            self.system_ids[system_index] = system.system_id
+            self.calls[system_index] = 0
+            self.durations[system_index] = 0.
+            self.write_index = (self.write_index + 1) % self.capacity
+            if self.record_count < self.capacity:
+                self.record_count += 1
+        del self.touched[:]
+        self.tick += 1
+        return 1
+
+    cdef SystemProfile* get_record(self, unsigned int index):
+        '''
+        Args:
+            index (unsigned int): The index of the record, 0 being the oldest
+            record held. Must be less than **record_count**.
+
+        Return:
+            SystemProfile*: Pointer to the record in the ring buffer.
+        '''
+        cdef unsigned int start = (self.write_index + self.capacity -
+            self.record_count) % self.capacity
+        return &self.records[(start + index) % self.capacity]
+
+    def get_records(self, unsigned int ticks=0):
+        '''
+        Returns the records held, oldest first.
+
+        Args:
+            ticks (unsigned int): If not 0 only the records of the last ticks
+            profiled ticks are returned.
+
+        Return:
+            list: A dict per record with the keys of PROFILE_FIELDS, duration
+            is in seconds.
+        '''
+        cdef unsigned int i
+        cdef SystemProfile* record
+        cdef list results = []
+        cdef dict system_ids = self.system_ids
+        r_a = results.append
+        for i in range(self.record_count):
+            record = self.get_record(i)
+            if ticks != 0 and record.tick + ticks < self.tick:
+                continue
+            r_a({
+                'tick': record.tick,
+                'system_id': system_ids.get(record.system_index),
+                'calls': record.calls,
+                'duration': record.duration,
+                'entity_count': record.entity_count,
+                'component_count': record.component_count,
+                'batches_drawn': record.batches_drawn,
+                'vertices_written': record.vertices_written,
+                'bytes_uploaded': record.bytes_uploaded,
+                })
+        return results
+
+    def get_last_tick(self):
+        '''
+        Returns the records of the last tick profiled, suitable for
+        displaying a timing overlay.
+
+        Return:
+            dict: The records from **get_records** keyed by system_id.
+        '''
+        return {record['system_id']: record for record in self.get_records(1)}
+
+    def dump_json(self, str path, unsigned int ticks=0):
+        '''
+        Writes the records from **get_records** to path as a JSON list.
+
+        Args:
+            path (str): The file to write.
+
+            ticks (unsigned int): Passed on to **get_records**.
+        '''
+        with open(path, 'w') as json_file:
+            json.dump(self.get_records(ticks), json_file)
+
+    def dump_csv(self, str path, unsigned int ticks=0):
+        '''
+        Writes the records from **get_records** to path as CSV, one row per
+        record with a header row of PROFILE_FIELDS.
+
+        Args:
+            path (str): The file to write.
+
+            ticks (unsigned int): Passed on to **get_records**.
+        '''
+        with open(path, 'w', newline='') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=PROFILE_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.get_records(ticks))
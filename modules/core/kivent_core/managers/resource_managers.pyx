@@ -112,6 +112,26 @@ cdef class ModelManager(GameManager):
         else:
             self._model_register[model_name][entity_id] = system_id
 
+    def register_entities_with_model(self, list entity_ids, str system_id,
+        str model_name):
+        '''
+        Registers many entities with the same model at once. Typically
+        called internally as part of Renderer.init_components.
+
+        Args:
+            entity_ids (list): Ids of the entities being registered.
+
+            system_id (str): system_id of the Renderer that these entities are
+            attached to with the model.
+
+            model_name (str): Name of the model to register the entities with.
+
+        '''
+        if model_name not in self._model_register:
+            self._model_register[model_name] = {}
+        self._model_register[model_name].update(
+            dict.fromkeys(entity_ids, system_id))
+
     def unregister_entity_with_model(self, unsigned int entity_id,
         str model_name):
         '''
@@ -125,6 +145,21 @@ cdef class ModelManager(GameManager):
         '''
         del self._model_register[model_name][entity_id]
 
+    def unregister_entities_with_model(self, list entity_ids,
+        str model_name):
+        '''
+        Unregisters many previously registered entities at once.
+
+        Args:
+            entity_ids (list): The ids of the entities being unregistered.
+
+            model_name (str): The name of the model those entities were
+            registered with.
+        '''
+        cdef dict register = self._model_register[model_name]
+        for entity_id in entity_ids:
+            del register[entity_id]
+
     def pickle_model(self, str model_name, str directory_name):
         '''
         Saves a model to disk using Pickle. Data will be stored as a
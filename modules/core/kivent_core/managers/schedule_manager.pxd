@@ -0,0 +1,17 @@
+from kivent_core.managers.game_manager cimport GameManager
+from kivent_core.managers.profile_manager cimport ProfileManager
+
+
+cdef class ScheduleManager(GameManager):
+    cdef bint enabled
+    cdef bint running
+    cdef unsigned int worker_count
+    cdef object executor
+    cdef dict stage_cache
+    cdef object local
+    cdef object gameworld
+
+    cdef list get_stages_for(self, list systems)
+    cdef int run(self, list systems, float dt, bint fixed,
+        ProfileManager profiler) except -1
+    cdef bint defer_removal(self, unsigned int entity_id) except -1
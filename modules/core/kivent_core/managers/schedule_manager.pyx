@@ -0,0 +1,325 @@
+# cython: embedsignature=True
+from kivent_core.managers.game_manager cimport GameManager
+from kivent_core.managers.entity_manager cimport EntityManager
+from kivent_core.managers.profile_manager cimport ProfileManager
+from kivent_core.managers.system_manager cimport SystemManager
+from kivent_core.systems.gamesystem cimport GameSystem
+from concurrent.futures import ThreadPoolExecutor, wait
+import threading
+import os
+
+
+cdef class ScheduleManager(GameManager):
+    '''
+    The ScheduleManager lets GameWorld.update run GameSystems that do not
+    depend on each other at the same time on a pool of threads. While
+    **enabled** is False, the default, GameWorld.update runs every system
+    one after another in update order as usual.
+
+    Which systems depend on each other is worked out from the components
+    they touch. A GameSystem reads and writes the components of its own
+    **system_id** and of every system_id in its **system_names**, except
+    those it lists in **read_only_systems** which it only reads. Two systems
+    conflict if one of them writes a component the other reads or writes.
+    The updateable systems are split into stages, each system going in the
+    stage after the last stage holding a system before it in update order
+    that it conflicts with. The systems of a stage are updated together and
+    a stage only starts once the one before it is done, so every system
+    sees exactly the data it would have seen if the systems had been updated
+    one after another.
+
+    Only a GameSystem with **thread_safe** True is ever updated off the main
+    thread. Any other system conflicts with every system and so is updated
+    alone, on the main thread, in update order. Threads only run at the
+    same time where the update of the system releases the GIL, as the
+    update kernels of LifespanSystem and LastPositionSystem2D do.
+
+    Entities queued for removal with GameWorld.queue_remove_entity while
+    the systems are updating are held per system and queued once every
+    stage is done, in update order, so that entities are removed in the
+    same order and get back the same entity_ids when reused.
+
+    The stages are cached for each set of updateable systems. Call
+    **invalidate** after changing the **thread_safe**, **system_names** or
+    **read_only_systems** of a GameSystem that has already been updated.
+
+    **Attributes:**
+        **enabled** (bool): Whether GameWorld.update runs independent
+        systems in parallel, can be changed at any time.
+
+        **worker_count** (unsigned int): The number of threads in the pool,
+        0 meaning one per CPU. Defaults to 0.
+
+    **Attributes: (Cython Access Only)**
+        **running** (bint): True while **run** is updating systems.
+
+        **executor** (ThreadPoolExecutor): The pool of threads, created the
+        first time a stage holds more than one system.
+
+        **stage_cache** (dict): Maps a tuple of the system_index of the
+        systems being updated to their stages.
+
+        **local** (threading.local): Holds the list of deferred removals of
+        the system being updated by the current thread.
+    '''
+
+    def __init__(self, unsigned int worker_count=0):
+        self.enabled = False
+        self.running = False
+        self.worker_count = worker_count
+        self.executor = None
+        self.stage_cache = {}
+        self.local = threading.local()
+        self.gameworld = None
+
+    def allocate(self, master_buffer, gameworld):
+        '''
+        Keeps a reference to the GameWorld, the ScheduleManager does not
+        allocate any memory.
+        '''
+        self.gameworld = gameworld
+        return 0
+
+    def deallocate(self, master_buffer, gameworld):
+        '''
+        Shuts down the pool of threads.
+        '''
+        self.shutdown()
+
+    property enabled:
+        def __get__(self):
+            return self.enabled
+
+        def __set__(self, bint value):
+            self.enabled = value
+
+    property worker_count:
+        def __get__(self):
+            return self.worker_count
+
+        def __set__(self, unsigned int value):
+            if value != self.worker_count:
+                self.shutdown()
+                self.worker_count = value
+
+    def shutdown(self):
+        '''
+        Stops the pool of threads, a new one is started the next time it is
+        needed.
+        '''
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def invalidate(self):
+        '''
+        Discards the cached stages so that they are worked out again on the
+        next update.
+        '''
+        self.stage_cache.clear()
+
+    def get_access(self, GameSystem system):
+        '''
+        Works out the components a GameSystem touches during its update.
+
+        Args:
+            system (GameSystem): The GameSystem.
+
+        Return:
+            tuple: A set of the system_id the system reads and a set of the
+            system_id it writes, every system_id written is also read.
+        '''
+        cdef set reads = set([system.system_id])
+        reads.update(getattr(system, 'system_names', []))
+        cdef set read_only = set(system.read_only_systems)
+        read_only.discard(system.system_id)
+        reads.update(read_only)
+        return reads, reads - read_only
+
+    def build_stages(self, list systems):
+        '''
+        Splits systems into stages of systems that can be updated at the same
+        time, as described above.
+
+        Args:
+            systems (list): The GameSystems to update, in update order.
+
+        Return:
+            list: A list of stages in the order they must run, each a list of
+            GameSystems in update order.
+        '''
+        cdef list accesses = []
+        cdef list levels = []
+        cdef list stages = []
+        cdef GameSystem system
+        cdef unsigned int n, m
+        cdef int level
+        cdef set reads, writes, other_reads, other_writes
+        cdef bint barrier
+        for n in range(len(systems)):
+            system = systems[n]
+            reads, writes = self.get_access(system)
+            barrier = not system.thread_safe
+            level = 0
+            for m in range(n):
+                other_reads, other_writes, other_barrier = accesses[m]
+                if levels[m] < level:
+                    continue
+                if (barrier or other_barrier or
+                    not writes.isdisjoint(other_reads) or
+                    not other_writes.isdisjoint(reads)):
+                    level = levels[m] + 1
+            accesses.append((reads, writes, barrier))
+            levels.append(level)
+            if level == len(stages):
+                stages.append([])
+            stages[level].append(system)
+        return stages
+
+    cdef list get_stages_for(self, list systems):
+        '''
+        Args:
+            systems (list): The GameSystems to update, in update order.
+
+        Return:
+            list: The result of **build_stages**, cached.
+        '''
+        cdef GameSystem system
+        cdef list indices = []
+        for system in systems:
+            indices.append(system.system_index)
+        key = tuple(indices)
+        cdef list stages = self.stage_cache.get(key)
+        if stages is None:
+            stages = self.stage_cache[key] = self.build_stages(systems)
+        return stages
+
+    def get_stages(self):
+        '''
+        Returns the stages for the GameSystems GameWorld.update would
+        currently update, mostly useful to check that systems expected to
+        run in parallel do.
+
+        Return:
+            list: A list of stages, each a list of system_id.
+        '''
+        cdef SystemManager system_manager = self.gameworld.system_manager
+        cdef list systems = []
+        cdef GameSystem system
+        for system_index in system_manager._update_order:
+            system = system_manager.systems[system_index]
+            if system.updateable and not system.paused:
+                systems.append(system)
+        return [[system.system_id for system in stage]
+            for stage in self.get_stages_for(systems)]
+
+    def _run_system(self, GameSystem system, float dt, bint fixed,
+        list removals, ProfileManager profiler):
+        '''
+        Updates a single GameSystem, on whichever thread calls it.
+
+        Args:
+            system (GameSystem): The GameSystem to update.
+
+            dt (float): Passed on to its update.
+
+            fixed (bint): If True **update** is called, otherwise
+            **_update**.
+
+            removals (list): Where the entities the system queues for removal
+            are held.
+
+            profiler (ProfileManager): Times the update unless it is None.
+        '''
+        cdef double start
+        local = self.local
+        local.removals = removals
+        try:
+            if profiler is not None:
+                start = profiler.begin_system()
+            if fixed:
+                system.update(dt)
+            else:
+                system._update(dt)
+            if profiler is not None:
+                profiler.end_system(system.system_index, start)
+        finally:
+            local.removals = None
+
+    cdef int run(self, list systems, float dt, bint fixed,
+        ProfileManager profiler) except -1:
+        '''
+        Updates systems stage by stage. The first system of every stage is
+        updated on the calling thread and the others on the pool. Entities
+        queued for removal meanwhile are queued with the EntityManager once
+        every system is done.
+
+        Args:
+            systems (list): The GameSystems to update, in update order.
+
+            dt (float): Passed on to the update of every system.
+
+            fixed (bint): If True **update** is called, otherwise
+            **_update**, see GameWorld.update_fixed.
+
+            profiler (ProfileManager): Times every system unless it is None.
+        '''
+        cdef list stages = self.get_stages_for(systems)
+        cdef list deferred = []
+        cdef dict removals = {}
+        cdef list stage, futures
+        cdef GameSystem system
+        cdef unsigned int i
+        cdef unsigned int entity_id
+        cdef EntityManager entity_manager = self.gameworld.entity_manager
+        for system in systems:
+            removals[system.system_index] = []
+            deferred.append(removals[system.system_index])
+        self.running = True
+        try:
+            for stage in stages:
+                futures = []
+                if len(stage) > 1:
+                    if self.executor is None:
+                        self.executor = ThreadPoolExecutor(
+                            max_workers=self.worker_count or os.cpu_count())
+                    for i in range(1, len(stage)):
+                        system = stage[i]
+                        futures.append(self.executor.submit(self._run_system,
+                            system, dt, fixed, removals[system.system_index],
+                            profiler))
+                system = stage[0]
+                try:
+                    self._run_system(system, dt, fixed,
+                        removals[system.system_index], profiler)
+                finally:
+                    wait(futures)
+                for future in futures:
+                    future.result()
+        finally:
+            self.running = False
+            for entity_ids in deferred:
+                for entity_id in entity_ids:
+                    entity_manager.queue_removal(entity_id)
+        return 1
+
+    cdef bint defer_removal(self, unsigned int entity_id) except -1:
+        '''
+        Called by GameWorld.queue_remove_entity while **running**, holds the
+        entity until every system has been updated.
+
+        Args:
+            entity_id (unsigned int): The entity to remove.
+
+        Return:
+            bint: 1 unless the entity was already queued before the systems
+            started updating.
+        '''
+        cdef EntityManager entity_manager = self.gameworld.entity_manager
+        removals = getattr(self.local, 'removals', None)
+        if removals is None:
+            return entity_manager.queue_removal(entity_id)
+        if entity_manager.is_queued_for_removal(entity_id):
+            return 0
+        removals.append(entity_id)
+        return 1
@@ -0,0 +1,27 @@
+from kivent_core.managers.game_manager cimport GameManager
+
+
+cdef class SnapshotWriter:
+    cdef list chunks
+
+    cdef int write(self, object value) except 0
+    cdef bytes getvalue(self)
+
+
+cdef class SnapshotReader:
+    cdef bytes data
+    cdef Py_ssize_t position
+    cdef unsigned int depth
+
+    cdef bytes take(self, Py_ssize_t count)
+    cdef Py_ssize_t read_count(self, object count_struct) except -1
+    cdef object read(self)
+    cdef int finish(self) except 0
+
+
+cdef class SnapshotManager(GameManager):
+    cdef object gameworld
+
+    cdef dict get_state(self)
+    cdef int set_state(self, dict state) except 0
+    cdef int check_entities(self) except 0
@@ -0,0 +1,499 @@
+# cython: embedsignature=True
+from kivent_core.managers.game_manager cimport GameManager
+from kivent_core.managers.entity_manager cimport EntityManager
+from kivent_core.managers.system_manager cimport SystemManager
+from kivent_core.systems.gamesystem cimport GameSystem
+from kivent_core.systems.staticmemgamesystem cimport StaticMemGameSystem
+from kivent_core.memory_handlers.membuffer cimport Buffer
+from kivent_core.memory_handlers.zone cimport MemoryZone
+from array import array
+from struct import Struct
+import json
+import sys
+
+SNAPSHOT_MAGIC = b'KEVSNAP\0'
+SNAPSHOT_VERSION = 3
+SNAPSHOT_HEADER = Struct('<8sII')
+ARRAY_TYPECODES = 'bBiIfd'
+MAX_DEPTH = 32
+
+cdef object INT64 = Struct('<q')
+cdef object FLOAT64 = Struct('<d')
+cdef object COUNT = Struct('<I')
+cdef object SIZE = Struct('<Q')
+cdef bint BIG_ENDIAN = sys.byteorder == 'big'
+
+
+class SnapshotError(Exception):
+    pass
+
+
+cdef class SnapshotWriter:
+    '''
+    Encodes the result of the get_snapshot_state hooks in the binary format
+    of a snapshot. Every value starts with a one byte tag followed by its
+    data in little endian:
+
+        **N**, **T**, **F**: None, True and False.
+
+        **i**, **f**: a 64 bit int and a double.
+
+        **s**, **y**: utf-8 str and bytes, the length as an unsigned 64 bit
+        int followed by the raw bytes.
+
+        **a**: an array.array, its typecode, the number of items as an
+        unsigned 64 bit int and then the items as raw bytes.
+
+        **l**, **t**, **d**: a list, tuple or dict, the number of items (or
+        key, value pairs) as an unsigned 32 bit int followed by the items.
+
+    No other type can be written, so reading a snapshot only ever builds
+    these plain values and never runs any code. Memory copied out of the
+    master buffer is written as bytes and index arrays as array.array, so
+    that both are written and read back in one go.
+
+    **Attributes: (Cython Access Only)**
+        **chunks** (list): The encoded pieces, joined by **getvalue**.
+    '''
+
+    def __cinit__(self):
+        self.chunks = []
+
+    cdef int write(self, object value) except 0:
+        '''
+        Encodes value, see the class docstring for the types allowed.
+
+        Args:
+            value (object): The value to encode.
+        '''
+        cdef list chunks = self.chunks
+        if value is None:
+            chunks.append(b'N')
+        elif value is True:
+            chunks.append(b'T')
+        elif value is False:
+            chunks.append(b'F')
+        elif isinstance(value, int):
+            try:
+                chunks.append(b'i' + INT64.pack(value))
+            except Exception:
+                raise SnapshotError('{} is too large for a snapshot'.format(
+                    value))
+        elif isinstance(value, float):
+            chunks.append(b'f' + FLOAT64.pack(value))
+        elif isinstance(value, str):
+            value = value.encode('utf-8')
+            chunks.append(b's' + SIZE.pack(len(value)))
+            chunks.append(value)
+        elif isinstance(value, bytes):
+            chunks.append(b'y' + SIZE.pack(len(value)))
+            chunks.append(value)
+        elif isinstance(value, array):
+            if value.typecode not in ARRAY_TYPECODES:
+                raise SnapshotError(
+                    'Arrays of typecode {} can not be saved'.format(
+                    value.typecode))
+            if BIG_ENDIAN:
+                value = array(value.typecode, value)
+                value.byteswap()
+            chunks.append(b'a' + value.typecode.encode('ascii') +
+                SIZE.pack(len(value)))
+            chunks.append(value.tobytes())
+        elif isinstance(value, list) or isinstance(value, tuple):
+            chunks.append((b'l' if isinstance(value, list) else b't') +
+                COUNT.pack(len(value)))
+            for item in value:
+                self.write(item)
+        elif isinstance(value, dict):
+            chunks.append(b'd' + COUNT.pack(len(value)))
+            for key in value:
+                self.write(key)
+                self.write(value[key])
+        else:
+            raise SnapshotError('{} can not be saved in a snapshot'.format(
+                type(value).__name__))
+        return 1
+
+    cdef bytes getvalue(self):
+        '''
+        Return:
+            bytes: Everything written so far.
+        '''
+        return b''.join(self.chunks)
+
+
+cdef class SnapshotReader:
+    '''
+    Decodes values written by a SnapshotWriter. Every length is checked
+    against the data left before anything is allocated or copied, and any
+    malformed data raises a SnapshotError.
+
+    **Attributes: (Cython Access Only)**
+        **data** (bytes): The snapshot being read.
+
+        **position** (Py_ssize_t): Offset of the next byte to read.
+
+        **depth** (unsigned int): How many containers are being read, at
+        most MAX_DEPTH can be nested.
+    '''
+
+    def __cinit__(self, bytes data, Py_ssize_t position=0):
+        self.data = data
+        self.position = position
+        self.depth = 0
+
+    cdef bytes take(self, Py_ssize_t count):
+        '''
+        Reads count raw bytes.
+
+        Args:
+            count (Py_ssize_t): The number of bytes to read.
+
+        Return:
+            bytes: The bytes read.
+        '''
+        cdef Py_ssize_t position = self.position
+        if count < 0 or count > len(self.data) - position:
+            raise SnapshotError('The snapshot is truncated')
+        self.position = position + count
+        return self.data[position:position + count]
+
+    cdef Py_ssize_t read_count(self, object count_struct) except -1:
+        '''
+        Reads a length or a number of items. As every item takes at least
+        one byte the count can not be larger than the data left.
+
+        Args:
+            count_struct (Struct): COUNT or SIZE.
+
+        Return:
+            Py_ssize_t: The count read.
+        '''
+        count = count_struct.unpack(self.take(count_struct.size))[0]
+        if count > len(self.data) - self.position:
+            raise SnapshotError('The snapshot is truncated')
+        return count
+
+    cdef object read(self):
+        '''
+        Decodes the next value.
+
+        Return:
+            object: The value, see SnapshotWriter for the possible types.
+        '''
+        cdef bytes tag = self.take(1)
+        cdef Py_ssize_t count
+        cdef list items
+        cdef dict values
+        if tag == b'N':
+            return None
+        elif tag == b'T':
+            return True
+        elif tag == b'F':
+            return False
+        elif tag == b'i':
+            return INT64.unpack(self.take(8))[0]
+        elif tag == b'f':
+            return FLOAT64.unpack(self.take(8))[0]
+        elif tag == b's':
+            try:
+                return self.take(self.read_count(SIZE)).decode('utf-8')
+            except UnicodeDecodeError:
+                raise SnapshotError('The snapshot holds an invalid string')
+        elif tag == b'y':
+            return self.take(self.read_count(SIZE))
+        elif tag == b'a':
+            typecode = self.take(1).decode('ascii', 'replace')
+            if typecode not in ARRAY_TYPECODES:
+                raise SnapshotError('The snapshot holds an invalid array')
+            result = array(typecode)
+            count = self.read_count(SIZE)
+            result.frombytes(self.take(count * result.itemsize))
+            if BIG_ENDIAN:
+                result.byteswap()
+            return result
+        elif tag == b'l' or tag == b't' or tag == b'd':
+            count = self.read_count(COUNT)
+            if self.depth == MAX_DEPTH:
+                raise SnapshotError('The snapshot is nested too deeply')
+            self.depth += 1
+            if tag == b'd':
+                values = {}
+                for i in range(count):
+                    key = self.read()
+                    try:
+                        values[key] = self.read()
+                    except TypeError:
+                        raise SnapshotError(
+                            'The snapshot holds an invalid dict key')
+                self.depth -= 1
+                return values
+            items = [self.read() for i in range(count)]
+            self.depth -= 1
+            return items if tag == b'l' else tuple(items)
+        raise SnapshotError('The snapshot holds an unknown tag {!r}'.format(
+            tag))
+
+    cdef int finish(self) except 0:
+        '''
+        Checks that all of the data has been read.
+        '''
+        if self.position != len(self.data):
+            raise SnapshotError('The snapshot has trailing data')
+        return 1
+
+
+cdef class SnapshotManager(GameManager):
+    '''
+    The SnapshotManager saves the state of every entity and component of the
+    GameWorld and puts it back later, for save games, rolling the simulation
+    back or loading test fixtures. As the entities and components already
+    live in the master buffer a snapshot is mostly a copy of the memory
+    used by the EntityManager and each GameSystem, together with the
+    bookkeeping of which slots are in use, so taking one is about as fast
+    as copying the memory. Restoring also batches the entities of every
+    Renderer again, which costs about as much as creating them.
+
+    Each GameSystem saves itself with its **get_snapshot_state** and
+    restores itself with **set_snapshot_state**, then once every GameSystem
+    is restored **link_snapshot_state** is called on each of them. Pointers
+    are never saved: the ZonedAggregators look the component pointers of
+    their entities up again in **link_snapshot_state**, and systems whose
+    components point to models, textures or other objects save their names
+    and link them again, like the Renderers do for their models and
+    textures. A GameWorld using a GameSystem with **supports_snapshot**
+    False, such as the cymunk systems whose bodies live in a Chipmunk
+    space, can not be snapshot or restored and raises a SnapshotError.
+
+    A snapshot starts with a header, packed with SNAPSHOT_HEADER: the magic
+    SNAPSHOT_MAGIC, the format version and the length of a small JSON
+    document describing the GameWorld it was taken from. The state of the
+    EntityManager and of every GameSystem follows, encoded by a
+    SnapshotWriter. Loading a snapshot never runs any code, so snapshots
+    received over the network or from save files can be restored, a
+    malformed snapshot raises a SnapshotError.
+
+    A snapshot can only be restored into a GameWorld set up the same way as
+    the one it was taken from: same size_of_gameworld, zones, and systems
+    added in the same order. The models and textures used by the Renderers
+    have to be loaded. Take and restore snapshots between updates, not from
+    inside a GameSystem's update.
+
+    **Attributes: (Cython Access Only)**
+        **gameworld** (GameWorld): The GameWorld being saved, set during
+        **allocate**.
+    '''
+
+    def __init__(self):
+        self.gameworld = None
+
+    def allocate(self, master_buffer, gameworld):
+        '''
+        Keeps a reference to the GameWorld, the SnapshotManager does not
+        allocate any memory.
+        '''
+        self.gameworld = gameworld
+        return 0
+
+    cdef dict get_state(self):
+        '''
+        Collects the state of the EntityManager and of every GameSystem.
+
+        Return:
+            dict: The state of the GameWorld.
+        '''
+        gameworld = self.gameworld
+        if gameworld is None or gameworld.master_buffer is None:
+            raise SnapshotError('The GameWorld has not been allocated')
+        cdef Buffer master_buffer = gameworld.master_buffer
+        cdef EntityManager entity_manager = gameworld.entity_manager
+        cdef SystemManager system_manager = gameworld.system_manager
+        cdef GameSystem system
+        cdef list systems = []
+        for system_index in range(len(system_manager.systems)):
+            system = system_manager.systems[system_index]
+            if system is None:
+                continue
+            if not system.supports_snapshot:
+                raise SnapshotError('{} does not support snapshots'.format(
+                    system.system_id))
+            systems.append((system_index, system.system_id,
+                system.get_snapshot_state()))
+        return {
+            'master_size': master_buffer.real_size,
+            'entities': entity_manager.get_snapshot_state(),
+            'entities_to_remove': list(gameworld.entities_to_remove),
+            'systems': systems,
+            }
+
+    cdef int set_state(self, dict state) except 0:
+        '''
+        Restores the result of **get_state**, first the EntityManager and
+        then every GameSystem in system_index order.
+
+        Args:
+            state (dict): The result of **get_state**.
+        '''
+        gameworld = self.gameworld
+        if gameworld is None or gameworld.master_buffer is None:
+            raise SnapshotError('The GameWorld has not been allocated')
+        cdef Buffer master_buffer = gameworld.master_buffer
+        cdef EntityManager entity_manager = gameworld.entity_manager
+        cdef SystemManager system_manager = gameworld.system_manager
+        cdef GameSystem system
+        cdef list layout = []
+        cdef list entities_to_remove = list(state['entities_to_remove'])
+        if state['master_size'] != master_buffer.real_size:
+            raise SnapshotError('''The snapshot was taken from a GameWorld
+                with a different size_of_gameworld''')
+        for system_index in range(len(system_manager.systems)):
+            system = system_manager.systems[system_index]
+            if system is None:
+                continue
+            if not system.supports_snapshot:
+                raise SnapshotError('{} does not support snapshots'.format(
+                    system.system_id))
+            layout.append((system_index, system.system_id))
+        if [tuple(system_state[:2]) for system_state in state['systems']] != (
+            layout):
+            raise SnapshotError('''The snapshot was taken from a GameWorld
+                with different systems''')
+        for entity_id in entities_to_remove:
+            if not (isinstance(entity_id, int) and
+                0 <= entity_id < entity_manager.entity_capacity):
+                raise SnapshotError('Invalid entity_id {!r}'.format(
+                    entity_id))
+        entity_manager.set_snapshot_state(state['entities'])
+        for system_index, system_id, system_state in state['systems']:
+            system = system_manager.systems[system_index]
+            system.set_snapshot_state(system_state)
+        self.check_entities()
+        for system_index, system_id, system_state in state['systems']:
+            system = system_manager.systems[system_index]
+            system.link_snapshot_state(system_state)
+        gameworld.entities_to_remove = entities_to_remove
+        return 1
+
+    cdef int check_entities(self) except 0:
+        '''
+        Checks that every component of the restored entities is an active
+        component of that entity in the StaticMemGameSystem it belongs to,
+        so that a malformed snapshot can not make a GameSystem reach outside
+        of its memory.
+        '''
+        gameworld = self.gameworld
+        cdef EntityManager entity_manager = gameworld.entity_manager
+        cdef SystemManager system_manager = gameworld.system_manager
+        cdef MemoryZone entity_zone = entity_manager.memory_index.memory_zone
+        cdef MemoryZone memory_zone
+        cdef list systems = system_manager.systems
+        cdef list memory_zones = []
+        cdef unsigned int* entity
+        cdef unsigned int system_index, component_index
+        for system_index in range(entity_manager.system_count - 1):
+            memory_zone = None
+            if system_index < len(systems) and isinstance(
+                systems[system_index], StaticMemGameSystem):
+                memory_zone = (<StaticMemGameSystem>systems[
+                    system_index]).imz_components.memory_zone
+            memory_zones.append(memory_zone)
+        for entity_id in entity_zone.get_active_slots():
+            entity = <unsigned int*>entity_zone.get_pointer(entity_id)
+            if entity[0] != entity_id:
+                raise SnapshotError('Entity {} is invalid'.format(entity_id))
+            for system_index in range(len(memory_zones)):
+                component_index = entity[system_index+1]
+                if component_index == <unsigned int>-1:
+                    continue
+                memory_zone = memory_zones[system_index]
+                if memory_zone is None:
+                    continue
+                if component_index >= memory_zone.count or (
+                    <unsigned int*>memory_zone.get_pointer(
+                    component_index))[0] != entity_id:
+                    raise SnapshotError(
+                        'Entity {} has an invalid component'.format(entity_id))
+        return 1
+
+    def snapshot(self):
+        '''
+        Takes a snapshot of the GameWorld.
+
+        Return:
+            bytes: The snapshot, to be passed to **restore**.
+        '''
+        cdef dict state = self.get_state()
+        cdef SnapshotWriter writer = SnapshotWriter()
+        header = json.dumps({
+            'master_size': state['master_size'],
+            'systems': [system_state[:2]
+                for system_state in state['systems']],
+            'entities_to_remove': state['entities_to_remove'],
+            }).encode('utf-8')
+        writer.chunks.append(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC,
+            SNAPSHOT_VERSION, len(header)))
+        writer.chunks.append(header)
+        writer.write(state['entities'])
+        for system_state in state['systems']:
+            writer.write(system_state[2])
+        return writer.getvalue()
+
+    def restore(self, bytes data):
+        '''
+        Puts the GameWorld back in the state it was in when **snapshot** was
+        called. Entities created since then are gone and removed entities
+        are back with the same entity_ids. Raises a SnapshotError if data is
+        not a snapshot this GameWorld can restore.
+
+        Args:
+            data (bytes): The result of **snapshot**.
+        '''
+        if len(data) < SNAPSHOT_HEADER.size:
+            raise SnapshotError('Not a KivEnt snapshot')
+        magic, version, header_size = SNAPSHOT_HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC:
+            raise SnapshotError('Not a KivEnt snapshot')
+        if version != SNAPSHOT_VERSION:
+            raise SnapshotError('Unsupported snapshot version {}'.format(
+                version))
+        cdef SnapshotReader reader = SnapshotReader(data,
+            SNAPSHOT_HEADER.size)
+        try:
+            header = json.loads(reader.take(header_size).decode('utf-8'))
+            systems = [(system_index, system_id)
+                for system_index, system_id in header['systems']]
+            master_size = header['master_size']
+            entities_to_remove = list(header['entities_to_remove'])
+        except (ValueError, TypeError, KeyError):
+            raise SnapshotError('The snapshot header is invalid')
+        entities = reader.read()
+        system_states = [system + (reader.read(),) for system in systems]
+        reader.finish()
+        self.set_state({
+            'master_size': master_size,
+            'entities': entities,
+            'entities_to_remove': entities_to_remove,
+            'systems': system_states,
+            })
+
+    def save(self, str file_name):
+        '''
+        Takes a snapshot of the GameWorld and writes it to a file.
+
+        Args:
+            file_name (str): The file to write.
+        '''
+        data = self.snapshot()
+        with open(file_name, 'wb') as output:
+            output.write(data)
+
+    def load(self, str file_name):
+        '''
+        Restores a snapshot previously written with **save**.
+
+        Args:
+            file_name (str): The file to read.
+        '''
+        with open(file_name, 'rb') as input_file:
+            data = input_file.read()
+        self.restore(data)
@@ -1,4 +1,3 @@
-# cython: profile=True
 # cython: embedsignature=True
 from kivent_core.memory_handlers.membuffer cimport Buffer
 
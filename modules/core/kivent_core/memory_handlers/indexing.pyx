@@ -76,7 +76,8 @@ offset into the position component array.
 from kivent_core.memory_handlers.block cimport MemoryBlock
 from kivent_core.memory_handlers.zone cimport MemoryZone
 from kivent_core.memory_handlers.pool cimport MemoryPool
-from kivent_core.memory_handlers.membuffer cimport Buffer
+from kivent_core.memory_handlers.membuffer cimport (Buffer,
+    ALLOCATOR_FIRST_FIT)
 
 
 cdef class BlockIndex:
@@ -258,7 +259,8 @@ cdef class IndexedMemoryZone:
     '''
 
     def __cinit__(self, Buffer master_buffer, unsigned int block_size,
-        unsigned int component_size, dict reserved_spec, ComponentToCreate):
+        unsigned int component_size, dict reserved_spec, ComponentToCreate,
+        unsigned int allocator=ALLOCATOR_FIRST_FIT):
         '''Allocates both a MemoryZone and and a ZoneIndex on initialization.
         Args:
             master_buffer (Buffer): The Buffer from which we will allocate the
@@ -276,9 +278,13 @@ cdef class IndexedMemoryZone:
 
             ComponentToCreate (object): The object we will wrap the data in
             MemoryZone with for the ZoneIndex.
+
+            allocator (unsigned int): The allocator used to track freed slots
+            in the MemoryZone, see Buffer.set_allocator. Defaults to
+            ALLOCATOR_FIRST_FIT.
         '''
         cdef MemoryZone memory_zone = MemoryZone(block_size,
-            master_buffer, component_size, reserved_spec)
+            master_buffer, component_size, reserved_spec, allocator)
         cdef ZoneIndex zone_index = ZoneIndex(memory_zone, ComponentToCreate)
         self.zone_index = zone_index
         self.memory_zone = memory_zone
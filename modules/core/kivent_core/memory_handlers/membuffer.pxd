@@ -1,5 +1,19 @@
 from cpython cimport bool
 
+cdef enum:
+    ALLOCATOR_FIRST_FIT = 0
+    ALLOCATOR_BITMAP = 1
+    ALLOCATOR_SIZE_CLASS = 2
+
+
+cdef unsigned int lowest_set_bit(unsigned long long word) noexcept nogil
+
+
+ctypedef struct FreeRange:
+    unsigned int start
+    unsigned int count
+
+
 cdef class Buffer:
     cdef unsigned int size
     cdef void* data
@@ -10,6 +24,11 @@ cdef class Buffer:
     cdef unsigned int data_in_free
     cdef unsigned int real_size
     cdef unsigned int size_in_blocks
+    cdef unsigned int allocator
+    cdef unsigned long long* free_bits
+    cdef unsigned int free_bits_hint
+    cdef FreeRange* free_ranges
+    cdef unsigned int free_range_capacity
 
     cdef unsigned int add_data(self, unsigned int block_count) except -1
     cdef void remove_data(self, unsigned int block_index,
@@ -25,3 +44,18 @@ cdef class Buffer:
     cdef void* allocate_memory(self) except NULL
     cdef bool check_empty(self)
     cdef unsigned int get_offset(self, unsigned int block_index)
+    cdef int set_allocator(self, unsigned int allocator) except 0
+    cdef unsigned int add_data_bitmap(self, unsigned int block_count) except -1
+    cdef void remove_data_bitmap(self, unsigned int block_index,
+        unsigned int block_count)
+    cdef unsigned int add_data_size_class(self,
+        unsigned int block_count) except -1
+    cdef void remove_data_size_class(self, unsigned int block_index,
+        unsigned int block_count)
+    cdef int reserve_free_ranges(self, unsigned int used_count) except 0
+    cdef unsigned int find_free_range(self, unsigned int block_index)
+    cdef void insert_free_range(self, unsigned int range_index,
+        unsigned int block_index, unsigned int block_count)
+    cdef void discard_free_range(self, unsigned int range_index)
+    cdef tuple get_state(self)
+    cdef int set_state(self, tuple state) except 0
@@ -1,5 +1,49 @@
 from cpython cimport bool
-from libc.stdlib cimport malloc, free
+from libc.stdlib cimport malloc, free, calloc, realloc
+from libc.string cimport memset, memcpy, memmove
+from array import array
+
+allocator_types = {
+    'first_fit': ALLOCATOR_FIRST_FIT,
+    'bitmap': ALLOCATOR_BITMAP,
+    'size_class': ALLOCATOR_SIZE_CLASS,
+    }
+
+
+def get_allocator_type(str name):
+    '''Converts the name of an allocator into the value expected by
+    Buffer.set_allocator.
+
+    Args:
+        name (str): One of 'first_fit', 'bitmap', or 'size_class'.
+
+    Return:
+        unsigned int: ALLOCATOR_FIRST_FIT, ALLOCATOR_BITMAP, or
+        ALLOCATOR_SIZE_CLASS.
+    '''
+    try:
+        return allocator_types[name]
+    except KeyError:
+        raise ValueError('Unknown allocator {name}, must be one of '
+            '{names}'.format(name=name, names=', '.join(allocator_types)))
+
+
+#Lookup table for finding the lowest set bit of a 64 bit word with a
+#de Bruijn multiplication, used by the bitmap allocator.
+DEF DEBRUIJN_64 = 0x03f79d71b4cb0a89
+cdef unsigned int debruijn_table[64]
+cdef unsigned int bit_position
+for bit_position in range(64):
+    debruijn_table[(((<unsigned long long>1) << bit_position) *
+        <unsigned long long>DEBRUIJN_64) >> 58] = bit_position
+
+
+cdef unsigned int lowest_set_bit(unsigned long long word) noexcept nogil:
+    '''Returns the index of the lowest set bit of word, which must not be
+    0.'''
+    return debruijn_table[((word & (~word + 1)) *
+        <unsigned long long>DEBRUIJN_64) >> 58]
+
 
 cdef class Buffer:
     '''The KivEnt Buffer allocates a static amount of memory and manages it by
@@ -44,6 +88,31 @@ cdef class Buffer:
         **size_in_blocks** (unsigned int): The number of blocks allocated from
         the parent buffer. Unused in the basic Buffer, but used by subclasses
         such as MemoryBlock.
+
+        **allocator** (unsigned int): How freed blocks are tracked and reused,
+        set with **set_allocator**. ALLOCATOR_FIRST_FIT (the default) keeps
+        the **free_blocks** list described above. ALLOCATOR_BITMAP is meant
+        for fixed size slots where every add_data asks for a single block: a
+        bitmap of the freed blocks is kept and the lowest free block is found
+        with a find-first-set, multi-block requests are always taken from the
+        tail. ALLOCATOR_SIZE_CLASS is meant for ranges of varying size: the
+        free ranges are kept in **free_ranges** sorted by start, the
+        smallest range that fits is used and freed ranges are merged with
+        their free neighbours, returning to the tail when they reach it.
+
+        **free_bits** (unsigned long long*): The bitmap used by
+        ALLOCATOR_BITMAP, one bit per block, set when the block is free.
+
+        **free_bits_hint** (unsigned int): Index of the lowest word in
+        **free_bits** that may have a bit set.
+
+        **free_ranges** (FreeRange*): Used by ALLOCATOR_SIZE_CLASS, the
+        **free_block_count** free ranges sorted by start. Neighbouring free
+        ranges are always merged, so there can never be more than half of
+        the used blocks, rounded up, and the array grows with **used_count**.
+
+        **free_range_capacity** (unsigned int): The number of FreeRange
+        **free_ranges** has room for.
     '''
 
     def __cinit__(self, unsigned int size_in_blocks, unsigned int type_size,
@@ -77,13 +146,52 @@ cdef class Buffer:
         self.size_in_blocks = size_in_blocks
         self.free_blocks = []
         self.data_in_free = 0
+        self.allocator = ALLOCATOR_FIRST_FIT
+        self.free_bits = NULL
+        self.free_bits_hint = 0
+        self.free_ranges = NULL
+        self.free_range_capacity = 0
 
     def __dealloc__(self):
         self.free_blocks = None
         self.size = 0
         self.free_block_count = 0
+        if self.free_bits != NULL:
+            free(self.free_bits)
+            self.free_bits = NULL
+        if self.free_ranges != NULL:
+            free(self.free_ranges)
+            self.free_ranges = NULL
         self.deallocate_memory()
 
+    cdef int set_allocator(self, unsigned int allocator) except 0:
+        '''Selects the strategy used to track and reuse freed blocks, see
+        **allocator**. Must be called while the Buffer is empty.
+
+        Args:
+            allocator (unsigned int): One of ALLOCATOR_FIRST_FIT,
+            ALLOCATOR_BITMAP, or ALLOCATOR_SIZE_CLASS.
+        '''
+        if not self.check_empty():
+            raise ValueError('Cannot change the allocator of a Buffer in use')
+        if allocator > ALLOCATOR_SIZE_CLASS:
+            raise ValueError('Unknown allocator {}'.format(allocator))
+        if self.free_bits != NULL:
+            free(self.free_bits)
+            self.free_bits = NULL
+        if self.free_ranges != NULL:
+            free(self.free_ranges)
+            self.free_ranges = NULL
+            self.free_range_capacity = 0
+        if allocator == ALLOCATOR_BITMAP:
+            self.free_bits = <unsigned long long*>calloc(
+                (self.size >> 6) + 1, sizeof(unsigned long long))
+            if self.free_bits == NULL:
+                raise MemoryError()
+        self.allocator = allocator
+        self.clear()
+        return 1
+
     cdef bool check_empty(self):
         '''Checks to see if the Buffer is completely unused (No blocks in
             either the **free_blocks** list or actively in use).
@@ -131,6 +239,10 @@ cdef class Buffer:
         #of pooling the same size objects and we are not super good at pooling
         #different sized objects. Perhaps we need to consider several alternate
         #implementations for different use cases. Or a smarter algorithm.
+        if self.allocator == ALLOCATOR_BITMAP:
+            return self.add_data_bitmap(block_count)
+        elif self.allocator == ALLOCATOR_SIZE_CLASS:
+            return self.add_data_size_class(block_count)
         cdef unsigned int largest_free_block = 0
         cdef unsigned int index
         cdef unsigned int data_in_free = self.data_in_free
@@ -162,12 +274,217 @@ cdef class Buffer:
             block_count (unsigned int): The number of data blocks that were
             previously allocated, originally passed in to **add_data**
         '''
+        if self.allocator == ALLOCATOR_BITMAP:
+            self.remove_data_bitmap(block_index, block_count)
+            return
+        elif self.allocator == ALLOCATOR_SIZE_CLASS:
+            self.remove_data_size_class(block_index, block_count)
+            return
         self.free_blocks.append((block_index, block_count))
         self.data_in_free += block_count
         self.free_block_count += 1
         if self.data_in_free >= self.used_count:
             self.clear()
 
+    cdef unsigned int add_data_bitmap(self,
+        unsigned int block_count) except -1:
+        '''**add_data** for ALLOCATOR_BITMAP. A single block is taken from
+        the lowest free bit if any block has been freed, otherwise the data is
+        taken from the tail.
+
+        Args:
+            block_count (unsigned int): The number of blocks to add
+
+        Return:
+            unsigned int: The index of the new data.
+        '''
+        cdef unsigned long long* free_bits = self.free_bits
+        cdef unsigned int word_count = (self.used_count >> 6) + 1
+        cdef unsigned int i
+        cdef unsigned long long word
+        cdef unsigned int index
+        if block_count == 1 and self.free_block_count > 0:
+            for i in range(self.free_bits_hint, word_count):
+                word = free_bits[i]
+                if word != 0:
+                    free_bits[i] = word & (word - 1)
+                    self.free_bits_hint = i
+                    self.free_block_count -= 1
+                    self.data_in_free -= 1
+                    return (i << 6) + lowest_set_bit(word)
+        if block_count <= self.get_blocks_on_tail():
+            index = self.used_count
+            self.used_count += block_count
+            return index
+        raise MemoryError()
+
+    cdef void remove_data_bitmap(self, unsigned int block_index,
+        unsigned int block_count):
+        '''**remove_data** for ALLOCATOR_BITMAP, marks every block in the
+        range as free.
+
+        Args:
+            block_index (unsigned int): The starting index of the data.
+
+            block_count (unsigned int): The number of blocks to free.
+        '''
+        cdef unsigned long long* free_bits = self.free_bits
+        cdef unsigned int i
+        for i in range(block_index, block_index + block_count):
+            free_bits[i >> 6] |= (<unsigned long long>1) << (i & 63)
+        if (block_index >> 6) < self.free_bits_hint:
+            self.free_bits_hint = block_index >> 6
+        self.data_in_free += block_count
+        self.free_block_count += block_count
+        if self.data_in_free >= self.used_count:
+            self.clear()
+
+    cdef unsigned int add_data_size_class(self,
+        unsigned int block_count) except -1:
+        '''**add_data** for ALLOCATOR_SIZE_CLASS. Takes the smallest free
+        range that can fit block_count, stopping at the first exact fit, and
+        leaves the remainder of the range free, otherwise takes the data from
+        the tail.
+
+        Args:
+            block_count (unsigned int): The number of blocks to add
+
+        Return:
+            unsigned int: The index of the new data.
+        '''
+        cdef FreeRange* free_ranges = self.free_ranges
+        cdef unsigned int best = <unsigned int>-1
+        cdef unsigned int best_count = 0
+        cdef unsigned int i, index, range_count
+        if self.data_in_free >= block_count:
+            for i in range(self.free_block_count):
+                range_count = free_ranges[i].count
+                if range_count == block_count:
+                    best = i
+                    break
+                elif range_count > block_count and (
+                    best == <unsigned int>-1 or range_count < best_count):
+                    best = i
+                    best_count = range_count
+            if best != <unsigned int>-1:
+                index = free_ranges[best].start
+                if free_ranges[best].count == block_count:
+                    self.discard_free_range(best)
+                else:
+                    free_ranges[best].start += block_count
+                    free_ranges[best].count -= block_count
+                    self.data_in_free -= block_count
+                return index
+        if block_count <= self.get_blocks_on_tail():
+            self.reserve_free_ranges(self.used_count + block_count)
+            index = self.used_count
+            self.used_count += block_count
+            return index
+        raise MemoryError()
+
+    cdef void remove_data_size_class(self, unsigned int block_index,
+        unsigned int block_count):
+        '''**remove_data** for ALLOCATOR_SIZE_CLASS. The range is merged with
+        any free range directly before or after it, if the merged range ends
+        at the tail it is returned to the tail instead of being kept in
+        **free_ranges**.
+
+        Args:
+            block_index (unsigned int): The starting index of the data.
+
+            block_count (unsigned int): The number of blocks to free.
+        '''
+        cdef FreeRange* free_ranges = self.free_ranges
+        cdef unsigned int end = block_index + block_count
+        cdef unsigned int i = self.find_free_range(block_index)
+        cdef bint merge_before = i > 0 and (
+            free_ranges[i-1].start + free_ranges[i-1].count == block_index)
+        cdef bint merge_after = i < self.free_block_count and (
+            free_ranges[i].start == end)
+        if merge_before and merge_after:
+            #discarding the range after takes its blocks out of data_in_free
+            free_ranges[i-1].count += block_count + free_ranges[i].count
+            self.data_in_free += block_count + free_ranges[i].count
+            self.discard_free_range(i)
+        elif merge_before:
+            free_ranges[i-1].count += block_count
+            self.data_in_free += block_count
+        elif merge_after:
+            free_ranges[i].start = block_index
+            free_ranges[i].count += block_count
+            self.data_in_free += block_count
+        else:
+            self.insert_free_range(i, block_index, block_count)
+        i = self.free_block_count - 1
+        if free_ranges[i].start + free_ranges[i].count >= self.used_count:
+            self.used_count = free_ranges[i].start
+            self.discard_free_range(i)
+        if self.data_in_free >= self.used_count:
+            self.clear()
+
+    cdef int reserve_free_ranges(self, unsigned int used_count) except 0:
+        '''Grows **free_ranges** so that it can hold every free range of
+        ALLOCATOR_SIZE_CLASS once used_count blocks are in use, so that
+        freeing data never has to allocate.
+
+        Args:
+            used_count (unsigned int): The number of blocks that will be in
+            use.
+        '''
+        cdef unsigned int needed = (used_count + 1) // 2
+        cdef unsigned int capacity = self.free_range_capacity
+        cdef FreeRange* free_ranges
+        if needed <= capacity:
+            return 1
+        if capacity < 16:
+            capacity = 16
+        while capacity < needed:
+            capacity *= 2
+        free_ranges = <FreeRange*>realloc(self.free_ranges,
+            sizeof(FreeRange) * capacity)
+        if free_ranges == NULL:
+            raise MemoryError()
+        self.free_ranges = free_ranges
+        self.free_range_capacity = capacity
+        return 1
+
+    cdef unsigned int find_free_range(self, unsigned int block_index):
+        '''Returns the index in **free_ranges** of the first free range
+        that starts at or after block_index, **free_block_count** if there
+        is none.'''
+        cdef FreeRange* free_ranges = self.free_ranges
+        cdef unsigned int low = 0
+        cdef unsigned int high = self.free_block_count
+        cdef unsigned int middle
+        while low < high:
+            middle = (low + high) // 2
+            if free_ranges[middle].start < block_index:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    cdef void insert_free_range(self, unsigned int range_index,
+        unsigned int block_index, unsigned int block_count):
+        '''Adds a free range at range_index of **free_ranges** for
+        ALLOCATOR_SIZE_CLASS.'''
+        cdef FreeRange* free_ranges = self.free_ranges
+        memmove(&free_ranges[range_index + 1], &free_ranges[range_index],
+            sizeof(FreeRange) * (self.free_block_count - range_index))
+        free_ranges[range_index].start = block_index
+        free_ranges[range_index].count = block_count
+        self.data_in_free += block_count
+        self.free_block_count += 1
+
+    cdef void discard_free_range(self, unsigned int range_index):
+        '''Removes the free range at range_index of **free_ranges** for
+        ALLOCATOR_SIZE_CLASS.'''
+        cdef FreeRange* free_ranges = self.free_ranges
+        self.data_in_free -= free_ranges[range_index].count
+        self.free_block_count -= 1
+        memmove(&free_ranges[range_index], &free_ranges[range_index + 1],
+            sizeof(FreeRange) * (self.free_block_count - range_index))
+
     cdef void* get_pointer(self, unsigned int block_index) except NULL:
         '''Returns a pointer to somewhere in the allocated data, performs no
         bounds checking so make sure to ask for the right data.
@@ -195,6 +512,13 @@ cdef class Buffer:
         cdef unsigned int index, block_count
         cdef list free_blocks = self.free_blocks
         cdef unsigned int largest_block_count = 0
+        if self.allocator == ALLOCATOR_BITMAP:
+            return 1 if free_block_count > 0 else 0
+        elif self.allocator == ALLOCATOR_SIZE_CLASS:
+            for i in range(free_block_count):
+                if self.free_ranges[i].count > largest_block_count:
+                    largest_block_count = self.free_ranges[i].count
+            return largest_block_count
         for i in range(free_block_count):
             free_block = free_blocks[i]
             index, block_count = free_block
@@ -249,6 +573,8 @@ cdef class Buffer:
             return True # Space on tail
         if self.data_in_free < block_count:
             return False
+        if self.allocator != ALLOCATOR_FIRST_FIT:
+            return self.get_largest_free_block() >= block_count
         free_blocks = self.free_blocks
         free_block_count = self.free_block_count
         for i in range(free_block_count):
@@ -259,7 +585,95 @@ cdef class Buffer:
     cdef void clear(self):
         '''Clear the whole buffer and mark all blocks as available.
         '''
+        if self.free_bits != NULL:
+            memset(self.free_bits, 0,
+                ((self.used_count >> 6) + 1) * sizeof(unsigned long long))
+        self.free_bits_hint = 0
         self.used_count = 0
         self.free_blocks = []
         self.free_block_count = 0
         self.data_in_free = 0
+
+    cdef tuple get_state(self):
+        '''Copies the bookkeeping of which blocks are used and free, so that
+        it can be put back with **set_state**. The data itself is not
+        copied.
+
+        Return:
+            tuple: The allocator state, only meant to be passed to
+            **set_state** of a Buffer of the same size and allocator.
+        '''
+        cdef bytes free_bits = None
+        cdef unsigned int i
+        free_ranges = None
+        if self.free_bits != NULL:
+            free_bits = (<char*>self.free_bits)[:((self.size >> 6) + 1) *
+                sizeof(unsigned long long)]
+        if self.allocator == ALLOCATOR_SIZE_CLASS:
+            free_ranges = array('I')
+            for i in range(self.free_block_count):
+                free_ranges.append(self.free_ranges[i].start)
+                free_ranges.append(self.free_ranges[i].count)
+        return (self.allocator, self.used_count, list(self.free_blocks),
+            self.free_block_count, self.data_in_free, free_bits,
+            self.free_bits_hint, free_ranges)
+
+    cdef int set_state(self, tuple state) except 0:
+        '''Restores the bookkeeping previously returned by **get_state**,
+        the blocks used at that time are considered used again. The data
+        itself is left untouched. Every free range is checked to lie within
+        the used blocks, so that a bad state can not hand out blocks outside
+        of the Buffer.
+
+        Args:
+            state (tuple): The result of **get_state**.
+        '''
+        cdef bytes free_bits
+        cdef unsigned long long* words
+        cdef unsigned long long mask
+        cdef unsigned int used_count, word_count, i, range_count
+        allocator, used_count, free_blocks, free_block_count, data_in_free, \
+            free_bits, free_bits_hint, free_ranges = state
+        if allocator != self.allocator or used_count > self.size:
+            raise ValueError('Buffer state does not match this Buffer')
+        for index, block_count in free_blocks:
+            if index + block_count > used_count:
+                raise ValueError('Buffer state does not match this Buffer')
+        word_count = (self.size >> 6) + 1
+        if (free_bits is None) != (self.free_bits == NULL):
+            raise ValueError('Buffer state does not match this Buffer')
+        if free_bits is not None:
+            if len(free_bits) != word_count * sizeof(unsigned long long):
+                raise ValueError('Buffer state does not match this Buffer')
+            words = <unsigned long long*><char*>free_bits
+            for i in range(used_count >> 6, word_count):
+                mask = ~(<unsigned long long>0)
+                if used_count > (i << 6):
+                    mask <<= used_count - (i << 6)
+                if words[i] & mask:
+                    raise ValueError('Buffer state does not match this Buffer')
+        if (free_ranges is None) != (allocator != ALLOCATOR_SIZE_CLASS):
+            raise ValueError('Buffer state does not match this Buffer')
+        if free_ranges is not None:
+            range_count = len(free_ranges) // 2
+            if (len(free_ranges) % 2 or range_count != free_block_count or
+                sum(free_ranges[1::2]) != data_in_free):
+                raise ValueError('Buffer state does not match this Buffer')
+            end = 0
+            for i in range(range_count):
+                if (free_ranges[2*i+1] == 0 or free_ranges[2*i] < end or
+                    free_ranges[2*i] + free_ranges[2*i+1] >= used_count):
+                    raise ValueError('Buffer state does not match this Buffer')
+                end = free_ranges[2*i] + free_ranges[2*i+1] + 1
+            self.reserve_free_ranges(used_count)
+            for i in range(range_count):
+                self.free_ranges[i].start = free_ranges[2*i]
+                self.free_ranges[i].count = free_ranges[2*i+1]
+        if free_bits is not None:
+            memcpy(self.free_bits, <char*>free_bits, len(free_bits))
+        self.used_count = used_count
+        self.free_blocks = [tuple(free_block) for free_block in free_blocks]
+        self.free_block_count = free_block_count
+        self.data_in_free = data_in_free
+        self.free_bits_hint = min(free_bits_hint, word_count - 1)
+        return 1
@@ -4,7 +4,9 @@ from kivent_core.memory_handlers.block cimport MemoryBlock
 cdef class MemoryPool:
     cdef unsigned int count
     cdef list memory_blocks
-    cdef list blocks_with_free_space
+    cdef unsigned long long* free_space_bits
+    cdef unsigned int free_space_count
+    cdef unsigned int free_space_hint
     cdef unsigned int used
     cdef unsigned int free_count
     cdef Buffer master_buffer
@@ -20,6 +22,12 @@ cdef class MemoryPool:
         unsigned int slot_index, unsigned int block_index)
     cdef void* get_pointer(self, unsigned int index) except NULL
     cdef unsigned int get_free_slot(self) except -1
+    cdef unsigned int get_block_with_free_space(self)
+    cdef void set_block_free_space(self, unsigned int block_index,
+        bint has_free_space)
     cdef void free_slot(self, unsigned int index)
     cdef void clear(self)
     cdef unsigned int get_size(self)
+    cdef tuple get_state(self)
+    cdef list get_state_active_slots(self, tuple state)
+    cdef int set_state(self, tuple state) except 0
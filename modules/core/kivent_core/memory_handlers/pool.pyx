@@ -1,5 +1,8 @@
-from kivent_core.memory_handlers.membuffer cimport Buffer
+from kivent_core.memory_handlers.membuffer cimport (Buffer,
+    ALLOCATOR_FIRST_FIT, lowest_set_bit)
 from kivent_core.memory_handlers.block cimport MemoryBlock
+from libc.stdlib cimport calloc, free
+from libc.string cimport memcpy, memset
 
 cdef class MemoryPool:
     '''The MemoryPool is suitable for pooling C data of the same type.
@@ -28,8 +31,15 @@ cdef class MemoryPool:
         start = **slots_per_block** * index in memory_blocks
         end = (**slots_per_block** * (index in memory_blocks + 1)) - 1
 
-        **blocks_with_free_space** (list): A list of the MemoryBlock that have
-        open slots.
+        **free_space_bits** (unsigned long long*): A bitmap with one bit per
+        MemoryBlock, set for the blocks that have open slots, so that they
+        can be added, removed and the lowest one found in constant time.
+
+        **free_space_count** (unsigned int): The number of bits set in
+        **free_space_bits**.
+
+        **free_space_hint** (unsigned int): Index of the lowest word in
+        **free_space_bits** that may have a bit set.
 
         **used** (unsigned int): Total number of used slots, will include both
         active slots and slots sitting in the free list of their respective
@@ -56,7 +66,8 @@ cdef class MemoryPool:
     '''
 
     def __cinit__(self, unsigned int block_size_in_kb, Buffer master_buffer,
-        unsigned int type_size, unsigned int desired_count):
+        unsigned int type_size, unsigned int desired_count,
+        unsigned int allocator=ALLOCATOR_FIRST_FIT):
         '''During initialization we determine how many MemoryBlock we will need
         of block_size_in_kb kibibytes to fit desired_count in data taking up
         type_size. A single large MemoryBlock with type_size:
@@ -77,8 +88,11 @@ cdef class MemoryPool:
             desired_count (unsigned int): The desired minimum number of slots
             to allocate. The actual size of the pool will be greater accounting
             for the size of the individual MemoryBlock.
+
+            allocator (unsigned int): The allocator used by each MemoryBlock
+            in the pool to track its freed slots, see Buffer.set_allocator.
+            Defaults to ALLOCATOR_FIRST_FIT.
         '''
-        self.blocks_with_free_space = []
         self.memory_blocks = mem_blocks = []
         self.used = 0
         self.free_count = 0
@@ -86,6 +100,12 @@ cdef class MemoryPool:
         cdef unsigned int size_in_bytes = (block_size_in_kb * 1024)
         cdef unsigned int slots_per_block = size_in_bytes // type_size
         cdef unsigned int block_count = (desired_count//slots_per_block) + 1
+        self.free_space_bits = <unsigned long long*>calloc(
+            (block_count >> 6) + 1, sizeof(unsigned long long))
+        if self.free_space_bits == NULL:
+            raise MemoryError()
+        self.free_space_count = 0
+        self.free_space_hint = 0
         self.count = slots_per_block * block_count
         self.slots_per_block = slots_per_block
         self.block_count = block_count
@@ -99,8 +119,15 @@ cdef class MemoryPool:
         for x in range(block_count):
             mem_block = MemoryBlock(1, type_size, size_in_bytes)
             mem_block.allocate_memory_with_buffer(master_block)
+            if allocator != ALLOCATOR_FIRST_FIT:
+                mem_block.set_allocator(allocator)
             mem_blocks_a(mem_block)
 
+    def __dealloc__(self):
+        if self.free_space_bits != NULL:
+            free(self.free_space_bits)
+            self.free_space_bits = NULL
+
     cdef unsigned int get_block_from_index(self, unsigned int index):
         '''Takes the slot index received from **get_free_slot** and retrieves
         the index of the block that contains that slot.
@@ -165,16 +192,15 @@ cdef class MemoryPool:
         cdef unsigned int block_index
         cdef MemoryBlock mem_block
         cdef list mem_blocks = self.memory_blocks
-        cdef list free_blocks = self.blocks_with_free_space
-        if self.used == self.count and len(free_blocks) <= 0:
+        if self.used == self.count and self.free_space_count == 0:
             raise MemoryError()
-        if len(free_blocks) == 0:
+        if self.free_space_count == 0:
             block_index = self.get_block_from_index(self.used)
             mem_block = mem_blocks[block_index]
             self.used += 1
             index = mem_block.add_data(1)
         else:
-            block_index = free_blocks[0]
+            block_index = self.get_block_with_free_space()
             mem_block = mem_blocks[block_index]
             index = mem_block.add_data(1)
             if block_index == self.get_block_from_index(self.used) and (
@@ -187,9 +213,42 @@ cdef class MemoryPool:
 
             if mem_block.free_block_count == 0 and (
                     mem_block.get_blocks_on_tail() == 0):
-                free_blocks.remove(block_index)
+                self.set_block_free_space(block_index, False)
         return self.get_index_from_slot_index_and_block(index, block_index)
 
+    cdef unsigned int get_block_with_free_space(self):
+        '''Returns the lowest index of a MemoryBlock with open slots in
+        **free_space_bits**, there must be at least one.
+        Return:
+            unsigned int: The index of the MemoryBlock.
+        '''
+        cdef unsigned long long* free_space_bits = self.free_space_bits
+        cdef unsigned int i = self.free_space_hint
+        while free_space_bits[i] == 0:
+            i += 1
+        self.free_space_hint = i
+        return (i << 6) + lowest_set_bit(free_space_bits[i])
+
+    cdef void set_block_free_space(self, unsigned int block_index,
+        bint has_free_space):
+        '''Sets or clears the bit of a MemoryBlock in **free_space_bits**.
+        Args:
+            block_index (unsigned int): The index of the MemoryBlock.
+
+            has_free_space (bint): Whether the MemoryBlock has open slots.
+        '''
+        cdef unsigned long long* word = &self.free_space_bits[block_index >> 6]
+        cdef unsigned long long bit = (<unsigned long long>1) << (
+            block_index & 63)
+        if has_free_space and not word[0] & bit:
+            word[0] |= bit
+            self.free_space_count += 1
+            if (block_index >> 6) < self.free_space_hint:
+                self.free_space_hint = block_index >> 6
+        elif not has_free_space and word[0] & bit:
+            word[0] &= ~bit
+            self.free_space_count -= 1
+
     cdef void free_slot(self, unsigned int index):
         '''Frees a previously acquired slot for reuse. Does not handle
         clearing data. If all used slots have been freed we will clear the whole
@@ -201,12 +260,10 @@ cdef class MemoryPool:
         cdef unsigned int slot_index = self.get_slot_index_from_index(index)
         cdef MemoryBlock mem_block
         cdef list mem_blocks = self.memory_blocks
-        cdef list free_blocks = self.blocks_with_free_space
         mem_block = mem_blocks[block_index]
         mem_block.remove_data(slot_index, 1)
         self.free_count += 1
-        if block_index not in free_blocks:
-            free_blocks.append(block_index)
+        self.set_block_free_space(block_index, True)
         if self.free_count >= self.used:
             self.clear()
 
@@ -221,10 +278,101 @@ cdef class MemoryPool:
     cdef void clear(self):
         '''Marks all slots as free, effectively 'clearing' the entire pool.
         Resets to the initialized state of the MemoryPool.'''
-        self.blocks_with_free_space = []
+        memset(self.free_space_bits, 0,
+            ((self.block_count >> 6) + 1) * sizeof(unsigned long long))
+        self.free_space_count = 0
+        self.free_space_hint = 0
         self.used = 0
         self.free_count = 0
         cdef MemoryBlock block
         for block in self.memory_blocks:
             if not block.check_empty():
                 block.clear()
+
+    cdef tuple get_state(self):
+        '''Copies the data of every MemoryBlock that has been used so far
+        together with the bookkeeping of the pool and its blocks, so that
+        both can be put back with **set_state**.
+
+        Return:
+            tuple: The pool state, only meant to be passed to **set_state**
+            of a MemoryPool allocated at the same place of the same Buffer.
+        '''
+        cdef MemoryBlock master_block = self.master_block
+        cdef MemoryBlock block
+        cdef unsigned int used_blocks = 0
+        if self.used > 0:
+            used_blocks = self.get_block_from_index(self.used - 1) + 1
+        cdef bytes data = (<char*>master_block.data)[
+            :used_blocks * master_block.type_size]
+        cdef unsigned int block_index
+        cdef list blocks_with_free_space = [block_index
+            for block_index in range(self.block_count)
+            if self.free_space_bits[block_index >> 6] & (
+            (<unsigned long long>1) << (block_index & 63))]
+        return (master_block.master_index, self.count, self.used,
+            self.free_count, blocks_with_free_space,
+            [block.get_state() for block in self.memory_blocks[:used_blocks]],
+            data)
+
+    cdef list get_state_active_slots(self, tuple state):
+        '''Returns the slots that would be active after **set_state** with
+        state, the used slots whose data does not start with an entity_id of
+        <unsigned int>-1, without changing the pool.
+
+        Args:
+            state (tuple): The result of **get_state**.
+
+        Return:
+            list: The indices of the active slots in state, in order.
+        '''
+        cdef MemoryBlock master_block = self.master_block
+        cdef bytes data = state[6]
+        cdef char* data_ptr = <char*>data
+        cdef unsigned int used = state[2]
+        cdef unsigned int index
+        cdef size_t offset
+        cdef list indices = []
+        for index in range(used):
+            offset = (self.get_block_from_index(index) *
+                master_block.type_size + self.get_slot_index_from_index(
+                index) * self.type_size)
+            if offset + sizeof(unsigned int) > <size_t>len(data):
+                raise ValueError(
+                    'MemoryPool state does not match this MemoryPool')
+            if (<unsigned int*>(data_ptr + offset))[0] != <unsigned int>-1:
+                indices.append(index)
+        return indices
+
+    cdef int set_state(self, tuple state) except 0:
+        '''Restores the data and bookkeeping previously returned by
+        **get_state**, the slots used at that time hold the same data and
+        are considered used again.
+
+        Args:
+            state (tuple): The result of **get_state**.
+        '''
+        cdef MemoryBlock master_block = self.master_block
+        cdef MemoryBlock block
+        cdef bytes data
+        cdef list block_states
+        cdef unsigned int i
+        master_index, count, used, free_count, blocks_with_free_space, \
+            block_states, data = state
+        if (master_index != master_block.master_index or
+            count != self.count or len(data) > master_block.real_size or
+            used > self.count or free_count > used or
+            len(block_states) > len(self.memory_blocks) or any(
+            [not 0 <= block_index < len(self.memory_blocks)
+            for block_index in blocks_with_free_space])):
+            raise ValueError('MemoryPool state does not match this MemoryPool')
+        memcpy(master_block.data, <char*>data, len(data))
+        self.clear()
+        for i in range(len(block_states)):
+            block = self.memory_blocks[i]
+            block.set_state(block_states[i])
+        self.used = used
+        self.free_count = free_count
+        for block_index in blocks_with_free_space:
+            self.set_block_free_space(block_index, True)
+        return 1
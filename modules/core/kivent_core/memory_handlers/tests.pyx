@@ -1,9 +1,11 @@
 from kivent_core.memory_handlers.block cimport MemoryBlock
-from kivent_core.memory_handlers.membuffer cimport Buffer
+from kivent_core.memory_handlers.membuffer cimport (Buffer,
+    ALLOCATOR_FIRST_FIT, ALLOCATOR_BITMAP, ALLOCATOR_SIZE_CLASS)
 from kivent_core.memory_handlers.zone cimport MemoryZone
 from kivent_core.memory_handlers.pool cimport MemoryPool
 from kivent_core.memory_handlers.utils cimport memrange
 from kivent_core.memory_handlers.indexing cimport IndexedMemoryZone, ZoneIndex, BlockIndex
+from random import Random
 
 ctypedef struct Test:
     float x
@@ -145,6 +147,159 @@ def test_pool(size_in_kb, size_of_pool):
         assert(read_mem.y==index)
 
 
+def test_bitmap_allocator(block_count):
+    cdef Buffer mem_block = Buffer(block_count*sizeof(Test), sizeof(Test), 1)
+    mem_block.allocate_memory()
+    mem_block.set_allocator(ALLOCATOR_BITMAP)
+    cdef unsigned int x
+    for x in range(block_count):
+        assert(mem_block.add_data(1)==x)
+    assert(not mem_block.can_fit_data(1))
+    for x in range(block_count-1, 0, -3):
+        mem_block.remove_data(x, 1)
+    #freed slots are always reused lowest index first
+    freed = sorted(range(block_count-1, 0, -3))
+    for x in freed:
+        assert(mem_block.add_data(1)==x)
+    assert(mem_block.free_block_count==0)
+    assert(mem_block.used_count==block_count)
+    for x in range(block_count):
+        mem_block.remove_data(x, 1)
+    assert(mem_block.check_empty())
+    assert(mem_block.add_data(1)==0)
+
+
+def test_size_class_allocator(block_count):
+    cdef Buffer mem_block = Buffer(block_count*sizeof(Test), sizeof(Test), 1)
+    mem_block.allocate_memory()
+    mem_block.set_allocator(ALLOCATOR_SIZE_CLASS)
+    cdef unsigned int a = mem_block.add_data(4)
+    cdef unsigned int b = mem_block.add_data(8)
+    cdef unsigned int c = mem_block.add_data(4)
+    cdef unsigned int d = mem_block.add_data(16)
+    assert((a, b, c, d)==(0, 4, 12, 16))
+    mem_block.remove_data(b, 8)
+    #the smallest free range that fits is used and split
+    assert(mem_block.add_data(3)==4)
+    assert(mem_block.get_largest_free_block()==5)
+    #neighbouring free ranges are merged
+    mem_block.remove_data(c, 4)
+    mem_block.remove_data(a, 4)
+    assert(mem_block.free_block_count==2)
+    assert(mem_block.get_largest_free_block()==9)
+    assert(mem_block.add_data(9)==7)
+    #freeing the last range returns it to the tail
+    mem_block.remove_data(d, 16)
+    assert(mem_block.used_count==16)
+    mem_block.remove_data(7, 9)
+    assert(mem_block.used_count==7)
+    assert(mem_block.free_block_count==1)
+    mem_block.remove_data(4, 3)
+    assert(mem_block.check_empty())
+
+
+def test_size_class_churn(block_count, steps):
+    cdef Buffer mem_block = Buffer(block_count*sizeof(Test), sizeof(Test), 1)
+    mem_block.allocate_memory()
+    mem_block.set_allocator(ALLOCATOR_SIZE_CLASS)
+    cdef unsigned int index, count
+    rng = Random(0)
+    ranges = []
+    used = set()
+    for x in range(steps):
+        if ranges and (rng.random() < .5 or not mem_block.can_fit_data(8)):
+            index, count = ranges.pop(rng.randrange(len(ranges)))
+            mem_block.remove_data(index, count)
+            used.difference_update(range(index, index + count))
+        else:
+            count = rng.randint(1, 8)
+            index = mem_block.add_data(count)
+            assert(index + count <= block_count)
+            assert(used.isdisjoint(range(index, index + count)))
+            used.update(range(index, index + count))
+            ranges.append((index, count))
+        if x == steps // 2:
+            state = mem_block.get_state()
+            saved = list(ranges)
+        assert(mem_block.used_count - mem_block.data_in_free == len(used))
+    mem_block.set_state(state)
+    assert(mem_block.get_state() == state)
+    for index, count in saved:
+        mem_block.remove_data(index, count)
+    assert(mem_block.check_empty())
+
+
+def test_allocator_pool(size_in_kb, size_of_pool, unsigned int allocator):
+    master_buffer = Buffer(size_in_kb*1024, 1, 1)
+    master_buffer.allocate_memory()
+    cdef MemoryPool memory_pool = MemoryPool(
+        size_of_pool, master_buffer, sizeof(Test), 10000, allocator)
+    cdef Test* test_mem
+    cdef unsigned int x, index
+    live = set()
+    for x in range(2000):
+        index = memory_pool.get_free_slot()
+        assert(index not in live)
+        live.add(index)
+        test_mem = <Test*>memory_pool.get_pointer(index)
+        test_mem.x = float(index)
+    for x in range(0, 2000, 2):
+        memory_pool.free_slot(x)
+        live.discard(x)
+    for x in range(1000):
+        index = memory_pool.get_free_slot()
+        assert(index not in live)
+        live.add(index)
+        test_mem = <Test*>memory_pool.get_pointer(index)
+        test_mem.x = float(index)
+    assert(memory_pool.used==2000)
+    assert(memory_pool.free_count==0)
+    for index in live:
+        test_mem = <Test*>memory_pool.get_pointer(index)
+        assert(test_mem.x==index)
+
+
+def test_pool_state(size_in_kb, size_of_pool, unsigned int allocator):
+    master_buffer = Buffer(size_in_kb*1024, 1, 1)
+    master_buffer.allocate_memory()
+    cdef MemoryPool memory_pool = MemoryPool(
+        size_of_pool, master_buffer, sizeof(Test), 10000, allocator)
+    cdef Test* test_mem
+    cdef unsigned int x, index
+    for x in range(2000):
+        index = memory_pool.get_free_slot()
+        test_mem = <Test*>memory_pool.get_pointer(index)
+        test_mem.x = float(index)
+    for x in range(0, 2000, 3):
+        memory_pool.free_slot(x)
+    state = memory_pool.get_state()
+    used, free_count = memory_pool.used, memory_pool.free_count
+    first = [memory_pool.get_free_slot() for x in range(1000)]
+    for index in first:
+        test_mem = <Test*>memory_pool.get_pointer(index)
+        test_mem.x = -1.
+    for x in range(1, 2000, 3):
+        memory_pool.free_slot(x)
+    memory_pool.set_state(state)
+    assert(memory_pool.used==used)
+    assert(memory_pool.free_count==free_count)
+    for x in range(2000):
+        if x % 3 != 0:
+            test_mem = <Test*>memory_pool.get_pointer(x)
+            assert(test_mem.x==x)
+    assert([memory_pool.get_free_slot() for x in range(1000)]==first)
+
+
+def test_allocators(size_in_kb, size_of_pool):
+    test_bitmap_allocator(200)
+    test_size_class_allocator(64)
+    test_size_class_churn(512, 5000)
+    for allocator in (ALLOCATOR_FIRST_FIT, ALLOCATOR_BITMAP,
+        ALLOCATOR_SIZE_CLASS):
+        test_allocator_pool(size_in_kb, size_of_pool, allocator)
+        test_pool_state(size_in_kb, size_of_pool, allocator)
+
+
 def test_zone(size_in_kb, pool_block_size, general_count, test_count):
     reserved_spec = {
         'general': 5000,
@@ -25,6 +25,8 @@ cdef class MemoryZone:
         unsigned int pool_index)
     cdef tuple get_pool_block_slot_indices(self, unsigned int index)
     cdef unsigned int get_free_slot(self, str reserved_hint) except -1
+    cdef unsigned int get_free_slots(self, str reserved_hint,
+        unsigned int count, unsigned int* indices) except -1
     cdef int free_slot(self, unsigned int index) except -1
     cdef void* get_pointer(self, unsigned int index) except NULL
     cdef unsigned int get_pool_end_from_pool_index(self, unsigned int index)
@@ -33,4 +35,8 @@ cdef class MemoryZone:
     cdef unsigned int get_pool_offset(self, unsigned int pool_index)
     cdef unsigned int get_size(self)
     cdef unsigned int get_active_slot_count(self)
-    cdef unsigned int get_active_slot_count_in_pool(self, unsigned int pool_index) except <unsigned int>-1
\ No newline at end of file
+    cdef unsigned int get_active_slot_count_in_pool(self, unsigned int pool_index) except <unsigned int>-1
+    cdef list get_active_slots(self)
+    cdef tuple get_state(self)
+    cdef list get_state_active_slots(self, tuple state)
+    cdef int set_state(self, tuple state) except 0
\ No newline at end of file
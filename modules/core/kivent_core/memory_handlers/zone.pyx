@@ -1,4 +1,5 @@
-from kivent_core.memory_handlers.membuffer cimport Buffer
+from kivent_core.memory_handlers.membuffer cimport (Buffer,
+    ALLOCATOR_FIRST_FIT)
 from kivent_core.memory_handlers.pool cimport MemoryPool
 from kivent_core.memory_handlers.block cimport MemoryBlock
 
@@ -33,7 +34,8 @@ cdef class MemoryZone:
         be allocated.
     '''
     def __cinit__(self, unsigned int block_size_in_kb, Buffer master_buffer,
-        unsigned int type_size, dict desired_counts):
+        unsigned int type_size, dict desired_counts,
+        unsigned int allocator=ALLOCATOR_FIRST_FIT):
         '''Will create len(desired_counts) MemoryPools numbered 0...len(
         desired_counts)-1 having space for each count.
 
@@ -48,6 +50,10 @@ cdef class MemoryZone:
 
             desired_counts (dict): Dict of key, val pair of zone_name,
             zone_count.
+
+            allocator (unsigned int): The allocator used by the MemoryBlock
+            of every pool, see Buffer.set_allocator. Defaults to
+            ALLOCATOR_FIRST_FIT.
         '''
         self.count = 0
         self.block_size_in_kb = block_size_in_kb
@@ -67,7 +73,7 @@ cdef class MemoryZone:
             index = self.count
             memory_pools[self.reserved_count] = pool = MemoryPool(
                 block_size_in_kb, master_buffer, type_size,
-                desired_counts[key])
+                desired_counts[key], allocator)
             self.reserved_count += 1
             pool_count = pool.block_count * pool.slots_per_block
             range_a((index, index+pool_count-1))
@@ -271,6 +277,33 @@ cdef class MemoryZone:
         cdef unsigned int unadjusted_index = pool.get_free_slot()
         return self.add_pool_offset(unadjusted_index, pool_index)
 
+    cdef unsigned int get_free_slots(self, str reserved_hint,
+        unsigned int count, unsigned int* indices) except -1:
+        '''Acquires count free slots from the zone name in a single pass,
+        writing their slot indices into indices. The zone is only looked up
+        once and a MemoryError is raised before any slot is acquired if the
+        pool cannot fit all of them.
+        Args:
+            reserved_hint (str): The name of the MemoryPool to get the slots
+            in.
+
+            count (unsigned int): The number of slots to acquire.
+
+            indices (unsigned int*): Array of at least count entries that will
+            receive the slot indices in the MemoryZone.
+        Return:
+            unsigned int: The number of slots acquired.
+        '''
+        cdef unsigned int pool_index = self.reserved_names.index(reserved_hint)
+        cdef MemoryPool pool = self.get_pool_from_pool_index(pool_index)
+        cdef unsigned int offset = self.get_pool_offset(pool_index)
+        cdef unsigned int i
+        if pool.count - (pool.used - pool.free_count) < count:
+            raise MemoryError()
+        for i in range(count):
+            indices[i] = pool.get_free_slot() + offset
+        return count
+
     cdef int free_slot(self, unsigned int index) except -1:
         '''Returns a slot for reuse after being acquired with **get_free_slot**.
         Args:
@@ -336,4 +369,77 @@ cdef class MemoryZone:
         for key in pools:
             pool = pools[key]
             count += pool.used - pool.free_count
-        return count
\ No newline at end of file
+        return count
+
+    cdef list get_active_slots(self):
+        '''Finds every active slot, an active slot is one whose first
+        unsigned int is not <unsigned int>-1, like for memrange. Slots that
+        have never been used are skipped.
+
+        Return:
+            list: The indices of the active slots, in order.
+        '''
+        cdef MemoryPool pool
+        cdef unsigned int pool_index, start, end, index
+        cdef list indices = []
+        for pool_index in range(self.reserved_count):
+            pool = self.memory_pools[pool_index]
+            start, end = self.reserved_ranges[pool_index]
+            for index in range(start, start + pool.used):
+                if (<unsigned int*>self.get_pointer(index))[0] != (
+                    <unsigned int>-1):
+                    indices.append(index)
+        return indices
+
+    cdef tuple get_state(self):
+        '''Copies the data and bookkeeping of every MemoryPool, see
+        MemoryPool.get_state.
+
+        Return:
+            tuple: The state of each pool, by pool index.
+        '''
+        cdef MemoryPool pool
+        cdef unsigned int i
+        cdef list states = []
+        for i in range(self.reserved_count):
+            pool = self.memory_pools[i]
+            states.append(pool.get_state())
+        return tuple(states)
+
+    cdef list get_state_active_slots(self, tuple state):
+        '''Returns the slots that would be active after **set_state** with
+        state, see MemoryPool.get_state_active_slots.
+
+        Args:
+            state (tuple): The result of **get_state**.
+
+        Return:
+            list: The indices of the active slots in state, in order.
+        '''
+        cdef MemoryPool pool
+        cdef unsigned int pool_index, start
+        cdef list indices = []
+        if len(state) != self.reserved_count:
+            raise ValueError('MemoryZone state does not match this MemoryZone')
+        for pool_index in range(self.reserved_count):
+            pool = self.memory_pools[pool_index]
+            start = self.reserved_ranges[pool_index][0]
+            indices.extend([start + index for index in
+                pool.get_state_active_slots(state[pool_index])])
+        return indices
+
+    cdef int set_state(self, tuple state) except 0:
+        '''Restores the data and bookkeeping of every MemoryPool previously
+        returned by **get_state**.
+
+        Args:
+            state (tuple): The result of **get_state**.
+        '''
+        cdef MemoryPool pool
+        cdef unsigned int i
+        if len(state) != self.reserved_count:
+            raise ValueError('MemoryZone state does not match this MemoryZone')
+        for i in range(self.reserved_count):
+            pool = self.memory_pools[i]
+            pool.set_state(state[i])
+        return 1
\ No newline at end of file
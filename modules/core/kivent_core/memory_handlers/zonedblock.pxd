@@ -19,6 +19,8 @@ cdef class BlockZone:
     cdef unsigned int get_blocks_on_tail(self)
     cdef bool can_fit_data(self, unsigned int block_count)
     cdef void clear(self)
+    cdef tuple get_state(self)
+    cdef int set_state(self, tuple state) except 0
 
 
 cdef class ZonedBlock:
@@ -159,6 +159,32 @@ cdef class BlockZone:
         self.free_blocks = []
         self.data_in_free = 0
 
+    cdef tuple get_state(self):
+        '''Copies the bookkeeping of the BlockZone so that it can be put back
+        with **set_state**.
+        Return:
+            tuple: The BlockZone state.
+        '''
+        return (self.start, self.total, self.used_count, self.data_in_free,
+            list(self.free_blocks))
+
+    cdef int set_state(self, tuple state) except 0:
+        '''Restores the bookkeeping previously returned by **get_state**.
+        Args:
+            state (tuple): The result of **get_state**.
+        '''
+        start, total, used_count, data_in_free, free_blocks = state
+        if start != self.start or total != self.total or used_count > total:
+            raise ValueError('BlockZone state does not match this BlockZone')
+        for index, block_count in free_blocks:
+            if index + block_count > used_count:
+                raise ValueError(
+                    'BlockZone state does not match this BlockZone')
+        self.used_count = used_count
+        self.data_in_free = data_in_free
+        self.free_blocks = [tuple(free_block) for free_block in free_blocks]
+        return 1
+
 
 cdef class ZonedBlock:
     '''The ZonedBlock is like a MemoryBlock in that the data is stored
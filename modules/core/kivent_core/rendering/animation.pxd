@@ -5,6 +5,7 @@ from kivent_core.memory_handlers.block cimport MemoryBlock
 
 ctypedef struct FrameStruct:
     unsigned int texkey
+    unsigned int groupkey
     void* model
     float duration
 
@@ -10,7 +10,10 @@ cdef class Frame:
     The Frame class allows you to access the render information
     for one frame of the animation sequence from python.
     It internally stores a pointer to a FrameStruct and provides
-    python apis to access model and texture names of the frame.
+    python apis to access model and texture names of the frame. The groupkey
+    of the texture is looked up once when the texture is set, so that
+    AnimationSystem can compare batches without going through the
+    texture_manager.
 
     Attributes:
         model (str): The model name to be rendered for this frame
@@ -34,7 +37,11 @@ cdef class Frame:
             return texture_manager.get_texname_from_texkey(self.frame_pointer.texkey)
 
         def __set__(self, value):
-            self.frame_pointer.texkey = texture_manager.get_texkey_from_name(value)
+            cdef unsigned int texkey = texture_manager.get_texkey_from_name(
+                value)
+            self.frame_pointer.texkey = texkey
+            self.frame_pointer.groupkey = (
+                texture_manager.get_groupkey_from_texkey(texkey))
 
     property duration:
         def __get__(self):
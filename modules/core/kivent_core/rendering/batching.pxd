@@ -9,6 +9,31 @@ from kivent_core.systems.staticmemgamesystem cimport ComponentPointerAggregator
 from kivent_core.managers.resource_managers import texture_manager
 
 
+ctypedef struct RenderStruct:
+    unsigned int entity_id
+    unsigned int texkey
+    unsigned int batch_id
+    void* model
+    void* renderer
+    int vert_index
+    int ind_index
+    bint render
+    unsigned int change_stamp
+    unsigned int model_version
+    float[5] last_state
+    unsigned char[4] last_color
+    bint state_valid
+
+
+ctypedef struct BatchRemoval:
+    unsigned int entity_id
+    unsigned int batch_id
+    unsigned int num_verts
+    unsigned int num_indices
+    unsigned int vert_index
+    unsigned int ind_index
+
+
 cdef class IndexedBatch:
     cdef list frame_data
     cdef unsigned int current_frame
@@ -33,7 +58,13 @@ cdef class IndexedBatch:
     cdef void* get_indices_frame_to_draw(self)
     cdef void set_index_count_for_frame(self,
         unsigned int index_count)
+    cdef unsigned int get_frame_stamp(self)
+    cdef void mark_vertices_dirty(self, unsigned int vert_index,
+        unsigned int count)
+    cdef void finish_frame(self, unsigned int stamp, unsigned int index_start,
+        unsigned int index_end)
     cdef void draw_frame(self)
+    cdef void flag_update(self)
     cdef void clear_frames(self)
 
 cdef class BatchManager:
@@ -56,13 +87,23 @@ cdef class BatchManager:
     cdef list system_names
     cdef Buffer master_buffer
     cdef unsigned int ent_per_batch
+    cdef float compaction_threshold
+    cdef float merge_threshold
+    cdef unsigned int compaction_cursor
+    cdef unsigned int compaction_count
+    cdef unsigned int merge_count
+    cdef unsigned int moved_count
+    cdef bint dirty_tracking
+    cdef bint headless
 
     cdef void set_mode(self, str mode)
     cdef str get_mode(self)
     cdef unsigned int get_size(self)
     cdef unsigned int get_size_of_component_pointers(self)
+    cdef unsigned long long get_bytes_uploaded(self)
     cdef unsigned int create_batch(self, unsigned int tex_key) except -1
     cdef int remove_batch(self, unsigned int batch_id) except 0
+    cdef int clear(self) except 0
     cdef IndexedBatch get_batch_with_space(self, unsigned int tex_key,
         unsigned int num_verts, unsigned int num_indices)
     cdef tuple batch_entity(self, unsigned int entity_id, unsigned int tex_key,
@@ -71,4 +112,12 @@ cdef class BatchManager:
         unsigned int batch_id, unsigned int num_verts,
         unsigned int num_indices, unsigned int vert_index,
         unsigned int ind_index) except 0
+    cdef bint unbatch_entities(self, BatchRemoval* removals,
+        unsigned int count) except 0
     cdef list get_vbos(self)
+    cdef void set_dirty_tracking(self, bint value)
+    cdef unsigned int compact_batch(self, IndexedBatch batch) except -1
+    cdef unsigned int merge_batch(self, IndexedBatch source,
+        IndexedBatch target) except -1
+    cdef IndexedBatch find_merge_target(self, IndexedBatch source)
+    cdef unsigned int compact(self, float time_budget) except -1
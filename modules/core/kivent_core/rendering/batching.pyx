@@ -1,13 +1,14 @@
-# cython: profile=True
 # cython: embedsignature=True
 from kivent_core.memory_handlers.block cimport MemoryBlock
 from kivent_core.memory_handlers.indexing cimport IndexedMemoryZone
-from kivent_core.memory_handlers.membuffer cimport Buffer
+from kivent_core.memory_handlers.membuffer cimport (Buffer,
+    ALLOCATOR_SIZE_CLASS)
 from kivent_core.rendering.fixedvbo cimport FixedVBO
 from kivent_core.rendering.frame_objects cimport FixedFrameData
 from kivent_core.rendering.vertex_format cimport KEVertexFormat
 from cpython cimport bool
 from kivent_core.rendering.cmesh cimport CMesh
+from kivent_core.rendering.model cimport VertexModel
 from kivent_core.managers.resource_managers import texture_manager
 from kivent_core.systems.staticmemgamesystem cimport ComponentPointerAggregator
 from kivy.logger import Logger
@@ -16,6 +17,8 @@ from kivy.graphics.cgl cimport (GLushort, GL_UNSIGNED_SHORT, GL_TRIANGLES,
     GL_TRIANGLE_FAN, cgl, GLuint)
 from kivent_core.gameworld import debug
 from kivent_core.rendering.gl_debug cimport gl_log_debug_message
+from libc.stdlib cimport calloc, free
+from time import time
 
 cdef class IndexedBatch:
     '''The IndexedBatch represents a collection of FixedFrameData vbos,
@@ -49,7 +52,8 @@ cdef class IndexedBatch:
         GL_LINE_LOOP, GL_TRIANGLE_STRIP.
 
         **mesh_instruction** (object): Reference to the actual instruction
-        that will be added to the canvas of the parent renderer.
+        that will be added to the canvas of the parent renderer. None if the
+        BatchManager is headless.
 
         **entity_components** (ComponentPointerAggregator): Helper object
         for retrieving pointers to the components of entities added to this
@@ -199,14 +203,67 @@ cdef class IndexedBatch:
         cdef FixedVBO indices = frame_data.index_vbo
         indices.data_size = index_count * sizeof(GLushort)
 
+    cdef unsigned int get_frame_stamp(self):
+        '''Returns the **write_stamp** of the frame that will be written to
+        next, the update stamp of the renderer the last time all of its data
+        was brought up to date.
+
+        Return:
+            unsigned int: The write_stamp of the FixedFrameData returned by
+            **get_next_vbo**.
+        '''
+        cdef FixedFrameData frame_data = self.get_next_vbo()
+        return frame_data.write_stamp
+
+    cdef void mark_vertices_dirty(self, unsigned int vert_index,
+        unsigned int count):
+        '''Flags vertices of the next frame as rewritten so that they will be
+        uploaded if the vertex FixedVBO is tracking dirty ranges.
+
+        Args:
+            vert_index (unsigned int): The first vertex written.
+
+            count (unsigned int): The number of vertices written.
+        '''
+        cdef FixedFrameData frame_data = self.get_next_vbo()
+        cdef FixedVBO vertices = frame_data.vertex_vbo
+        cdef unsigned int type_size = vertices.memory_block.type_size
+        vertices.mark_dirty(vert_index * type_size,
+            (vert_index + count) * type_size)
+
+    cdef void finish_frame(self, unsigned int stamp, unsigned int index_start,
+        unsigned int index_end):
+        '''Records that every entity in the next frame has been brought up to
+        date as of the renderer update stamp, and flags the indices that
+        changed for upload.
+
+        Args:
+            stamp (unsigned int): The update stamp of the renderer.
+
+            index_start (unsigned int): The first index that changed.
+
+            index_end (unsigned int): The index after the last that changed,
+            no indices will be flagged if this is not greater than
+            index_start.
+        '''
+        cdef FixedFrameData frame_data = self.get_next_vbo()
+        frame_data.write_stamp = stamp
+        if index_end > index_start:
+            frame_data.index_vbo.mark_dirty(index_start * sizeof(GLushort),
+                index_end * sizeof(GLushort))
+
     cdef void draw_frame(self):
         '''Actually triggers the drawing of a frame by calling glDrawElements.
         The current FixedFrameData as returned by **get_current_vbo** will be
-        drawn. **current_frame** will be incremented after drawing.
+        drawn. **current_frame** will be incremented after drawing. If no
+        indices have been written for the frame, for instance because every
+        entity was culled, nothing will be uploaded or drawn.
         '''
         cdef FixedFrameData frame_data = self.get_current_vbo()
         cdef FixedVBO indices = frame_data.index_vbo
         cdef FixedVBO vertices = frame_data.vertex_vbo
+        if indices.data_size == 0:
+            return
         gl_log_debug_message('IndexedBatch.draw_frame-vertices bind')
         vertices.bind()
         gl_log_debug_message('IndexedBatch.draw_frame-indices bind')
@@ -218,6 +275,18 @@ cdef class IndexedBatch:
         vertices.unbind()
         indices.unbind()
 
+    cdef void flag_update(self):
+        '''Called by the renderer after writing the next frame, so that it
+        is drawn. The **mesh_instruction** is flagged for update and will
+        advance **current_frame** when the canvas is next drawn. If there is
+        no **mesh_instruction** **current_frame** is advanced immediately.
+        '''
+        cdef CMesh mesh_instruction = self.mesh_instruction
+        if mesh_instruction is None:
+            self.current_frame += 1
+        else:
+            mesh_instruction.flag_update()
+
     cdef void clear_frames(self):
         '''Clears all frames, returning their memory and deleting the members
         of **frame_data**.
@@ -313,6 +382,36 @@ cdef class BatchManager:
         entities that will fit in each batch. The ComponentPointerAggregator
         will be this size per batch. Created during initialization by dividing
         the **slots_per_block** by the **smallest_vertex_count** init arg.
+
+        **compaction_threshold** (float): A batch will be compacted by
+        **compact** once the free space between its vertex or index ranges
+        is greater than this fraction of the range in use. Defaults to .25.
+
+        **merge_threshold** (float): A batch holding fewer vertices than
+        this fraction of **slots_per_block** will be merged by **compact**
+        into another batch sharing its tex_key, if one has room.
+        Defaults to .5.
+
+        **compaction_cursor** (unsigned int): The batch **compact** will
+        resume from on its next call.
+
+        **compaction_count** (unsigned int): The number of batches compacted
+        so far.
+
+        **merge_count** (unsigned int): The number of batches merged into
+        another so far.
+
+        **moved_count** (unsigned int): The number of entities that have had
+        their vertex and index ranges moved by compaction or merging.
+
+        **dirty_tracking** (bint): If True the FixedVBO of every batch will
+        only upload the ranges flagged as dirty by the renderer, see
+        **set_dirty_tracking**. Defaults to False.
+
+        **headless** (bint): If True batches are created without a CMesh and
+        nothing is added to the **canvas**, the frame data is still written
+        but never uploaded or drawn. Set by the Renderer of a headless
+        GameWorld. Defaults to False.
     '''
 
     def __cinit__(self, unsigned int vbo_size_in_kb, unsigned int batch_count,
@@ -390,6 +489,14 @@ cdef class BatchManager:
         self.max_batches = batch_count
         self.set_mode(mode_str)
         self.canvas = canvas
+        self.compaction_threshold = .25
+        self.merge_threshold = .5
+        self.compaction_cursor = 0
+        self.compaction_count = 0
+        self.merge_count = 0
+        self.moved_count = 0
+        self.dirty_tracking = False
+        self.headless = False
 
     cdef unsigned int get_size(self):
         '''Returns the combined size of all memory being used by the
@@ -402,6 +509,22 @@ cdef class BatchManager:
         return self.indices_block.real_size + self.batch_block.real_size + (
             pointer_size)
 
+    cdef unsigned long long get_bytes_uploaded(self):
+        '''Returns the number of bytes the vertex and index FixedVBO of every
+        batch, including batches that have been freed, have uploaded so far.
+        Return:
+            unsigned long long: The sum of the **bytes_uploaded** of each
+            FixedVBO.
+        '''
+        cdef IndexedBatch batch
+        cdef FixedFrameData frame
+        cdef unsigned long long total = 0
+        for batch in self.batches:
+            for frame in batch.frame_data:
+                total += frame.vertex_vbo.bytes_uploaded
+                total += frame.index_vbo.bytes_uploaded
+        return total
+
     cdef void set_mode(self, str mode):
         '''Sets the mode of drawing.
         Args:
@@ -472,7 +595,6 @@ cdef class BatchManager:
         if len(free_batches) > 0:
             new_index = free_batches.pop(0)
             batch = self.batches[new_index]
-            cmesh = batch.mesh_instruction
             batch.tex_key = tex_key
         else:
             entity_components = ComponentPointerAggregator(
@@ -484,12 +606,14 @@ cdef class BatchManager:
             self.batches.append(batch)
             new_index = self.batch_count
             self.batch_count += 1
-            cmesh = CMesh(batch=batch)
-            batch.mesh_instruction = cmesh
+            if not self.headless:
+                batch.mesh_instruction = CMesh(batch=batch)
         batch.batch_id = new_index
-        self.canvas.add(cmesh)
+        if not self.headless:
+            cmesh = batch.mesh_instruction
+            self.canvas.add(cmesh)
+            cmesh.texture = texture_manager.get_texture(tex_key)
         cdef dict batch_groups = self.batch_groups
-        cmesh.texture = texture_manager.get_texture(tex_key)
         if tex_key not in batch_groups:
             batch_groups[tex_key] = [batch]
         else:
@@ -507,11 +631,23 @@ cdef class BatchManager:
         cdef IndexedBatch batch = self.batches[batch_id]
         cdef unsigned int tex_key = batch.tex_key
         self.batch_groups[tex_key].remove(batch)
-        self.canvas.remove(batch.mesh_instruction)
+        if batch.mesh_instruction is not None:
+            self.canvas.remove(batch.mesh_instruction)
         batch.clear_frames()
         self.free_batches.append(batch_id)
         return 1
 
+    cdef int clear(self) except 0:
+        '''Removes every active batch with **remove_batch**, afterwards no
+        entity is batched.
+        '''
+        cdef list free_batches = self.free_batches
+        cdef unsigned int batch_id
+        for batch_id in range(self.batch_count):
+            if batch_id not in free_batches:
+                self.remove_batch(batch_id)
+        return 1
+
     cdef IndexedBatch get_batch_with_space(self, unsigned int tex_key,
         unsigned int num_verts, unsigned int num_indices):
         '''Finds a batch with enough room to fit this data, or creates a new
@@ -601,9 +737,53 @@ cdef class BatchManager:
             self.remove_batch(batch_id)
         return 1
 
+    cdef bint unbatch_entities(self, BatchRemoval* removals,
+        unsigned int count) except 0:
+        '''Removes many entities from their batches in a single pass. Batches
+        are only checked for emptiness once all of the entities have been
+        removed, **remove_batch** being called for those left empty.
+        Args:
+            removals (BatchRemoval*): Array of count BatchRemoval, each holding
+            the same arguments as **unbatch_entity**.
+
+            count (unsigned int): The number of entries in removals.
+
+        Return:
+            bint: 1 if the entities were unbatched, 0 if an error occured
+            (will result in an exception propogating).
+        '''
+        cdef list batches = self.batches
+        cdef unsigned int batch_count = self.batch_count
+        cdef IndexedBatch batch
+        cdef BatchRemoval* removal
+        cdef unsigned int i
+        if count == 0:
+            return 1
+        cdef char* touched = <char*>calloc(batch_count, sizeof(char))
+        if touched == NULL:
+            raise MemoryError()
+        try:
+            for i in range(count):
+                removal = &removals[i]
+                batch = batches[removal.batch_id]
+                batch.remove_entity(removal.entity_id, removal.num_verts,
+                    removal.vert_index, removal.num_indices,
+                    removal.ind_index)
+                touched[removal.batch_id] = 1
+            for i in range(batch_count):
+                if touched[i]:
+                    batch = batches[i]
+                    if batch.check_empty():
+                        self.remove_batch(i)
+        finally:
+            free(touched)
+        return 1
+
     cdef list get_vbos(self):
         '''Returns a new list of FixedFrameData allocated for a new batch.
-        Used during **create_batch**, should not be called directly.
+        Used during **create_batch**, should not be called directly. The
+        vertex and index MemoryBlock use the ALLOCATOR_SIZE_CLASS allocator as
+        models of many different sizes are added to and removed from a batch.
 
         Return:
             list: list of FixedFrameData with **frame_count** entries.
@@ -621,9 +801,300 @@ cdef class BatchManager:
         for i in range(self.frame_count):
             index_block = MemoryBlock(1, sizeof(GLushort), vbo_size*1024)
             index_block.allocate_memory_with_buffer(master_index)
+            index_block.set_allocator(ALLOCATOR_SIZE_CLASS)
             vertex_block = MemoryBlock(1, type_size, vbo_size*1024)
             vertex_block.allocate_memory_with_buffer(master_vertex)
+            vertex_block.set_allocator(ALLOCATOR_SIZE_CLASS)
             frame_data = FixedFrameData(index_block, vertex_block,
                 vertex_format)
+            frame_data.index_vbo.track_dirty = self.dirty_tracking
+            frame_data.vertex_vbo.track_dirty = self.dirty_tracking
             vbo_a(frame_data)
         return vbos
+
+    cdef void set_dirty_tracking(self, bint value):
+        '''Turns on or off uploading only the dirty ranges of each FixedVBO.
+        The **write_stamp** of every frame is reset so that the next frames
+        are written in full.
+
+        Args:
+            value (bint): Whether dirty ranges should be tracked.
+        '''
+        cdef IndexedBatch batch
+        cdef FixedFrameData frame_data
+        self.dirty_tracking = value
+        for batch in self.batches:
+            for frame_data in batch.frame_data:
+                frame_data.index_vbo.track_dirty = value
+                frame_data.vertex_vbo.track_dirty = value
+                frame_data.write_stamp = 0
+
+    cdef unsigned int compact_batch(self, IndexedBatch batch) except -1:
+        '''Slides the vertex and index ranges of every entity in the batch
+        down so that they are packed from the start of the batch, in the
+        order the entities are drawn, reclaiming the space left behind by
+        unbatched entities. The vert_index and ind_index of the RenderStruct
+        of every moved entity is updated. The vertex data itself is not moved,
+        the batch must be redrawn by its renderer before it is drawn again.
+
+        Args:
+            batch (IndexedBatch): The batch to compact.
+
+        Return:
+            unsigned int: The number of entities whose ranges were moved.
+        '''
+        cdef FixedFrameData primary_frame = batch.frame_data[0]
+        cdef MemoryBlock indices_block = primary_frame.index_vbo.memory_block
+        cdef MemoryBlock vertex_block = primary_frame.vertex_vbo.memory_block
+        cdef ComponentPointerAggregator entity_components = (
+            batch.entity_components)
+        cdef MemoryBlock components_block = entity_components.memory_block
+        cdef void** component_data = <void**>components_block.data
+        cdef unsigned int component_count = entity_components.count
+        cdef unsigned int t
+        cdef int vert_index, ind_index
+        cdef unsigned int moved = 0
+        cdef RenderStruct* render_comp
+        cdef VertexModel model
+        indices_block.clear()
+        vertex_block.clear()
+        for t in range(components_block.used_count):
+            render_comp = <RenderStruct*>component_data[t*component_count]
+            if render_comp == NULL:
+                continue
+            model = <VertexModel>render_comp.model
+            vert_index = vertex_block.add_data(model._vertex_count)
+            ind_index = indices_block.add_data(model._index_count)
+            if (vert_index != render_comp.vert_index or
+                ind_index != render_comp.ind_index):
+                render_comp.vert_index = vert_index
+                render_comp.ind_index = ind_index
+                render_comp.state_valid = False
+                moved += 1
+        self.compaction_count += 1
+        self.moved_count += moved
+        return moved
+
+    cdef unsigned int merge_batch(self, IndexedBatch source,
+        IndexedBatch target) except -1:
+        '''Moves every entity in source into target and removes source.
+        Both batches must share the same tex_key and target must have room
+        for all of the entities in source, see **find_merge_target**. target
+        is compacted first if it has any free space between its ranges. Both
+        batches must be redrawn by the renderer before they are drawn again.
+
+        Args:
+            source (IndexedBatch): The batch to empty.
+
+            target (IndexedBatch): The batch the entities will be moved to.
+
+        Return:
+            unsigned int: The number of entities moved.
+        '''
+        cdef FixedFrameData primary_frame = target.frame_data[0]
+        cdef MemoryBlock indices_block = primary_frame.index_vbo.memory_block
+        cdef MemoryBlock vertex_block = primary_frame.vertex_vbo.memory_block
+        cdef ComponentPointerAggregator entity_components = (
+            source.entity_components)
+        cdef MemoryBlock components_block = entity_components.memory_block
+        cdef void** component_data = <void**>components_block.data
+        cdef unsigned int component_count = entity_components.count
+        cdef unsigned int t
+        cdef unsigned int moved = 0
+        cdef RenderStruct* render_comp
+        cdef VertexModel model
+        cdef tuple indices
+        if indices_block.data_in_free > 0 or vertex_block.data_in_free > 0:
+            self.compact_batch(target)
+        for t in range(components_block.used_count):
+            render_comp = <RenderStruct*>component_data[t*component_count]
+            if render_comp == NULL:
+                continue
+            model = <VertexModel>render_comp.model
+            indices = target.add_entity(render_comp.entity_id,
+                model._vertex_count, model._index_count)
+            render_comp.batch_id = target.batch_id
+            render_comp.vert_index = indices[0]
+            render_comp.ind_index = indices[1]
+            render_comp.state_valid = False
+            moved += 1
+        self.remove_batch(source.batch_id)
+        self.merge_count += 1
+        self.moved_count += moved
+        return moved
+
+    cdef IndexedBatch find_merge_target(self, IndexedBatch source):
+        '''Finds the fullest batch sharing source's tex_key that has room
+        for all of the vertices, indices, and entities in source once
+        compacted.
+
+        Args:
+            source (IndexedBatch): The batch to be merged.
+
+        Return:
+            IndexedBatch: The batch to merge source into, or None if there is
+            no batch with enough room.
+        '''
+        cdef FixedFrameData frame = source.frame_data[0]
+        cdef MemoryBlock indices_block = frame.index_vbo.memory_block
+        cdef MemoryBlock vertex_block = frame.vertex_vbo.memory_block
+        cdef MemoryBlock components_block = (
+            source.entity_components.memory_block)
+        cdef unsigned int verts = (
+            vertex_block.used_count - vertex_block.data_in_free)
+        cdef unsigned int indices = (
+            indices_block.used_count - indices_block.data_in_free)
+        cdef unsigned int entities = (
+            components_block.used_count - components_block.data_in_free)
+        cdef unsigned int target_verts
+        cdef unsigned int best_verts = 0
+        cdef IndexedBatch batch
+        cdef IndexedBatch best = None
+        for batch in self.batch_groups[source.tex_key]:
+            if batch is source:
+                continue
+            frame = batch.frame_data[0]
+            indices_block = frame.index_vbo.memory_block
+            vertex_block = frame.vertex_vbo.memory_block
+            components_block = batch.entity_components.memory_block
+            target_verts = vertex_block.used_count - vertex_block.data_in_free
+            if (target_verts + verts <= vertex_block.size and
+                indices_block.used_count - indices_block.data_in_free +
+                indices <= indices_block.size and
+                entities <= components_block.get_blocks_on_tail() +
+                components_block.data_in_free and
+                (best is None or target_verts > best_verts)):
+                best = batch
+                best_verts = target_verts
+        return best
+
+    cdef unsigned int compact(self, float time_budget) except -1:
+        '''Runs an incremental compaction pass over the active batches,
+        typically once per frame by the renderer before it draws. Batches
+        are visited in turn starting from **compaction_cursor**. A batch
+        holding fewer vertices than **merge_threshold** of its capacity is
+        merged into another batch sharing its tex_key if one has room,
+        otherwise a batch is compacted if the free space between its ranges
+        is greater than **compaction_threshold** of the space in use. The pass
+        stops once time_budget seconds have elapsed, at least one batch is
+        always visited, and the next call will resume where it stopped.
+
+        Args:
+            time_budget (float): The time in seconds the pass may take.
+
+        Return:
+            unsigned int: The number of batches compacted or merged, every
+            batch touched must be redrawn before it is drawn again.
+        '''
+        cdef unsigned int batch_count = self.batch_count
+        cdef list batches = self.batches
+        cdef list free_batches = self.free_batches
+        cdef unsigned int cursor = self.compaction_cursor
+        cdef float compaction_threshold = self.compaction_threshold
+        cdef float merge_limit = self.merge_threshold * self.slots_per_block
+        cdef unsigned int visited = 0
+        cdef unsigned int touched = 0
+        cdef unsigned int batch_id
+        cdef IndexedBatch batch, target
+        cdef FixedFrameData frame
+        cdef MemoryBlock indices_block, vertex_block
+        if batch_count == 0:
+            return 0
+        cdef double start = time()
+        while visited < batch_count:
+            if visited > 0 and time() - start >= time_budget:
+                break
+            batch_id = (cursor + visited) % batch_count
+            visited += 1
+            if batch_id in free_batches:
+                continue
+            batch = batches[batch_id]
+            frame = batch.frame_data[0]
+            indices_block = frame.index_vbo.memory_block
+            vertex_block = frame.vertex_vbo.memory_block
+            if (vertex_block.used_count - vertex_block.data_in_free <
+                merge_limit and len(self.batch_groups[batch.tex_key]) > 1):
+                target = self.find_merge_target(batch)
+                if target is not None:
+                    self.merge_batch(batch, target)
+                    touched += 1
+                    continue
+            if (vertex_block.data_in_free >
+                compaction_threshold * vertex_block.used_count or
+                indices_block.data_in_free >
+                compaction_threshold * indices_block.used_count):
+                self.compact_batch(batch)
+                touched += 1
+        self.compaction_cursor = (cursor + visited) % batch_count
+        return touched
+
+    def get_fragmentation_stats(self):
+        '''Returns a summary of how fragmented the active batches are.
+
+        Return:
+            dict: with the keys:
+                'batches': the number of active batches.
+
+                'vertices_live', 'indices_live': the number of vertices and
+                indices belonging to batched entities.
+
+                'vertices_reserved', 'indices_reserved': the number of
+                vertices and indices up to the end of the last range in use,
+                summed over all batches.
+
+                'vertices_free', 'indices_free': the free space between
+                ranges, summed over all batches.
+
+                'vertex_fragmentation', 'index_fragmentation': the free
+                space as a fraction of the reserved space.
+
+                'free_ranges': the number of free ranges between vertex ranges.
+
+                'largest_free_range': the largest free vertex range in any
+                batch.
+
+                'compactions', 'merges', 'entities_moved': totals of
+                **compaction_count**, **merge_count**, and **moved_count**.
+        '''
+        cdef IndexedBatch batch
+        cdef FixedFrameData frame
+        cdef MemoryBlock indices_block, vertex_block
+        cdef list free_batches = self.free_batches
+        cdef unsigned int i
+        cdef unsigned int active = 0
+        cdef unsigned int verts_reserved = 0, verts_free = 0
+        cdef unsigned int inds_reserved = 0, inds_free = 0
+        cdef unsigned int free_ranges = 0, largest_free = 0
+        for i in range(self.batch_count):
+            if i in free_batches:
+                continue
+            batch = self.batches[i]
+            frame = batch.frame_data[0]
+            indices_block = frame.index_vbo.memory_block
+            vertex_block = frame.vertex_vbo.memory_block
+            active += 1
+            verts_reserved += vertex_block.used_count
+            verts_free += vertex_block.data_in_free
+            inds_reserved += indices_block.used_count
+            inds_free += indices_block.data_in_free
+            free_ranges += vertex_block.free_block_count
+            largest_free = max(largest_free,
+                vertex_block.get_largest_free_block())
+        return {
+            'batches': active,
+            'vertices_live': verts_reserved - verts_free,
+            'vertices_reserved': verts_reserved,
+            'vertices_free': verts_free,
+            'vertex_fragmentation': (
+                float(verts_free) / verts_reserved if verts_reserved else 0.),
+            'indices_live': inds_reserved - inds_free,
+            'indices_reserved': inds_reserved,
+            'indices_free': inds_free,
+            'index_fragmentation': (
+                float(inds_free) / inds_reserved if inds_reserved else 0.),
+            'free_ranges': free_ranges,
+            'largest_free_range': largest_free,
+            'compactions': self.compaction_count,
+            'merges': self.merge_count,
+            'entities_moved': self.moved_count,
+            }
@@ -1,4 +1,3 @@
-# cython: profile=True
 # cython: embedsignature=True
 from kivy.graphics.instructions cimport VertexInstruction
 from kivent_core.rendering.batching cimport IndexedBatch
@@ -2,6 +2,9 @@ from kivent_core.memory_handlers.block cimport MemoryBlock
 from kivent_core.rendering.vertex_format cimport KEVertexFormat
 from kivy.graphics.cgl cimport GLuint
 
+cdef enum:
+    MAX_DIRTY_RANGES = 8
+
 cdef class FixedVBO:
     cdef MemoryBlock memory_block
     cdef int usage
@@ -11,10 +14,16 @@ cdef class FixedVBO:
     cdef unsigned int size_last_frame
     cdef unsigned int data_size
     cdef KEVertexFormat vertex_format
+    cdef bint track_dirty
+    cdef unsigned int dirty_count
+    cdef unsigned int dirty_starts[MAX_DIRTY_RANGES]
+    cdef unsigned int dirty_ends[MAX_DIRTY_RANGES]
+    cdef unsigned long long bytes_uploaded
 
     cdef int have_id(self)
     cdef void generate_buffer(self)
     cdef void update_buffer(self)
+    cdef void mark_dirty(self, unsigned int start, unsigned int end)
     cdef void bind(self)
     cdef void unbind(self)
     cdef void return_memory(self)
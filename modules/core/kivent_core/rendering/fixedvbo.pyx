@@ -53,6 +53,23 @@ cdef class FixedVBO:
 
         **vertex_format** (KEVertexFormat): The object containing data about
         the vertex format for this VBO.
+
+        **track_dirty** (bint): If True only the byte ranges passed to
+        **mark_dirty** since the last upload will be uploaded, as long as
+        **data_size** has not changed. Otherwise all of the data is uploaded
+        every time. Defaults to False.
+
+        **dirty_count** (unsigned int): The number of ranges in
+        **dirty_starts** and **dirty_ends**.
+
+        **dirty_starts** (unsigned int[MAX_DIRTY_RANGES]): The first byte of
+        each range waiting to be uploaded.
+
+        **dirty_ends** (unsigned int[MAX_DIRTY_RANGES]): The byte after the
+        last of each range waiting to be uploaded.
+
+        **bytes_uploaded** (unsigned long long): The total number of bytes
+        sent to the GPU by **update_buffer**, used for profiling.
     '''
 
     def __cinit__(self, KEVertexFormat vertex_format, MemoryBlock memory_block,
@@ -90,6 +107,9 @@ cdef class FixedVBO:
         self.memory_block = memory_block
         self.size_last_frame = 0
         self.data_size = memory_block.real_size
+        self.track_dirty = False
+        self.dirty_count = 0
+        self.bytes_uploaded = 0
 
     def __dealloc__(self):
         cdef Context context = get_context()
@@ -122,11 +142,14 @@ cdef class FixedVBO:
         '''Updates the buffer, uploading the latest data from **memory_block**
         If the data is the same size as the last call of **update_buffer**
         glBufferSubData will be used, if it is different glBufferData will be
-        used. If V_NEEDGEN has been set for **flags**, **generate_buffer**
-        will be called.
+        used. If **track_dirty** is set and the size has not changed, only
+        the ranges passed to **mark_dirty** are uploaded. If V_NEEDGEN has
+        been set for **flags**, **generate_buffer** will be called.
         '''
         #commontout for sphinx
         cdef unsigned int data_size = self.data_size
+        cdef unsigned int i, start, end
+        cdef char* data = <char*>self.memory_block.data
         if self.flags & V_NEEDGEN:
             self.generate_buffer()
             self.flags &= ~V_NEEDGEN
@@ -137,10 +160,70 @@ cdef class FixedVBO:
             cgl.glBufferData(
                 self.target, data_size, self.memory_block.data, self.usage)
             gl_log_debug_message('FixedVBO.update_buffer-glBufferData')
+            self.bytes_uploaded += data_size
+        elif self.track_dirty:
+            for i in range(self.dirty_count):
+                start = self.dirty_starts[i]
+                end = min(self.dirty_ends[i], data_size)
+                if end > start:
+                    cgl.glBufferSubData(self.target, start, end - start,
+                        &data[start])
+                    gl_log_debug_message(
+                        'FixedVBO.update_buffer-glBufferSubData')
+                    self.bytes_uploaded += end - start
         else:
             cgl.glBufferSubData(self.target, 0, data_size, self.memory_block.data)
             gl_log_debug_message('FixedVBO.update_buffer-glBufferSubData')
+            self.bytes_uploaded += data_size
         self.size_last_frame = data_size
+        self.dirty_count = 0
+
+    cdef void mark_dirty(self, unsigned int start, unsigned int end):
+        '''Records that the bytes from start up to end have changed and need
+        to be uploaded by the next **update_buffer**. Overlapping or touching
+        ranges are combined. Once MAX_DIRTY_RANGES ranges are held a new
+        range is combined with the range it adds the fewest bytes to.
+
+        Args:
+            start (unsigned int): The first byte that changed.
+
+            end (unsigned int): The byte after the last byte that changed.
+        '''
+        cdef unsigned int i, cost
+        cdef unsigned int best = 0
+        cdef unsigned int best_cost = <unsigned int>-1
+        cdef unsigned int count = self.dirty_count
+        cdef unsigned int* starts = self.dirty_starts
+        cdef unsigned int* ends = self.dirty_ends
+        if end <= start:
+            return
+        for i in range(count):
+            if start <= ends[i] and end >= starts[i]:
+                starts[i] = min(start, starts[i])
+                ends[i] = max(end, ends[i])
+                return
+        if count < MAX_DIRTY_RANGES:
+            starts[count] = start
+            ends[count] = end
+            self.dirty_count += 1
+            return
+        for i in range(count):
+            cost = (max(end, ends[i]) - min(start, starts[i])) - (
+                ends[i] - starts[i])
+            if cost < best_cost:
+                best_cost = cost
+                best = i
+        starts[best] = min(start, starts[best])
+        ends[best] = max(end, ends[best])
+
+    def get_dirty_ranges(self):
+        '''Returns the byte ranges waiting to be uploaded.
+
+        Return:
+            list: list of (start, end) tuples.
+        '''
+        return [(self.dirty_starts[i], self.dirty_ends[i])
+            for i in range(self.dirty_count)]
 
     cdef void bind(self):
         '''Binds this buffer for rendering, calling **update_buffer** in the
@@ -170,6 +253,7 @@ cdef class FixedVBO:
             arr.append(self.id)
             context.trigger_gl_dealloc()
         self.flags = V_NEEDGEN
+        self.dirty_count = 0
         if self.target == GL_ELEMENT_ARRAY_BUFFER:
             self.data_size = 0
         self.memory_block.clear()
@@ -3,6 +3,7 @@ from kivent_core.rendering.fixedvbo cimport FixedVBO
 cdef class FixedFrameData:
     cdef FixedVBO index_vbo
     cdef FixedVBO vertex_vbo
+    cdef unsigned int write_stamp
 
     cdef void return_memory(self)
     cdef void clear(self)
@@ -13,6 +13,10 @@ cdef class FixedFrameData:
 
         **vertex_vbo** (FixedVBO): The FixedVBO holding vertex data. Will
         have the target: GL_ARRAY_BUFFER.
+
+        **write_stamp** (unsigned int): The update stamp of the renderer the
+        last time every entity in the frame was brought up to date, used by
+        renderers tracking changes to skip unchanged entities. 0 if never.
     '''
 
     def __cinit__(self, MemoryBlock index_block, MemoryBlock vertex_block,
@@ -32,6 +36,7 @@ cdef class FixedFrameData:
             vertex_format, index_block, 'stream', 'elements')
         self.vertex_vbo = FixedVBO(
             vertex_format, vertex_block, 'stream', 'array')
+        self.write_stamp = 0
 
     cdef void return_memory(self):
         '''Returns the memory held by **index_vbo** and **vertex_vbo** by
@@ -42,3 +47,4 @@ cdef class FixedFrameData:
     cdef void clear(self):
         self.index_vbo.reload()
         self.vertex_vbo.reload()
+        self.write_stamp = 0
@@ -3,9 +3,13 @@ from kivent_core.memory_handlers.block cimport MemoryBlock
 from kivent_core.rendering.vertex_formats cimport FormatConfig
 
 
+cdef class VertexModel
+
+
 cdef class Vertex:
     cdef dict vertex_format
     cdef void* vertex_pointer
+    cdef VertexModel model
 
 
 cdef class VertexModel:
@@ -17,3 +21,8 @@ cdef class VertexModel:
     cdef Buffer index_buffer
     cdef Buffer vertex_buffer
     cdef str _name
+    cdef float _bounding_radius
+    cdef bint _bounds_dirty
+    cdef unsigned int _version
+
+    cdef float get_bounding_radius(self)
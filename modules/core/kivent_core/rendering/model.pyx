@@ -5,6 +5,7 @@ from kivent_core.rendering.vertex_formats cimport VertexFormat4F, FormatConfig
 from kivent_core.rendering.vertex_formats import vertex_format_4f, vertex_format_7f
 from kivy.graphics.cgl cimport (GLfloat, GLbyte, GLubyte, GLint, GLuint,
     GLshort, GLushort)
+from libc.math cimport sqrt
 from kivent_core.memory_handlers.membuffer cimport Buffer
 from kivent_core.memory_handlers.block cimport MemoryBlock
 
@@ -57,6 +58,11 @@ cdef class Vertex:
     that data. Not the original, modifying the returned list will not affect
     the underlying data, instead you must call set.
 
+    **Attributes: (Cython Access Only)**
+        **model** (VertexModel): The VertexModel this Vertex belongs to.
+        Setting the 'pos' attribute will invalidate the bounding radius of
+        the model.
+
     '''
 
     def __cinit__(self, dict format):
@@ -162,6 +168,10 @@ cdef class Vertex:
                     ub_data[0] = <GLubyte>value[x]
                 else:
                     raise TypeError()
+            if self.model is not None:
+                self.model._version += 1
+                if name == b'pos':
+                    self.model._bounds_dirty = True
         else:
             raise AttributeError()
 
@@ -228,6 +238,16 @@ cdef class VertexModel:
         **vertex_buffer** (Buffer):  The Buffer from which we will actually
         allocate the **vertices_block**. Used when **vertex_count** changes.
 
+        **_bounding_radius** (float): The cached distance from (0, 0) to the
+        furthest 'pos' of the vertices, see **get_bounding_radius**.
+
+        **_bounds_dirty** (bint): If True **_bounding_radius** will be
+        recalculated the next time it is needed.
+
+        **_version** (unsigned int): Incremented every time the vertex data
+        is changed, renderers tracking changes compare it to find entities
+        that need to be redrawn.
+
     **Attributes:**
         **index_count** (unsigned int): The number of indices in your model.
         Unbatch any active entities before setting and rebatch afterwards.
@@ -241,6 +261,10 @@ cdef class VertexModel:
         **format_config** (FormatConfig): The vertex format for this model.
         Will be set on creation and should not be changed.
 
+        **bounding_radius** (float): The distance from (0, 0) to the furthest
+        vertex of the model, used by the renderers to cull entities outside
+        of the view.
+
         **vertices** (list): Returns a list of Vertex objects for every vertex
         in the model. Be careful about keeping the results around. You need to
         retrieve a new copy of the list if you for instance change
@@ -285,6 +309,9 @@ cdef class VertexModel:
         self.vertices_block = vertices_block
         self.index_buffer = index_buffer
         self.vertex_buffer = vertex_buffer
+        self._bounding_radius = 0.
+        self._bounds_dirty = True
+        self._version = 0
 
     def __dealloc__(self):
         if self.indices_block is not None:
@@ -303,8 +330,46 @@ cdef class VertexModel:
             raise IndexError()
         cdef Vertex vertex = Vertex(self._format_config._format_dict)
         vertex.vertex_pointer = self.vertices_block.get_pointer(index)
+        vertex.model = self
         return vertex
 
+    cdef float get_bounding_radius(self):
+        '''
+        Returns the distance from (0, 0) to the furthest vertex of the model.
+        The result is cached and only recalculated after the 'pos' of the
+        vertices has changed. If the vertex format does not have a float
+        'pos' attribute a very large radius is returned so that the model
+        is never culled.
+
+        Return:
+            float: The bounding radius of the model.
+        '''
+        cdef dict format_dict
+        cdef tuple pos_attribute
+        cdef unsigned int offset, vert_size, i
+        cdef char* data
+        cdef GLfloat* pos
+        cdef float dist, max_dist
+        if self._bounds_dirty:
+            format_dict = self._format_config._format_dict
+            pos_attribute = format_dict.get(b'pos')
+            if pos_attribute is None or pos_attribute[1] != b'float' or (
+                pos_attribute[0] != 2):
+                self._bounding_radius = 1e30
+            else:
+                offset = pos_attribute[2]
+                vert_size = self._format_config._size
+                data = <char*>self.vertices_block.data
+                max_dist = 0.
+                for i in range(self._vertex_count):
+                    pos = <GLfloat*>&data[i*vert_size + offset]
+                    dist = pos[0]*pos[0] + pos[1]*pos[1]
+                    if dist > max_dist:
+                        max_dist = dist
+                self._bounding_radius = sqrt(max_dist)
+            self._bounds_dirty = False
+        return self._bounding_radius
+
     property index_count:
 
         def __set__(self, unsigned int new_count):
@@ -347,6 +412,8 @@ cdef class VertexModel:
                     old_count*self._format_config._size)
                 self.vertices_block.remove_from_buffer()
                 self.vertices_block = new_vertices
+                self._bounds_dirty = True
+                self._version += 1
 
         def __get__(self):
             return self._vertex_count
@@ -455,6 +522,8 @@ cdef class VertexModel:
             self._index_count*sizeof(GLushort))
         memcpy(<char *>self.vertices_block.data, to_copy.vertices_block.data,
             self._vertex_count * self._format_config._size)
+        self._bounds_dirty = True
+        self._version += 1
 
     def set_all_vertex_attribute(self, str attribute_name, value):
         '''
@@ -478,6 +547,7 @@ cdef class VertexModel:
         if not attribute_bytes in self._format_config._format_dict:
             raise AttributeError()
         cdef Vertex vertex = Vertex(self._format_config._format_dict)
+        vertex.model = self
         for i from 0 <= i < vert_count:
             vertex.vertex_pointer = self.vertices_block.get_pointer(i)
             setattr(vertex, attribute_name, value)
@@ -506,6 +576,7 @@ cdef class VertexModel:
         if not attribute_bytes in self._format_config._format_dict:
             raise AttributeError()
         cdef Vertex vertex = Vertex(self._format_config._format_dict)
+        vertex.model = self
         for i from 0 <= i < vert_count:
             vertex.vertex_pointer = self.vertices_block.get_pointer(i)
             old_value = getattr(vertex, attribute_name)
@@ -541,6 +612,7 @@ cdef class VertexModel:
         if not attribute_bytes in self._format_config._format_dict:
             raise AttributeError()
         cdef Vertex vertex = Vertex(self._format_config._format_dict)
+        vertex.model = self
         for i from 0 <= i < vert_count:
             vertex.vertex_pointer = self.vertices_block.get_pointer(i)
             old_value = getattr(vertex, attribute_name)
@@ -615,6 +687,11 @@ cdef class VertexModel:
         def __get__(self):
             return self._format_config
 
+    property bounding_radius:
+
+        def __get__(self):
+            return self.get_bounding_radius()
+
     property indices:
 
         def __get__(self):
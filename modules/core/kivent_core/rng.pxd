@@ -0,0 +1,54 @@
+ctypedef struct RNGState:
+    unsigned long long state
+    unsigned long long increment
+
+
+cdef inline unsigned int rng_next(RNGState* rng) nogil:
+    cdef unsigned long long old = rng.state
+    cdef unsigned int xorshifted = <unsigned int>(((old >> 18) ^ old) >> 27)
+    cdef unsigned int rotation = <unsigned int>(old >> 59)
+    rng.state = old * 6364136223846793005ULL + rng.increment
+    return (xorshifted >> rotation) | (xorshifted << ((32 - rotation) & 31))
+
+
+cdef inline void rng_seed(RNGState* rng, unsigned long long seed,
+    unsigned long long stream) nogil:
+    rng.state = 0
+    rng.increment = (stream << 1) | 1
+    rng_next(rng)
+    rng.state += seed
+    rng_next(rng)
+
+
+cdef inline float rng_uniform(RNGState* rng) nogil:
+    return <float>(rng_next(rng) >> 8) * <float>(1. / 16777216.)
+
+
+cdef inline float rng_signed(RNGState* rng) nogil:
+    return <float>(<int>(rng_next(rng) >> 7) - 16777216) * <float>(
+        1. / 16777216.)
+
+
+cdef inline float rng_variance(RNGState* rng, float base,
+    float variance) nogil:
+    return base + variance * rng_signed(rng)
+
+
+cdef inline void rng_fill_signed(RNGState* rng, float* output,
+    unsigned int count) nogil:
+    cdef unsigned int i
+    for i in range(count):
+        output[i] = rng_signed(rng)
+
+
+cdef inline void rng_fill_variance(RNGState* rng, float* output,
+    unsigned int count, float base, float variance) nogil:
+    cdef unsigned int i
+    for i in range(count):
+        output[i] = base + variance * rng_signed(rng)
+
+
+cdef class RandomGenerator:
+    cdef RNGState rng
+    cdef unsigned long long _seed
+    cdef unsigned long long _stream
@@ -9,3 +9,4 @@ from kivent_core.systems import gamemap
 from kivent_core.systems import renderers
 from kivent_core.systems import lifespan
 from kivent_core.systems import animation_sys
+from kivent_core.systems import spatial_hash
@@ -1,18 +1,54 @@
 from kivent_core.systems.staticmemgamesystem cimport StaticMemGameSystem, MemComponent
 from kivent_core.rendering.animation cimport FrameList, Frame, FrameStruct
+from kivent_core.systems.renderers cimport RenderStruct
+from kivent_core.rendering.model cimport VertexModel
 
 
 ctypedef struct AnimationStruct:
     unsigned int entity_id
     void* frames
+    FrameStruct* frame_data
+    unsigned int frame_count
     void* manager
     unsigned int current_frame_index
     float current_duration
     bint loop
     bint dirty
+    unsigned int texkey
+    unsigned int groupkey
+    void* registered_model
+    void* group
+    unsigned int group_index
 
 cdef class AnimationComponent(MemComponent):
     pass
 
+cdef class AnimationGroup:
+    cdef FrameList frames
+    cdef FrameStruct* frame_data
+    cdef unsigned int frame_count
+    cdef unsigned int current_frame_index
+    cdef float current_duration
+    cdef bint loop
+    cdef unsigned int groupkey
+    cdef VertexModel shared_model
+    cdef AnimationStruct** subscribers
+    cdef RenderStruct** renders
+    cdef unsigned int count
+    cdef unsigned int capacity
+
+    cdef int subscribe(self, AnimationStruct* anim_comp,
+        RenderStruct* render_comp) except -1
+    cdef void unsubscribe(self, AnimationStruct* anim_comp)
+    cdef int advance(self, float elapsed) except -1
+    cdef int apply_frame(self) except -1
+
+cdef int retarget_render(RenderStruct* render_comp, void* model,
+    unsigned int texkey, bint same_batch) except -1
+
 cdef class AnimationSystem(StaticMemGameSystem):
-    pass
+    cdef dict groups
+    cdef AnimationGroup get_group(self, str name, object group_name,
+        FrameList frame_list, bint loop)
+    cdef int sync_model(self, AnimationStruct* anim_comp,
+        RenderStruct* render_comp) except -1
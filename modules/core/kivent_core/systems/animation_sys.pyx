@@ -11,6 +11,9 @@ from kivent_core.managers.animation_manager cimport AnimationManager
 from kivy.properties import (StringProperty, ObjectProperty, NumericProperty,
         BooleanProperty, ListProperty)
 from kivy.factory import Factory
+from libc.stdlib cimport realloc, free
+from array import array
+import json
 
 cdef class AnimationComponent(MemComponent):
     '''The component associated with AnimationSystem. Stores the current
@@ -25,7 +28,7 @@ cdef class AnimationComponent(MemComponent):
 
         **current_frame_index:** (unsigned int): The current frame being
         displayed of the animation and <unsigned int>-1 if the animation
-        is stopped.
+        is stopped or the entity is playing it in an AnimationGroup.
 
         **current_duration:** (float): The time in milliseconds the sprite
         has spent on the current frame. Used internally by the system's
@@ -89,18 +92,286 @@ cdef class AnimationComponent(MemComponent):
             cdef AnimationStruct* data = <AnimationStruct*>self.pointer
             cdef AnimationManager manager = <AnimationManager>data.manager
             cdef FrameList frames = manager._animations[value]
+            if data.group != NULL:
+                (<AnimationGroup>data.group).unsubscribe(data)
             data.frames = <void*>frames
+            data.frame_data = <FrameStruct*>frames.frames_block.data
+            data.frame_count = frames.frame_count
             data.current_frame_index = 0
             data.current_duration = 0
             data.dirty = True
 
 
+cdef int retarget_render(RenderStruct* render_comp, void* model,
+    unsigned int texkey, bint same_batch) except -1:
+    '''
+    Sets the model and texkey of a RenderComponent, moving the entity to
+    another batch if the new texture is not in the same group or the new
+    model does not have the same vertex and index counts.
+
+    Args:
+        render_comp (RenderStruct*): The RenderComponent to change.
+
+        model (void*): The VertexModel to render with.
+
+        texkey (unsigned int): The texkey to render with.
+
+        same_batch (bint): True if texkey is in the same group as the
+        current texkey of render_comp.
+
+    Return:
+        int: 1 if the entity was moved to another batch, otherwise 0.
+    '''
+    cdef VertexModel old_model = <VertexModel>render_comp.model
+    cdef VertexModel new_model = <VertexModel>model
+    cdef Renderer renderer
+    if (old_model._vertex_count != new_model._vertex_count or
+        old_model._index_count != new_model._index_count):
+        same_batch = False
+    if same_batch:
+        render_comp.model = model
+        render_comp.texkey = texkey
+        render_comp.state_valid = False
+        return 0
+    renderer = <Renderer>render_comp.renderer
+    renderer._unbatch_entity(render_comp.entity_id, render_comp)
+    render_comp.model = model
+    render_comp.texkey = texkey
+    renderer._batch_entity(render_comp.entity_id, render_comp)
+    return 1
+
+
+cdef class AnimationGroup:
+    '''
+    A clock shared by every entity playing the same animation in lockstep,
+    such as the animated tiles of a map. The group is advanced once per
+    update and only touches its subscribers when the frame changes.
+
+    If every frame uses a texture from the same group and a model with the
+    same vertex and index counts, the subscribers render a copy of the
+    first frame's model and a frame change copies the new frame's model
+    into it, so the cost does not depend on the number of subscribers.
+    The texkey of the subscribers is then left as it was when they
+    subscribed. Otherwise the model and texkey of every subscriber is set
+    on each frame change.
+
+    **Attributes: (Cython Access Only)**
+        **frames** (FrameList): The animation being played.
+
+        **frame_data** (FrameStruct*): The frames of **frames**.
+
+        **frame_count** (unsigned int): The number of frames.
+
+        **current_frame_index** (unsigned int): The frame being displayed,
+        <unsigned int>-1 once an animation that does not loop has finished.
+
+        **current_duration** (float): The time in milliseconds spent on
+        the current frame.
+
+        **loop** (bint): Whether the animation loops.
+
+        **groupkey** (unsigned int): The groupkey of the current frame's
+        texture.
+
+        **shared_model** (VertexModel): The model rendered by every
+        subscriber, or None if the frames can not share one.
+
+        **subscribers** (AnimationStruct**): The AnimationComponent of each
+        subscriber, **count** long.
+
+        **renders** (RenderStruct**): The RenderComponent of each
+        subscriber, in the same order as **subscribers**.
+
+        **count** (unsigned int): The number of subscribers.
+
+        **capacity** (unsigned int): The number of subscribers there is room
+        for before **subscribers** and **renders** are grown.
+    '''
+
+    def __cinit__(self, FrameList frames, bint loop,
+        ModelManager model_manager):
+        cdef FrameStruct* frame_data = <FrameStruct*>frames.frames_block.data
+        cdef VertexModel first = <VertexModel>frame_data[0].model
+        cdef VertexModel model
+        cdef bint shared = frames.frame_count > 1
+        cdef unsigned int i
+        self.frames = frames
+        self.frame_data = frame_data
+        self.frame_count = frames.frame_count
+        self.current_frame_index = 0
+        self.current_duration = 0.
+        self.loop = loop
+        self.groupkey = frame_data[0].groupkey
+        self.subscribers = NULL
+        self.renders = NULL
+        self.count = 0
+        self.capacity = 0
+        for i in range(1, frames.frame_count):
+            model = <VertexModel>frame_data[i].model
+            if (frame_data[i].groupkey != self.groupkey or
+                model._vertex_count != first._vertex_count or
+                model._index_count != first._index_count or
+                model._format_config is not first._format_config):
+                shared = False
+                break
+        if shared:
+            self.shared_model = model_manager._models[
+                model_manager.copy_model(first._name)]
+
+    def __dealloc__(self):
+        free(self.subscribers)
+        free(self.renders)
+
+    cdef int subscribe(self, AnimationStruct* anim_comp,
+        RenderStruct* render_comp) except -1:
+        '''
+        Adds an entity to the group and sets its RenderComponent to the
+        current frame. The entity's own clock is stopped.
+
+        Args:
+            anim_comp (AnimationStruct*): The AnimationComponent of the
+            entity.
+
+            render_comp (RenderStruct*): The RenderComponent of the entity.
+        '''
+        cdef unsigned int capacity
+        cdef AnimationStruct** subscribers
+        cdef RenderStruct** renders
+        cdef unsigned int index = self.current_frame_index
+        cdef FrameStruct* frame_data
+        cdef void* model
+        if self.count == self.capacity:
+            capacity = max(16, self.capacity * 2)
+            subscribers = <AnimationStruct**>realloc(self.subscribers,
+                sizeof(AnimationStruct*) * capacity)
+            if subscribers == NULL:
+                raise MemoryError()
+            self.subscribers = subscribers
+            renders = <RenderStruct**>realloc(self.renders,
+                sizeof(RenderStruct*) * capacity)
+            if renders == NULL:
+                raise MemoryError()
+            self.renders = renders
+            self.capacity = capacity
+        anim_comp.group = <void*>self
+        anim_comp.group_index = self.count
+        anim_comp.current_frame_index = <unsigned int>-1
+        if anim_comp.registered_model == NULL:
+            anim_comp.registered_model = render_comp.model
+        self.subscribers[self.count] = anim_comp
+        self.renders[self.count] = render_comp
+        self.count += 1
+        if index == <unsigned int>-1:
+            index = self.frame_count - 1
+        frame_data = &self.frame_data[index]
+        if self.shared_model is not None:
+            model = <void*>self.shared_model
+        else:
+            model = frame_data.model
+        retarget_render(render_comp, model, frame_data.texkey,
+            texture_manager.get_groupkey_from_texkey(render_comp.texkey) ==
+            frame_data.groupkey)
+        return 1
+
+    cdef void unsubscribe(self, AnimationStruct* anim_comp):
+        '''
+        Removes an entity from the group, its RenderComponent keeps the
+        model and texkey it has.
+
+        Args:
+            anim_comp (AnimationStruct*): The AnimationComponent of the
+            entity.
+        '''
+        cdef unsigned int index = anim_comp.group_index
+        cdef unsigned int last = self.count - 1
+        if index != last:
+            self.subscribers[index] = self.subscribers[last]
+            self.renders[index] = self.renders[last]
+            self.subscribers[index].group_index = index
+        self.count = last
+        anim_comp.group = NULL
+        anim_comp.group_index = <unsigned int>-1
+
+    cdef int advance(self, float elapsed) except -1:
+        '''
+        Advances the clock of the group, applying the next frame to the
+        subscribers if the current one has been displayed for its duration.
+
+        Args:
+            elapsed (float): The time passed in milliseconds.
+
+        Return:
+            int: 1 if the frame changed, otherwise 0.
+        '''
+        cdef unsigned int current_index = self.current_frame_index
+        cdef FrameStruct* frame_data
+        if current_index == <unsigned int>-1:
+            return 0
+        frame_data = &self.frame_data[current_index]
+        self.current_duration += elapsed
+        if frame_data.duration >= self.current_duration:
+            return 0
+        current_index += 1
+        if current_index == self.frame_count:
+            if self.loop:
+                current_index = 0
+            else:
+                current_index = <unsigned int>-1
+        self.current_frame_index = current_index
+        self.current_duration -= frame_data.duration
+        if current_index == <unsigned int>-1:
+            return 0
+        self.apply_frame()
+        return 1
+
+    cdef int apply_frame(self) except -1:
+        '''
+        Displays the current frame on every subscriber, either by copying
+        it into **shared_model** or by retargeting each RenderComponent.
+        '''
+        cdef FrameStruct* frame_data = &self.frame_data[
+            self.current_frame_index]
+        cdef bint same_batch = frame_data.groupkey == self.groupkey
+        cdef unsigned int i
+        if self.shared_model is not None:
+            self.shared_model.copy_vertex_model(
+                <VertexModel>frame_data.model)
+            return 1
+        for i in range(self.count):
+            retarget_render(self.renders[i], frame_data.model,
+                frame_data.texkey, same_batch)
+        self.groupkey = frame_data.groupkey
+        return 1
+
+
 cdef class AnimationSystem(StaticMemGameSystem):
     '''
     Processing depends on: Renderer, AnimationSystem
 
     This GameSystem updates the model and texkey of the RenderComponent
     as per frames of the animation.
+
+    Frames are read straight from the FrameStruct array of each FrameList,
+    and whether a new frame needs a different batch is decided by comparing
+    the groupkey cached on the frame with the groupkey of the texture the
+    RenderComponent had, so switching frames does not touch Python.
+
+    To keep switching frames cheap the ModelManager's model_register is not
+    updated every time the model of an entity changes. Each entity stays
+    registered with the model it had before it first switched frames, until
+    **sync_models** is called or its AnimationComponent is removed. Call
+    **sync_models** before reading the model_register or setting the model
+    of an animated RenderComponent yourself.
+
+    Entities initialized with a 'group' share an AnimationGroup with every
+    other entity playing the same animation with the same group. The group
+    has a single clock started when its first entity is added, and later
+    entities join it at the frame it is on, so the cost of a tick depends
+    on the number of groups rather than the number of entities. Use this
+    for tiles and other sprites that animate in lockstep.
+
+    **Attributes: (Cython Access Only)**
+        **groups** (dict): The AnimationGroup for each (name, group) pair.
     '''
 
     system_id = StringProperty('animation')
@@ -110,6 +381,24 @@ cdef class AnimationSystem(StaticMemGameSystem):
     component_type = ObjectProperty(AnimationComponent)
     system_names = ListProperty(['animation','renderer'])
 
+    def __init__(self, **kwargs):
+        self.groups = {}
+        super(AnimationSystem, self).__init__(**kwargs)
+
+    cdef AnimationGroup get_group(self, str name, object group_name,
+        FrameList frame_list, bint loop):
+        '''
+        Returns the AnimationGroup playing the animation name for
+        group_name, creating it if needed.
+        '''
+        key = (name, group_name)
+        cdef AnimationGroup group = self.groups.get(key)
+        if group is None:
+            group = AnimationGroup(frame_list, loop,
+                self.gameworld.model_manager)
+            self.groups[key] = group
+        return group
+
     def init_component(self, unsigned int component_index,
                        unsigned int entity_id, str zone, args):
         '''
@@ -120,6 +409,10 @@ cdef class AnimationSystem(StaticMemGameSystem):
             name (str): name of the animation which is registered
                         in animation_manager
             loop (bool): whether to loop this animation or not
+            group (object): if provided the entity joins the AnimationGroup
+                            for this name and group instead of keeping
+                            its own clock, loop is then set by the first
+                            entity of the group
         '''
         model_manager = self.gameworld.model_manager
         animation_manager = self.gameworld.animation_manager
@@ -130,12 +423,29 @@ cdef class AnimationSystem(StaticMemGameSystem):
         cdef FrameList frame_list = animation_manager.animations[args['name']]
         component.entity_id = entity_id
         component.frames = <void*>frame_list
+        component.frame_data = <FrameStruct*>frame_list.frames_block.data
+        component.frame_count = frame_list.frame_count
         component.manager = <void*>animation_manager
         component.current_frame_index = 0
         component.current_duration = 0
         component.loop = args['loop']
-
-        return self.entity_components.add_entity(entity_id, zone)
+        component.texkey = <unsigned int>-1
+        component.groupkey = <unsigned int>-1
+        component.registered_model = NULL
+        component.group = NULL
+        component.group_index = <unsigned int>-1
+
+        cdef unsigned int block_index = self.entity_components.add_entity(
+            entity_id, zone)
+        cdef void** component_data
+        group_name = args.get('group')
+        if group_name is not None:
+            component_data = <void**>self.entity_components.memory_block.data
+            self.get_group(args['name'], group_name, frame_list,
+                args['loop']).subscribe(component, <RenderStruct*>(
+                component_data[block_index * self.entity_components.count
+                + 1]))
+        return block_index
 
     def clear_component(self, unsigned int component_index):
         cdef MemoryZone memory_zone = self.imz_components.memory_zone
@@ -143,52 +453,107 @@ cdef class AnimationSystem(StaticMemGameSystem):
             memory_zone.get_pointer(component_index))
         pointer.entity_id = -1
         pointer.frames = NULL
+        pointer.frame_data = NULL
+        pointer.frame_count = 0
         pointer.current_frame_index = <unsigned int>-1
         pointer.current_duration = 0
+        pointer.registered_model = NULL
+        pointer.group = NULL
+        pointer.group_index = <unsigned int>-1
 
 
     def remove_component(self, unsigned int component_index):
-        cdef AnimationComponent component = self.components[component_index]
-        self.entity_components.remove_entity(component.entity_id)
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef AnimationStruct* anim_comp = <AnimationStruct*>(
+            memory_zone.get_pointer(component_index))
+        cdef unsigned int entity_id = anim_comp.entity_id
+        cdef unsigned int block_index = (
+            self.entity_components.get_block_index(entity_id))
+        cdef void** component_data = <void**>(
+            self.entity_components.memory_block.data)
+        self.sync_model(anim_comp, <RenderStruct*>component_data[
+            block_index * self.entity_components.count + 1])
+        if anim_comp.group != NULL:
+            (<AnimationGroup>anim_comp.group).unsubscribe(anim_comp)
+        self.entity_components.remove_entity(entity_id)
         super(AnimationSystem, self).remove_component(component_index)
 
+    cdef int sync_model(self, AnimationStruct* anim_comp,
+        RenderStruct* render_comp) except -1:
+        '''
+        Moves the entity in the ModelManager's model_register from the
+        model it was registered with to the model it is currently rendered
+        with, if they differ.
+
+        Args:
+            anim_comp (AnimationStruct*): The AnimationComponent of the
+            entity.
+
+            render_comp (RenderStruct*): The RenderComponent of the entity.
+        '''
+        cdef ModelManager model_manager
+        cdef Renderer renderer
+        if anim_comp.registered_model == NULL:
+            return 0
+        if anim_comp.registered_model != render_comp.model:
+            model_manager = self.gameworld.model_manager
+            renderer = <Renderer>render_comp.renderer
+            model_manager.unregister_entity_with_model(render_comp.entity_id,
+                (<VertexModel>anim_comp.registered_model)._name)
+            model_manager.register_entity_with_model(render_comp.entity_id,
+                renderer.system_id, (<VertexModel>render_comp.model)._name)
+        anim_comp.registered_model = NULL
+        return 1
+
+    def sync_models(self):
+        '''
+        Brings the ModelManager's model_register up to date with the model
+        every animated entity is currently rendered with.
+        '''
+        cdef void** component_data = <void**>(
+            self.entity_components.memory_block.data)
+        cdef unsigned int component_count = self.entity_components.count
+        cdef unsigned int count = self.entity_components.memory_block.count
+        cdef unsigned int i, real_index
+        for i in range(count):
+            real_index = i*component_count
+            if component_data[real_index] == NULL:
+                continue
+            self.sync_model(<AnimationStruct*>component_data[real_index],
+                <RenderStruct*>component_data[real_index+1])
+
 
     def update(self, dt):
-        gameworld = self.gameworld
         cdef void** component_data = <void**>(
             self.entity_components.memory_block.data)
         cdef unsigned int component_count = self.entity_components.count
         cdef unsigned int count = self.entity_components.memory_block.count
         cdef unsigned int i, real_index
-        cdef FrameList frame_list
-        cdef Frame frame
         cdef AnimationStruct* anim_comp
         cdef RenderStruct* render_comp
         cdef FrameStruct* frame_data
         cdef unsigned int current_index
-        cdef unsigned int groupkey
-        cdef Renderer renderer
-        cdef ModelManager model_manager = self.gameworld.model_manager
-
+        cdef bint same_batch
+        cdef float elapsed = dt * 1000
+        cdef AnimationGroup group
 
         for i in range(count):
             real_index = i*component_count
             if component_data[real_index] == NULL:
                 continue
             anim_comp = <AnimationStruct*>component_data[real_index]
-            render_comp = <RenderStruct*>component_data[real_index+1]
-
-            frame_list = <FrameList>anim_comp.frames
             current_index = anim_comp.current_frame_index
-            frame = frame_list[current_index]
-            frame_data = <FrameStruct*>frame.frame_pointer
+            if current_index == <unsigned int>-1:
+                continue
+            render_comp = <RenderStruct*>component_data[real_index+1]
+            frame_data = &anim_comp.frame_data[current_index]
 
-            anim_comp.current_duration += dt * 1000
+            anim_comp.current_duration += elapsed
 
             if frame_data.duration < anim_comp.current_duration:
                 # Switch to next frame
                 current_index += 1
-                if current_index == frame_list.frame_count:
+                if current_index == anim_comp.frame_count:
                     if anim_comp.loop:
                         current_index = 0
                     else:
@@ -204,29 +569,200 @@ cdef class AnimationSystem(StaticMemGameSystem):
             if current_index != <unsigned int>-1 and anim_comp.dirty:
                 # Animation is dirty
                 # update texture and model in RenderComponent
-                frame = frame_list[current_index]
-                frame_data = <FrameStruct*>frame.frame_pointer
-                groupkey = (texture_manager.get_groupkey_from_texkey(
-                                                frame_data.texkey))
-                same_batch = texture_manager.get_texkey_in_group(
-                                                render_comp.texkey,
-                                                groupkey)
-                model_manager.unregister_entity_with_model(
-                    render_comp.entity_id,
-                    (<VertexModel>render_comp.model)._name)
-                render_comp.model = frame_data.model
-                model_manager.register_entity_with_model(
-                    render_comp.entity_id, self.system_id,
-                    (<VertexModel>render_comp.model)._name)
-                renderer = <Renderer>render_comp.renderer
-                if not same_batch:
-                    renderer._unbatch_entity(render_comp.entity_id,
-                        render_comp)
-                render_comp.texkey = frame_data.texkey
-                if not same_batch:
-                    renderer._batch_entity(render_comp.entity_id,
-                        render_comp)
+                frame_data = &anim_comp.frame_data[current_index]
+                if render_comp.texkey != anim_comp.texkey:
+                    # texture was set from outside of the animation
+                    anim_comp.texkey = render_comp.texkey
+                    anim_comp.groupkey = (
+                        texture_manager.get_groupkey_from_texkey(
+                        render_comp.texkey))
+                same_batch = frame_data.groupkey == anim_comp.groupkey
+                if anim_comp.registered_model == NULL:
+                    anim_comp.registered_model = render_comp.model
+                retarget_render(render_comp, frame_data.model,
+                    frame_data.texkey, same_batch)
+                anim_comp.texkey = frame_data.texkey
+                anim_comp.groupkey = frame_data.groupkey
                 anim_comp.dirty = False
 
+        for group in self.groups.values():
+            group.advance(elapsed)
+
+    def get_snapshot_state(self):
+        '''
+        Extends StaticMemGameSystem.get_snapshot_state with the name of the
+        animation of every active component and the AnimationGroup it plays
+        in, as the frame lists and groups the components point to can not
+        be saved directly. The animation names and the name, group and
+        clock of every AnimationGroup are saved as JSON followed by arrays
+        of the index of the animation and group of each component, so
+        group names have to be strings or numbers.
+
+        Return:
+            tuple: The state of the system.
+        '''
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef AnimationStruct* pointer
+        cdef AnimationGroup group
+        cdef dict name_ids = {}
+        cdef dict group_ids = {}
+        cdef list groups = []
+        for (name, group_name), group in self.groups.items():
+            if not isinstance(group_name, (str, int, float)):
+                raise ValueError(
+                    'Group {!r} can not be saved in a snapshot'.format(
+                    group_name))
+            group_ids[<size_t><void*>group] = len(groups)
+            groups.append([name, group_name, group.loop,
+                group.current_frame_index, group.current_duration])
+        component_indices = array('I', memory_zone.get_active_slots())
+        animation_ids = array('I')
+        component_groups = array('I')
+        for component_index in component_indices:
+            pointer = <AnimationStruct*>memory_zone.get_pointer(
+                component_index)
+            name = (<FrameList>pointer.frames).name
+            if name not in name_ids:
+                name_ids[name] = len(name_ids)
+            animation_ids.append(name_ids[name])
+            if pointer.group == NULL:
+                component_groups.append(<unsigned int>-1)
+            else:
+                component_groups.append(group_ids[<size_t>pointer.group])
+        return (super(AnimationSystem, self).get_snapshot_state(),
+            json.dumps([sorted(name_ids, key=name_ids.get), groups]),
+            component_indices, animation_ids, component_groups)
+
+    def set_snapshot_state(self, tuple state):
+        '''
+        Restores the result of **get_snapshot_state**. The component data is
+        restored and the frame list of every component is looked up again
+        by name in the AnimationManager. The AnimationGroups are made again,
+        reusing the current group for the same animation and group, and
+        their clocks restored, the entities join them again in
+        **link_snapshot_state** once the RenderComponents are restored.
+
+        Args:
+            state (tuple): The result of **get_snapshot_state**.
+        '''
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef AnimationManager animation_manager = (
+            self.gameworld.animation_manager)
+        cdef AnimationStruct* pointer
+        cdef AnimationGroup group
+        cdef FrameList frame_list
+        cdef unsigned int frame_index
+        cdef dict groups = {}
+        cdef list group_list = []
+        cdef list frame_lists = []
+        base_state, names, component_indices, animation_ids, group_ids = (
+            state)
+        if not (len(component_indices) == len(animation_ids) == len(
+            group_ids)):
+            raise ValueError('{} was not snapshot with the same setup'.format(
+                self.system_id))
+        animation_names, group_states = json.loads(names)
+        for name in animation_names:
+            frame_lists.append(animation_manager._animations[name])
+        for name, group_name, loop, frame_index, current_duration in (
+            group_states):
+            frame_list = animation_manager._animations[name]
+            if (frame_index != <unsigned int>-1 and
+                frame_index >= frame_list.frame_count):
+                raise ValueError('Invalid frame index {}'.format(frame_index))
+            key = (name, group_name)
+            group = self.groups.get(key)
+            if group is None or group.frames is not frame_list:
+                group = AnimationGroup(frame_list, loop,
+                    self.gameworld.model_manager)
+            group.loop = loop
+            group.current_frame_index = frame_index
+            group.current_duration = current_duration
+            if frame_index == <unsigned int>-1:
+                frame_index = frame_list.frame_count - 1
+            group.groupkey = group.frame_data[frame_index].groupkey
+            groups[key] = group
+            group_list.append(group)
+        for component_index, animation_id, group_id in zip(
+            component_indices, animation_ids, group_ids):
+            if (component_index >= memory_zone.count or
+                animation_id >= len(frame_lists) or
+                group_id != <unsigned int>-1 and (
+                group_id >= len(group_list) or
+                (<AnimationGroup>group_list[group_id]).frames is not
+                frame_lists[animation_id])):
+                raise ValueError('Invalid component index {}'.format(
+                    component_index))
+        for group in self.groups.values():
+            group.count = 0
+        super(AnimationSystem, self).set_snapshot_state(base_state)
+        for component_index in memory_zone.get_active_slots():
+            pointer = <AnimationStruct*>memory_zone.get_pointer(
+                component_index)
+            pointer.frames = NULL
+        for component_index, animation_id, group_id in zip(
+            component_indices, animation_ids, group_ids):
+            pointer = <AnimationStruct*>memory_zone.get_pointer(
+                component_index)
+            frame_list = frame_lists[animation_id]
+            if pointer.entity_id == <unsigned int>-1:
+                raise ValueError('Component {} is not active'.format(
+                    component_index))
+            if (pointer.current_frame_index != <unsigned int>-1 and
+                pointer.current_frame_index >= frame_list.frame_count):
+                raise ValueError('Invalid frame index {}'.format(
+                    pointer.current_frame_index))
+            pointer.frames = <void*>frame_list
+            pointer.frame_data = <FrameStruct*>frame_list.frames_block.data
+            pointer.frame_count = frame_list.frame_count
+            pointer.manager = <void*>animation_manager
+            pointer.texkey = <unsigned int>-1
+            pointer.groupkey = <unsigned int>-1
+            pointer.registered_model = NULL
+            pointer.group = NULL
+            pointer.group_index = <unsigned int>-1
+            if group_id != <unsigned int>-1:
+                pointer.group = <void*>group_list[group_id]
+        for component_index in memory_zone.get_active_slots():
+            pointer = <AnimationStruct*>memory_zone.get_pointer(
+                component_index)
+            if pointer.frames == NULL:
+                raise ValueError('Component {} has no animation'.format(
+                    component_index))
+        self.groups = groups
+
+    def link_snapshot_state(self, tuple state):
+        '''
+        Adds the entities that were playing in an AnimationGroup back to it
+        and shows the current frame of every group.
 
-Factory.register('AnimationSystem', cls=AnimationSystem)
+        Args:
+            state (tuple): The result of **get_snapshot_state**.
+        '''
+        super(AnimationSystem, self).link_snapshot_state(state[0])
+        cdef void** component_data = <void**>(
+            self.entity_components.memory_block.data)
+        cdef unsigned int component_count = self.entity_components.count
+        cdef unsigned int count = self.entity_components.memory_block.count
+        cdef unsigned int i, real_index, frame_index
+        cdef AnimationStruct* anim_comp
+        cdef AnimationGroup group
+        for i in range(count):
+            real_index = i*component_count
+            if component_data[real_index] == NULL:
+                continue
+            anim_comp = <AnimationStruct*>component_data[real_index]
+            if anim_comp.group == NULL:
+                continue
+            group = <AnimationGroup>anim_comp.group
+            anim_comp.group = NULL
+            group.subscribe(anim_comp,
+                <RenderStruct*>component_data[real_index+1])
+        for group in self.groups.values():
+            if group.shared_model is None:
+                continue
+            frame_index = group.current_frame_index
+            if frame_index == <unsigned int>-1:
+                frame_index = group.frame_count - 1
+            group.shared_model.copy_vertex_model(
+                <VertexModel>group.frame_data[frame_index].model)
@@ -111,6 +111,39 @@ cdef class ColorSystem(StaticMemGameSystem):
         for i in range(4):
             component.color[i] = args[i]
 
+    def init_components(self, list component_indices, list entity_ids,
+        str zone, args):
+        '''Initializes many ColorComponent at once. args is either a sequence
+        of (r, g, b, a) tuples, one per component, or a buffer of unsigned
+        chars with shape (count, 4) such as a uint8 numpy array, which will be
+        read directly.
+        '''
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef unsigned int count = len(component_indices)
+        cdef unsigned int i
+        cdef int j
+        cdef ColorStruct* component
+        cdef unsigned char[:, :] columns = None
+        if not isinstance(args, (list, tuple)):
+            try:
+                columns = args
+            except (TypeError, ValueError):
+                columns = None
+        if columns is not None and (
+            columns.shape[0] < count or columns.shape[1] < 4):
+            raise ValueError('color data must have shape (count, 4)')
+        for i in range(count):
+            component = <ColorStruct*>memory_zone.get_pointer(
+                component_indices[i])
+            component.entity_id = entity_ids[i]
+            if columns is not None:
+                for j in range(4):
+                    component.color[j] = columns[i, j]
+            else:
+                color = args[i]
+                for j in range(4):
+                    component.color[j] = color[j]
+
     def clear_component(self, unsigned int component_index):
         cdef MemoryZone memory_zone = self.imz_components.memory_zone
         cdef ColorStruct* pointer = <ColorStruct*>memory_zone.get_pointer(
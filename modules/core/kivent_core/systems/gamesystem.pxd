@@ -1,4 +1,5 @@
 from kivent_core.uix.cwidget cimport CWidget
+from kivent_core.managers.profile_manager cimport SystemProfile
 
 cdef class GameSystem(CWidget):
     cdef float _frame_time
@@ -8,3 +9,4 @@ cdef class GameSystem(CWidget):
     cdef dict copied_components
     cpdef unsigned int get_active_component_count(self) except <unsigned int>-1
     cpdef unsigned int get_active_component_count_in_zone(self, str zone) except <unsigned int>-1
+    cdef int fill_profile(self, SystemProfile* profile) except -1
@@ -74,6 +74,31 @@ cdef class GameSystem(CWidget):
         **update_time** (NumericProperty): The 'tick' rate of this system's
         update. Defaults to 1./60. or 60 FPS
 
+        **fixed_step** (BooleanProperty): Only used when the GameWorld's
+        **fixed_timestep** is True. If True, **update** is called once for
+        every fixed step the GameWorld takes, with the GameWorld's
+        update_time as dt. If False, **_update** is called once per frame
+        after all the steps have been taken, as a Renderer does. Defaults
+        to True.
+
+        **thread_safe** (BooleanProperty): If True the **update** of this
+        GameSystem only touches the components named by its **system_id**,
+        its **system_names** if it has any, and its **read_only_systems**,
+        and removes entities only with GameWorld.queue_remove_entity, so
+        that the ScheduleManager may update it on another thread at the same
+        time as systems touching other components. Defaults to False.
+
+        **read_only_systems** (ListProperty): system_id of components this
+        GameSystem reads but never writes during **update**. The
+        ScheduleManager lets systems that only read the same components run
+        at the same time.
+
+        **supports_snapshot** (BooleanProperty): Whether the state of this
+        GameSystem can be saved and restored by the SnapshotManager, see
+        **get_snapshot_state**. Set this to False on systems whose state
+        lives outside of KivEnt, the SnapshotManager then refuses to snapshot
+        or restore a GameWorld using them. Defaults to True.
+
         **components** (list): a list of the components currently active.
         If the list contains None at an index that component has been recently
         released for GC and a free list is being maintained internally. Skip
@@ -102,6 +127,10 @@ cdef class GameSystem(CWidget):
     gameworld = ObjectProperty(None)
     gameview = StringProperty(None, allownone=True)
     update_time = NumericProperty(1./60.)
+    fixed_step = BooleanProperty(True)
+    thread_safe = BooleanProperty(False)
+    read_only_systems = ListProperty([])
+    supports_snapshot = BooleanProperty(True)
     do_allocation = BooleanProperty(False)
     do_components = BooleanProperty(True)
     zones = ListProperty([])
@@ -260,6 +289,45 @@ cdef class GameSystem(CWidget):
         self.init_component(component_index, entity_id, zone, args)
         return component_index
 
+    def create_components(self, list entity_ids, str zone, args):
+        '''Typically called by GameWorld.init_entities_bulk to create a
+        component for many entities at once. The basic GameSystem simply calls
+        **create_component** for each entity, systems with contiguous storage
+        override this to reserve and initialize their components in one pass.
+
+        Args:
+            entity_ids (list) : The identities of the **Entity** to assign
+            a new component to.
+
+            zone (str) : The zone to create the components in.
+
+            args : If a dict, the same arguments will be used to initialize
+            every component. Otherwise args must be indexable with one entry
+            per entity, args[i] being used for entity_ids[i].
+
+        Return:
+            component_indices (list) : The identities of the new components
+            in the same order as entity_ids.
+
+        If a component fails to be created the components already created
+        are removed before the exception is raised again.
+        '''
+        create_component = self.create_component
+        cdef list component_indices = []
+        cdef bint shared = isinstance(args, dict)
+        try:
+            for i in range(len(entity_ids)):
+                if shared:
+                    component_indices.append(create_component(entity_ids[i],
+                        zone, args))
+                else:
+                    component_indices.append(create_component(entity_ids[i],
+                        zone, args[i]))
+        except:
+            self.remove_components(component_indices)
+            raise
+        return component_indices
+
     def copy_component(self, unsigned int entity_id, 
                        unsigned int component_index):
         cdef EntityManager entity_manager = self.gameworld.entity_manager
@@ -289,6 +357,20 @@ cdef class GameSystem(CWidget):
         self.py_components[component_index] = None
         self.free_indices.append(component_index)
 
+    def remove_components(self, list component_indices):
+        '''
+        Typically called by GameWorld when flushing its removal queue, with
+        every component of this system belonging to the entities being
+        removed. The basic GameSystem calls **remove_component** for each,
+        override to process all of the removals in one pass.
+
+        Args:
+            component_indices (list): the component_ids to be removed.
+        '''
+        remove_component = self.remove_component
+        for component_index in component_indices:
+            remove_component(component_index)
+
     cpdef unsigned int get_active_component_count(self) except <unsigned int>-1:
         '''
         Returns the number of active components in this system.
@@ -306,6 +388,65 @@ cdef class GameSystem(CWidget):
         '''
         raise NotImplementedError("The default python GameSystem does not support zones.")
 
+    cdef int fill_profile(self, SystemProfile* profile) except -1:
+        '''
+        Called by the ProfileManager at the end of a profiled tick to fill in
+        the counts of the SystemProfile recorded for this system. By default
+        only the number of active components is filled in.
+
+        Args:
+            profile (SystemProfile*): The record being written.
+        '''
+        if self.do_components:
+            profile.component_count = self.get_active_component_count()
+        return 1
+
+    def get_snapshot_state(self):
+        '''
+        Called by the SnapshotManager to copy everything needed to put the
+        components of this system back later with **set_snapshot_state**.
+        The result can only be made of None, bool, int, float, str, bytes,
+        array.array, list, tuple and dict, see SnapshotWriter. Pointers can
+        not be saved, save the name of what they point to instead. A
+        GameSystem with no components has nothing to save and returns None.
+        The python components of the default GameSystem can not be saved,
+        so this raises a **NotImplementedError** unless overridden.
+
+        Return:
+            object: The state of the system.
+        '''
+        if not self.do_components:
+            return None
+        raise NotImplementedError(
+            '{} does not support snapshots'.format(self.system_id))
+
+    def set_snapshot_state(self, state):
+        '''
+        Called by the SnapshotManager to restore the result of
+        **get_snapshot_state**. The EntityManager has already been restored
+        when this is called, other GameSystems may not have been. As state
+        can come from a file or the network it has to be checked before
+        being used, raise a ValueError if it does not fit this system.
+
+        Args:
+            state (object): The result of **get_snapshot_state**.
+        '''
+        if not self.do_components:
+            return
+        raise NotImplementedError(
+            '{} does not support snapshots'.format(self.system_id))
+
+    def link_snapshot_state(self, state):
+        '''
+        Called by the SnapshotManager once **set_snapshot_state** has been
+        called for every GameSystem, to look up again anything that refers
+        to the components of other systems.
+
+        Args:
+            state (object): The result of **get_snapshot_state**.
+        '''
+        pass
+
     def on_remove_system(self):
         '''Function called when a system is removed during a gameworld state
         change
@@ -9,7 +9,7 @@ from kivy.graphics.transformation cimport Matrix
 from kivy.graphics import RenderContext
 from kivy.factory import Factory
 from kivy.input import MotionEvent
-from libc.math cimport sin, cos
+from libc.math cimport sin, cos, fabs
 
 
 cdef class GameView(GameSystem):
@@ -141,6 +141,30 @@ cdef class GameView(GameSystem):
 
 
 
+    def get_view_bounds(self, float margin=0.):
+        '''
+        Returns the axis aligned rectangle in world space containing
+        everything currently visible in the view, taking into account
+        **camera_scale** and **camera_rotate**. Used by the renderers to cull
+        entities that are off screen.
+
+        Args:
+            margin (float): Extra distance in world units added to every side
+            of the rectangle.
+
+        Return:
+            tuple: (center_x, center_y, half_width, half_height) of the
+            visible area.
+        '''
+        px, py = self.camera_pos
+        camera_scale = self.camera_scale
+        size = self.window_size
+        sx, sy = size[0] * camera_scale/2, size[1] * camera_scale/2
+        cos_r = fabs(cos(self.camera_rotate))
+        sin_r = fabs(sin(self.camera_rotate))
+        return (-px + sx, -py + sy, cos_r*sx + sin_r*sy + margin,
+            sin_r*sx + cos_r*sy + margin)
+
     def get_camera_centered(self, map_size, camera_size, camera_scale):
         x = max((camera_size[0]*camera_scale - map_size[0])/2., 0.)
         y = max((camera_size[1]*camera_scale - map_size[1])/2., 0.)
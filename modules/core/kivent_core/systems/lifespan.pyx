@@ -1,5 +1,5 @@
 from kivent_core.systems.staticmemgamesystem cimport (StaticMemGameSystem, 
-    MemComponent)
+    MemComponent, KernelQueue, kernel_remove, ZonedAggregator)
 from kivy.properties import (StringProperty, BooleanProperty, ListProperty,
     NumericProperty, ObjectProperty)
 from kivent_core.memory_handlers.block cimport MemoryBlock
@@ -40,10 +40,32 @@ cdef class LifespanComponent(MemComponent):
             data.paused = value
 
 
+cdef void lifespan_kernel(void** components, float dt, void* user_data,
+    KernelQueue* queue) noexcept nogil:
+    '''
+    Advances the lifespan of a single entity and asks for its removal once
+    the lifespan has run out, see StaticMemGameSystem.run_kernel.
+    '''
+    cdef LifespanStruct* system_comp = <LifespanStruct*>components[0]
+    if not system_comp.paused:
+        system_comp.current_time += dt
+    if system_comp.current_time >= system_comp.lifespan:
+        kernel_remove(queue, system_comp.entity_id)
+
+
 cdef class LifespanSystem(StaticMemGameSystem):
+    '''
+    LifespanSystem removes entities once they have existed for their
+    lifespan. The lifespans are advanced by **run_kernel**, across threads
+    if **parallel** is True. If **thread_safe** is True expired entities
+    are queued with GameWorld.queue_remove_entity instead of being removed
+    immediately, so that the ScheduleManager can update this system at the
+    same time as others.
+    '''
     system_id = StringProperty('lifespan')
     updateable = BooleanProperty(True)
     processor = BooleanProperty(True)
+    dense_aggregator = BooleanProperty(True)
     type_size = NumericProperty(sizeof(LifespanStruct))
     component_type = ObjectProperty(LifespanComponent)
     system_names = ListProperty(['lifespan'])
@@ -74,28 +96,38 @@ cdef class LifespanSystem(StaticMemGameSystem):
         component.paused = 0
 
     def remove_component(self, unsigned int component_index):
-        cdef LifespanComponent component = self.components[component_index]
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef LifespanStruct* component = <LifespanStruct*>(
+            memory_zone.get_pointer(component_index))
         self.entity_components.remove_entity(component.entity_id)
         super(LifespanSystem, self).remove_component(component_index)
 
+    def remove_components(self, list component_indices):
+        '''
+        Overrides StaticMemGameSystem's remove_components. Every entity is
+        removed from the **entity_components** aggregator before the
+        components are freed together. If **remove_component** has been
+        overridden it will be called for each component instead.
+
+        Args:
+            component_indices (list): the component_ids to be removed.
+        '''
+        if type(self).remove_component is not LifespanSystem.remove_component:
+            return super(LifespanSystem, self).remove_components(
+                component_indices)
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef ZonedAggregator entity_components = self.entity_components
+        cdef unsigned int component_index
+        cdef LifespanStruct* component
+        for component_index in component_indices:
+            component = <LifespanStruct*>memory_zone.get_pointer(
+                component_index)
+            entity_components.remove_entity(component.entity_id)
+        self.free_components(component_indices)
+
     def update(self, dt):
-        cdef LifespanStruct* system_comp
-        cdef void** component_data = <void**>(
-            self.entity_components.memory_block.data)
-        cdef unsigned int component_count = self.entity_components.count
-        cdef unsigned int count = self.entity_components.memory_block.count
-        cdef unsigned int i, real_index
-        remove_entity = self.gameworld.remove_entity
-
-        for i in range(count):
-            real_index = i*component_count
-            if component_data[real_index] == NULL:
-                continue
-            system_comp = <LifespanStruct*>component_data[real_index]
-            if not system_comp.paused:
-                system_comp.current_time += dt
-            if system_comp.current_time >= system_comp.lifespan:
-                remove_entity(system_comp.entity_id)
+        #backwards, removing an entity only moves one already visited
+        self.run_kernel(lifespan_kernel, dt, NULL, True)
 
 
 Factory.register('LifespanSystem', cls=LifespanSystem)
\ No newline at end of file
@@ -13,3 +13,7 @@ cdef class PositionComponent2D(MemComponent):
 
 cdef class PositionSystem2D(StaticMemGameSystem):
     pass
+
+
+cdef class LastPositionSystem2D(PositionSystem2D):
+    pass
@@ -1,10 +1,12 @@
 # cython: embedsignature=True
-from kivent_core.systems.staticmemgamesystem cimport StaticMemGameSystem, MemComponent
+from kivent_core.systems.staticmemgamesystem cimport (StaticMemGameSystem,
+    MemComponent, KernelQueue, ZonedAggregator)
 from kivent_core.memory_handlers.zone cimport MemoryZone
 from kivent_core.memory_handlers.indexing cimport IndexedMemoryZone
 from kivent_core.memory_handlers.membuffer cimport Buffer
 from kivy.factory import Factory
-from kivy.properties import ObjectProperty, NumericProperty, StringProperty
+from kivy.properties import (ObjectProperty, NumericProperty, StringProperty,
+    BooleanProperty, ListProperty)
 
 
 cdef class PositionComponent2D(MemComponent):
@@ -78,6 +80,41 @@ cdef class PositionSystem2D(StaticMemGameSystem):
         component.x = x
         component.y = y
 
+    def init_components(self, list component_indices, list entity_ids,
+        str zone, args):
+        '''Initializes many PositionComponent2D at once. args is either a
+        sequence of (x, y) tuples, one per component, or a buffer of doubles
+        with shape (count, 2) such as a float64 numpy array, which will be
+        read directly without creating any python objects.
+        '''
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef unsigned int count = len(component_indices)
+        cdef unsigned int i
+        cdef PositionStruct2D* component
+        cdef double[:, :] columns = None
+        if not isinstance(args, (list, tuple)):
+            try:
+                columns = args
+            except (TypeError, ValueError):
+                columns = None
+        if columns is not None:
+            if columns.shape[0] < count or columns.shape[1] < 2:
+                raise ValueError('position data must have shape (count, 2)')
+            for i in range(count):
+                component = <PositionStruct2D*>memory_zone.get_pointer(
+                    component_indices[i])
+                component.entity_id = entity_ids[i]
+                component.x = columns[i, 0]
+                component.y = columns[i, 1]
+        else:
+            for i in range(count):
+                pos = args[i]
+                component = <PositionStruct2D*>memory_zone.get_pointer(
+                    component_indices[i])
+                component.entity_id = entity_ids[i]
+                component.x = pos[0]
+                component.y = pos[1]
+
     def clear_component(self, unsigned int component_index):
         cdef MemoryZone memory_zone = self.imz_components.memory_zone
         cdef PositionStruct2D* pointer = <PositionStruct2D*>(
@@ -87,4 +124,89 @@ cdef class PositionSystem2D(StaticMemGameSystem):
         pointer.y = 0.
 
 
+cdef void copy_position_kernel(void** components, float dt, void* user_data,
+    KernelQueue* queue) noexcept nogil:
+    '''
+    Copies the position of a single entity into its last_position, see
+    StaticMemGameSystem.run_kernel.
+    '''
+    cdef PositionStruct2D* last_pos_comp = <PositionStruct2D*>components[0]
+    cdef PositionStruct2D* pos_comp = <PositionStruct2D*>components[1]
+    last_pos_comp.x = pos_comp.x
+    last_pos_comp.y = pos_comp.y
+
+
+cdef class LastPositionSystem2D(PositionSystem2D):
+    '''
+    Processing Depends On: PositionSystem2D
+
+    LastPositionSystem2D keeps a copy of each entity's 'position' from before
+    the current step, so that a renderer such as the LerpScaledPolyRenderer
+    can draw entities between the two using the GameWorld's
+    **interpolation_alpha**. Every update the current position is copied
+    into the 'last_position' component, so this system should be updated
+    before any GameSystem that moves entities, either by adding it first or
+    by setting the SystemManager's **update_order**. The 'position'
+    component must be created before the 'last_position' component. The
+    copy is made by **run_kernel** and 'position' is only read, so
+    the ScheduleManager can update this system at the same time as other
+    systems that read 'position'.
+    '''
+    system_id = StringProperty('last_position')
+    updateable = BooleanProperty(True)
+    processor = BooleanProperty(True)
+    thread_safe = BooleanProperty(True)
+    system_names = ListProperty(['last_position', 'position'])
+    read_only_systems = ListProperty(['position'])
+
+    def init_component(self, unsigned int component_index,
+        unsigned int entity_id, str zone, args):
+        '''The PositionComponent2D is initialized with an args tuple of (x, y),
+        usually the same as the entity's position.
+        '''
+        super(LastPositionSystem2D, self).init_component(component_index,
+            entity_id, zone, args)
+        return self.entity_components.add_entity(entity_id, zone)
+
+    def init_components(self, list component_indices, list entity_ids,
+        str zone, args):
+        super(LastPositionSystem2D, self).init_components(component_indices,
+            entity_ids, zone, args)
+        for entity_id in entity_ids:
+            self.entity_components.add_entity(entity_id, zone)
+
+    def remove_component(self, unsigned int component_index):
+        cdef PositionComponent2D component = self.components[component_index]
+        self.entity_components.remove_entity(component.entity_id)
+        super(LastPositionSystem2D, self).remove_component(component_index)
+
+    def remove_components(self, list component_indices):
+        '''
+        Overrides StaticMemGameSystem's remove_components. Every entity is
+        removed from the **entity_components** aggregator before the
+        components are freed together. If **remove_component** has been
+        overridden it will be called for each component instead.
+
+        Args:
+            component_indices (list): the component_ids to be removed.
+        '''
+        if (type(self).remove_component is not
+            LastPositionSystem2D.remove_component):
+            return super(LastPositionSystem2D, self).remove_components(
+                component_indices)
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef ZonedAggregator entity_components = self.entity_components
+        cdef unsigned int component_index
+        cdef PositionStruct2D* component
+        for component_index in component_indices:
+            component = <PositionStruct2D*>memory_zone.get_pointer(
+                component_index)
+            entity_components.remove_entity(component.entity_id)
+        self.free_components(component_indices)
+
+    def update(self, dt):
+        self.run_kernel(copy_position_kernel, dt, NULL, False)
+
+
 Factory.register('PositionSystem2D', cls=PositionSystem2D)
+Factory.register('LastPositionSystem2D', cls=LastPositionSystem2D)
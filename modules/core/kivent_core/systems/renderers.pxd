@@ -1,21 +1,76 @@
 from kivent_core.rendering.cmesh cimport CMesh
 from kivent_core.systems.staticmemgamesystem cimport StaticMemGameSystem, MemComponent
-from kivent_core.rendering.batching cimport BatchManager
+from kivent_core.rendering.batching cimport BatchManager, RenderStruct
 from kivent_core.rendering.vertex_format cimport KEVertexFormat
 from kivent_core.memory_handlers.membuffer cimport Buffer
+from kivent_core.managers.profile_manager cimport SystemProfile
 from kivent_core.rendering.model cimport VertexModel
 from cpython cimport bool
-
-
-ctypedef struct RenderStruct:
-    unsigned int entity_id
-    unsigned int texkey
-    unsigned int batch_id
-    void* model
-    void* renderer
-    int vert_index
-    int ind_index
-    bint render
+from libc.math cimport fabs
+from kivy.graphics.cgl cimport GLushort
+
+
+ctypedef struct CullRect:
+    float x
+    float y
+    float half_w
+    float half_h
+    bint active
+
+
+cdef inline bint in_view(CullRect* rect, float x, float y, float radius):
+    return not rect.active or (fabs(x - rect.x) <= rect.half_w + radius and
+        fabs(y - rect.y) <= rect.half_h + radius)
+
+
+ctypedef struct DirtyRange:
+    unsigned int start
+    unsigned int end
+
+
+cdef inline bint needs_redraw(RenderStruct* render_comp, VertexModel model,
+    unsigned int stamp, unsigned int frame_stamp, float x, float y,
+    float rotate, float sx, float sy, unsigned char* color):
+    cdef float* state = render_comp.last_state
+    cdef unsigned char* last_color = render_comp.last_color
+    cdef unsigned int i
+    cdef bint changed = (not render_comp.state_valid or
+        render_comp.model_version != model._version or state[0] != x or
+        state[1] != y or state[2] != rotate or state[3] != sx or
+        state[4] != sy)
+    if color != NULL and not changed:
+        for i in range(4):
+            if last_color[i] != color[i]:
+                changed = True
+                break
+    if changed:
+        state[0] = x
+        state[1] = y
+        state[2] = rotate
+        state[3] = sx
+        state[4] = sy
+        if color != NULL:
+            for i in range(4):
+                last_color[i] = color[i]
+        render_comp.model_version = model._version
+        render_comp.change_stamp = stamp
+        render_comp.state_valid = True
+    return render_comp.change_stamp > frame_stamp
+
+
+cdef inline void write_indices(GLushort* frame_indices, VertexModel model,
+    unsigned int index_offset, unsigned int vert_offset,
+    DirtyRange* index_range):
+    cdef GLushort* model_indices = <GLushort*>model.indices_block.data
+    cdef unsigned int i
+    cdef GLushort value
+    for i in range(model._index_count):
+        value = model_indices[i] + vert_offset
+        if frame_indices[i+index_offset] != value:
+            frame_indices[i+index_offset] = value
+            if i + index_offset < index_range.start:
+                index_range.start = i + index_offset
+            index_range.end = i + index_offset + 1
 
 
 cdef class RenderComponent(MemComponent):
@@ -26,6 +81,11 @@ cdef class Renderer(StaticMemGameSystem):
     cdef BatchManager batch_manager
     cdef object update_trigger
     cdef bint do_texture
+    cdef bint headless
+    cdef unsigned int update_stamp
+    cdef unsigned int batches_drawn
+    cdef unsigned int vertices_written
+    cdef unsigned long long bytes_uploaded
 
     cdef void* _batch_entity(self, unsigned int entity_id,
         RenderStruct* component_data) except NULL
@@ -35,6 +95,9 @@ cdef class Renderer(StaticMemGameSystem):
         unsigned int entity_id, bool render, VertexModel model,
         unsigned int texkey) except NULL
     cdef void* setup_batch_manager(self, Buffer master_buffer) except NULL
+    cdef int get_cull_rect(self, CullRect* rect) except -1
+    cdef unsigned int next_update_stamp(self)
+    cdef int fill_profile(self, SystemProfile* profile) except -1
 
 
 cdef class RotateRenderer(Renderer):
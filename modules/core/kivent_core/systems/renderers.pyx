@@ -1,10 +1,9 @@
-# cython: profile=True
 # cython: embedsignature=True
 from cpython cimport bool
 from kivy.properties import (
     BooleanProperty, StringProperty, NumericProperty, ListProperty
     )
-from kivy.graphics import Callback
+from kivy.graphics import Callback, Canvas
 from kivy.graphics.instructions cimport RenderContext
 from kivent_core.rendering.vertex_formats cimport (
     VertexFormat4F, VertexFormat2F4UB, VertexFormat7F, VertexFormat4F4UB,
@@ -16,7 +15,8 @@ from kivent_core.rendering.vertex_formats import (
     )
 from kivent_core.rendering.vertex_format cimport KEVertexFormat
 from kivent_core.rendering.cmesh cimport CMesh
-from kivent_core.rendering.batching cimport BatchManager, IndexedBatch
+from kivent_core.rendering.batching cimport (BatchManager, IndexedBatch,
+    BatchRemoval)
 from kivent_core.managers.resource_managers import texture_manager
 from kivent_core.managers.resource_managers cimport ModelManager, TextureManager
 from kivy.graphics.opengl import (
@@ -44,6 +44,10 @@ from kivy.properties import ObjectProperty, NumericProperty
 from kivy.clock import Clock
 from kivent_core.rendering.gl_debug cimport gl_log_debug_message
 from functools import partial
+from libc.stdlib cimport malloc, free
+from array import array
+import kivent_core
+import json
 
 
 cdef float lerp(float v0, float v1, float t):
@@ -185,6 +189,7 @@ cdef class RenderComponent(MemComponent):
                 component_data.render = 1
             else:
                 component_data.render = 0
+            component_data.state_valid = False
 
 
     property vertex_count:
@@ -321,6 +326,35 @@ cdef class Renderer(StaticMemGameSystem):
         force the renderer to redraw a frame. force_update = True will call
         update_trigger automatically on batching and unbatching of an Entity.
 
+        **compaction_budget** (NumericProperty): Time in seconds the
+        **batch_manager** may spend compacting and merging fragmented batches
+        at the start of every update, see BatchManager.compact. Set to 0 to
+        disable compaction. Defaults to .001.
+
+        **compaction_threshold** (NumericProperty): Fraction of free space
+        between the ranges of a batch at which it will be compacted.
+        Defaults to .25.
+
+        **merge_threshold** (NumericProperty): Fraction of a batch's vertex
+        capacity below which it will be merged into another batch using the
+        same texture. Defaults to .5.
+
+        **do_culling** (BooleanProperty): If True, entities whose model does
+        not overlap the view of the GameView named by **gameview** will not
+        be drawn. Their vertices are not written and no indices are
+        submitted for them. Batches with no visible entities will not be
+        drawn at all. Defaults to False.
+
+        **culling_margin** (NumericProperty): Distance in world units added to
+        every side of the view when culling, use this if your shader moves
+        vertices away from the position of their entity. Defaults to 0.
+
+        **dirty_tracking** (BooleanProperty): If True, entities whose
+        position, rotation, scale, color and model have not changed since
+        they were last written to a frame are not written again and only the
+        changed ranges of each batch are uploaded to the GPU. Worthwhile when
+        most entities are static. Defaults to False.
+
     **Attributes: (Cython Access Only)**
         **attribute_count** (unsigned int): The number of attributes in the
         VertMesh format for this renderer. Defaults to 4 (x, y, u, v).
@@ -328,9 +362,32 @@ cdef class Renderer(StaticMemGameSystem):
         **batch_manager** (BatchManager): The BatchManager that is responsible
         for actually submitting vertex data to the GPU.
 
+        **headless** (bint): True if the GameWorld passed to the constructor
+        is headless, or KIVENT_HEADLESS is set and no GameWorld was passed.
+        The canvas will be a plain Canvas without a shader, and the
+        **batch_manager** will not create any drawing instructions.
+
+        **update_stamp** (unsigned int): Incremented at the start of every
+        update. Stored on each RenderStruct when the entity changes and on
+        each frame when it is written, see **next_update_stamp**.
+
+        **batches_drawn** (unsigned int): The number of batches written
+        during the last update.
+
+        **vertices_written** (unsigned int): The number of vertices written
+        during the last update.
+
+        **bytes_uploaded** (unsigned long long): The total bytes uploaded by
+        the **batch_manager** the last time a SystemProfile was filled in.
+
+        **fixed_step** (BooleanProperty): Defaults to False for Renderer, when
+        the GameWorld uses a **fixed_timestep** the renderer is updated once
+        per frame after all fixed steps have been taken.
+
     '''
     system_id = StringProperty('renderer')
     updateable = BooleanProperty(True)
+    fixed_step = BooleanProperty(False)
     renderable = BooleanProperty(True)
     static_rendering = BooleanProperty(False)
     force_update = BooleanProperty(False)
@@ -348,17 +405,32 @@ cdef class Renderer(StaticMemGameSystem):
     reset_blend_factor_dest = NumericProperty(GL_ONE_MINUS_SRC_ALPHA)
     type_size = NumericProperty(sizeof(RenderStruct))
     component_type = ObjectProperty(RenderComponent)
+    compaction_budget = NumericProperty(.001)
+    compaction_threshold = NumericProperty(.25)
+    merge_threshold = NumericProperty(.5)
+    do_culling = BooleanProperty(False)
+    culling_margin = NumericProperty(0.)
+    dirty_tracking = BooleanProperty(False)
 
     def __init__(self, **kwargs):
-        self.canvas = RenderContext(use_parent_projection=True,
-                                    nocompiler=True)
-        if 'shader_source' in kwargs:
-            self.canvas.shader.source = kwargs.get('shader_source')
+        gameworld = kwargs.get('gameworld')
+        if gameworld is not None:
+            self.headless = gameworld.headless
+        else:
+            self.headless = kivent_core.headless
+        if self.headless:
+            self.canvas = Canvas()
+        else:
+            self.canvas = RenderContext(use_parent_projection=True,
+                                        nocompiler=True)
+            if 'shader_source' in kwargs:
+                self.canvas.shader.source = kwargs.get('shader_source')
         super(Renderer, self).__init__(**kwargs)
-        with self.canvas.before:
-            Callback(self._set_blend_func)
-        with self.canvas.after:
-            Callback(self._reset_blend_func)
+        if not self.headless:
+            with self.canvas.before:
+                Callback(self._set_blend_func)
+            with self.canvas.after:
+                Callback(self._reset_blend_func)
         self.update_trigger = Clock.create_trigger(partial(self.update, True))
 
 
@@ -391,16 +463,96 @@ cdef class Renderer(StaticMemGameSystem):
         '''
         We only want to update renderer once per frame, so we will override
         the basic GameSystem logic here which accounts appropriately for
-        dt.
+        dt. Before updating, the **batch_manager** is given
+        **compaction_budget** seconds to compact its batches, if any batch
+        was changed every batch is redrawn even with static_rendering.
+        '''
+        cdef BatchManager batch_manager = self.batch_manager
+        cdef bint compacted = False
+        if self.compaction_budget > 0:
+            compacted = batch_manager.compact(self.compaction_budget) > 0
+        self.update(compacted, dt)
+
+    def get_fragmentation_stats(self):
+        '''
+        Returns a summary of the free space between entities in the batches
+        of this renderer, see BatchManager.get_fragmentation_stats.
+
+        Return:
+            dict: The fragmentation stats of the **batch_manager**.
+        '''
+        return self.batch_manager.get_fragmentation_stats()
+
+    cdef int get_cull_rect(self, CullRect* rect) except -1:
+        '''
+        Fills in the area of the world that is currently visible, called
+        at the start of **update**. If **do_culling** is False or no
+        **gameview** has been set the rect will be inactive and every entity
+        will be drawn.
+
+        Args:
+            rect (CullRect*): The CullRect to fill in.
+        '''
+        rect.active = False
+        if not self.do_culling or self.gameview is None:
+            return 0
+        gameview = self.gameworld.system_manager[self.gameview]
+        rect.x, rect.y, rect.half_w, rect.half_h = gameview.get_view_bounds(
+            self.culling_margin)
+        rect.active = True
+        return 1
+
+    cdef unsigned int next_update_stamp(self):
+        '''
+        Advances and returns **update_stamp**, called at the start of
+        **update**.
+
+        Return:
+            unsigned int: The stamp for this update.
+        '''
+        self.update_stamp += 1
+        return self.update_stamp
+
+    cdef int fill_profile(self, SystemProfile* profile) except -1:
+        '''
+        Extends GameSystem.fill_profile with the **batches_drawn** and
+        **vertices_written** of the last update, and the bytes uploaded by
+        the **batch_manager** since the last profile was filled in. Uploads
+        happen when the canvas is drawn, so these are usually the bytes of
+        the previous frame.
+
+        Args:
+            profile (SystemProfile*): The record being written.
         '''
-        self.update(False, dt)
+        cdef unsigned long long uploaded = (
+            self.batch_manager.get_bytes_uploaded())
+        StaticMemGameSystem.fill_profile(self, profile)
+        profile.batches_drawn = self.batches_drawn
+        profile.vertices_written = self.vertices_written
+        if uploaded >= self.bytes_uploaded:
+            profile.bytes_uploaded = uploaded - self.bytes_uploaded
+        self.bytes_uploaded = uploaded
+        return 1
+
+    def on_dirty_tracking(self, instance, value):
+        if self.batch_manager is not None:
+            self.batch_manager.set_dirty_tracking(value)
+
+    def on_compaction_threshold(self, instance, value):
+        if self.batch_manager is not None:
+            self.batch_manager.compaction_threshold = value
+
+    def on_merge_threshold(self, instance, value):
+        if self.batch_manager is not None:
+            self.batch_manager.merge_threshold = value
 
     def on_shader_source(self, instance, value):
         '''
         Event that sets the canvas.shader.source property when the
         **shader_source** property is set
         '''
-        self.canvas.shader.source = value
+        if not self.headless:
+            self.canvas.shader.source = value
 
     def clear_component(self, unsigned int component_index):
         cdef MemoryZone memory_zone = self.imz_components.memory_zone
@@ -414,6 +566,8 @@ cdef class Renderer(StaticMemGameSystem):
         pointer.batch_id = -1
         pointer.vert_index = -1
         pointer.ind_index = -1
+        pointer.state_valid = 0
+        pointer.change_stamp = 0
 
     cdef void* setup_batch_manager(self, Buffer master_buffer) except NULL:
         '''
@@ -433,6 +587,10 @@ cdef class Renderer(StaticMemGameSystem):
     def allocate(self, Buffer master_buffer, dict reserve_spec):
         super(Renderer, self).allocate(master_buffer, reserve_spec)
         self.setup_batch_manager(master_buffer)
+        self.batch_manager.compaction_threshold = self.compaction_threshold
+        self.batch_manager.merge_threshold = self.merge_threshold
+        self.batch_manager.set_dirty_tracking(self.dirty_tracking)
+        self.batch_manager.headless = self.headless
 
     def get_system_size(self):
         return super(
@@ -464,6 +622,8 @@ cdef class Renderer(StaticMemGameSystem):
         pointer.model = <void*>model
         pointer.renderer = <void*>self
         pointer.texkey = texkey
+        pointer.state_valid = 0
+        pointer.change_stamp = 0
         if render:
             pointer.render = 1
         else:
@@ -500,8 +660,53 @@ cdef class Renderer(StaticMemGameSystem):
         Keep in mind that all RenderComponent will share the same VertMesh if
         they have the same vert_mesh_key or load the same sprite.
         '''
+        cdef int texkey
+        model_key, texkey, render = self.load_model_from_args(args)
+        cdef ModelManager model_manager = self.gameworld.model_manager
+        cdef VertexModel model = model_manager._models[model_key]
+        model_manager.register_entity_with_model(entity_id, self.system_id,
+            model_key)
+        self._init_component(component_index, entity_id, render, model, texkey)
+
+    def init_components(self, list component_indices, list entity_ids,
+        str zone_name, args):
+        '''
+        Initializes many RenderComponent at once. If args is a single dict
+        without 'copy' set, the texture and model are only resolved once and
+        shared by every component, otherwise each component is initialized
+        with **init_component** using args[i].
+        '''
+        if not isinstance(args, dict) or args.get('copy', False):
+            return super(Renderer, self).init_components(component_indices,
+                entity_ids, zone_name, args)
+        cdef int texkey
+        model_key, texkey, render = self.load_model_from_args(args)
+        cdef ModelManager model_manager = self.gameworld.model_manager
+        cdef VertexModel model = model_manager._models[model_key]
+        cdef unsigned int i = 0
+        model_manager.register_entities_with_model(entity_ids, self.system_id,
+            model_key)
+        try:
+            for i in range(len(component_indices)):
+                self._init_component(component_indices[i], entity_ids[i],
+                    render, model, texkey)
+        except:
+            #the components before i were batched, the rest only registered
+            self.remove_components(component_indices[:i])
+            model_manager.unregister_entities_with_model(entity_ids[i:],
+                model._name)
+            raise
+
+    def load_model_from_args(self, dict args):
+        '''
+        Resolves the model and texture described by the args of
+        **init_component**, loading or copying the model if required.
+
+        Return:
+            tuple: (model_key, texkey, render)
+        '''
         cdef float w, h
-        cdef int vert_index_key, texkey
+        cdef int texkey
         cdef bool copy, render
         if 'texture' in args:
             texture_key = args['texture']
@@ -526,10 +731,7 @@ cdef class Renderer(StaticMemGameSystem):
         elif model_key is not None and copy:
             model_key = model_manager.copy_model(model_key,
                 model_name=copy_name)
-        cdef VertexModel model = model_manager._models[model_key]
-        model_manager.register_entity_with_model(entity_id, self.system_id,
-            model_key)
-        self._init_component(component_index, entity_id, render, model, texkey)
+        return model_key, texkey, render
 
     def update(self, force_update, dt):
         '''
@@ -555,18 +757,24 @@ cdef class Renderer(StaticMemGameSystem):
         cdef GLushort* frame_indices
         cdef VertexFormat4F* vertex
         cdef VertexModel model
-        cdef GLushort* model_indices
         cdef VertexFormat4F* model_vertices
         cdef VertexFormat4F model_vertex
         cdef unsigned int used, i, ri, component_count, n, t
         cdef ComponentPointerAggregator entity_components
         cdef BatchManager batch_manager = self.batch_manager
         cdef dict batch_groups = batch_manager.batch_groups
-        cdef CMesh mesh_instruction
         cdef MemoryBlock components_block
         cdef void** component_data
         cdef bint static_rendering = self.static_rendering
 
+        cdef CullRect cull_rect
+        cdef bint track_changes = batch_manager.dirty_tracking
+        cdef unsigned int stamp = self.next_update_stamp()
+        cdef unsigned int frame_stamp = 0
+        cdef DirtyRange index_range
+        cdef unsigned int batches_drawn = 0, vertices_written = 0
+        self.get_cull_rect(&cull_rect)
+
         for batch_key in batch_groups:
             batches = batch_groups[batch_key]
             for batch in batches:
@@ -579,6 +787,10 @@ cdef class Renderer(StaticMemGameSystem):
                     frame_data = <VertexFormat4F*>batch.get_vbo_frame_to_draw()
                     frame_indices = <GLushort*>batch.get_indices_frame_to_draw()
                     index_offset = 0
+                    if track_changes:
+                        frame_stamp = batch.get_frame_stamp()
+                        index_range.start = <unsigned int>-1
+                        index_range.end = 0
                     for t in range(used):
                         ri = t * component_count
                         if component_data[ri] == NULL:
@@ -588,12 +800,22 @@ cdef class Renderer(StaticMemGameSystem):
                         model = <VertexModel>render_comp.model
                         if render_comp.render:
                             pos_comp = <PositionStruct2D*>component_data[ri+1]
+                            if cull_rect.active and not in_view(&cull_rect,
+                                pos_comp.x, pos_comp.y,
+                                model.get_bounding_radius()):
+                                render_comp.state_valid = False
+                                continue
+                            if track_changes and not needs_redraw(render_comp,
+                                model, stamp, frame_stamp, pos_comp.x,
+                                pos_comp.y, 0., 1., 1., NULL):
+                                write_indices(frame_indices, model,
+                                    index_offset, vert_offset, &index_range)
+                                index_offset += model._index_count
+                                continue
                             model_vertices = <VertexFormat4F*>(
                                 model.vertices_block.data)
-                            model_indices = <GLushort*>model.indices_block.data
-                            for i in range(model._index_count):
-                                frame_indices[i+index_offset] = (
-                                    model_indices[i] + vert_offset)
+                            write_indices(frame_indices, model, index_offset,
+                                vert_offset, &index_range)
                             for n in range(model._vertex_count):
                                 vertex = &frame_data[n + vert_offset]
                                 model_vertex = model_vertices[n]
@@ -601,10 +823,19 @@ cdef class Renderer(StaticMemGameSystem):
                                 vertex.pos[1] = pos_comp.y + model_vertex.pos[1]
                                 vertex.uvs[0] = model_vertex.uvs[0]
                                 vertex.uvs[1] = model_vertex.uvs[1]
+                            vertices_written += model._vertex_count
+                            if track_changes:
+                                batch.mark_vertices_dirty(vert_offset,
+                                    model._vertex_count)
                             index_offset += model._index_count
                     batch.set_index_count_for_frame(index_offset)
-                mesh_instruction = batch.mesh_instruction
-                mesh_instruction.flag_update()
+                    batches_drawn += 1
+                    if track_changes:
+                        batch.finish_frame(stamp, index_range.start,
+                            index_range.end)
+                batch.flag_update()
+        self.batches_drawn = batches_drawn
+        self.vertices_written = vertices_written
 
     def remove_component(self, unsigned int component_index):
         cdef IndexedMemoryZone components = self.imz_components
@@ -615,6 +846,66 @@ cdef class Renderer(StaticMemGameSystem):
             pointer.entity_id, (<VertexModel>pointer.model)._name)
         super(Renderer, self).remove_component(component_index)
 
+    def remove_components(self, list component_indices):
+        '''
+        Overrides StaticMemGameSystem's remove_components. Every entity is
+        unbatched through a single **batch_manager**.unbatch_entities call
+        and unregistered from its model once per model before the components
+        are freed. If **remove_component** has been overridden it will be
+        called for each component instead.
+
+        Args:
+            component_indices (list): the component_ids to be removed.
+        '''
+        if type(self).remove_component is not Renderer.remove_component:
+            return super(Renderer, self).remove_components(component_indices)
+        cdef IndexedMemoryZone components = self.imz_components
+        cdef ModelManager model_manager = self.gameworld.model_manager
+        cdef unsigned int count = len(component_indices)
+        cdef unsigned int batched = 0
+        cdef unsigned int i
+        cdef RenderStruct* pointer
+        cdef BatchRemoval* removal
+        cdef VertexModel model
+        cdef dict model_entities = {}
+        cdef list entity_ids
+        if count == 0:
+            return
+        cdef BatchRemoval* removals = <BatchRemoval*>malloc(
+            sizeof(BatchRemoval) * count)
+        if removals == NULL:
+            raise MemoryError()
+        try:
+            for i in range(count):
+                pointer = <RenderStruct*>components.get_pointer(
+                    component_indices[i])
+                model = <VertexModel>pointer.model
+                if pointer.batch_id != <unsigned int>-1:
+                    removal = &removals[batched]
+                    removal.entity_id = pointer.entity_id
+                    removal.batch_id = pointer.batch_id
+                    removal.num_verts = model._vertex_count
+                    removal.num_indices = model._index_count
+                    removal.vert_index = pointer.vert_index
+                    removal.ind_index = pointer.ind_index
+                    pointer.batch_id = -1
+                    pointer.vert_index = -1
+                    pointer.ind_index = -1
+                    batched += 1
+                entity_ids = model_entities.get(model._name)
+                if entity_ids is None:
+                    entity_ids = model_entities[model._name] = []
+                entity_ids.append(pointer.entity_id)
+            self.batch_manager.unbatch_entities(removals, batched)
+        finally:
+            free(removals)
+        for model_name in model_entities:
+            model_manager.unregister_entities_with_model(
+                model_entities[model_name], model_name)
+        if batched > 0 and self.force_update:
+            self.update_trigger()
+        self.free_components(component_indices)
+
     def unbatch_entity(self, unsigned int entity_id):
         '''
         Python accessible function for unbatching the entity, the real work
@@ -701,10 +992,128 @@ cdef class Renderer(StaticMemGameSystem):
         component_data.batch_id = batch_indices[0]
         component_data.vert_index = batch_indices[1]
         component_data.ind_index = batch_indices[2]
+        component_data.state_valid = False
         if self.force_update:
             self.update_trigger()
         return component_data
 
+    def get_snapshot_state(self):
+        '''
+        Extends StaticMemGameSystem.get_snapshot_state with the model name,
+        texture name and whether it was batched for every active component,
+        as the model and renderer pointers and the batches can not be saved
+        directly. The different (model name, texture name) pairs are saved
+        once as JSON followed by an array of the index of the pair of each
+        component. The batches are rebuilt by **set_snapshot_state**.
+
+        Return:
+            tuple: The state of the system.
+        '''
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef RenderStruct* pointer
+        cdef VertexModel model
+        cdef dict name_ids = {}
+        component_indices = array('I', memory_zone.get_active_slots())
+        component_names = array('I')
+        batched = array('B')
+        for component_index in component_indices:
+            pointer = <RenderStruct*>memory_zone.get_pointer(component_index)
+            model = <VertexModel>pointer.model
+            texture_name = None
+            if pointer.texkey != <unsigned int>-1:
+                texture_name = texture_manager.get_texname_from_texkey(
+                    pointer.texkey)
+            names = (model._name, texture_name)
+            if names not in name_ids:
+                name_ids[names] = len(name_ids)
+            component_names.append(name_ids[names])
+            batched.append(pointer.batch_id != <unsigned int>-1)
+        return (super(Renderer, self).get_snapshot_state(),
+            json.dumps(sorted(name_ids, key=name_ids.get)), component_indices,
+            component_names, batched)
+
+    def set_snapshot_state(self, tuple state):
+        '''
+        Restores the result of **get_snapshot_state**. The models, textures
+        and components of the snapshot are checked first, so that a snapshot
+        this renderer can not restore raises a ValueError before anything is
+        changed. Then every batch is cleared and the entities registered
+        with this renderer in the ModelManager's model_register are
+        unregistered, whatever model they are registered with, the component
+        data is restored, the model, renderer and texkey of every component
+        are looked up again by name and the components that were batched are
+        batched again.
+
+        Args:
+            state (tuple): The result of **get_snapshot_state**.
+        '''
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef ModelManager model_manager = self.gameworld.model_manager
+        cdef BatchManager batch_manager = self.batch_manager
+        cdef RenderStruct* pointer
+        cdef VertexModel model
+        cdef dict model_entities = {}
+        cdef dict register
+        cdef list models = []
+        cdef list texkeys = []
+        cdef set active_slots
+        base_state, names, component_indices, component_names, batched = (
+            state)
+        if not (len(component_indices) == len(component_names) == len(
+            batched)):
+            raise ValueError('{} was not snapshot with the same setup'.format(
+                self.system_id))
+        for model_name, texture_name in json.loads(names):
+            if model_name not in model_manager._models:
+                raise ValueError('Model {} is not loaded'.format(model_name))
+            models.append(model_manager._models[model_name])
+            if texture_name is None:
+                texkeys.append(<unsigned int>-1)
+            elif texture_name not in texture_manager.loaded_textures:
+                raise ValueError('Texture {} is not loaded'.format(
+                    texture_name))
+            else:
+                texkeys.append(texture_manager.get_texkey_from_name(
+                    texture_name))
+        active_slots = set(memory_zone.get_state_active_slots(base_state[0]))
+        for component_index, name_id in zip(component_indices,
+            component_names):
+            if component_index not in active_slots:
+                raise ValueError('Component {} is not active'.format(
+                    component_index))
+            if name_id >= len(models):
+                raise ValueError('Invalid model for component {}'.format(
+                    component_index))
+        if len(set(component_indices)) != len(active_slots):
+            raise ValueError('{} was not snapshot with the same setup'.format(
+                self.system_id))
+        for register in model_manager._model_register.values():
+            for entity_id in [entity_id for entity_id in register
+                if register[entity_id] == self.system_id]:
+                del register[entity_id]
+        batch_manager.clear()
+        super(Renderer, self).set_snapshot_state(base_state)
+        for component_index, name_id, batch in zip(component_indices,
+            component_names, batched):
+            pointer = <RenderStruct*>memory_zone.get_pointer(component_index)
+            model = models[name_id]
+            pointer.model = <void*>model
+            pointer.renderer = <void*>self
+            pointer.texkey = texkeys[name_id]
+            pointer.batch_id = -1
+            pointer.vert_index = -1
+            pointer.ind_index = -1
+            pointer.state_valid = 0
+            model_entities.setdefault(model._name, []).append(
+                pointer.entity_id)
+            if batch:
+                self._batch_entity(pointer.entity_id, pointer)
+        for model_name in model_entities:
+            model_manager.register_entities_with_model(
+                model_entities[model_name], self.system_id, model_name)
+        if self.force_update:
+            self.update_trigger()
+
 
 cdef class RotateRenderer(Renderer):
     '''
@@ -753,18 +1162,24 @@ cdef class RotateRenderer(Renderer):
         cdef GLushort* frame_indices
         cdef VertexFormat7F* vertex
         cdef VertexModel model
-        cdef GLushort* model_indices
         cdef VertexFormat4F* model_vertices
         cdef VertexFormat4F model_vertex
         cdef unsigned int used, i, ri, component_count, n, t
         cdef ComponentPointerAggregator entity_components
         cdef BatchManager batch_manager = self.batch_manager
         cdef dict batch_groups = batch_manager.batch_groups
-        cdef CMesh mesh_instruction
         cdef MemoryBlock components_block
         cdef void** component_data
         cdef bint static_rendering = self.static_rendering
 
+        cdef CullRect cull_rect
+        cdef bint track_changes = batch_manager.dirty_tracking
+        cdef unsigned int stamp = self.next_update_stamp()
+        cdef unsigned int frame_stamp = 0
+        cdef DirtyRange index_range
+        cdef unsigned int batches_drawn = 0, vertices_written = 0
+        self.get_cull_rect(&cull_rect)
+
         for batch_key in batch_groups:
             batches = batch_groups[batch_key]
             for batch in batches:
@@ -777,6 +1192,10 @@ cdef class RotateRenderer(Renderer):
                     frame_data = <VertexFormat7F*>batch.get_vbo_frame_to_draw()
                     frame_indices = <GLushort*>batch.get_indices_frame_to_draw()
                     index_offset = 0
+                    if track_changes:
+                        frame_stamp = batch.get_frame_stamp()
+                        index_range.start = <unsigned int>-1
+                        index_range.end = 0
                     for t in range(used):
                         ri = t * component_count
                         if component_data[ri] == NULL:
@@ -787,12 +1206,22 @@ cdef class RotateRenderer(Renderer):
                         if render_comp.render:
                             pos_comp = <PositionStruct2D*>component_data[ri+1]
                             rot_comp = <RotateStruct2D*>component_data[ri+2]
+                            if cull_rect.active and not in_view(&cull_rect,
+                                pos_comp.x, pos_comp.y,
+                                model.get_bounding_radius()):
+                                render_comp.state_valid = False
+                                continue
+                            if track_changes and not needs_redraw(render_comp,
+                                model, stamp, frame_stamp, pos_comp.x,
+                                pos_comp.y, rot_comp.r, 1., 1., NULL):
+                                write_indices(frame_indices, model,
+                                    index_offset, vert_offset, &index_range)
+                                index_offset += model._index_count
+                                continue
                             model_vertices = <VertexFormat4F*>(
                                 model.vertices_block.data)
-                            model_indices = <GLushort*>model.indices_block.data
-                            for i in range(model._index_count):
-                                frame_indices[i+index_offset] = (
-                                    model_indices[i] + vert_offset)
+                            write_indices(frame_indices, model, index_offset,
+                                vert_offset, &index_range)
                             for n in range(model._vertex_count):
                                 vertex = &frame_data[n + vert_offset]
                                 model_vertex = model_vertices[n]
@@ -803,10 +1232,19 @@ cdef class RotateRenderer(Renderer):
                                 vertex.rot = rot_comp.r
                                 vertex.center[0] = pos_comp.x
                                 vertex.center[1] = pos_comp.y
+                            vertices_written += model._vertex_count
+                            if track_changes:
+                                batch.mark_vertices_dirty(vert_offset,
+                                    model._vertex_count)
                             index_offset += model._index_count
                     batch.set_index_count_for_frame(index_offset)
-                mesh_instruction = batch.mesh_instruction
-                mesh_instruction.flag_update()
+                    batches_drawn += 1
+                    if track_changes:
+                        batch.finish_frame(stamp, index_range.start,
+                            index_range.end)
+                batch.flag_update()
+        self.batches_drawn = batches_drawn
+        self.vertices_written = vertices_written
 
 
 cdef class RotateScaleRenderer(RotateRenderer):
@@ -846,18 +1284,24 @@ cdef class RotateScaleRenderer(RotateRenderer):
         cdef GLushort* frame_indices
         cdef VertexFormat7F* vertex
         cdef VertexModel model
-        cdef GLushort* model_indices
         cdef VertexFormat4F* model_vertices
         cdef VertexFormat4F model_vertex
         cdef unsigned int used, i, ri, component_count, n, t
         cdef ComponentPointerAggregator entity_components
         cdef BatchManager batch_manager = self.batch_manager
         cdef dict batch_groups = batch_manager.batch_groups
-        cdef CMesh mesh_instruction
         cdef MemoryBlock components_block
         cdef void** component_data
         cdef bint static_rendering = self.static_rendering
 
+        cdef CullRect cull_rect
+        cdef bint track_changes = batch_manager.dirty_tracking
+        cdef unsigned int stamp = self.next_update_stamp()
+        cdef unsigned int frame_stamp = 0
+        cdef DirtyRange index_range
+        cdef unsigned int batches_drawn = 0, vertices_written = 0
+        self.get_cull_rect(&cull_rect)
+
         for batch_key in batch_groups:
             batches = batch_groups[batch_key]
             for batch in batches:
@@ -870,6 +1314,10 @@ cdef class RotateScaleRenderer(RotateRenderer):
                     frame_data = <VertexFormat7F*>batch.get_vbo_frame_to_draw()
                     frame_indices = <GLushort*>batch.get_indices_frame_to_draw()
                     index_offset = 0
+                    if track_changes:
+                        frame_stamp = batch.get_frame_stamp()
+                        index_range.start = <unsigned int>-1
+                        index_range.end = 0
                     for t in range(used):
                         ri = t * component_count
                         if component_data[ri] == NULL:
@@ -881,12 +1329,24 @@ cdef class RotateScaleRenderer(RotateRenderer):
                             pos_comp = <PositionStruct2D*>component_data[ri+1]
                             rot_comp = <RotateStruct2D*>component_data[ri+2]
                             scale_comp = <ScaleStruct2D*>component_data[ri+3]
+                            if cull_rect.active and not in_view(&cull_rect,
+                                pos_comp.x, pos_comp.y,
+                                model.get_bounding_radius() * max(
+                                fabs(scale_comp.sx), fabs(scale_comp.sy))):
+                                render_comp.state_valid = False
+                                continue
+                            if track_changes and not needs_redraw(render_comp,
+                                model, stamp, frame_stamp, pos_comp.x,
+                                pos_comp.y, rot_comp.r, scale_comp.sx,
+                                scale_comp.sy, NULL):
+                                write_indices(frame_indices, model,
+                                    index_offset, vert_offset, &index_range)
+                                index_offset += model._index_count
+                                continue
                             model_vertices = <VertexFormat4F*>(
                                 model.vertices_block.data)
-                            model_indices = <GLushort*>model.indices_block.data
-                            for i in range(model._index_count):
-                                frame_indices[i+index_offset] = (
-                                    model_indices[i] + vert_offset)
+                            write_indices(frame_indices, model, index_offset,
+                                vert_offset, &index_range)
                             for n in range(model._vertex_count):
                                 vertex = &frame_data[n + vert_offset]
                                 model_vertex = model_vertices[n]
@@ -897,10 +1357,19 @@ cdef class RotateScaleRenderer(RotateRenderer):
                                 vertex.rot = rot_comp.r
                                 vertex.center[0] = pos_comp.x
                                 vertex.center[1] = pos_comp.y
+                            vertices_written += model._vertex_count
+                            if track_changes:
+                                batch.mark_vertices_dirty(vert_offset,
+                                    model._vertex_count)
                             index_offset += model._index_count
                     batch.set_index_count_for_frame(index_offset)
-                mesh_instruction = batch.mesh_instruction
-                mesh_instruction.flag_update()
+                    batches_drawn += 1
+                    if track_changes:
+                        batch.finish_frame(stamp, index_range.start,
+                            index_range.end)
+                batch.flag_update()
+        self.batches_drawn = batches_drawn
+        self.vertices_written = vertices_written
                 
 
 
@@ -954,18 +1423,24 @@ cdef class RotateColorRenderer(Renderer):
         cdef VertexFormat7F4UB* vertex
         cdef ColorStruct* color_comp
         cdef VertexModel model
-        cdef GLushort* model_indices
         cdef VertexFormat4F* model_vertices
         cdef VertexFormat4F model_vertex
         cdef unsigned int used, i, ri, component_count, n, t
         cdef ComponentPointerAggregator entity_components
         cdef BatchManager batch_manager = self.batch_manager
         cdef dict batch_groups = batch_manager.batch_groups
-        cdef CMesh mesh_instruction
         cdef MemoryBlock components_block
         cdef void** component_data
         cdef bint static_rendering = self.static_rendering
 
+        cdef CullRect cull_rect
+        cdef bint track_changes = batch_manager.dirty_tracking
+        cdef unsigned int stamp = self.next_update_stamp()
+        cdef unsigned int frame_stamp = 0
+        cdef DirtyRange index_range
+        cdef unsigned int batches_drawn = 0, vertices_written = 0
+        self.get_cull_rect(&cull_rect)
+
         for batch_key in batch_groups:
             batches = batch_groups[batch_key]
             for batch in batches:
@@ -978,6 +1453,10 @@ cdef class RotateColorRenderer(Renderer):
                     frame_data = <VertexFormat7F4UB*>batch.get_vbo_frame_to_draw()
                     frame_indices = <GLushort*>batch.get_indices_frame_to_draw()
                     index_offset = 0
+                    if track_changes:
+                        frame_stamp = batch.get_frame_stamp()
+                        index_range.start = <unsigned int>-1
+                        index_range.end = 0
                     for t in range(used):
                         ri = t * component_count
                         if component_data[ri] == NULL:
@@ -989,12 +1468,23 @@ cdef class RotateColorRenderer(Renderer):
                             pos_comp = <PositionStruct2D*>component_data[ri+1]
                             rot_comp = <RotateStruct2D*>component_data[ri+2]
                             color_comp = <ColorStruct*>component_data[ri+3]
+                            if cull_rect.active and not in_view(&cull_rect,
+                                pos_comp.x, pos_comp.y,
+                                model.get_bounding_radius()):
+                                render_comp.state_valid = False
+                                continue
+                            if track_changes and not needs_redraw(render_comp,
+                                model, stamp, frame_stamp, pos_comp.x,
+                                pos_comp.y, rot_comp.r, 1., 1.,
+                                color_comp.color):
+                                write_indices(frame_indices, model,
+                                    index_offset, vert_offset, &index_range)
+                                index_offset += model._index_count
+                                continue
                             model_vertices = <VertexFormat4F*>(
                                 model.vertices_block.data)
-                            model_indices = <GLushort*>model.indices_block.data
-                            for i in range(model._index_count):
-                                frame_indices[i+index_offset] = (
-                                    model_indices[i] + vert_offset)
+                            write_indices(frame_indices, model, index_offset,
+                                vert_offset, &index_range)
                             for n in range(model._vertex_count):
                                 vertex = &frame_data[n + vert_offset]
                                 model_vertex = model_vertices[n]
@@ -1009,11 +1499,19 @@ cdef class RotateColorRenderer(Renderer):
                                 vertex.v_color[1] = color_comp.color[1]
                                 vertex.v_color[2] = color_comp.color[2]
                                 vertex.v_color[3] = color_comp.color[3]
-
+                            vertices_written += model._vertex_count
+                            if track_changes:
+                                batch.mark_vertices_dirty(vert_offset,
+                                    model._vertex_count)
                             index_offset += model._index_count
                     batch.set_index_count_for_frame(index_offset)
-                mesh_instruction = batch.mesh_instruction
-                mesh_instruction.flag_update()
+                    batches_drawn += 1
+                    if track_changes:
+                        batch.finish_frame(stamp, index_range.start,
+                            index_range.end)
+                batch.flag_update()
+        self.batches_drawn = batches_drawn
+        self.vertices_written = vertices_written
 
 
 cdef class RotateColorScaleRenderer(RotateColorRenderer):
@@ -1056,18 +1554,24 @@ cdef class RotateColorScaleRenderer(RotateColorRenderer):
         cdef VertexFormat7F4UB* vertex
         cdef ColorStruct* color_comp
         cdef VertexModel model
-        cdef GLushort* model_indices
         cdef VertexFormat4F* model_vertices
         cdef VertexFormat4F model_vertex
         cdef unsigned int used, i, ri, component_count, n, t
         cdef ComponentPointerAggregator entity_components
         cdef BatchManager batch_manager = self.batch_manager
         cdef dict batch_groups = batch_manager.batch_groups
-        cdef CMesh mesh_instruction
         cdef MemoryBlock components_block
         cdef void** component_data
         cdef bint static_rendering = self.static_rendering
 
+        cdef CullRect cull_rect
+        cdef bint track_changes = batch_manager.dirty_tracking
+        cdef unsigned int stamp = self.next_update_stamp()
+        cdef unsigned int frame_stamp = 0
+        cdef DirtyRange index_range
+        cdef unsigned int batches_drawn = 0, vertices_written = 0
+        self.get_cull_rect(&cull_rect)
+
         for batch_key in batch_groups:
             batches = batch_groups[batch_key]
             for batch in batches:
@@ -1080,6 +1584,10 @@ cdef class RotateColorScaleRenderer(RotateColorRenderer):
                     frame_data = <VertexFormat7F4UB*>batch.get_vbo_frame_to_draw()
                     frame_indices = <GLushort*>batch.get_indices_frame_to_draw()
                     index_offset = 0
+                    if track_changes:
+                        frame_stamp = batch.get_frame_stamp()
+                        index_range.start = <unsigned int>-1
+                        index_range.end = 0
                     for t in range(used):
                         ri = t * component_count
                         if component_data[ri] == NULL:
@@ -1092,12 +1600,24 @@ cdef class RotateColorScaleRenderer(RotateColorRenderer):
                             rot_comp = <RotateStruct2D*>component_data[ri+2]
                             color_comp = <ColorStruct*>component_data[ri+3]
                             scale_comp = <ScaleStruct2D*>component_data[ri+4]
+                            if cull_rect.active and not in_view(&cull_rect,
+                                pos_comp.x, pos_comp.y,
+                                model.get_bounding_radius() * max(
+                                fabs(scale_comp.sx), fabs(scale_comp.sy))):
+                                render_comp.state_valid = False
+                                continue
+                            if track_changes and not needs_redraw(render_comp,
+                                model, stamp, frame_stamp, pos_comp.x,
+                                pos_comp.y, rot_comp.r, scale_comp.sx,
+                                scale_comp.sy, color_comp.color):
+                                write_indices(frame_indices, model,
+                                    index_offset, vert_offset, &index_range)
+                                index_offset += model._index_count
+                                continue
                             model_vertices = <VertexFormat4F*>(
                                 model.vertices_block.data)
-                            model_indices = <GLushort*>model.indices_block.data
-                            for i in range(model._index_count):
-                                frame_indices[i+index_offset] = (
-                                    model_indices[i] + vert_offset)
+                            write_indices(frame_indices, model, index_offset,
+                                vert_offset, &index_range)
                             for n in range(model._vertex_count):
                                 vertex = &frame_data[n + vert_offset]
                                 model_vertex = model_vertices[n]
@@ -1112,11 +1632,19 @@ cdef class RotateColorScaleRenderer(RotateColorRenderer):
                                 vertex.v_color[1] = color_comp.color[1]
                                 vertex.v_color[2] = color_comp.color[2]
                                 vertex.v_color[3] = color_comp.color[3]
-
+                            vertices_written += model._vertex_count
+                            if track_changes:
+                                batch.mark_vertices_dirty(vert_offset,
+                                    model._vertex_count)
                             index_offset += model._index_count
                     batch.set_index_count_for_frame(index_offset)
-                mesh_instruction = batch.mesh_instruction
-                mesh_instruction.flag_update()
+                    batches_drawn += 1
+                    if track_changes:
+                        batch.finish_frame(stamp, index_range.start,
+                            index_range.end)
+                batch.flag_update()
+        self.batches_drawn = batches_drawn
+        self.vertices_written = vertices_written
     
 
 
@@ -1162,19 +1690,25 @@ cdef class ColorRenderer(Renderer):
         cdef GLushort* frame_indices
         cdef VertexFormat4F4UB* vertex
         cdef VertexModel model
-        cdef GLushort* model_indices
         cdef VertexFormat4F* model_vertices
         cdef VertexFormat4F model_vertex
         cdef unsigned int used, i, ri, component_count, n, t
         cdef ComponentPointerAggregator entity_components
         cdef BatchManager batch_manager = self.batch_manager
         cdef dict batch_groups = batch_manager.batch_groups
-        cdef CMesh mesh_instruction
         cdef MemoryBlock components_block
         cdef void** component_data
         cdef bint static_rendering = self.static_rendering
         cdef int ii
 
+        cdef CullRect cull_rect
+        cdef bint track_changes = batch_manager.dirty_tracking
+        cdef unsigned int stamp = self.next_update_stamp()
+        cdef unsigned int frame_stamp = 0
+        cdef DirtyRange index_range
+        cdef unsigned int batches_drawn = 0, vertices_written = 0
+        self.get_cull_rect(&cull_rect)
+
         for batch_key in batch_groups:
             batches = batch_groups[batch_key]
             for batch in batches:
@@ -1187,6 +1721,10 @@ cdef class ColorRenderer(Renderer):
                     frame_data = <VertexFormat4F4UB*>batch.get_vbo_frame_to_draw()
                     frame_indices = <GLushort*>batch.get_indices_frame_to_draw()
                     index_offset = 0
+                    if track_changes:
+                        frame_stamp = batch.get_frame_stamp()
+                        index_range.start = <unsigned int>-1
+                        index_range.end = 0
                     for t in range(used):
                         ri = t * component_count
                         if component_data[ri] == NULL:
@@ -1200,12 +1738,22 @@ cdef class ColorRenderer(Renderer):
                                 ri+1]
                             color_comp = <ColorStruct*>component_data[
                                 ri+2]
+                            if cull_rect.active and not in_view(&cull_rect,
+                                pos_comp.x, pos_comp.y,
+                                model.get_bounding_radius()):
+                                render_comp.state_valid = False
+                                continue
+                            if track_changes and not needs_redraw(render_comp,
+                                model, stamp, frame_stamp, pos_comp.x,
+                                pos_comp.y, 0., 1., 1., color_comp.color):
+                                write_indices(frame_indices, model,
+                                    index_offset, vert_offset, &index_range)
+                                index_offset += model._index_count
+                                continue
                             model_vertices = <VertexFormat4F*>(
                                 model.vertices_block.data)
-                            model_indices = <GLushort*>model.indices_block.data
-                            for i in range(model._index_count):
-                                frame_indices[i+index_offset] = (
-                                    model_indices[i] + vert_offset)
+                            write_indices(frame_indices, model, index_offset,
+                                vert_offset, &index_range)
                             for n in range(model._vertex_count):
                                 vertex = &frame_data[n + vert_offset]
                                 model_vertex = model_vertices[n]
@@ -1215,10 +1763,19 @@ cdef class ColorRenderer(Renderer):
                                 vertex.uvs[1] = model_vertex.uvs[1]
                                 for ii in range(4):
                                     vertex.v_color[ii] = color_comp.color[ii]
+                            vertices_written += model._vertex_count
+                            if track_changes:
+                                batch.mark_vertices_dirty(vert_offset,
+                                    model._vertex_count)
                             index_offset += model._index_count
                     batch.set_index_count_for_frame(index_offset)
-                mesh_instruction = batch.mesh_instruction
-                mesh_instruction.flag_update()
+                    batches_drawn += 1
+                    if track_changes:
+                        batch.finish_frame(stamp, index_range.start,
+                            index_range.end)
+                batch.flag_update()
+        self.batches_drawn = batches_drawn
+        self.vertices_written = vertices_written
 
 cdef unsigned char blend_integer_colors(unsigned char color1,
                                         unsigned char color2):
@@ -1265,18 +1822,24 @@ cdef class PolyRenderer(Renderer):
         cdef GLushort* frame_indices
         cdef VertexFormat2F4UB* vertex
         cdef VertexModel model
-        cdef GLushort* model_indices
         cdef VertexFormat2F4UB* model_vertices
         cdef VertexFormat2F4UB model_vertex
         cdef unsigned int used, i, ri, component_count, n
         cdef ComponentPointerAggregator entity_components
         cdef BatchManager batch_manager = self.batch_manager
         cdef dict batch_groups = batch_manager.batch_groups
-        cdef CMesh mesh_instruction
         cdef MemoryBlock components_block
         cdef void** component_data
         cdef bint static_rendering = self.static_rendering
 
+        cdef CullRect cull_rect
+        cdef bint track_changes = batch_manager.dirty_tracking
+        cdef unsigned int stamp = self.next_update_stamp()
+        cdef unsigned int frame_stamp = 0
+        cdef DirtyRange index_range
+        cdef unsigned int batches_drawn = 0, vertices_written = 0
+        self.get_cull_rect(&cull_rect)
+
         for batch_key in batch_groups:
             batches = batch_groups[batch_key]
             for batch in batches:
@@ -1289,6 +1852,10 @@ cdef class PolyRenderer(Renderer):
                     frame_data = <VertexFormat2F4UB*>batch.get_vbo_frame_to_draw()
                     frame_indices = <GLushort*>batch.get_indices_frame_to_draw()
                     index_offset = 0
+                    if track_changes:
+                        frame_stamp = batch.get_frame_stamp()
+                        index_range.start = <unsigned int>-1
+                        index_range.end = 0
                     for i in range(used):
                         ri = i * component_count
                         if component_data[ri] == NULL:
@@ -1299,12 +1866,22 @@ cdef class PolyRenderer(Renderer):
                         if render_comp.render:
                             pos_comp = <PositionStruct2D*>component_data[
                                 ri+1]
+                            if cull_rect.active and not in_view(&cull_rect,
+                                pos_comp.x, pos_comp.y,
+                                model.get_bounding_radius()):
+                                render_comp.state_valid = False
+                                continue
+                            if track_changes and not needs_redraw(render_comp,
+                                model, stamp, frame_stamp, pos_comp.x,
+                                pos_comp.y, 0., 1., 1., NULL):
+                                write_indices(frame_indices, model,
+                                    index_offset, vert_offset, &index_range)
+                                index_offset += model._index_count
+                                continue
                             model_vertices = <VertexFormat2F4UB*>(
                                 model.vertices_block.data)
-                            model_indices = <GLushort*>model.indices_block.data
-                            for i in range(model._index_count):
-                                frame_indices[i+index_offset] = (
-                                    model_indices[i] + vert_offset)
+                            write_indices(frame_indices, model, index_offset,
+                                vert_offset, &index_range)
                             for n in range(model._vertex_count):
                                 vertex = &frame_data[n + vert_offset]
                                 model_vertex = model_vertices[n]
@@ -1314,10 +1891,19 @@ cdef class PolyRenderer(Renderer):
                                 vertex.v_color[1] = model_vertex.v_color[1]
                                 vertex.v_color[2] = model_vertex.v_color[2]
                                 vertex.v_color[3] = model_vertex.v_color[3]
+                            vertices_written += model._vertex_count
+                            if track_changes:
+                                batch.mark_vertices_dirty(vert_offset,
+                                    model._vertex_count)
                             index_offset += model._index_count
                     batch.set_index_count_for_frame(index_offset)
-                mesh_instruction = batch.mesh_instruction
-                mesh_instruction.flag_update()
+                    batches_drawn += 1
+                    if track_changes:
+                        batch.finish_frame(stamp, index_range.start,
+                            index_range.end)
+                batch.flag_update()
+        self.batches_drawn = batches_drawn
+        self.vertices_written = vertices_written
 
 
 cdef class RotatePolyRenderer(Renderer):
@@ -1363,18 +1949,24 @@ cdef class RotatePolyRenderer(Renderer):
         cdef GLushort* frame_indices
         cdef VertexFormat5F4UB* vertex
         cdef VertexModel model
-        cdef GLushort* model_indices
         cdef VertexFormat2F4UB* model_vertices
         cdef VertexFormat2F4UB model_vertex
         cdef unsigned int used, i, ri, component_count, n
         cdef ComponentPointerAggregator entity_components
         cdef BatchManager batch_manager = self.batch_manager
         cdef dict batch_groups = batch_manager.batch_groups
-        cdef CMesh mesh_instruction
         cdef MemoryBlock components_block
         cdef void** component_data
         cdef bint static_rendering = self.static_rendering
         
+        cdef CullRect cull_rect
+        cdef bint track_changes = batch_manager.dirty_tracking
+        cdef unsigned int stamp = self.next_update_stamp()
+        cdef unsigned int frame_stamp = 0
+        cdef DirtyRange index_range
+        cdef unsigned int batches_drawn = 0, vertices_written = 0
+        self.get_cull_rect(&cull_rect)
+
         for batch_key in batch_groups:
             batches = batch_groups[batch_key]
             for batch in batches:
@@ -1387,6 +1979,10 @@ cdef class RotatePolyRenderer(Renderer):
                     frame_data = <VertexFormat5F4UB*>batch.get_vbo_frame_to_draw()
                     frame_indices = <GLushort*>batch.get_indices_frame_to_draw()
                     index_offset = 0
+                    if track_changes:
+                        frame_stamp = batch.get_frame_stamp()
+                        index_range.start = <unsigned int>-1
+                        index_range.end = 0
                     for i in range(used):
                         ri = i * component_count
                         if component_data[ri] == NULL:
@@ -1399,12 +1995,22 @@ cdef class RotatePolyRenderer(Renderer):
                                 ri+1]
                             rot_comp = <RotateStruct2D*>component_data[
                                 ri+2]
+                            if cull_rect.active and not in_view(&cull_rect,
+                                pos_comp.x, pos_comp.y,
+                                model.get_bounding_radius()):
+                                render_comp.state_valid = False
+                                continue
+                            if track_changes and not needs_redraw(render_comp,
+                                model, stamp, frame_stamp, pos_comp.x,
+                                pos_comp.y, rot_comp.r, 1., 1., NULL):
+                                write_indices(frame_indices, model,
+                                    index_offset, vert_offset, &index_range)
+                                index_offset += model._index_count
+                                continue
                             model_vertices = <VertexFormat2F4UB*>(
                                 model.vertices_block.data)
-                            model_indices = <GLushort*>model.indices_block.data
-                            for i in range(model._index_count):
-                                frame_indices[i+index_offset] = (
-                                    model_indices[i] + vert_offset)
+                            write_indices(frame_indices, model, index_offset,
+                                vert_offset, &index_range)
                             for n in range(model._vertex_count):
                                 vertex = &frame_data[n + vert_offset]
                                 model_vertex = model_vertices[n]
@@ -1417,10 +2023,19 @@ cdef class RotatePolyRenderer(Renderer):
                                 vertex.v_color[1] = model_vertex.v_color[1]
                                 vertex.v_color[2] = model_vertex.v_color[2]
                                 vertex.v_color[3] = model_vertex.v_color[3]
+                            vertices_written += model._vertex_count
+                            if track_changes:
+                                batch.mark_vertices_dirty(vert_offset,
+                                    model._vertex_count)
                             index_offset += model._index_count
                     batch.set_index_count_for_frame(index_offset)
-                mesh_instruction = batch.mesh_instruction
-                mesh_instruction.flag_update()
+                    batches_drawn += 1
+                    if track_changes:
+                        batch.finish_frame(stamp, index_range.start,
+                            index_range.end)
+                batch.flag_update()
+        self.batches_drawn = batches_drawn
+        self.vertices_written = vertices_written
 
 
 cdef class RotateColorScalePolyRenderer(RotatePolyRenderer):
@@ -1458,19 +2073,25 @@ cdef class RotateColorScalePolyRenderer(RotatePolyRenderer):
         cdef GLushort* frame_indices
         cdef VertexFormat5F4UB* vertex
         cdef VertexModel model
-        cdef GLushort* model_indices
         cdef VertexFormat2F4UB* model_vertices
         cdef VertexFormat2F4UB model_vertex
         cdef unsigned int used, i, ri, component_count, n
         cdef ComponentPointerAggregator entity_components
         cdef BatchManager batch_manager = self.batch_manager
         cdef dict batch_groups = batch_manager.batch_groups
-        cdef CMesh mesh_instruction
         cdef MemoryBlock components_block
         cdef void** component_data
         cdef bint static_rendering = self.static_rendering
         cdef int ii
         
+        cdef CullRect cull_rect
+        cdef bint track_changes = batch_manager.dirty_tracking
+        cdef unsigned int stamp = self.next_update_stamp()
+        cdef unsigned int frame_stamp = 0
+        cdef DirtyRange index_range
+        cdef unsigned int batches_drawn = 0, vertices_written = 0
+        self.get_cull_rect(&cull_rect)
+
         for batch_key in batch_groups:
             batches = batch_groups[batch_key]
             for batch in batches:
@@ -1483,6 +2104,10 @@ cdef class RotateColorScalePolyRenderer(RotatePolyRenderer):
                     frame_data = <VertexFormat5F4UB*>batch.get_vbo_frame_to_draw()
                     frame_indices = <GLushort*>batch.get_indices_frame_to_draw()
                     index_offset = 0
+                    if track_changes:
+                        frame_stamp = batch.get_frame_stamp()
+                        index_range.start = <unsigned int>-1
+                        index_range.end = 0
                     for i in range(used):
                         ri = i * component_count
                         if component_data[ri] == NULL:
@@ -1495,12 +2120,24 @@ cdef class RotateColorScalePolyRenderer(RotatePolyRenderer):
                             rot_comp = <RotateStruct2D*>component_data[ri+2]
                             color_comp = <ColorStruct*>component_data[ri+3]
                             scale_comp = <ScaleStruct2D*>component_data[ri+4]
+                            if cull_rect.active and not in_view(&cull_rect,
+                                pos_comp.x, pos_comp.y,
+                                model.get_bounding_radius() * max(
+                                fabs(scale_comp.sx), fabs(scale_comp.sy))):
+                                render_comp.state_valid = False
+                                continue
+                            if track_changes and not needs_redraw(render_comp,
+                                model, stamp, frame_stamp, pos_comp.x,
+                                pos_comp.y, rot_comp.r, scale_comp.sx,
+                                scale_comp.sy, color_comp.color):
+                                write_indices(frame_indices, model,
+                                    index_offset, vert_offset, &index_range)
+                                index_offset += model._index_count
+                                continue
                             model_vertices = <VertexFormat2F4UB*>(
                                 model.vertices_block.data)
-                            model_indices = <GLushort*>model.indices_block.data
-                            for i in range(model._index_count):
-                                frame_indices[i+index_offset] = (
-                                    model_indices[i] + vert_offset)
+                            write_indices(frame_indices, model, index_offset,
+                                vert_offset, &index_range)
                             for n in range(model._vertex_count):
                                 vertex = &frame_data[n + vert_offset]
                                 model_vertex = model_vertices[n]
@@ -1513,10 +2150,19 @@ cdef class RotateColorScalePolyRenderer(RotatePolyRenderer):
                                     vertex.v_color[ii] = blend_integer_colors(
                                         model_vertex.v_color[ii],
                                         color_comp.color[ii]) 
+                            vertices_written += model._vertex_count
+                            if track_changes:
+                                batch.mark_vertices_dirty(vert_offset,
+                                    model._vertex_count)
                             index_offset += model._index_count
                     batch.set_index_count_for_frame(index_offset)
-                mesh_instruction = batch.mesh_instruction
-                mesh_instruction.flag_update()
+                    batches_drawn += 1
+                    if track_changes:
+                        batch.finish_frame(stamp, index_range.start,
+                            index_range.end)
+                batch.flag_update()
+        self.batches_drawn = batches_drawn
+        self.vertices_written = vertices_written
 
 
 cdef class ColorPolyRenderer(Renderer):
@@ -1560,18 +2206,24 @@ cdef class ColorPolyRenderer(Renderer):
         cdef GLushort* frame_indices
         cdef VertexFormat2F4UB* vertex
         cdef VertexModel model
-        cdef GLushort* model_indices
         cdef VertexFormat2F4UB* model_vertices
         cdef VertexFormat2F4UB model_vertex
         cdef unsigned int used, i, ri, component_count, n
         cdef ComponentPointerAggregator entity_components
         cdef BatchManager batch_manager = self.batch_manager
         cdef dict batch_groups = batch_manager.batch_groups
-        cdef CMesh mesh_instruction
         cdef MemoryBlock components_block
         cdef void** component_data
         cdef bint static_rendering = self.static_rendering
         
+        cdef CullRect cull_rect
+        cdef bint track_changes = batch_manager.dirty_tracking
+        cdef unsigned int stamp = self.next_update_stamp()
+        cdef unsigned int frame_stamp = 0
+        cdef DirtyRange index_range
+        cdef unsigned int batches_drawn = 0, vertices_written = 0
+        self.get_cull_rect(&cull_rect)
+
         for batch_key in batch_groups:
             batches = batch_groups[batch_key]
             for batch in batches:
@@ -1584,6 +2236,10 @@ cdef class ColorPolyRenderer(Renderer):
                     frame_data = <VertexFormat2F4UB*>batch.get_vbo_frame_to_draw()
                     frame_indices = <GLushort*>batch.get_indices_frame_to_draw()
                     index_offset = 0
+                    if track_changes:
+                        frame_stamp = batch.get_frame_stamp()
+                        index_range.start = <unsigned int>-1
+                        index_range.end = 0
                     for i in range(used):
                         ri = i * component_count
                         if component_data[ri] == NULL:
@@ -1596,12 +2252,22 @@ cdef class ColorPolyRenderer(Renderer):
                                 ri+1]
                             color_comp = <ColorStruct*>component_data[
                                 ri+2]
+                            if cull_rect.active and not in_view(&cull_rect,
+                                pos_comp.x, pos_comp.y,
+                                model.get_bounding_radius()):
+                                render_comp.state_valid = False
+                                continue
+                            if track_changes and not needs_redraw(render_comp,
+                                model, stamp, frame_stamp, pos_comp.x,
+                                pos_comp.y, 0., 1., 1., color_comp.color):
+                                write_indices(frame_indices, model,
+                                    index_offset, vert_offset, &index_range)
+                                index_offset += model._index_count
+                                continue
                             model_vertices = <VertexFormat2F4UB*>(
                                 model.vertices_block.data)
-                            model_indices = <GLushort*>model.indices_block.data
-                            for i in range(model._index_count):
-                                frame_indices[i+index_offset] = (
-                                    model_indices[i] + vert_offset)
+                            write_indices(frame_indices, model, index_offset,
+                                vert_offset, &index_range)
                             for n in range(model._vertex_count):
                                 vertex = &frame_data[n + vert_offset]
                                 model_vertex = model_vertices[n]
@@ -1619,10 +2285,19 @@ cdef class ColorPolyRenderer(Renderer):
                                 vertex.v_color[3] = blend_integer_colors(
                                     model_vertex.v_color[3],
                                     color_comp.color[3]) 
+                            vertices_written += model._vertex_count
+                            if track_changes:
+                                batch.mark_vertices_dirty(vert_offset,
+                                    model._vertex_count)
                             index_offset += model._index_count
                     batch.set_index_count_for_frame(index_offset)
-                mesh_instruction = batch.mesh_instruction
-                mesh_instruction.flag_update()
+                    batches_drawn += 1
+                    if track_changes:
+                        batch.finish_frame(stamp, index_range.start,
+                            index_range.end)
+                batch.flag_update()
+        self.batches_drawn = batches_drawn
+        self.vertices_written = vertices_written
 
 cdef class ScaledPolyRenderer(Renderer):
     '''
@@ -1666,18 +2341,24 @@ cdef class ScaledPolyRenderer(Renderer):
         cdef GLushort* frame_indices
         cdef VertexFormat2F4UB* vertex
         cdef VertexModel model
-        cdef GLushort* model_indices
         cdef VertexFormat2F4UB* model_vertices
         cdef VertexFormat2F4UB model_vertex
         cdef unsigned int used, i, ri, component_count, n
         cdef ComponentPointerAggregator entity_components
         cdef BatchManager batch_manager = self.batch_manager
         cdef dict batch_groups = batch_manager.batch_groups
-        cdef CMesh mesh_instruction
         cdef MemoryBlock components_block
         cdef void** component_data
         cdef bint static_rendering = self.static_rendering
         
+        cdef CullRect cull_rect
+        cdef bint track_changes = batch_manager.dirty_tracking
+        cdef unsigned int stamp = self.next_update_stamp()
+        cdef unsigned int frame_stamp = 0
+        cdef DirtyRange index_range
+        cdef unsigned int batches_drawn = 0, vertices_written = 0
+        self.get_cull_rect(&cull_rect)
+
         for batch_key in batch_groups:
             batches = batch_groups[batch_key]
             for batch in batches:
@@ -1690,6 +2371,10 @@ cdef class ScaledPolyRenderer(Renderer):
                     frame_data = <VertexFormat2F4UB*>batch.get_vbo_frame_to_draw()
                     frame_indices = <GLushort*>batch.get_indices_frame_to_draw()
                     index_offset = 0
+                    if track_changes:
+                        frame_stamp = batch.get_frame_stamp()
+                        index_range.start = <unsigned int>-1
+                        index_range.end = 0
                     for i in range(used):
                         ri = i * component_count
                         if component_data[ri] == NULL:
@@ -1702,12 +2387,24 @@ cdef class ScaledPolyRenderer(Renderer):
                             scale_comp = <ScaleStruct2D*>component_data[ri+2]
                             color_comp = <ColorStruct*>component_data[
                                 ri+3]
+                            if cull_rect.active and not in_view(&cull_rect,
+                                pos_comp.x, pos_comp.y,
+                                model.get_bounding_radius() * max(
+                                fabs(scale_comp.sx), fabs(scale_comp.sy))):
+                                render_comp.state_valid = False
+                                continue
+                            if track_changes and not needs_redraw(render_comp,
+                                model, stamp, frame_stamp, pos_comp.x,
+                                pos_comp.y, 0., scale_comp.sx, scale_comp.sy,
+                                color_comp.color):
+                                write_indices(frame_indices, model,
+                                    index_offset, vert_offset, &index_range)
+                                index_offset += model._index_count
+                                continue
                             model_vertices = <VertexFormat2F4UB*>(
                                 model.vertices_block.data)
-                            model_indices = <GLushort*>model.indices_block.data
-                            for i in range(model._index_count):
-                                frame_indices[i+index_offset] = (
-                                    model_indices[i] + vert_offset)
+                            write_indices(frame_indices, model, index_offset,
+                                vert_offset, &index_range)
                             for n in range(model._vertex_count):
                                 vertex = &frame_data[n + vert_offset]
                                 model_vertex = model_vertices[n]
@@ -1729,15 +2426,30 @@ cdef class ScaledPolyRenderer(Renderer):
                                 vertex.v_color[3] = blend_integer_colors(
                                     model_vertex.v_color[3],
                                     color_comp.color[3]) 
+                            vertices_written += model._vertex_count
+                            if track_changes:
+                                batch.mark_vertices_dirty(vert_offset,
+                                    model._vertex_count)
                             index_offset += model._index_count
                     batch.set_index_count_for_frame(index_offset)
-                mesh_instruction = batch.mesh_instruction
-                mesh_instruction.flag_update()
+                    batches_drawn += 1
+                    if track_changes:
+                        batch.finish_frame(stamp, index_range.start,
+                            index_range.end)
+                batch.flag_update()
+        self.batches_drawn = batches_drawn
+        self.vertices_written = vertices_written
 
 
 cdef class LerpScaledPolyRenderer(Renderer):
     '''
-    Processing Depends On: PositionSystem2D, PolyRenderer
+    Processing Depends On: PositionSystem2D, LastPositionSystem2D,
+    ScaleSystem2D, ColorSystem, LerpScaledPolyRenderer
+
+    Draws each entity between its 'last_position' and its 'position',
+    using the GameWorld's **interpolation_alpha**. Use it with a GameWorld
+    whose **fixed_timestep** is True and a LastPositionSystem2D, so that
+    motion simulated at a fixed rate is drawn smoothly at any frame rate.
 
     The renderer draws with the VertexFormat2F4UB:
 
@@ -1779,19 +2491,24 @@ cdef class LerpScaledPolyRenderer(Renderer):
         cdef GLushort* frame_indices
         cdef VertexFormat2F4UB* vertex
         cdef VertexModel model
-        cdef GLushort* model_indices
         cdef VertexFormat2F4UB* model_vertices
         cdef VertexFormat2F4UB model_vertex
         cdef unsigned int used, i, ri, component_count, n
         cdef ComponentPointerAggregator entity_components
         cdef BatchManager batch_manager = self.batch_manager
         cdef dict batch_groups = batch_manager.batch_groups
-        cdef CMesh mesh_instruction
         cdef MemoryBlock components_block
         cdef void** component_data
         cdef bint static_rendering = self.static_rendering
-        cdef float update_speed = self.gameworld.update_time
-        cdef float leftover = (dt - update_speed)/update_speed
+        cdef float leftover = self.gameworld.interpolation_alpha
+        cdef CullRect cull_rect
+        cdef bint track_changes = batch_manager.dirty_tracking
+        cdef unsigned int stamp = self.next_update_stamp()
+        cdef unsigned int frame_stamp = 0
+        cdef DirtyRange index_range
+        cdef unsigned int batches_drawn = 0, vertices_written = 0
+        self.get_cull_rect(&cull_rect)
+
         for batch_key in batch_groups:
             batches = batch_groups[batch_key]
             for batch in batches:
@@ -1804,6 +2521,10 @@ cdef class LerpScaledPolyRenderer(Renderer):
                     frame_data = <VertexFormat2F4UB*>batch.get_vbo_frame_to_draw()
                     frame_indices = <GLushort*>batch.get_indices_frame_to_draw()
                     index_offset = 0
+                    if track_changes:
+                        frame_stamp = batch.get_frame_stamp()
+                        index_range.start = <unsigned int>-1
+                        index_range.end = 0
                     for i in range(used):
                         ri = i * component_count
                         if component_data[ri] == NULL:
@@ -1818,12 +2539,26 @@ cdef class LerpScaledPolyRenderer(Renderer):
                             scale_comp = <ScaleStruct2D*>component_data[ri+3]
                             color_comp = <ColorStruct*>(
                                 component_data[ri+4])
+                            if cull_rect.active and not in_view(&cull_rect,
+                                pos_comp.x, pos_comp.y,
+                                model.get_bounding_radius() * max(
+                                fabs(scale_comp.sx), fabs(scale_comp.sy))):
+                                render_comp.state_valid = False
+                                continue
+                            if track_changes and not needs_redraw(render_comp,
+                                model, stamp, frame_stamp,
+                                lerp(last_pos_comp.x, pos_comp.x, leftover),
+                                lerp(last_pos_comp.y, pos_comp.y, leftover),
+                                0., scale_comp.sx, scale_comp.sy,
+                                color_comp.color):
+                                write_indices(frame_indices, model,
+                                    index_offset, vert_offset, &index_range)
+                                index_offset += model._index_count
+                                continue
                             model_vertices = <VertexFormat2F4UB*>(
                                 model.vertices_block.data)
-                            model_indices = <GLushort*>model.indices_block.data
-                            for i in range(model._index_count):
-                                frame_indices[i+index_offset] = (
-                                    model_indices[i] + vert_offset)
+                            write_indices(frame_indices, model, index_offset,
+                                vert_offset, &index_range)
                             for n in range(model._vertex_count):
                                 vertex = &frame_data[n + vert_offset]
                                 model_vertex = model_vertices[n]
@@ -1849,10 +2584,19 @@ cdef class LerpScaledPolyRenderer(Renderer):
                                 vertex.v_color[3] = blend_integer_colors(
                                     model_vertex.v_color[3],
                                     color_comp.color[3])
+                            vertices_written += model._vertex_count
+                            if track_changes:
+                                batch.mark_vertices_dirty(vert_offset,
+                                    model._vertex_count)
                             index_offset += model._index_count
                     batch.set_index_count_for_frame(index_offset)
-                mesh_instruction = batch.mesh_instruction
-                mesh_instruction.flag_update()
+                    batches_drawn += 1
+                    if track_changes:
+                        batch.finish_frame(stamp, index_range.start,
+                            index_range.end)
+                batch.flag_update()
+        self.batches_drawn = batches_drawn
+        self.vertices_written = vertices_written
 
 
 
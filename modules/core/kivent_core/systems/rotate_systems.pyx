@@ -57,6 +57,40 @@ cdef class RotateSystem2D(StaticMemGameSystem):
         component.entity_id = entity_id
         component.r = r
 
+    def init_components(self, list component_indices, list entity_ids,
+        str zone, args):
+        '''Initializes many RotateComponent2D at once. args is either a single
+        float shared by every component, a sequence with one rotation per
+        component, or a 1 dimensional buffer of doubles such as a float64
+        numpy array, which will be read directly.
+        '''
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef unsigned int count = len(component_indices)
+        cdef unsigned int i
+        cdef RotateStruct2D* component
+        cdef double[:] column = None
+        cdef float r
+        shared = isinstance(args, (int, float))
+        if shared:
+            r = args
+        elif not isinstance(args, (list, tuple)):
+            try:
+                column = args
+            except (TypeError, ValueError):
+                column = None
+        if column is not None and column.shape[0] < count:
+            raise ValueError('rotate data must have shape (count,)')
+        for i in range(count):
+            component = <RotateStruct2D*>memory_zone.get_pointer(
+                component_indices[i])
+            component.entity_id = entity_ids[i]
+            if shared:
+                component.r = r
+            elif column is not None:
+                component.r = column[i]
+            else:
+                component.r = args[i]
+
     def clear_component(self, unsigned int component_index):
         cdef MemoryZone memory_zone = self.imz_components.memory_zone
         cdef RotateStruct2D* pointer = <RotateStruct2D*>(
@@ -88,6 +88,48 @@ cdef class ScaleSystem2D(StaticMemGameSystem):
         component.sx = sx
         component.sy = sy
 
+    def init_components(self, list component_indices, list entity_ids,
+        str zone, args):
+        '''Initializes many ScaleComponent2D at once. args is either a single
+        float used for sx and sy of every component, a sequence with one
+        entry per component following the rules of **init_component**, or a
+        buffer of doubles with shape (count, 2) such as a float64 numpy
+        array, which will be read directly.
+        '''
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef unsigned int count = len(component_indices)
+        cdef unsigned int i
+        cdef ScaleStruct2D* component
+        cdef double[:, :] columns = None
+        cdef float sx, sy
+        shared = isinstance(args, (int, float))
+        if shared:
+            sx = sy = args
+        elif not isinstance(args, (list, tuple)):
+            try:
+                columns = args
+            except (TypeError, ValueError):
+                columns = None
+        if columns is not None and (
+            columns.shape[0] < count or columns.shape[1] < 2):
+            raise ValueError('scale data must have shape (count, 2)')
+        for i in range(count):
+            if columns is not None:
+                sx = columns[i, 0]
+                sy = columns[i, 1]
+            elif not shared:
+                scale = args[i]
+                if isinstance(scale, tuple):
+                    sx = scale[0]
+                    sy = scale[1]
+                else:
+                    sx = sy = scale
+            component = <ScaleStruct2D*>memory_zone.get_pointer(
+                component_indices[i])
+            component.entity_id = entity_ids[i]
+            component.sx = sx
+            component.sy = sy
+
     def clear_component(self, unsigned int component_index):
         cdef MemoryZone memory_zone = self.imz_components.memory_zone
         cdef ScaleStruct2D* pointer = <ScaleStruct2D*>(
@@ -0,0 +1,54 @@
+from kivent_core.systems.staticmemgamesystem cimport (StaticMemGameSystem,
+    MemComponent)
+
+
+ctypedef struct SpatialHashStruct:
+    unsigned int entity_id
+    float radius
+
+
+ctypedef struct SpatialEntry:
+    unsigned int entity_id
+    float x
+    float y
+    float radius
+    int cell_x
+    int cell_y
+
+
+cdef class SpatialHashComponent(MemComponent):
+    pass
+
+
+cdef class SpatialHashSystem(StaticMemGameSystem):
+    cdef SpatialEntry* entries
+    cdef SpatialEntry* staging
+    cdef unsigned int* bucket_starts
+    cdef unsigned int* entry_buckets
+    cdef float* nearest_distances
+    cdef unsigned int entry_count
+    cdef unsigned int entry_capacity
+    cdef unsigned int bucket_count
+    cdef unsigned int nearest_capacity
+    cdef float _cell_size
+    cdef float max_radius
+    cdef int min_cell_x
+    cdef int min_cell_y
+    cdef int max_cell_x
+    cdef int max_cell_y
+
+    cdef int ensure_capacity(self, unsigned int count) except -1
+    cdef unsigned int get_bucket(self, int cell_x, int cell_y)
+    cdef int rebuild(self) except -1
+    cdef int _collect(self, float x0, float y0, float x1, float y1,
+        float x, float y, float radius, bint circle, unsigned int* results,
+        unsigned int max_results) except -1
+    cdef unsigned int _scan_nearest(self, int cell_x, int cell_y, float x,
+        float y, unsigned int k, unsigned int* results, float* distances,
+        unsigned int found)
+    cdef int _query_radius(self, float x, float y, float radius,
+        unsigned int* results, unsigned int max_results) except -1
+    cdef int _query_aabb(self, float x0, float y0, float x1, float y1,
+        unsigned int* results, unsigned int max_results) except -1
+    cdef int _query_nearest(self, float x, float y, unsigned int k,
+        unsigned int* results, float* distances) except -1
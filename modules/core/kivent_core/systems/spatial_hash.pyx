@@ -0,0 +1,644 @@
+# cython: embedsignature=True
+from kivent_core.systems.staticmemgamesystem cimport (StaticMemGameSystem,
+    MemComponent)
+from kivent_core.systems.position_systems cimport PositionStruct2D
+from kivent_core.memory_handlers.zone cimport MemoryZone
+from kivy.properties import (StringProperty, BooleanProperty, ListProperty,
+    NumericProperty, ObjectProperty)
+from kivy.factory import Factory
+from libc.stdlib cimport malloc, free
+from libc.string cimport memset
+from libc.math cimport floor, sqrt
+
+
+cdef inline unsigned int insert_nearest(unsigned int* results,
+    float* distances, unsigned int found, unsigned int k,
+    unsigned int entity_id, float distance):
+    '''Inserts entity_id into the first k results kept sorted by
+    distance, returns the new number of results.'''
+    cdef unsigned int i
+    if found == k:
+        if distance >= distances[k-1]:
+            return found
+        i = k - 1
+    else:
+        i = found
+        found += 1
+    while i > 0 and distances[i-1] > distance:
+        distances[i] = distances[i-1]
+        results[i] = results[i-1]
+        i -= 1
+    distances[i] = distance
+    results[i] = entity_id
+    return found
+
+
+cdef class SpatialHashComponent(MemComponent):
+    '''The component associated with SpatialHashSystem.
+
+    **Attributes:**
+        **entity_id** (unsigned int): The entity_id this component is currently
+        associated with. Will be <unsigned int>-1 if the component is
+        unattached.
+
+        **radius** (float): The radius of the circle around the entity's
+        position that is used when testing it against a query.
+    '''
+
+    property entity_id:
+        def __get__(self):
+            cdef SpatialHashStruct* data = <SpatialHashStruct*>self.pointer
+            return data.entity_id
+
+    property radius:
+        def __get__(self):
+            cdef SpatialHashStruct* data = <SpatialHashStruct*>self.pointer
+            return data.radius
+        def __set__(self, float value):
+            cdef SpatialHashStruct* data = <SpatialHashStruct*>self.pointer
+            data.radius = value
+
+
+cdef class SpatialHashSystem(StaticMemGameSystem):
+    '''
+    Processing Depends On: PositionSystem2D, SpatialHashSystem
+
+    The SpatialHashSystem keeps a uniform grid index of the positions of
+    every entity with a SpatialHashComponent so that proximity queries do
+    not have to look at every entity or go through a physics engine. The
+    grid is rebuilt from scratch every update: entities are bucketed by the
+    cell of **cell_size** their position falls in, cells are hashed into a
+    table of buckets and the entries are sorted by bucket with a counting
+    sort into contiguous arrays. The world is therefore unbounded and
+    rebuilding costs O(n) regardless of how far entities have moved.
+
+    Queries return the entities as they were on the last update. Every
+    query has a Cython version writing entity_ids into a buffer you
+    allocate yourself and a Python version that either fills a writable
+    unsigned int buffer such as an array.array('I') or returns a list.
+
+    Choose **cell_size** close to the size of your typical query, very
+    small cells make large queries visit many empty cells and very large
+    cells make every query test many entities.
+
+    **Attributes:**
+        **cell_size** (NumericProperty): The width and height of a grid cell
+        in world units. Defaults to 64.
+
+    **Attributes: (Cython Access Only)**
+        **entries** (SpatialEntry*): The indexed entities sorted by bucket.
+
+        **staging** (SpatialEntry*): Scratch array the entries are gathered
+        into before being sorted.
+
+        **bucket_starts** (unsigned int*): The index in **entries** of the
+        first entry of every bucket, **bucket_count** + 1 long so that the
+        entries of bucket b are bucket_starts[b] to bucket_starts[b+1].
+
+        **entry_buckets** (unsigned int*): Scratch array holding the bucket
+        of each entry in **staging**.
+
+        **nearest_distances** (float*): Scratch array used by
+        **_query_nearest** when no distance buffer is supplied.
+
+        **entry_count** (unsigned int): Number of entities in the index.
+
+        **entry_capacity** (unsigned int): Number of entries the arrays
+        can currently hold.
+
+        **bucket_count** (unsigned int): Number of buckets, always a power
+        of 2 at least as large as **entry_capacity**.
+
+        **max_radius** (float): The largest radius of any indexed entity,
+        queries are grown by this amount before choosing cells to visit.
+
+        **min_cell_x**, **min_cell_y**, **max_cell_x**, **max_cell_y** (int):
+        The range of cells containing entities.
+    '''
+    system_id = StringProperty('spatial_hash')
+    updateable = BooleanProperty(True)
+    processor = BooleanProperty(True)
+    type_size = NumericProperty(sizeof(SpatialHashStruct))
+    component_type = ObjectProperty(SpatialHashComponent)
+    system_names = ListProperty(['spatial_hash', 'position'])
+    cell_size = NumericProperty(64.)
+
+    def __dealloc__(self):
+        free(self.entries)
+        free(self.staging)
+        free(self.bucket_starts)
+        free(self.entry_buckets)
+        free(self.nearest_distances)
+        self.entries = NULL
+        self.staging = NULL
+        self.bucket_starts = NULL
+        self.entry_buckets = NULL
+        self.nearest_distances = NULL
+
+    def init_component(self, unsigned int component_index,
+        unsigned int entity_id, str zone_name, dict args):
+        '''A SpatialHashComponent is initialized with an args dict
+        optionally containing 'radius', defaults to 0.
+        '''
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef SpatialHashStruct* component = <SpatialHashStruct*>(
+            memory_zone.get_pointer(component_index))
+        component.entity_id = entity_id
+        component.radius = args.get('radius', 0.)
+        return self.entity_components.add_entity(entity_id, zone_name)
+
+    def clear_component(self, unsigned int component_index):
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef SpatialHashStruct* component = <SpatialHashStruct*>(
+            memory_zone.get_pointer(component_index))
+        component.entity_id = -1
+        component.radius = 0.
+
+    def remove_component(self, unsigned int component_index):
+        cdef SpatialHashComponent component = self.components[component_index]
+        self.entity_components.remove_entity(component.entity_id)
+        super(SpatialHashSystem, self).remove_component(component_index)
+
+    cdef int ensure_capacity(self, unsigned int count) except -1:
+        '''Grows the index arrays so that at least count entities can be
+        indexed. The contents of the arrays are not preserved.
+
+        Args:
+            count (unsigned int): The number of entities to make room for.
+        '''
+        cdef unsigned int capacity = self.entry_capacity
+        cdef unsigned int bucket_count = 64
+        if count <= capacity:
+            return 0
+        capacity = max(count, capacity * 2, 64)
+        while bucket_count < capacity:
+            bucket_count *= 2
+        free(self.entries)
+        free(self.staging)
+        free(self.entry_buckets)
+        free(self.bucket_starts)
+        self.entries = <SpatialEntry*>malloc(capacity * sizeof(SpatialEntry))
+        self.staging = <SpatialEntry*>malloc(capacity * sizeof(SpatialEntry))
+        self.entry_buckets = <unsigned int*>malloc(
+            capacity * sizeof(unsigned int))
+        self.bucket_starts = <unsigned int*>malloc(
+            (bucket_count + 1) * sizeof(unsigned int))
+        if (self.entries == NULL or self.staging == NULL or
+            self.entry_buckets == NULL or self.bucket_starts == NULL):
+            self.entry_capacity = 0
+            self.bucket_count = 0
+            raise MemoryError()
+        self.entry_capacity = capacity
+        self.bucket_count = bucket_count
+        return 1
+
+    cdef unsigned int get_bucket(self, int cell_x, int cell_y):
+        '''Hashes the cell coordinates into a bucket index.'''
+        return ((<unsigned int>cell_x * <unsigned int>73856093) ^
+            (<unsigned int>cell_y * <unsigned int>19349663)) & (
+            self.bucket_count - 1)
+
+    cdef int rebuild(self) except -1:
+        '''Rebuilds the whole index from the current positions. Called every
+        update.
+
+        Return:
+            int: The number of entities indexed.
+        '''
+        cdef void** component_data = <void**>(
+            self.entity_components.memory_block.data)
+        cdef unsigned int component_count = self.entity_components.count
+        cdef unsigned int count = self.entity_components.memory_block.count
+        cdef float cell_size = self.cell_size
+        cdef SpatialHashStruct* hash_comp
+        cdef PositionStruct2D* pos_comp
+        cdef SpatialEntry* entry
+        cdef unsigned int i, real_index, bucket
+        cdef unsigned int entry_count = 0
+        cdef float inv_cell_size, max_radius = 0.
+        cdef int cell_x, cell_y
+        cdef int min_x = 0, min_y = 0, max_x = 0, max_y = 0
+        if cell_size <= 0.:
+            raise ValueError('cell_size must be greater than 0')
+        inv_cell_size = 1. / cell_size
+        self.ensure_capacity(count)
+        self.entry_count = 0
+        if self.entry_capacity == 0:
+            return 0
+        cdef SpatialEntry* staging = self.staging
+        cdef SpatialEntry* entries = self.entries
+        cdef unsigned int* entry_buckets = self.entry_buckets
+        cdef unsigned int* bucket_starts = self.bucket_starts
+        cdef unsigned int bucket_count = self.bucket_count
+        memset(bucket_starts, 0, (bucket_count + 1) * sizeof(unsigned int))
+        for i in range(count):
+            real_index = i * component_count
+            if component_data[real_index] == NULL:
+                continue
+            hash_comp = <SpatialHashStruct*>component_data[real_index]
+            pos_comp = <PositionStruct2D*>component_data[real_index+1]
+            cell_x = <int>floor(pos_comp.x * inv_cell_size)
+            cell_y = <int>floor(pos_comp.y * inv_cell_size)
+            entry = &staging[entry_count]
+            entry.entity_id = hash_comp.entity_id
+            entry.x = pos_comp.x
+            entry.y = pos_comp.y
+            entry.radius = hash_comp.radius
+            entry.cell_x = cell_x
+            entry.cell_y = cell_y
+            if entry_count == 0:
+                min_x = max_x = cell_x
+                min_y = max_y = cell_y
+            else:
+                min_x = min(min_x, cell_x)
+                max_x = max(max_x, cell_x)
+                min_y = min(min_y, cell_y)
+                max_y = max(max_y, cell_y)
+            if hash_comp.radius > max_radius:
+                max_radius = hash_comp.radius
+            bucket = self.get_bucket(cell_x, cell_y)
+            entry_buckets[entry_count] = bucket
+            bucket_starts[bucket+1] += 1
+            entry_count += 1
+        for i in range(bucket_count):
+            bucket_starts[i+1] += bucket_starts[i]
+        for i in range(entry_count):
+            bucket = entry_buckets[i]
+            entries[bucket_starts[bucket]] = staging[i]
+            bucket_starts[bucket] += 1
+        for i in range(bucket_count, 0, -1):
+            bucket_starts[i] = bucket_starts[i-1]
+        bucket_starts[0] = 0
+        self.entry_count = entry_count
+        self._cell_size = cell_size
+        self.max_radius = max_radius
+        self.min_cell_x = min_x
+        self.min_cell_y = min_y
+        self.max_cell_x = max_x
+        self.max_cell_y = max_y
+        return entry_count
+
+    def update(self, dt):
+        self.rebuild()
+
+    cdef int _collect(self, float x0, float y0, float x1, float y1,
+        float x, float y, float radius, bint circle, unsigned int* results,
+        unsigned int max_results) except -1:
+        '''Shared implementation of **_query_aabb** and **_query_radius**.
+        Visits the cells overlapping the box x0, y0, x1, y1 grown by
+        **max_radius**, or every entry if that would visit more cells than
+        there are entries.
+
+        Args:
+            x0, y0, x1, y1 (float): The box to search.
+
+            x, y, radius (float): The circle to test against if circle is
+            True.
+
+            circle (bint): If True entries are tested against the circle,
+            otherwise against the box.
+
+            results (unsigned int*): Buffer to write entity_ids into.
+
+            max_results (unsigned int): Size of results, the query stops
+            once it is full.
+
+        Return:
+            int: The number of entity_ids written to results.
+        '''
+        cdef unsigned int entry_count = self.entry_count
+        if entry_count == 0 or max_results == 0 or x1 < x0 or y1 < y0:
+            return 0
+        cdef float inv_cell_size = 1. / self._cell_size
+        cdef float grow = self.max_radius
+        cdef int cx0 = max(<int>floor((x0 - grow) * inv_cell_size),
+            self.min_cell_x)
+        cdef int cy0 = max(<int>floor((y0 - grow) * inv_cell_size),
+            self.min_cell_y)
+        cdef int cx1 = min(<int>floor((x1 + grow) * inv_cell_size),
+            self.max_cell_x)
+        cdef int cy1 = min(<int>floor((y1 + grow) * inv_cell_size),
+            self.max_cell_y)
+        if cx0 > cx1 or cy0 > cy1:
+            return 0
+        cdef SpatialEntry* entries = self.entries
+        cdef unsigned int* bucket_starts = self.bucket_starts
+        cdef SpatialEntry* entry
+        cdef unsigned int found = 0
+        cdef unsigned int i, start, end, bucket
+        cdef int cell_x, cell_y
+        cdef float dx, dy, reach
+        cdef double cell_count = (<double>(cx1 - cx0) + 1.) * (
+            <double>(cy1 - cy0) + 1.)
+        cdef bint scan_all = cell_count > entry_count
+        cell_x = cx0
+        cell_y = cy0
+        while True:
+            if scan_all:
+                start = 0
+                end = entry_count
+            else:
+                bucket = self.get_bucket(cell_x, cell_y)
+                start = bucket_starts[bucket]
+                end = bucket_starts[bucket+1]
+            for i in range(start, end):
+                entry = &entries[i]
+                if not scan_all and (entry.cell_x != cell_x or
+                    entry.cell_y != cell_y):
+                    continue
+                if circle:
+                    dx = entry.x - x
+                    dy = entry.y - y
+                    reach = radius + entry.radius
+                    if dx*dx + dy*dy > reach*reach:
+                        continue
+                elif (entry.x + entry.radius < x0 or
+                    entry.x - entry.radius > x1 or
+                    entry.y + entry.radius < y0 or
+                    entry.y - entry.radius > y1):
+                    continue
+                results[found] = entry.entity_id
+                found += 1
+                if found == max_results:
+                    return found
+            if scan_all:
+                break
+            cell_y += 1
+            if cell_y > cy1:
+                cell_y = cy0
+                cell_x += 1
+                if cell_x > cx1:
+                    break
+        return found
+
+    cdef int _query_radius(self, float x, float y, float radius,
+        unsigned int* results, unsigned int max_results) except -1:
+        '''Finds the entities whose circle overlaps the circle at x, y.
+
+        Args:
+            x, y (float): Center of the query.
+
+            radius (float): Radius of the query.
+
+            results (unsigned int*): Buffer to write entity_ids into.
+
+            max_results (unsigned int): Size of results, the query stops
+            once it is full.
+
+        Return:
+            int: The number of entity_ids written to results.
+        '''
+        return self._collect(x - radius, y - radius, x + radius, y + radius,
+            x, y, radius, True, results, max_results)
+
+    cdef int _query_aabb(self, float x0, float y0, float x1, float y1,
+        unsigned int* results, unsigned int max_results) except -1:
+        '''Finds the entities whose circle overlaps the axis aligned box
+        from x0, y0 to x1, y1. The test is against the bounding box of the
+        entity's circle.
+
+        Args:
+            x0, y0 (float): The bottom left corner of the box.
+
+            x1, y1 (float): The top right corner of the box.
+
+            results (unsigned int*): Buffer to write entity_ids into.
+
+            max_results (unsigned int): Size of results, the query stops
+            once it is full.
+
+        Return:
+            int: The number of entity_ids written to results.
+        '''
+        return self._collect(x0, y0, x1, y1, 0., 0., 0., False, results,
+            max_results)
+
+    cdef unsigned int _scan_nearest(self, int cell_x, int cell_y, float x,
+        float y, unsigned int k, unsigned int* results, float* distances,
+        unsigned int found):
+        '''Adds the entries of one cell to the k nearest found so far,
+        distances are kept squared. Returns the new number found.'''
+        cdef SpatialEntry* entries = self.entries
+        cdef SpatialEntry* entry
+        cdef unsigned int bucket, i
+        cdef float dx, dy
+        if (cell_x < self.min_cell_x or cell_x > self.max_cell_x or
+            cell_y < self.min_cell_y or cell_y > self.max_cell_y):
+            return found
+        bucket = self.get_bucket(cell_x, cell_y)
+        for i in range(self.bucket_starts[bucket],
+            self.bucket_starts[bucket+1]):
+            entry = &entries[i]
+            if entry.cell_x != cell_x or entry.cell_y != cell_y:
+                continue
+            dx = entry.x - x
+            dy = entry.y - y
+            found = insert_nearest(results, distances, found, k,
+                entry.entity_id, dx*dx + dy*dy)
+        return found
+
+    cdef int _query_nearest(self, float x, float y, unsigned int k,
+        unsigned int* results, float* distances) except -1:
+        '''Finds the k entities whose positions are closest to x, y. Rings
+        of cells are searched outward from the cell containing x, y until
+        no unvisited cell can contain anything closer than the k-th result,
+        switching to a scan of every entry if more cells than entries would
+        be visited.
+
+        Args:
+            x, y (float): The point to search from.
+
+            k (unsigned int): The number of entities to find.
+
+            results (unsigned int*): Buffer of at least k to write the
+            entity_ids into, nearest first.
+
+            distances (float*): Buffer of at least k to write the distance
+            of each result into. If NULL a scratch buffer is used.
+
+        Return:
+            int: The number of entity_ids written to results, less than k
+            only if fewer than k entities are indexed.
+        '''
+        cdef unsigned int entry_count = self.entry_count
+        if entry_count == 0 or k == 0:
+            return 0
+        if distances == NULL:
+            if self.nearest_capacity < k:
+                free(self.nearest_distances)
+                self.nearest_distances = <float*>malloc(k * sizeof(float))
+                if self.nearest_distances == NULL:
+                    self.nearest_capacity = 0
+                    raise MemoryError()
+                self.nearest_capacity = k
+            distances = self.nearest_distances
+        cdef float cell_size = self._cell_size
+        cdef int qx = <int>floor(x / cell_size)
+        cdef int qy = <int>floor(y / cell_size)
+        cdef int max_ring = max(abs(qx - self.min_cell_x),
+            abs(self.max_cell_x - qx), abs(qy - self.min_cell_y),
+            abs(self.max_cell_y - qy))
+        cdef unsigned int found = 0
+        cdef unsigned int i
+        cdef double visited = 0.
+        cdef float limit, dx, dy
+        cdef int ring = 0
+        cdef int c
+        cdef SpatialEntry* entry
+        while ring <= max_ring:
+            if ring == 0:
+                found = self._scan_nearest(qx, qy, x, y, k, results,
+                    distances, found)
+                visited += 1.
+            else:
+                for c in range(qx - ring, qx + ring + 1):
+                    found = self._scan_nearest(c, qy - ring, x, y, k,
+                        results, distances, found)
+                    found = self._scan_nearest(c, qy + ring, x, y, k,
+                        results, distances, found)
+                for c in range(qy - ring + 1, qy + ring):
+                    found = self._scan_nearest(qx - ring, c, x, y, k,
+                        results, distances, found)
+                    found = self._scan_nearest(qx + ring, c, x, y, k,
+                        results, distances, found)
+                visited += 8. * ring
+            if found == k:
+                limit = ring * cell_size
+                if distances[k-1] <= limit*limit:
+                    break
+            if visited > entry_count:
+                found = 0
+                for i in range(entry_count):
+                    entry = &self.entries[i]
+                    dx = entry.x - x
+                    dy = entry.y - y
+                    found = insert_nearest(results, distances, found, k,
+                        entry.entity_id, dx*dx + dy*dy)
+                break
+            ring += 1
+        for i in range(found):
+            distances[i] = sqrt(distances[i])
+        return found
+
+    def query_radius(self, float x, float y, float radius,
+        unsigned int[:] out=None):
+        '''Finds the entities whose circle overlaps the circle at x, y as of
+        the last update.
+
+        Args:
+            x, y (float): Center of the query.
+
+            radius (float): Radius of the query.
+
+            out (unsigned int buffer): Optional writable buffer such as an
+            array.array('I') to write the entity_ids into. The query stops
+            once it is full.
+
+        Return:
+            list or int: The entity_ids found, or if out was provided the
+            number of entity_ids written to it.
+        '''
+        cdef unsigned int found
+        cdef unsigned int* results
+        if out is not None:
+            if out.shape[0] == 0:
+                return 0
+            return self._query_radius(x, y, radius, &out[0], out.shape[0])
+        if self.entry_count == 0:
+            return []
+        results = <unsigned int*>malloc(
+            self.entry_count * sizeof(unsigned int))
+        if results == NULL:
+            raise MemoryError()
+        try:
+            found = self._query_radius(x, y, radius, results,
+                self.entry_count)
+            return [results[i] for i in range(found)]
+        finally:
+            free(results)
+
+    def query_aabb(self, float x0, float y0, float x1, float y1,
+        unsigned int[:] out=None):
+        '''Finds the entities whose circle overlaps the axis aligned box
+        from x0, y0 to x1, y1 as of the last update.
+
+        Args:
+            x0, y0 (float): The bottom left corner of the box.
+
+            x1, y1 (float): The top right corner of the box.
+
+            out (unsigned int buffer): Optional writable buffer such as an
+            array.array('I') to write the entity_ids into. The query stops
+            once it is full.
+
+        Return:
+            list or int: The entity_ids found, or if out was provided the
+            number of entity_ids written to it.
+        '''
+        cdef unsigned int found
+        cdef unsigned int* results
+        if out is not None:
+            if out.shape[0] == 0:
+                return 0
+            return self._query_aabb(x0, y0, x1, y1, &out[0], out.shape[0])
+        if self.entry_count == 0:
+            return []
+        results = <unsigned int*>malloc(
+            self.entry_count * sizeof(unsigned int))
+        if results == NULL:
+            raise MemoryError()
+        try:
+            found = self._query_aabb(x0, y0, x1, y1, results,
+                self.entry_count)
+            return [results[i] for i in range(found)]
+        finally:
+            free(results)
+
+    def query_nearest(self, float x, float y, unsigned int k,
+        unsigned int[:] out=None):
+        '''Finds the k entities whose positions are closest to x, y as of
+        the last update.
+
+        Args:
+            x, y (float): The point to search from.
+
+            k (unsigned int): The number of entities to find.
+
+            out (unsigned int buffer): Optional writable buffer such as an
+            array.array('I') to write the entity_ids into, nearest first.
+            At most len(out) entities will be found.
+
+        Return:
+            list or int: A list of (entity_id, distance) tuples nearest
+            first, or if out was provided the number of entity_ids written
+            to it.
+        '''
+        cdef unsigned int found
+        cdef unsigned int* results
+        if out is not None:
+            k = min(k, out.shape[0])
+            if k == 0:
+                return 0
+            return self._query_nearest(x, y, k, &out[0], NULL)
+        if self.entry_count == 0 or k == 0:
+            return []
+        results = <unsigned int*>malloc(k * sizeof(unsigned int))
+        if results == NULL:
+            raise MemoryError()
+        try:
+            found = self._query_nearest(x, y, k, results, NULL)
+            return [(results[i], self.nearest_distances[i])
+                for i in range(found)]
+        finally:
+            free(results)
+
+    def link_snapshot_state(self, tuple state):
+        '''
+        Extends StaticMemGameSystem.link_snapshot_state to **rebuild** the
+        index, so that queries see the restored entities right away.
+        '''
+        super(SpatialHashSystem, self).link_snapshot_state(state)
+        self.rebuild()
+
+
+Factory.register('SpatialHashSystem', cls=SpatialHashSystem)
@@ -5,6 +5,32 @@ from kivent_core.memory_handlers.zonedblock cimport ZonedBlock
 from cpython cimport bool
 
 
+ctypedef struct LiveIndex:
+    unsigned int live_count
+    unsigned int zone_count
+    unsigned int* zone_starts
+    unsigned int* zone_totals
+    unsigned int* zone_live
+    unsigned int entity_capacity
+    unsigned int* entity_slots
+    unsigned int* slot_entities
+
+
+ctypedef struct KernelQueue:
+    unsigned int* removals
+    unsigned int removal_count
+    unsigned int removal_capacity
+    bint failed
+
+
+ctypedef void (*EntityKernel)(void** components, float dt, void* user_data,
+    KernelQueue* queue) noexcept nogil
+
+
+cdef int kernel_remove(KernelQueue* queue,
+    unsigned int entity_id) noexcept nogil
+
+
 cdef class MemComponent:
     cdef void* pointer
     cdef unsigned int _id
@@ -14,6 +40,13 @@ cdef class StaticMemGameSystem(GameSystem):
     cdef IndexedMemoryZone imz_components
     cdef ZonedAggregator entity_components
 
+    cdef int free_components(self, list component_indices) except 0
+    cdef int discard_components(self, list component_indices,
+        list entity_ids) except 0
+    cdef int run_kernel(self, EntityKernel kernel, float dt, void* user_data,
+        bint backwards) except -1
+    cdef int apply_kernel_removal(self, unsigned int entity_id) except -1
+
 
 cdef class ZonedAggregator:
     cdef ZonedBlock memory_block
@@ -22,6 +55,10 @@ cdef class ZonedAggregator:
     cdef dict entity_block_index
     cdef object gameworld
     cdef list system_names
+    cdef dict zone_indices
+    cdef list block_zones
+    cdef bint dense
+    cdef LiveIndex live_index
 
     cdef bool check_empty(self)
     cdef void free(self)
@@ -30,6 +67,14 @@ cdef class ZonedAggregator:
     cdef int remove_entity(self, unsigned int entity_id) except 0
     cdef unsigned int add_entity(self, unsigned int entity_id,
         str zone_name) except -1
+    cdef int set_pointers(self, unsigned int entity_id,
+        unsigned int block_index, bint checked) except 0
+    cdef bint has_entity(self, unsigned int entity_id)
+    cdef unsigned int get_block_index(self, unsigned int entity_id) except -1
+    cdef unsigned int get_live_range(self, unsigned int zone,
+        unsigned int* start)
+    cdef tuple get_state(self)
+    cdef int set_state(self, tuple state) except 0
 
 
 cdef class ComponentPointerAggregator:
@@ -39,6 +84,8 @@ cdef class ComponentPointerAggregator:
     cdef unsigned int total
     cdef list system_names
     cdef dict entity_block_index
+    cdef bint dense
+    cdef LiveIndex live_index
 
     cdef bool check_empty(self)
     cdef unsigned int get_size(self)
@@ -46,3 +93,7 @@ cdef class ComponentPointerAggregator:
     cdef void clear(self)
     cdef int remove_entity(self, unsigned int entity_id) except 0
     cdef unsigned int add_entity(self, unsigned int entity_id) except -1
+    cdef bint has_entity(self, unsigned int entity_id)
+    cdef unsigned int get_block_index(self, unsigned int entity_id) except -1
+    cdef unsigned int get_live_range(self, unsigned int zone,
+        unsigned int* start)
@@ -9,14 +9,19 @@ from kivent_core.memory_handlers.zone cimport MemoryZone
 from kivent_core.memory_handlers.block cimport MemoryBlock
 from kivent_core.memory_handlers.indexing cimport IndexedMemoryZone
 from kivy.properties import (NumericProperty, ObjectProperty, ListProperty,
-    BooleanProperty)
+    BooleanProperty, StringProperty)
 from kivent_core.memory_handlers.membuffer cimport Buffer
-from kivent_core.memory_handlers.zonedblock cimport ZonedBlock
+from kivent_core.memory_handlers.membuffer import get_allocator_type
+from kivent_core.memory_handlers.zonedblock cimport ZonedBlock, BlockZone
 from kivent_core.systems.gamesystem cimport GameSystem
 from kivent_core.managers.system_manager cimport SystemManager
 from cpython cimport bool
 from kivent_core.memory_handlers.utils import memrange
 from kivent_core.managers.entity_manager cimport EntityManager
+from libc.stdlib cimport malloc, calloc, realloc, free
+from libc.string cimport memcpy
+from cython.parallel cimport prange
+from array import array
 
 
 cdef class MemComponent:
@@ -60,6 +65,60 @@ class NotAllocatedError(Exception):
     pass
 
 
+cdef int kernel_remove(KernelQueue* queue,
+    unsigned int entity_id) noexcept nogil:
+    '''
+    Called by an EntityKernel to have entity_id removed once every chunk has
+    been processed, see StaticMemGameSystem.run_kernel.
+
+    Args:
+        queue (KernelQueue*): The queue passed to the kernel.
+
+        entity_id (unsigned int): The entity to remove.
+
+    Return:
+        int: 1 on success, 0 if the queue could not grow, in which case
+        run_kernel will raise a MemoryError.
+    '''
+    cdef unsigned int capacity
+    cdef unsigned int* removals
+    if queue.removal_count == queue.removal_capacity:
+        capacity = queue.removal_capacity * 2
+        if capacity == 0:
+            capacity = 64
+        removals = <unsigned int*>realloc(queue.removals,
+            sizeof(unsigned int) * capacity)
+        if removals == NULL:
+            queue.failed = True
+            return 0
+        queue.removals = removals
+        queue.removal_capacity = capacity
+    queue.removals[queue.removal_count] = entity_id
+    queue.removal_count += 1
+    return 1
+
+
+cdef void run_kernel_chunk(EntityKernel kernel, void** data,
+    unsigned int count, unsigned int start, unsigned int end,
+    bint backwards, float dt, void* user_data,
+    KernelQueue* queue) noexcept nogil:
+    '''
+    Calls kernel for the pointers of every entity from block index start to
+    end, skipping the empty slots of a sparse aggregator.
+    '''
+    cdef unsigned int i
+    if backwards:
+        i = end
+        while i > start:
+            i -= 1
+            if data[i*count] != NULL:
+                kernel(&data[i*count], dt, user_data, queue)
+    else:
+        for i in range(start, end):
+            if data[i*count] != NULL:
+                kernel(&data[i*count], dt, user_data, queue)
+
+
 cdef class StaticMemGameSystem(GameSystem):
     '''
     The StaticMemGameSystem keeps a statically allocated array of C structs as
@@ -105,6 +164,25 @@ cdef class StaticMemGameSystem(GameSystem):
         python level access to the **component_type** objects that wrap the
         C data.
 
+        **dense_aggregator** (BooleanProperty): If True the **ZonedAggregator**
+        is dense, keeping the live entities packed at the front of each zone
+        so that **update** can loop over exactly the live entities instead of
+        skipping the holes left by removed ones. See ZonedAggregator.
+        Defaults to False.
+
+        **allocator** (StringProperty): How freed component slots are tracked
+        and reused, one of 'first_fit', 'bitmap', or 'size_class'. Components
+        are fixed size so 'bitmap' gives constant time reuse of freed slots
+        without keeping a Python object for every freed slot. Defaults to
+        'bitmap'.
+
+        **parallel** (BooleanProperty): If True, **run_kernel** spreads its
+        chunks across threads with OpenMP. This only has an effect if
+        kivent_core was built with KIVENT_USE_OPENMP set. Defaults to False.
+
+        **kernel_chunk_size** (NumericProperty): The most entities
+        **run_kernel** hands to a thread at once. Defaults to 4096.
+
     '''
     size_of_component_block = NumericProperty(4)
     type_size = NumericProperty(0)
@@ -112,6 +190,10 @@ cdef class StaticMemGameSystem(GameSystem):
     processor = BooleanProperty(False)
     system_names = ListProperty([])
     do_allocation = BooleanProperty(True)
+    dense_aggregator = BooleanProperty(False)
+    allocator = StringProperty('bitmap')
+    parallel = BooleanProperty(False)
+    kernel_chunk_size = NumericProperty(4096)
 
     def __cinit__(self, **kwargs):
         self.entity_components = None
@@ -168,11 +250,12 @@ cdef class StaticMemGameSystem(GameSystem):
         '''
         self.imz_components = IndexedMemoryZone(master_buffer,
             self.size_of_component_block, self.type_size,
-            reserve_spec, self.component_type)
+            reserve_spec, self.component_type,
+            get_allocator_type(self.allocator))
         if self.processor:
             self.entity_components = ZonedAggregator(
                 [x for x in self.system_names], reserve_spec,
-                self.gameworld, master_buffer)
+                self.gameworld, master_buffer, self.dense_aggregator)
 
     def get_system_size(self):
         '''
@@ -232,6 +315,168 @@ cdef class StaticMemGameSystem(GameSystem):
         entity_manager.set_component(entity_id, -1, self.system_index)
         memory_zone.free_slot(component_index)
 
+    def create_components(self, list entity_ids, str zone, args):
+        '''
+        Overrides GameSystem's default create_components, reserving all the
+        component slots from the IndexedMemoryZone in a single pass and
+        handing them over to **init_components** together.
+
+        Args:
+            entity_ids (list) : The identities of the **Entity** to assign
+            a new component to.
+
+            zone (str) : The zone to create the components in.
+
+            args : If a dict, the same arguments will be used to initialize
+            every component. Otherwise args must be indexable with one entry
+            per entity, args[i] being used for entity_ids[i].
+
+        Return:
+            component_indices (list) : The identities of the new components
+            in the same order as entity_ids.
+        '''
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef EntityManager entity_manager = self.gameworld.entity_manager
+        cdef unsigned int system_index = self.system_index
+        cdef unsigned int count = len(entity_ids)
+        cdef unsigned int i
+        cdef list component_indices
+        if count == 0:
+            return []
+        cdef unsigned int* indices = <unsigned int*>malloc(
+            sizeof(unsigned int) * count)
+        if indices == NULL:
+            raise MemoryError()
+        try:
+            memory_zone.get_free_slots(zone, count, indices)
+            for i in range(count):
+                entity_manager.set_component(entity_ids[i], indices[i],
+                    system_index)
+            component_indices = [indices[i] for i in range(count)]
+        finally:
+            free(indices)
+        try:
+            self.init_components(component_indices, entity_ids, zone, args)
+        except:
+            self.discard_components(component_indices, entity_ids)
+            raise
+        return component_indices
+
+    def remove_components(self, list component_indices):
+        '''
+        Overrides the default behavior of GameSystem. If **remove_component**
+        has not been overridden the components are cleared and their slots
+        freed in a single pass with **free_components**, otherwise
+        **remove_component** is called for each component so that any extra
+        cleanup it performs still happens.
+
+        Args:
+            component_indices (list): the component_ids to be removed.
+        '''
+        if type(self).remove_component is StaticMemGameSystem.remove_component:
+            self.free_components(component_indices)
+        else:
+            GameSystem.remove_components(self, component_indices)
+
+    cdef int free_components(self, list component_indices) except 0:
+        '''
+        Clears each component, detaches it from its entity, and frees its
+        slot in the IndexedMemoryZone. This is the work done by the
+        StaticMemGameSystem **remove_component** for many components at once.
+
+        Args:
+            component_indices (list): the component_ids to be freed.
+        '''
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef EntityManager entity_manager = self.gameworld.entity_manager
+        cdef unsigned int system_index = self.system_index
+        cdef unsigned int component_index
+        cdef unsigned int* pointer
+        clear_component = self.clear_component
+        for component_index in component_indices:
+            pointer = <unsigned int*>memory_zone.get_pointer(component_index)
+            entity_manager.set_component(pointer[0], -1, system_index)
+            clear_component(component_index)
+            memory_zone.free_slot(component_index)
+        return 1
+
+    def init_components(self, list component_indices, list entity_ids,
+        str zone, args):
+        '''
+        Initializes many components at once, called by **create_components**
+        after the slots have been reserved. By default this will
+        **clear_component** and **init_component** each component in turn,
+        override when subclassing to fill the component data directly. If
+        an exception is raised, any work done for the components other than
+        writing their data, such as batching them, must be undone first,
+        **create_components** will then free their slots.
+
+        Args:
+            component_indices (list): The indices of the new components.
+
+            entity_ids (list): The entity_id for each component.
+
+            zone (str): The zone the components were created in.
+
+            args : Either a dict shared by all components or an indexable
+            with one entry per component.
+        '''
+        clear_component = self.clear_component
+        init_component = self.init_component
+        cdef unsigned int i = 0
+        cdef bool shared = isinstance(args, dict)
+        try:
+            for i in range(len(component_indices)):
+                component_index = component_indices[i]
+                clear_component(component_index)
+                if shared:
+                    init_component(component_index, entity_ids[i], zone, args)
+                else:
+                    init_component(component_index, entity_ids[i], zone,
+                        args[i])
+        except:
+            #the components before i were fully initialized
+            self.remove_components(component_indices[:i])
+            raise
+
+    cdef int discard_components(self, list component_indices,
+        list entity_ids) except 0:
+        '''
+        Undoes the reservation made by **create_components** when
+        **init_components** fails. Every component still attached to its
+        entity is detached, removed from the **entity_components**
+        aggregator if it was added, cleared, and its slot freed. Unlike
+        **free_components** the entity_id is not read from the component
+        data, which may not have been written.
+
+        Args:
+            component_indices (list): the component_ids that were reserved.
+
+            entity_ids (list): the entity_id for each component.
+        '''
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef EntityManager entity_manager = self.gameworld.entity_manager
+        cdef MemoryZone entity_memory = entity_manager.memory_index.memory_zone
+        cdef ZonedAggregator entity_components = self.entity_components
+        cdef unsigned int system_index = self.system_index
+        cdef unsigned int i, entity_id, component_index
+        cdef unsigned int* entity_pointer
+        clear_component = self.clear_component
+        for i in range(len(component_indices)):
+            entity_id = entity_ids[i]
+            component_index = component_indices[i]
+            entity_pointer = <unsigned int*>entity_memory.get_pointer(
+                entity_id)
+            if entity_pointer[system_index+1] != component_index:
+                continue
+            if (entity_components is not None and
+                entity_components.has_entity(entity_id)):
+                entity_components.remove_entity(entity_id)
+            entity_manager.set_component(entity_id, -1, system_index)
+            clear_component(component_index)
+            memory_zone.free_slot(component_index)
+        return 1
+
     def init_component(self, unsigned int component_index,
         unsigned int entity_id, args):
         '''
@@ -247,6 +492,165 @@ cdef class StaticMemGameSystem(GameSystem):
         recycling'''
         pass
 
+    cdef int run_kernel(self, EntityKernel kernel, float dt, void* user_data,
+        bint backwards) except -1:
+        '''
+        Calls kernel once for every entity in the **ZonedAggregator**,
+        without holding the GIL, with a pointer to the entity's first
+        component pointer. The entities are split into chunks of at most
+        **kernel_chunk_size** that are run across threads if **parallel** is
+        True. The kernel must only touch the components it is given and
+        user_data, it asks for entities to be removed with kernel_remove.
+        Each chunk has its own KernelQueue, once every chunk is done the
+        removals are applied in the order a single loop over the entities
+        would have asked for them with **apply_kernel_removal**.
+
+        Args:
+            kernel (EntityKernel): The function to call for every entity.
+
+            dt (float): Passed on to the kernel.
+
+            user_data (void*): Passed on to the kernel.
+
+            backwards (bint): If True the entities of a zone are visited from
+            last to first, as needed for a dense aggregator if entities are
+            removed.
+        '''
+        cdef ZonedAggregator entity_components = self.entity_components
+        cdef void** data = <void**>entity_components.memory_block.data
+        cdef unsigned int count = entity_components.count
+        cdef unsigned int chunk_size = max(<unsigned int>self.kernel_chunk_size,
+            1)
+        cdef unsigned int zone, start, end, chunk_start, chunk_end, i
+        cdef unsigned int chunk_count = 0
+        cdef int chunk
+        for zone in range(entity_components.live_index.zone_count):
+            end = entity_components.get_live_range(zone, &start)
+            chunk_count += (end - start + chunk_size - 1) // chunk_size
+        if chunk_count == 0:
+            return 1
+        cdef unsigned int* starts = <unsigned int*>malloc(
+            sizeof(unsigned int) * chunk_count * 2)
+        cdef KernelQueue* queues = <KernelQueue*>calloc(chunk_count,
+            sizeof(KernelQueue))
+        if starts == NULL or queues == NULL:
+            free(starts)
+            free(queues)
+            raise MemoryError()
+        cdef unsigned int* ends = &starts[chunk_count]
+        cdef KernelQueue* queue
+        cdef bint parallel = self.parallel and chunk_count > 1
+        i = 0
+        for zone in range(entity_components.live_index.zone_count):
+            end = entity_components.get_live_range(zone, &start)
+            chunk_start = start
+            while chunk_start < end:
+                chunk_end = min(chunk_start + chunk_size, end)
+                #chunks of a backwards zone are listed last first
+                starts[i] = end - (chunk_end - start) if backwards else (
+                    chunk_start)
+                ends[i] = end - (chunk_start - start) if backwards else (
+                    chunk_end)
+                chunk_start = chunk_end
+                i += 1
+        try:
+            if parallel:
+                for chunk in prange(<int>chunk_count, nogil=True,
+                    schedule='dynamic'):
+                    run_kernel_chunk(kernel, data, count, starts[chunk],
+                        ends[chunk], backwards, dt, user_data, &queues[chunk])
+            else:
+                with nogil:
+                    for i in range(chunk_count):
+                        run_kernel_chunk(kernel, data, count, starts[i],
+                            ends[i], backwards, dt, user_data, &queues[i])
+            for i in range(chunk_count):
+                if queues[i].failed:
+                    raise MemoryError()
+            for chunk in range(<int>chunk_count):
+                queue = &queues[chunk]
+                for i in range(queue.removal_count):
+                    self.apply_kernel_removal(queue.removals[i])
+        finally:
+            for i in range(chunk_count):
+                free(queues[i].removals)
+            free(queues)
+            free(starts)
+        return 1
+
+    cdef int apply_kernel_removal(self, unsigned int entity_id) except -1:
+        '''
+        Removes an entity a kernel asked to remove during **run_kernel**.
+        Entities that already left the **ZonedAggregator**, for instance
+        because an earlier removal took them along, are skipped. The entity
+        is queued with GameWorld.queue_remove_entity if **thread_safe** is
+        True, otherwise it is removed immediately.
+
+        Args:
+            entity_id (unsigned int): The entity to remove.
+        '''
+        if not self.entity_components.has_entity(entity_id):
+            return 1
+        if self.thread_safe:
+            self.gameworld.queue_remove_entity(entity_id)
+        else:
+            self.gameworld.remove_entity(entity_id)
+        return 1
+
+    def get_snapshot_state(self):
+        '''
+        Copies the component data and pool bookkeeping of
+        **imz_components**, and which entity is where in the
+        **ZonedAggregator** if there is one, for the SnapshotManager.
+        Systems that keep pointers in their components have to override
+        this to save what the pointers refer to.
+
+        Return:
+            tuple: The state of the system.
+        '''
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef ZonedAggregator aggregator = self.entity_components
+        aggregator_state = None
+        if aggregator is not None:
+            aggregator_state = aggregator.get_state()
+        return (memory_zone.get_state(), aggregator_state,
+            dict(self.copied_components))
+
+    def set_snapshot_state(self, tuple state):
+        '''
+        Restores the component data of the result of
+        **get_snapshot_state**, see GameSystem.set_snapshot_state.
+
+        Args:
+            state (tuple): The result of **get_snapshot_state**.
+        '''
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef ZonedAggregator aggregator = self.entity_components
+        cdef dict copied_components
+        zone_state, aggregator_state, copied_components = state
+        if (aggregator_state is None) != (aggregator is None):
+            raise ValueError('{} was not snapshot with the same setup'.format(
+                self.system_id))
+        for component_index in copied_components.values():
+            if component_index >= memory_zone.count:
+                raise ValueError('Invalid component index {}'.format(
+                    component_index))
+        memory_zone.set_state(zone_state)
+        self.copied_components = dict(copied_components)
+
+    def link_snapshot_state(self, tuple state):
+        '''
+        Puts the entities back in the **ZonedAggregator**, looking up the
+        pointers to their components again, once the components of every
+        system have been restored.
+
+        Args:
+            state (tuple): The result of **get_snapshot_state**.
+        '''
+        cdef ZonedAggregator aggregator = self.entity_components
+        if aggregator is not None:
+            aggregator.set_state(state[1])
+
     cpdef unsigned int get_active_component_count(self) except <unsigned int>-1:
         '''Returns the number of all active components in this system.
 
@@ -275,6 +679,134 @@ cdef class StaticMemGameSystem(GameSystem):
         return memory_zone.get_active_slot_count_in_pool(pool_index)
 
 
+cdef int init_live_index(LiveIndex* index, list zone_ranges,
+    unsigned int total, unsigned int entity_capacity, bint dense) except 0:
+    '''
+    Allocates the arrays of the LiveIndex of an aggregator. The
+    entity_slots and slot_entities maps are only needed when dense.
+
+    Args:
+        index (LiveIndex*): The LiveIndex to set up.
+
+        zone_ranges (list): (start, total) of every zone, by start.
+
+        total (unsigned int): The number of slots in all zones.
+
+        entity_capacity (unsigned int): One more than the largest entity_id
+        that can be added.
+
+        dense (bint): Whether the aggregator keeps its entities packed.
+    '''
+    cdef unsigned int zone_count = len(zone_ranges)
+    cdef unsigned int i
+    index.live_count = 0
+    index.zone_count = zone_count
+    index.entity_capacity = 0
+    index.zone_starts = <unsigned int*>malloc(
+        sizeof(unsigned int) * zone_count * 3)
+    if index.zone_starts == NULL:
+        raise MemoryError()
+    if dense:
+        index.entity_capacity = entity_capacity
+        index.entity_slots = <unsigned int*>malloc(
+            sizeof(unsigned int) * entity_capacity)
+        index.slot_entities = <unsigned int*>malloc(
+            sizeof(unsigned int) * total)
+        if index.entity_slots == NULL or index.slot_entities == NULL:
+            free_live_index(index)
+            raise MemoryError()
+    index.zone_totals = &index.zone_starts[zone_count]
+    index.zone_live = &index.zone_starts[zone_count*2]
+    for i in range(zone_count):
+        index.zone_starts[i], index.zone_totals[i] = zone_ranges[i]
+    clear_live_index(index, total)
+    return 1
+
+
+cdef void free_live_index(LiveIndex* index):
+    if index.zone_starts != NULL:
+        free(index.zone_starts)
+    if index.entity_slots != NULL:
+        free(index.entity_slots)
+    if index.slot_entities != NULL:
+        free(index.slot_entities)
+    index.zone_starts = NULL
+    index.zone_totals = NULL
+    index.zone_live = NULL
+    index.entity_slots = NULL
+    index.slot_entities = NULL
+    index.zone_count = 0
+    index.live_count = 0
+    index.entity_capacity = 0
+
+
+cdef void clear_live_index(LiveIndex* index, unsigned int total):
+    cdef unsigned int i
+    index.live_count = 0
+    for i in range(index.zone_count):
+        index.zone_live[i] = 0
+    if index.slot_entities == NULL:
+        return
+    for i in range(index.entity_capacity):
+        index.entity_slots[i] = <unsigned int>-1
+    for i in range(total):
+        index.slot_entities[i] = <unsigned int>-1
+
+
+cdef unsigned int dense_add(LiveIndex* index, unsigned int zone,
+    unsigned int entity_id) except -1:
+    '''
+    Takes the slot after the last live slot of zone for entity_id.
+
+    Return:
+        unsigned int: The block index of the slot.
+    '''
+    if entity_id >= index.entity_capacity:
+        raise IndexError('entity_id %d is out of range' % entity_id)
+    if index.zone_live[zone] >= index.zone_totals[zone]:
+        raise MemoryError()
+    cdef unsigned int block_index = (index.zone_starts[zone] +
+        index.zone_live[zone])
+    index.zone_live[zone] += 1
+    index.live_count += 1
+    index.entity_slots[entity_id] = block_index
+    index.slot_entities[block_index] = entity_id
+    return block_index
+
+
+cdef unsigned int dense_remove(LiveIndex* index, unsigned int entity_id,
+    void** data, unsigned int count) except -1:
+    '''
+    Frees the slot of entity_id by moving the pointers of the last live
+    entity of the same zone into it, so the live slots stay packed.
+
+    Return:
+        unsigned int: The block index of the slot that is no longer live,
+        its pointers have to be reset by the caller.
+    '''
+    cdef unsigned int block_index = <unsigned int>-1
+    if entity_id < index.entity_capacity:
+        block_index = index.entity_slots[entity_id]
+    if block_index == <unsigned int>-1:
+        raise KeyError(entity_id)
+    cdef unsigned int zone = index.zone_count - 1
+    while index.zone_starts[zone] > block_index:
+        zone -= 1
+    cdef unsigned int last = index.zone_starts[zone] + index.zone_live[zone] - 1
+    cdef unsigned int moved
+    if block_index != last:
+        memcpy(&data[block_index*count], &data[last*count],
+            sizeof(void*) * count)
+        moved = index.slot_entities[last]
+        index.slot_entities[block_index] = moved
+        index.entity_slots[moved] = block_index
+    index.slot_entities[last] = <unsigned int>-1
+    index.entity_slots[entity_id] = <unsigned int>-1
+    index.zone_live[zone] -= 1
+    index.live_count -= 1
+    return last
+
+
 cdef class ZonedAggregator:
     '''
     ZonedAggregator provides a shortcut for processing data from several
@@ -288,6 +820,24 @@ cdef class ZonedAggregator:
     Aggregator, you must remove and readd the entity to the Aggregator or it
     will have a bad reference.
 
+    Normally removing an entity leaves a hole of NULL pointers that the
+    update loop has to skip. If the aggregator is **dense** the live entities
+    are instead kept packed at the front of each zone: removing an entity
+    moves the last live entity of its zone into the freed slot. Either way
+    **get_live_range** gives the slots of a zone to loop over, like:
+
+        for zone in range(aggregator.live_index.zone_count):
+            end = aggregator.get_live_range(zone, &start)
+            for i in range(start, end):
+                if component_data[i*aggregator.count] == NULL:
+                    continue
+
+    The NULL check is only needed when the aggregator is not dense. Block
+    indices are not stable for a dense aggregator, look them up with
+    **get_block_index** when needed instead of storing them. Removing
+    entities while looping is safe if the loop runs backwards through each
+    zone.
+
     **Attributes (Cython Access Only):**
         **count** (unsigned int): The number of systems being tracked by this
         aggregator.
@@ -297,7 +847,7 @@ cdef class ZonedAggregator:
         total * count
 
         **entity_block_index** (dict): Stores the actual location of the entity
-        in the Aggregator as keyed by the entity_id.
+        in the Aggregator as keyed by the entity_id. None if **dense**.
 
         **system_names** (list): The systems that components will be retrieved
         from per entity.
@@ -307,10 +857,25 @@ cdef class ZonedAggregator:
 
         **gameworld** (object): Reference to the GameWorld for access to
         entities and system_manager.
+
+        **zone_indices** (dict): Index of each zone in the **live_index**
+        arrays keyed by zone name.
+
+        **block_zones** (list): The BlockZones of **memory_block** in the
+        same order.
+
+        **dense** (bint): Whether the live entities are kept packed.
+
+        **live_index** (LiveIndex): live_count is the number of entities
+        added, zone_count the number of zones and zone_starts and
+        zone_totals hold the first block index and the number of slots of
+        every zone. When **dense** zone_live holds the number of live slots
+        of every zone, and entity_slots and slot_entities map entity_ids to
+        block indices and back.
     '''
 
     def __cinit__(self, list system_names, dict zone_counts,
-        object gameworld, Buffer master_buffer):
+        object gameworld, Buffer master_buffer, bint dense=False):
         '''
         The ZonedAggregator allocates a ZonedBlock with enough space
         to fit the total sum of entities as specified in the zone_counts dict.
@@ -326,6 +891,9 @@ cdef class ZonedAggregator:
 
             master_buffer (Buffer): the buffer from which the void pointer
             array will be allocated.
+
+            dense (bint): If True keep the live entities packed in each zone.
+            Defaults to False.
         '''
         self.count = len(system_names)
         cdef unsigned int total = 0
@@ -338,8 +906,28 @@ cdef class ZonedAggregator:
         cdef unsigned int size_per_ent = sizeof(void*) * self.count
         self.memory_block = ZonedBlock(size_per_ent, zone_counts)
         self.memory_block.allocate_memory_with_buffer(master_buffer)
+        self.dense = dense
+        self.zone_indices = {}
+        cdef IndexedMemoryZone entities = gameworld.entities
+        cdef BlockZone zone
+        cdef list zone_ranges = []
+        self.block_zones = []
+        for zone in self.memory_block.zones.values():
+            zone_ranges.append((zone.start, zone.total, zone.name, zone))
+        zone_ranges.sort(key=lambda zone_range: zone_range[0])
+        for start, zone_total, zone_name, zone in zone_ranges:
+            self.zone_indices[zone_name] = len(self.block_zones)
+            self.block_zones.append(zone)
+        init_live_index(&self.live_index,
+            [zone_range[:2] for zone_range in zone_ranges], total,
+            entities.memory_zone.count, dense)
+        if dense:
+            self.entity_block_index = None
         self.clear()
 
+    def __dealloc__(self):
+        free_live_index(&self.live_index)
+
     cdef bool check_empty(self):
         '''
         Determines whether the **memory_block** is current empty
@@ -348,6 +936,8 @@ cdef class ZonedAggregator:
             bool: Will be True if there is no data in **memory_block**, else
             False.
         '''
+        if self.dense:
+            return self.live_index.live_count == 0
         return self.memory_block.check_empty()
 
     cdef void free(self):
@@ -375,11 +965,15 @@ cdef class ZonedAggregator:
         cdef unsigned int i
         for i in range(self.total*self.count):
             data[i] = NULL
+        if self.dense:
+            clear_live_index(&self.live_index, self.total)
 
     cdef int remove_entity(self, unsigned int entity_id) except 0:
         '''
         Removes a previously added entity. All pointers at the location
-        will be reset to NULL.
+        will be reset to NULL. If **dense** the last live entity of the zone
+        is moved into the location first, and the pointers of its old
+        location are reset instead.
 
         Args:
             entity_id (unsigned int): the id of the entity to remove from the
@@ -389,14 +983,21 @@ cdef class ZonedAggregator:
             int: 1 if entity_id was successfully removed, else 0. Return exists
             mainly for exception propogation from Cython to Python.
         '''
-        cdef unsigned int block_index = self.entity_block_index[entity_id]
-        cdef unsigned int adjusted_index = block_index * self.count
         cdef void** data = <void**>self.memory_block.data
+        cdef unsigned int block_index, adjusted_index
         cdef unsigned int i
+        if self.dense:
+            block_index = dense_remove(&self.live_index, entity_id, data,
+                self.count)
+        else:
+            block_index = self.entity_block_index[entity_id]
+            self.live_index.live_count -= 1
+        adjusted_index = block_index * self.count
         for i in range(self.count):
             data[adjusted_index+i] = NULL
-        self.memory_block.remove_data(block_index, 1)
-        del self.entity_block_index[entity_id]
+        if not self.dense:
+            self.memory_block.remove_data(block_index, 1)
+            del self.entity_block_index[entity_id]
         return 1
 
     cdef unsigned int add_entity(self, unsigned int entity_id,
@@ -420,17 +1021,49 @@ cdef class ZonedAggregator:
             unsigned int: Will return the index of the pointers in the
             **memory_block**
         '''
-        cdef unsigned int block_index = self.memory_block.add_data(1, zone_name)
+        cdef unsigned int block_index
+        if self.dense:
+            block_index = dense_add(&self.live_index,
+                self.zone_indices[zone_name], entity_id)
+        else:
+            block_index = self.memory_block.add_data(1, zone_name)
+            self.entity_block_index[entity_id] = block_index
+            self.live_index.live_count += 1
+        self.set_pointers(entity_id, block_index, False)
+        return block_index
+
+    cdef int set_pointers(self, unsigned int entity_id,
+        unsigned int block_index, bint checked) except 0:
+        '''
+        Stores the pointers to the current components of entity_id
+        corresponding to **system_names** at block_index.
+
+        Args:
+            entity_id (unsigned int): The id of the entity.
+
+            block_index (unsigned int): The location of the entity in the
+            **memory_block**.
+
+            checked (bint): If True raise a ValueError unless the entity and
+            each of its components are active, used when the entity data
+            comes from a snapshot.
+        '''
         cdef IndexedMemoryZone entities = self.gameworld.entities
+        if checked and (entity_id >= entities.memory_zone.count or
+            block_index >= self.total):
+            raise ValueError('Can not add entity {} at {}'.format(entity_id,
+                block_index))
         cdef unsigned int* entity = <unsigned int*>entities.get_pointer(
             entity_id)
+        if checked and entity[0] != entity_id:
+            raise ValueError('Entity {} is not active'.format(entity_id))
         cdef unsigned int adjusted_index = block_index * self.count
-        self.entity_block_index[entity_id] = block_index
         cdef unsigned int system_index, component_index, pointer_loc
         cdef StaticMemGameSystem system
         cdef unsigned int i
         cdef str system_name
         cdef MemoryZone memory_zone
+        cdef void* pointer
         cdef void** data = <void**>self.memory_block.data
         cdef SystemManager system_manager = self.gameworld.system_manager
         cdef list systems = system_manager.systems
@@ -440,8 +1073,150 @@ cdef class ZonedAggregator:
             component_index = entity[system_index+1]
             system = systems[system_index]
             memory_zone = system.imz_components.memory_zone
-            data[pointer_loc] = memory_zone.get_pointer(component_index)
-        return block_index
+            if checked and component_index >= memory_zone.count:
+                raise ValueError('Entity {} has no {} component'.format(
+                    entity_id, system_name))
+            pointer = memory_zone.get_pointer(component_index)
+            if checked and (<unsigned int*>pointer)[0] != entity_id:
+                raise ValueError('Entity {} has no {} component'.format(
+                    entity_id, system_name))
+            data[pointer_loc] = pointer
+        return 1
+
+    cdef bint has_entity(self, unsigned int entity_id):
+        '''
+        Checks whether entity_id has been added to the aggregator.
+
+        Args:
+            entity_id (unsigned int): The id of the entity to look for.
+
+        Return:
+            bint: True if the entity is in the aggregator, else False.
+        '''
+        if self.dense:
+            return (entity_id < self.live_index.entity_capacity and
+                self.live_index.entity_slots[entity_id] != <unsigned int>-1)
+        return entity_id in self.entity_block_index
+
+    cdef unsigned int get_block_index(self, unsigned int entity_id) except -1:
+        '''
+        Looks up the current location of an entity in the aggregator, the
+        pointers of the entity start at block_index * count in
+        memory_block.data. A KeyError is raised if the entity was not added.
+
+        Args:
+            entity_id (unsigned int): The id of the entity to look for.
+
+        Return:
+            unsigned int: The block index of the entity.
+        '''
+        if not self.has_entity(entity_id):
+            raise KeyError(entity_id)
+        if self.dense:
+            return self.live_index.entity_slots[entity_id]
+        return self.entity_block_index[entity_id]
+
+    cdef unsigned int get_live_range(self, unsigned int zone,
+        unsigned int* start):
+        '''
+        Gets the block indices to loop over to visit every entity of a zone.
+        If **dense** these are exactly the live entities, otherwise they run
+        up to the last slot the zone has used and removed entities leave
+        NULL pointers in between.
+
+        Args:
+            zone (unsigned int): Index of the zone, see **zone_indices**.
+
+            start (unsigned int*): Set to the first block index of the zone.
+
+        Return:
+            unsigned int: One past the last block index to visit.
+        '''
+        start[0] = self.live_index.zone_starts[zone]
+        if self.dense:
+            return start[0] + self.live_index.zone_live[zone]
+        cdef BlockZone block_zone = self.block_zones[zone]
+        return start[0] + block_zone.used_count
+
+    cdef tuple get_state(self):
+        '''
+        Saves which entity is in which slot, and the bookkeeping of every
+        BlockZone unless **dense**, so that **set_state** can put the
+        entities back in the same slots. The pointers themselves are not
+        saved.
+
+        Return:
+            tuple: The aggregator state.
+        '''
+        cdef LiveIndex* live_index = &self.live_index
+        cdef dict zone_states = None
+        cdef BlockZone zone
+        cdef unsigned int zone_index, block_index, start
+        entity_ids = array('I')
+        block_indices = array('I')
+        if self.dense:
+            for zone_index in range(live_index.zone_count):
+                start = live_index.zone_starts[zone_index]
+                for block_index in range(start,
+                    start + live_index.zone_live[zone_index]):
+                    entity_ids.append(live_index.slot_entities[block_index])
+                    block_indices.append(block_index)
+        else:
+            zone_states = {}
+            for zone in self.block_zones:
+                zone_states[zone.name] = zone.get_state()
+            entity_ids.extend(self.entity_block_index.keys())
+            block_indices.extend(self.entity_block_index.values())
+        return (zone_states, entity_ids, block_indices)
+
+    cdef int set_state(self, tuple state) except 0:
+        '''
+        Restores the result of **get_state**, looking up the pointers of
+        every entity again with **set_pointers**. The EntityManager and the
+        systems in **system_names** have to be restored first.
+
+        Args:
+            state (tuple): The result of **get_state**.
+        '''
+        cdef LiveIndex* live_index = &self.live_index
+        cdef dict zone_states
+        cdef BlockZone zone
+        cdef unsigned int entity_id, block_index, zone_index
+        zone_states, entity_ids, block_indices = state
+        if ((zone_states is None) != self.dense or
+            len(entity_ids) != len(block_indices) or
+            len(set(block_indices)) != len(block_indices) or
+            len(block_indices) > self.total):
+            raise ValueError(
+                'ZonedAggregator state does not match this ZonedAggregator')
+        self.clear()
+        if self.dense:
+            for block_index, entity_id in sorted(zip(block_indices,
+                entity_ids)):
+                if block_index >= self.total or self.has_entity(entity_id):
+                    raise ValueError('Can not add entity {} at {}'.format(
+                        entity_id, block_index))
+                zone_index = live_index.zone_count - 1
+                while live_index.zone_starts[zone_index] > block_index:
+                    zone_index -= 1
+                if dense_add(live_index, zone_index, entity_id) != (
+                    block_index):
+                    raise ValueError('Can not add entity {} at {}'.format(
+                        entity_id, block_index))
+                self.set_pointers(entity_id, block_index, True)
+            return 1
+        if len(zone_states) != len(self.block_zones):
+            raise ValueError(
+                'ZonedAggregator state does not match this ZonedAggregator')
+        for zone in self.block_zones:
+            zone.set_state(zone_states[zone.name])
+        for entity_id, block_index in zip(entity_ids, block_indices):
+            if entity_id in self.entity_block_index:
+                raise ValueError('Entity {} was saved twice'.format(entity_id))
+            self.set_pointers(entity_id, block_index, True)
+            self.entity_block_index[entity_id] = block_index
+        live_index.live_count = len(entity_ids)
+        return 1
 
 
 cdef class ComponentPointerAggregator:
@@ -456,6 +1231,10 @@ cdef class ComponentPointerAggregator:
     you must remove and readd the entity to the Aggregator or it will have a
     bad reference.
 
+    If the aggregator is **dense** the live entities are kept packed at the
+    front of the **memory_block** as a single zone of **live_index**, see
+    ZonedAggregator.
+
     **Attributes (Cython Access Only):**
         **count** (unsigned int): The number of systems being tracked by this
         aggregator.
@@ -465,7 +1244,7 @@ cdef class ComponentPointerAggregator:
         total * count
 
         **entity_block_index** (dict): Stores the actual location of the entity
-        in the Aggregator as keyed by the entity_id.
+        in the Aggregator as keyed by the entity_id. None if **dense**.
 
         **system_names** (list): The systems that components will be retrieved
         from per entity.
@@ -475,10 +1254,15 @@ cdef class ComponentPointerAggregator:
 
         **gameworld** (object): Reference to the GameWorld for access to
         entities and system_manager.
+
+        **dense** (bint): Whether the live entities are kept packed.
+
+        **live_index** (LiveIndex): The entities added as a single zone, see
+        ZonedAggregator.
     '''
 
     def __cinit__(self, list system_names, unsigned int total,
-        object gameworld, Buffer master_buffer):
+        object gameworld, Buffer master_buffer, bint dense=False):
         '''
         The ComponentPointerAggregator allocates a MemoryBlock with enough
         space to fit total * len(system_names) void pointers.
@@ -494,6 +1278,9 @@ cdef class ComponentPointerAggregator:
 
             master_buffer (Buffer): the buffer from which the void pointer
             array will be allocated.
+
+            dense (bint): If True keep the live entities packed. Defaults to
+            False.
         '''
         cdef unsigned int count = len(system_names)
         self.count = count
@@ -505,8 +1292,20 @@ cdef class ComponentPointerAggregator:
         cdef unsigned int size_in_kb = ((total * size_per_ent) // 1024) + 1
         self.memory_block = MemoryBlock(size_in_kb*1024, size_per_ent, 1)
         self.memory_block.allocate_memory_with_buffer(master_buffer)
+        self.dense = dense
+        cdef IndexedMemoryZone entities
+        if dense:
+            self.entity_block_index = None
+            entities = gameworld.entities
+            init_live_index(&self.live_index, [(0, total)], total,
+                entities.memory_zone.count, dense)
+        else:
+            init_live_index(&self.live_index, [(0, total)], total, 0, dense)
         self.clear()
 
+    def __dealloc__(self):
+        free_live_index(&self.live_index)
+
     cdef bool check_empty(self):
         '''
         Determines whether the **memory_block** is current empty
@@ -515,6 +1314,8 @@ cdef class ComponentPointerAggregator:
             bool: Will be True if there is no data in **memory_block**,
             else False.
         '''
+        if self.dense:
+            return self.live_index.live_count == 0
         return self.memory_block.check_empty()
 
     cdef void free(self):
@@ -543,11 +1344,15 @@ cdef class ComponentPointerAggregator:
         cdef unsigned int i
         for i in range(self.total*self.count):
             data[i] = NULL
+        if self.dense:
+            clear_live_index(&self.live_index, self.total)
 
     cdef int remove_entity(self, unsigned int entity_id) except 0:
         '''
         Removes a previously added entity. All pointers at the location
-        will be reset to NULL.
+        will be reset to NULL. If **dense** the last live entity is moved
+        into the location first, and the pointers of its old location are
+        reset instead.
 
         Args:
             entity_id (unsigned int): the id of the entity to remove from the
@@ -557,14 +1362,21 @@ cdef class ComponentPointerAggregator:
             int: 1 if entity_id was successfully removed, else 0. Return exists
             mainly for exception propogation from Cython to Python.
         '''
-        cdef unsigned int block_index = self.entity_block_index[entity_id]
-        cdef unsigned int adjusted_index = block_index * self.count
         cdef void** data = <void**>self.memory_block.data
+        cdef unsigned int block_index, adjusted_index
         cdef unsigned int i
+        if self.dense:
+            block_index = dense_remove(&self.live_index, entity_id, data,
+                self.count)
+        else:
+            block_index = self.entity_block_index[entity_id]
+            self.live_index.live_count -= 1
+        adjusted_index = block_index * self.count
         for i in range(self.count):
             data[adjusted_index+i] = NULL
-        self.memory_block.remove_data(block_index, 1)
-        del self.entity_block_index[entity_id]
+        if not self.dense:
+            self.memory_block.remove_data(block_index, 1)
+            del self.entity_block_index[entity_id]
         return 1
 
     cdef unsigned int add_entity(self, unsigned int entity_id) except -1:
@@ -584,12 +1396,17 @@ cdef class ComponentPointerAggregator:
             unsigned int: Will return the index of the pointers in the
             **memory_block**
         '''
-        cdef unsigned int block_index = self.memory_block.add_data(1)
+        cdef unsigned int block_index
+        if self.dense:
+            block_index = dense_add(&self.live_index, 0, entity_id)
+        else:
+            block_index = self.memory_block.add_data(1)
+            self.entity_block_index[entity_id] = block_index
+            self.live_index.live_count += 1
         cdef IndexedMemoryZone entities = self.gameworld.entities
         cdef unsigned int* entity = <unsigned int*>entities.get_pointer(
             entity_id)
         cdef unsigned int adjusted_index = block_index * self.count
-        self.entity_block_index[entity_id] = block_index
         cdef unsigned int system_index, component_index, pointer_loc
         cdef StaticMemGameSystem system
         cdef unsigned int i
@@ -606,3 +1423,54 @@ cdef class ComponentPointerAggregator:
             memory_zone = system.imz_components.memory_zone
             data[pointer_loc] = memory_zone.get_pointer(component_index)
         return block_index
+
+    cdef bint has_entity(self, unsigned int entity_id):
+        '''
+        Checks whether entity_id has been added to the aggregator.
+
+        Args:
+            entity_id (unsigned int): The id of the entity to look for.
+
+        Return:
+            bint: True if the entity is in the aggregator, else False.
+        '''
+        if self.dense:
+            return (entity_id < self.live_index.entity_capacity and
+                self.live_index.entity_slots[entity_id] != <unsigned int>-1)
+        return entity_id in self.entity_block_index
+
+    cdef unsigned int get_block_index(self, unsigned int entity_id) except -1:
+        '''
+        Looks up the current location of an entity in the aggregator. A
+        KeyError is raised if the entity was not added.
+
+        Args:
+            entity_id (unsigned int): The id of the entity to look for.
+
+        Return:
+            unsigned int: The block index of the entity.
+        '''
+        if not self.has_entity(entity_id):
+            raise KeyError(entity_id)
+        if self.dense:
+            return self.live_index.entity_slots[entity_id]
+        return self.entity_block_index[entity_id]
+
+    cdef unsigned int get_live_range(self, unsigned int zone,
+        unsigned int* start):
+        '''
+        Gets the block indices to loop over to visit every entity, see
+        ZonedAggregator.get_live_range. There is a single zone, 0.
+
+        Args:
+            zone (unsigned int): Index of the zone, always 0.
+
+            start (unsigned int*): Set to the first block index, 0.
+
+        Return:
+            unsigned int: One past the last block index to visit.
+        '''
+        start[0] = 0
+        if self.dense:
+            return self.live_index.zone_live[0]
+        return self.memory_block.used_count
@@ -0,0 +1,90 @@
+from kivent_core.gameworld import GameWorld
+from kivent_core.systems.position_systems import PositionSystem2D
+from kivent_core.systems.renderers import Renderer
+from kivent_core.memory_handlers.utils import memrange
+
+
+def make_test_gameworld(unsigned int count):
+    gameworld = GameWorld(zones={'general': count + 100},
+        size_of_gameworld=8*1024, headless=True)
+    gameworld.add_system(PositionSystem2D(gameworld=gameworld,
+        zones=['general']))
+    gameworld.add_system(Renderer(gameworld=gameworld, zones=['general'],
+        max_batches=count // 100 + 1, size_of_batches=64))
+    gameworld.allocate()
+    return gameworld
+
+
+def test_snapshot_untextured(unsigned int count):
+    gameworld = make_test_gameworld(count)
+    component_order = ['position', 'renderer']
+    model_manager = gameworld.model_manager
+    model_key = model_manager.load_model('vertex_format_4f', 4, 6,
+        'untextured')
+    components = {'position': [(float(i), 0.) for i in range(count)],
+        'renderer': {'model_key': model_key}}
+    gameworld.init_entities_bulk(components, component_order, count)
+    renderer = gameworld.system_manager['renderer']
+    data = gameworld.snapshot_manager.snapshot()
+    for entity_id in range(0, count, 2):
+        gameworld.remove_entity(entity_id)
+    gameworld.snapshot_manager.restore(data)
+    entity_ids = [component.entity_id
+        for component in memrange(renderer.components)]
+    assert(entity_ids == list(range(count)))
+    for component in memrange(renderer.components):
+        assert(component.texture_key is None)
+        assert(component.model.name == 'untextured')
+        assert(component.batch_id != <unsigned int>-1)
+    assert(gameworld.snapshot_manager.snapshot() == data)
+
+
+def check_test_gameworld(gameworld, unsigned int count, str model_name):
+    renderer = gameworld.system_manager['renderer']
+    position = gameworld.system_manager['position']
+    registered = gameworld.model_manager.model_register.get(model_name, {})
+    assert(gameworld.entities.get_active_count() == count)
+    assert(position.components.get_active_count() == count)
+    assert(renderer.components.get_active_count() == count)
+    assert(len(registered) == count)
+    for component in memrange(renderer.components):
+        if component.entity_id != <unsigned int>-1:
+            assert(component.entity_id in registered)
+            assert(component.batch_id != <unsigned int>-1)
+
+
+def test_init_entities_rollback(unsigned int count):
+    gameworld = make_test_gameworld(2 * count)
+    component_order = ['position', 'renderer']
+    model_manager = gameworld.model_manager
+    model_key = model_manager.load_model('vertex_format_4f', 4, 6,
+        'untextured')
+    positions = [(float(i), 0.) for i in range(count)]
+    gameworld.init_entities_bulk({'position': positions,
+        'renderer': {'model_key': model_key}}, component_order, count // 2)
+    check_test_gameworld(gameworld, count // 2, model_key)
+    #fails halfway through the positions, before any renderer is made
+    bad_positions = list(positions)
+    bad_positions[count // 2] = None
+    try:
+        gameworld.init_entities_bulk({'position': bad_positions,
+            'renderer': {'model_key': model_key}}, component_order, count)
+    except TypeError:
+        pass
+    else:
+        assert(False)
+    check_test_gameworld(gameworld, count // 2, model_key)
+    #fails halfway through the renderers, after the first half is batched
+    renderer_args = [{'model_key': model_key} for i in range(count)]
+    renderer_args[count // 2] = {'model_key': 'missing'}
+    try:
+        gameworld.init_entities_bulk({'position': positions,
+            'renderer': renderer_args}, component_order, count)
+    except KeyError:
+        pass
+    else:
+        assert(False)
+    check_test_gameworld(gameworld, count // 2, model_key)
+    gameworld.init_entities_bulk({'position': positions,
+        'renderer': {'model_key': model_key}}, component_order, count)
+    check_test_gameworld(gameworld, count + count // 2, model_key)
@@ -85,6 +85,10 @@ elif platform == 'darwin':
                        '-framework', 'OpenGL']
     libraries = []
 
+if environ.get('KIVENT_USE_OPENMP'):
+    extra_compile_args = extra_compile_args + ['-fopenmp']
+    extra_link_args = extra_link_args + ['-fopenmp']
+
 do_clear_existing = False
 
 prefixes = {
@@ -106,7 +110,7 @@ file_prefixes = {
 }
 
 modules = {
-    'core': ['entity', 'gameworld'],
+    'core': ['entity', 'gameworld', 'rng', 'tests'],
     'memory_handlers': [
         'block', 'membuffer', 'indexing', 'pool', 'utils',
         'zone', 'tests', 'zonedblock'
@@ -119,12 +123,13 @@ modules = {
     'managers': [
         'resource_managers', 'system_manager', 'entity_manager',
         'sound_manager', 'game_manager', 'animation_manager',
+        'profile_manager', 'schedule_manager', 'snapshot_manager',
     ],
     'uix': ['cwidget', 'gamescreens'],
     'systems': [
         'gamesystem', 'staticmemgamesystem', 'position_systems',
         'gameview', 'scale_systems', 'rotate_systems', 'color_systems',
-        'gamemap', 'renderers', 'lifespan', 'animation_sys',
+        'gamemap', 'renderers', 'lifespan', 'animation_sys', 'spatial_hash',
     ],
 }
 
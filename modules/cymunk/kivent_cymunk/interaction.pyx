@@ -141,6 +141,7 @@ cdef class CymunkTouchSystem(StaticMemGameSystem):
     component_type = ObjectProperty(CymunkTouchComponent)
     zone_to_use = StringProperty('touch')
     system_names = ListProperty(['cymunk_touch','position'])
+    supports_snapshot = BooleanProperty(False)
 
 
     def init_component(self, unsigned int component_index,
@@ -456,6 +457,7 @@ cdef class SteeringSystem(StaticMemGameSystem):
     system_id = StringProperty('steering')
     updateable = BooleanProperty(True)
     system_names = ListProperty(['steering','cymunk_physics'])
+    supports_snapshot = BooleanProperty(False)
     processor = BooleanProperty(True)
     type_size = NumericProperty(sizeof(SteeringStruct))
     component_type = ObjectProperty(SteeringComponent)
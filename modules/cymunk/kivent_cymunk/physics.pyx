@@ -14,12 +14,13 @@ from libc.math cimport M_PI_2
 cimport cython
 from kivy.factory import Factory
 from kivent_core.systems.staticmemgamesystem cimport (StaticMemGameSystem,
-    MemComponent)
+    MemComponent, KernelQueue)
 from kivent_core.memory_handlers.membuffer cimport Buffer
 from kivent_core.memory_handlers.block cimport MemoryBlock
 from kivent_core.memory_handlers.zone cimport MemoryZone
 from kivent_core.memory_handlers.indexing cimport IndexedMemoryZone
 from kivent_core.managers.system_manager cimport SystemManager
+from kivent_core.systems.gamesystem cimport GameSystem
 
 
 cdef class PhysicsComponent(MemComponent):
@@ -86,6 +87,22 @@ cdef class PhysicsComponent(MemComponent):
             self._shape_type = value
 
 
+cdef void copy_body_kernel(void** components, float dt, void* user_data,
+    KernelQueue* queue) noexcept nogil:
+    '''
+    Copies the position and angle of a single entity's body into its
+    position and rotate components, see StaticMemGameSystem.run_kernel.
+    '''
+    cdef PhysicsStruct* physics_comp = <PhysicsStruct*>components[0]
+    cdef PositionStruct2D* pos_comp = <PositionStruct2D*>components[1]
+    cdef RotateStruct2D* rot_comp = <RotateStruct2D*>components[2]
+    cdef cpBody* body = physics_comp.body
+    cdef cpVect p_position = body.p
+    rot_comp.r = body.a
+    pos_comp.x = p_position.x
+    pos_comp.y = p_position.y
+
+
 cdef class CymunkPhysics(StaticMemGameSystem):
     '''
     Processing Depends On: 
@@ -137,8 +154,10 @@ cdef class CymunkPhysics(StaticMemGameSystem):
     type_size = NumericProperty(sizeof(PhysicsStruct))
     component_type = ObjectProperty(PhysicsComponent)
     processor = BooleanProperty(True)
+    dense_aggregator = BooleanProperty(True)
     ignore_groups = ListProperty([])
     system_names = ListProperty(['cymunk_physics','position', 'rotate'])
+    supports_snapshot = BooleanProperty(False)
 
     property space:
         def __get__(self):
@@ -463,6 +482,13 @@ cdef class CymunkPhysics(StaticMemGameSystem):
         component._shape_type = 'None'
         self._clear_component(component_index)
 
+    def create_components(self, list entity_ids, str zone_name, args):
+        '''Each body has to be added to the Space and synced with its
+        position and rotate components as it is created, so bulk creation
+        falls back to calling **create_component** for every entity.'''
+        return GameSystem.create_components(self, entity_ids, zone_name,
+            args)
+
     def create_component(self, unsigned int entity_id, str zone_name, args):
         component_index = super(CymunkPhysics, self).create_component(
             entity_id, zone_name, args)
@@ -515,34 +541,11 @@ cdef class CymunkPhysics(StaticMemGameSystem):
 
     def update(self, dt):
         '''Handles update of the cymunk space and updates the component data
-        for position and rotate components. '''
+        for position and rotate components, across threads if **parallel**
+        is True. '''
 
         self.space.step(dt)
-
-        cdef void** component_data = <void**>(
-            self.entity_components.memory_block.data)
-        cdef unsigned int component_count = self.entity_components.count
-        cdef unsigned int count = self.entity_components.memory_block.count
-        cdef unsigned int i, real_index
-        cdef PositionStruct2D* pos_comp
-        cdef RotateStruct2D* rot_comp
-        cdef PhysicsStruct* physics_comp
-        cdef cpBody* body
-        cdef cpVect p_position
-
-        for i in range(count):
-            real_index = i*component_count
-            if component_data[real_index] == NULL:
-                continue
-            physics_comp = <PhysicsStruct*>component_data[real_index]
-            pos_comp = <PositionStruct2D*>component_data[real_index+1]
-            rot_comp = <RotateStruct2D*>component_data[real_index+2]
-            body = physics_comp.body
-            rot_comp.r = body.a
-            p_position = body.p
-            pos_comp.x = p_position.x
-            pos_comp.y = p_position.y
-
+        self.run_kernel(copy_body_kernel, dt, NULL, False)
 
 
 Factory.register('CymunkPhysics', cls=CymunkPhysics)
@@ -46,14 +46,29 @@ cdef class TileMap:
     cdef unsigned int object_count
     cdef list _z_index_map
     cdef list _obj_layers_index
+    cdef void _get_tile_positions(self, const int* cols, const int* rows,
+                                  double* xs, double* ys, unsigned int count)
+    cdef void _get_tile_indices(self, const double* xs, const double* ys,
+                                int* cols, int* rows, unsigned int count)
 
 cdef class StaggeredTileMap(TileMap):
     cdef bint _stagger_index # True for Even, False for Odd
     cdef bint _stagger_axis # True for X, False for Y
+    cdef void _get_tile_positions(self, const int* cols, const int* rows,
+                                  double* xs, double* ys, unsigned int count)
+    cdef void _get_tile_indices(self, const double* xs, const double* ys,
+                                int* cols, int* rows, unsigned int count)
 
 cdef class HexagonalTileMap(StaggeredTileMap):
     cdef unsigned int hex_side_length
+    cdef void _get_tile_positions(self, const int* cols, const int* rows,
+                                  double* xs, double* ys, unsigned int count)
+    cdef void _get_tile_indices(self, const double* xs, const double* ys,
+                                int* cols, int* rows, unsigned int count)
 
 cdef class IsometricTileMap(TileMap):
-    pass
+    cdef void _get_tile_positions(self, const int* cols, const int* rows,
+                                  double* xs, double* ys, unsigned int count)
+    cdef void _get_tile_indices(self, const double* xs, const double* ys,
+                                int* cols, int* rows, unsigned int count)
 
@@ -4,6 +4,8 @@ from kivent_core.rendering.animation cimport FrameList
 from kivent_core.managers.resource_managers import texture_manager
 from kivent_core.memory_handlers.block cimport MemoryBlock
 from kivent_maps.map_manager cimport MapManager
+from libc.math cimport fabs, sqrt
+from array import array
 import math
 
 
@@ -417,6 +419,171 @@ cdef class TileMap:
 
         return (int(pixel_x/tw), int((h - pixel_y)/th))
 
+    def get_tile_positions(self, const int[::1] cols, const int[::1] rows,
+                           double[::1] out_x=None, double[::1] out_y=None):
+        '''
+        Batched version of **get_tile_position**, calculating the pixel
+        position of the center of many tiles in one typed loop.
+
+        Args:
+            cols (int buffer): cols of the tiles, such as an array.array('i')
+            or an int32 numpy array.
+
+            rows (int buffer): rows of the tiles, same length as cols.
+
+            out_x (double buffer): Optional writable buffer such as an
+            array.array('d') or a float64 numpy array to write the x
+            positions into. A new array.array('d') is made if None.
+
+            out_y (double buffer): Same as out_x for the y positions.
+
+        Return:
+            (out_x, out_y): The buffers holding the x and y positions.
+        '''
+        cdef unsigned int count = cols.shape[0]
+        if rows.shape[0] != count:
+            raise ValueError('Expected %d rows, got %d' % (
+                count, rows.shape[0]))
+        if out_x is None:
+            out_x = array('d', [0.]) * count
+        if out_y is None:
+            out_y = array('d', [0.]) * count
+        if out_x.shape[0] < count or out_y.shape[0] < count:
+            raise ValueError('Output buffers must hold %d positions' % count)
+        if count > 0:
+            self._get_tile_positions(&cols[0], &rows[0], &out_x[0],
+                                     &out_y[0], count)
+        return (out_x.base, out_y.base)
+
+    def get_tile_indices(self, const double[::1] pixels_x,
+                         const double[::1] pixels_y,
+                         int[::1] out_cols=None, int[::1] out_rows=None):
+        '''
+        Batched version of **get_tile_index**, calculating the grid position
+        of the tiles at many pixel positions in one typed loop. Pixels that
+        get_tile_index can not place in a tile of a staggered or hexagonal
+        map get a col and row of -1.
+
+        Args:
+            pixels_x (double buffer): horizontal pixel positions from the
+            left edge, such as an array.array('d') or a float64 numpy array.
+
+            pixels_y (double buffer): vertical pixel positions from the
+            bottom edge, same length as pixels_x.
+
+            out_cols (int buffer): Optional writable buffer such as an
+            array.array('i') or an int32 numpy array to write the cols into.
+            A new array.array('i') is made if None.
+
+            out_rows (int buffer): Same as out_cols for the rows.
+
+        Return:
+            (out_cols, out_rows): The buffers holding the cols and rows.
+        '''
+        cdef unsigned int count = pixels_x.shape[0]
+        if pixels_y.shape[0] != count:
+            raise ValueError('Expected %d y positions, got %d' % (
+                count, pixels_y.shape[0]))
+        if out_cols is None:
+            out_cols = array('i', [0]) * count
+        if out_rows is None:
+            out_rows = array('i', [0]) * count
+        if out_cols.shape[0] < count or out_rows.shape[0] < count:
+            raise ValueError('Output buffers must hold %d indices' % count)
+        if count > 0:
+            self._get_tile_indices(&pixels_x[0], &pixels_y[0], &out_cols[0],
+                                   &out_rows[0], count)
+        return (out_cols.base, out_rows.base)
+
+    cdef void _get_tile_positions(self, const int* cols, const int* rows,
+                                  double* xs, double* ys, unsigned int count):
+        cdef double w, h
+        w, h = self.size_on_screen
+        cdef double tw = self.tile_size_x
+        cdef double th = self.tile_size_y
+        cdef unsigned int n
+
+        for n in range(count):
+            xs[n] = cols[n] * tw + tw/2
+            ys[n] = h - rows[n] * th - th/2
+
+    cdef void _get_tile_indices(self, const double* xs, const double* ys,
+                                int* cols, int* rows, unsigned int count):
+        cdef double w, h
+        w, h = self.size_on_screen
+        cdef double tw = self.tile_size_x
+        cdef double th = self.tile_size_y
+        cdef unsigned int n
+
+        for n in range(count):
+            cols[n] = <int>(xs[n]/tw)
+            rows[n] = <int>((h - ys[n])/th)
+
+    def get_chunk_count(self, unsigned int chunk_size):
+        '''
+        Calculates how many chunks of chunk_size x chunk_size tiles are
+        needed to cover the map. Chunks on the right and bottom edges may
+        hold fewer tiles.
+
+        Args:
+            chunk_size (unsigned int): cols and rows of tiles in one chunk
+
+        Return:
+            (unsigned int, unsigned int): number of chunk cols and rows.
+        '''
+        return ((self.size_x + chunk_size - 1) // chunk_size,
+                (self.size_y + chunk_size - 1) // chunk_size)
+
+    def get_chunk_tiles(self, unsigned int ci, unsigned int cj,
+                        unsigned int chunk_size):
+        '''
+        Calculates the range of tiles in the chunk at (ci, cj).
+
+        Args:
+            ci (unsigned int): col of the chunk
+
+            cj (unsigned int): row of the chunk
+
+            chunk_size (unsigned int): cols and rows of tiles in one chunk
+
+        Return:
+            (unsigned int, unsigned int, unsigned int, unsigned int): first
+            col, first row, last col + 1 and last row + 1 of the tiles.
+        '''
+        return (ci * chunk_size, cj * chunk_size,
+                min((ci + 1) * chunk_size, self.size_x),
+                min((cj + 1) * chunk_size, self.size_y))
+
+    def get_chunk_bounds(self, unsigned int ci, unsigned int cj,
+                         unsigned int chunk_size):
+        '''
+        Calculates a pixel rectangle containing every tile of the chunk at
+        (ci, cj). It is found from the position of the tiles on the corners
+        of the chunk, padded by one tile on every side so that it also
+        holds the shifted rows and cols of staggered and hexagonal maps.
+
+        Args:
+            ci (unsigned int): col of the chunk
+
+            cj (unsigned int): row of the chunk
+
+            chunk_size (unsigned int): cols and rows of tiles in one chunk
+
+        Return:
+            (float, float, float, float): left, bottom, right and top edges
+            of the rectangle.
+        '''
+        i0, j0, i1, j1 = self.get_chunk_tiles(ci, cj, chunk_size)
+        tw, th = self.tile_size
+        xs = []
+        ys = []
+        for i, j in ((i0, j0), (i1 - 1, j0), (i0, j1 - 1), (i1 - 1, j1 - 1)):
+            x, y = self.get_tile_position(i, j)
+            xs.append(x)
+            ys.append(y)
+
+        return (min(xs) - tw, min(ys) - th, max(xs) + tw, max(ys) + th)
+
     property tiles:
         def __get__(self):
             tile_list = []
@@ -639,6 +806,88 @@ cdef class StaggeredTileMap(TileMap):
 
         return (col,row)
 
+    cdef void _get_tile_positions(self, const int* cols, const int* rows,
+                                  double* xs, double* ys, unsigned int count):
+        cdef double w, h
+        w, h = self.size_on_screen
+        cdef double tw = self.tile_size_x
+        cdef double th = self.tile_size_y
+        cdef bint sa = self._stagger_axis
+        cdef bint si = self._stagger_index
+        cdef unsigned int n
+        cdef int i, j
+
+        for n in range(count):
+            i = cols[n]
+            j = rows[n]
+            if sa:
+                ys[n] = h - (j * th + th)
+                xs[n] = (i * tw)/2 + tw/2
+                # (i+1)%2 == 0 for an odd i, also when i is negative
+                if si != <bint>(i & 1):
+                    ys[n] -= th/2
+            else:
+                ys[n] = h - ((j * th)/2 + th)
+                xs[n] = i * tw + tw/2
+                if si != <bint>(j & 1):
+                    xs[n] += tw/2
+
+    cdef void _get_tile_indices(self, const double* xs, const double* ys,
+                                int* cols, int* rows, unsigned int count):
+        cdef double w, h
+        w, h = self.size_on_screen
+        cdef double tw = self.tile_size_x
+        cdef double th = self.tile_size_y
+        cdef bint sa = self._stagger_axis
+        cdef bint si = self._stagger_index
+        cdef double m = th/tw
+        cdef double px, py, rel_x_g, rel_x_r, rel_y_g, rel_y_r
+        cdef int col_shifted, col_non_shifted, row_shifted, row_non_shifted
+        cdef unsigned int n
+
+        for n in range(count):
+            px = xs[n]
+            py = ys[n]
+            col_shifted = <int>((px - tw/2)/tw)
+            col_non_shifted = <int>(px/tw)
+            row_shifted = <int>((h - py - th/2)/th)
+            row_non_shifted = <int>((h - py)/th)
+
+            rel_x_g = fabs(px - col_non_shifted*tw)
+            rel_x_r = fabs(px - col_shifted*tw - tw/2)
+
+            if si:
+                rel_y_g = fabs(h - py - row_shifted*th - 1.5*th)
+                rel_y_r = fabs(h - py - row_non_shifted*th - th)
+            else:
+                rel_y_r = fabs(h - py - row_shifted*th - 1.5*th)
+                rel_y_g = fabs(h - py - row_non_shifted*th - th)
+
+            if (rel_y_g > m*rel_x_g - th/2 and rel_y_g < -m*rel_x_g + 3*(th/2)
+                    and rel_y_g < m*rel_x_g + th/2
+                    and rel_y_g > -m*rel_x_g + th/2):
+                if sa:
+                    rows[n] = row_shifted if si else row_non_shifted
+                    cols[n] = col_non_shifted*2
+                else:
+                    cols[n] = col_non_shifted
+                    rows[n] = row_shifted*2+1 if si else row_non_shifted*2
+
+            elif (rel_y_r > m*rel_x_r - th/2
+                    and rel_y_r < -m*rel_x_r + 3*(th/2)
+                    and rel_y_r < m*rel_x_r + th/2
+                    and rel_y_r > -m*rel_x_r + th/2):
+                if sa:
+                    rows[n] = row_non_shifted if si else row_shifted
+                    cols[n] = col_shifted*2+1
+                else:
+                    cols[n] = col_shifted
+                    rows[n] = row_non_shifted*2 if si else row_shifted*2+1
+
+            else:
+                cols[n] = -1
+                rows[n] = -1
+
     property size_on_screen:
         def __get__(self):
             sx, sy = self.size_x, self.size_y
@@ -770,7 +1019,109 @@ cdef class HexagonalTileMap(StaggeredTileMap):
                 row = row_shifted*2+1
 
         return (col, row)
-        
+
+    cdef void _get_tile_positions(self, const int* cols, const int* rows,
+                                  double* xs, double* ys, unsigned int count):
+        cdef double w, h
+        w, h = self.size_on_screen
+        cdef double tw = self.tile_size_x
+        cdef double th = self.tile_size_y
+        cdef double ts = self.hex_side_length
+        cdef bint sa = self._stagger_axis
+        cdef bint si = self._stagger_index
+        cdef unsigned int n
+        cdef int i, j
+
+        for n in range(count):
+            i = cols[n]
+            j = rows[n]
+            if sa:
+                ys[n] = h - (j * th + th/2)
+                xs[n] = (i * (tw + ts))/2 + tw/2
+                if si != <bint>(i & 1):
+                    ys[n] -= th/2
+            else:
+                ys[n] = h - ((j * (th + ts))/2 + th/2)
+                xs[n] = i * tw + tw/2
+                if si != <bint>(j & 1):
+                    xs[n] += tw/2
+
+    cdef void _get_tile_indices(self, const double* xs, const double* ys,
+                                int* cols, int* rows, unsigned int count):
+        cdef double w, h
+        w, h = self.size_on_screen
+        cdef double tw = self.tile_size_x
+        cdef double th = self.tile_size_y
+        cdef double ts = self.hex_side_length
+        cdef bint sa = self._stagger_axis
+        cdef bint si = self._stagger_index
+        cdef double c, m, px, py, rel_x_g, rel_x_r, rel_y_g, rel_y_r
+        cdef int col_shifted, col_non_shifted, row_shifted, row_non_shifted
+        cdef unsigned int n
+
+        if sa:
+            c = (tw - ts)/2
+            m = (th/2)/c
+        else:
+            c = (th - ts)/2
+            m = c/(tw/2)
+
+        for n in range(count):
+            px = xs[n]
+            py = ys[n]
+            if sa:
+                col_shifted = <int>((px - ts - c)/(tw + ts))
+                col_non_shifted = <int>(px/(tw + ts))
+                row_shifted = <int>((h - py - th/2)/th)
+                row_non_shifted = <int>((h - py)/th)
+
+                rel_x_g = fabs(px - col_non_shifted*(tw + ts))
+                rel_x_r = fabs(px - col_shifted*(tw + ts) - (ts + c))
+
+                if si:
+                    rel_y_g = fabs(h - py - row_shifted*th - 1.5*th)
+                    rel_y_r = fabs(h - py - row_non_shifted*th - th)
+                else:
+                    rel_y_r = fabs(h - py - row_shifted*th - 1.5*th)
+                    rel_y_g = fabs(h - py - row_non_shifted*th - th)
+
+                if (rel_y_g >= m*rel_x_g - m*(ts+c)
+                        and rel_y_g <= -m*rel_x_g + th + m*(ts+c)
+                        and rel_y_g <= th and rel_y_g >= 0
+                        and rel_y_g <= m*rel_x_g + th/2
+                        and rel_y_g >= -m*rel_x_g + th/2):
+                    cols[n] = col_non_shifted*2
+                    rows[n] = row_shifted if si else row_non_shifted
+                else:
+                    cols[n] = col_shifted*2 + 1
+                    rows[n] = row_non_shifted if si else row_shifted
+
+            else:
+                col_shifted = <int>((px - tw/2)/tw)
+                col_non_shifted = <int>(px/tw)
+                row_non_shifted = <int>((h - py)/(th + ts))
+                row_shifted = <int>((h - py - (ts+c))/(th + ts))
+
+                rel_y_g = fabs(h - py - row_non_shifted*(th + ts) - (th + ts))
+                rel_y_r = fabs(h - py - (row_shifted + 1)*(th + ts) - (ts + c))
+
+                if si:
+                    rel_x_g = fabs(px - tw/2 - col_shifted*tw)
+                    rel_x_r = fabs(px - col_non_shifted*tw)
+                else:
+                    rel_x_g = fabs(px - col_non_shifted*tw)
+                    rel_x_r = fabs(px - tw/2 - col_shifted*tw)
+
+                if (rel_y_g >= -m*rel_x_g + (ts + c)
+                        and rel_y_g >= m*rel_x_g + (ts - c)
+                        and rel_y_g <= m*rel_x_g + (2*ts + c)
+                        and rel_y_g <= -m*rel_x_g + (2*ts + 3*c)):
+                    cols[n] = col_shifted if si else col_non_shifted
+                    rows[n] = row_non_shifted*2
+                else:
+                    cols[n] = col_non_shifted if si else col_shifted
+                    rows[n] = row_shifted*2+1
+
     property size_on_screen:
         def __get__(self):
             sx, sy = self.size_x, self.size_y
@@ -832,6 +1183,37 @@ cdef class IsometricTileMap(TileMap):
 
         return (col, row)
 
+    cdef void _get_tile_positions(self, const int* cols, const int* rows,
+                                  double* xs, double* ys, unsigned int count):
+        cdef double w, h
+        w, h = self.size_on_screen
+        cdef double tw = self.tile_size_x
+        cdef double th = self.tile_size_y
+        cdef unsigned int n
+
+        for n in range(count):
+            xs[n] = (cols[n] - rows[n]) * tw/2 + w/2
+            ys[n] = h - th - (cols[n] + rows[n]) * th/2
+
+    cdef void _get_tile_indices(self, const double* xs, const double* ys,
+                                int* cols, int* rows, unsigned int count):
+        cdef double w, h
+        w, h = self.size_on_screen
+        cdef double tw = self.tile_size_x
+        cdef double th = self.tile_size_y
+        cdef double m = th/tw
+        cdef double cos_a = 1/sqrt(1 + m*m)
+        cdef double sin_a = sqrt(1 - cos_a*cos_a)
+        cdef double side = th/(2*sin_a)
+        cdef double px, py
+        cdef unsigned int n
+
+        for n in range(count):
+            py = h - ys[n]
+            px = xs[n] - w/2
+            cols[n] = <int>((px/(2*cos_a) + py/(2*sin_a))/side)
+            rows[n] = <int>((py/(2*sin_a) - px/(2*cos_a))/side)
+
     property size_on_screen:
         def __get__(self):
             s = max(self.size_x, self.size_y)
@@ -2,9 +2,141 @@ from kivent_core.managers.resource_managers cimport ModelManager
 from kivent_core.managers.animation_manager cimport AnimationManager
 from kivent_core.managers.game_manager cimport GameManager
 from kivent_core.memory_handlers.block cimport MemoryBlock
+from kivent_core.rendering.model cimport VertexModel
+from kivent_core.rendering.vertex_formats cimport FormatConfig
+from kivent_core.managers.resource_managers import texture_manager
 from kivent_maps.map_data cimport TileMap, StaggeredTileMap, \
-        HexagonalTileMap, IsometricTileMap
+        HexagonalTileMap, IsometricTileMap, TileStruct
+from kivent_core.rendering.animation cimport FrameList
 from kivy.compat import PY2
+from kivy.graphics.cgl cimport GLfloat, GLushort
+from libc.string cimport memcpy
+from libc.stdlib cimport malloc, free
+from hashlib import sha1
+import json
+import mmap
+import os
+import struct
+
+
+# Layout of the header of a compiled map: magic, format version, a number
+# written in native byte order to detect caches from another platform, mtime
+# and sha1 of the TMX, size of the tables, cols, rows and tile layers.
+MAP_CACHE_MAGIC = b'KVMC'
+MAP_CACHE_VERSION = 1
+MAP_CACHE_BYTE_ORDER = struct.pack('=I', 0x01020304)
+MAP_CACHE_HEADER = struct.Struct('<4sI4sd20sIIII')
+
+
+def _hash_file(str filename):
+    cdef object digest = sha1()
+    with open(filename, 'rb') as source:
+        for chunk in iter(lambda: source.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def write_map_cache(str cache_filename, str tmx_filename, dict tables,
+                    unsigned int size_x, unsigned int size_y,
+                    unsigned int tile_layers, tiles):
+    '''
+    Writes a compiled map. The file holds a header, the tables as utf-8
+    JSON and then the raw tiles as unsigned ints in the order of the
+    TileStructs of a TileMap, [col][row][layer]. A tile is 0 when its layer
+    is empty, otherwise the index + 1 of its entry in tables['tile_kinds'],
+    a list of [model, texture, animation] names.
+
+    The tables hold everything else needed to load the map, see
+    map_utils.compile_tmx. The cache is only valid for the TMX it was
+    compiled from, checked by **read_map_cache** with its mtime and sha1.
+
+    Args:
+        cache_filename (str): Name of the file to write.
+
+        tmx_filename (str): Name of the TMX the map was compiled from.
+
+        tables (dict): JSON serializable tables of the map.
+
+        size_x (unsigned int): number of cols
+
+        size_y (unsigned int): number of rows
+
+        tile_layers (unsigned int): number of tile layers
+
+        tiles: buffer of size_x * size_y * tile_layers unsigned ints, such
+        as an array.array('I').
+    '''
+    cdef bytes table_data = json.dumps(tables,
+                                       separators=(',', ':')).encode('utf-8')
+    cdef bytes tile_data = bytes(memoryview(tiles).cast('B'))
+    if len(tile_data) != size_x * size_y * tile_layers * sizeof(unsigned int):
+        raise ValueError('Expected %d tiles, got %d bytes' % (
+            size_x * size_y * tile_layers, len(tile_data)))
+    padding = -(MAP_CACHE_HEADER.size + len(table_data)) % sizeof(
+        unsigned int)
+    with open(cache_filename, 'wb') as cache:
+        cache.write(MAP_CACHE_HEADER.pack(MAP_CACHE_MAGIC, MAP_CACHE_VERSION,
+            MAP_CACHE_BYTE_ORDER, os.path.getmtime(tmx_filename),
+            _hash_file(tmx_filename), len(table_data), size_x, size_y,
+            tile_layers))
+        cache.write(table_data)
+        cache.write(b'\0' * padding)
+        cache.write(tile_data)
+
+
+def read_map_cache(str cache_filename, str tmx_filename=None):
+    '''
+    Memory maps a compiled map written by **write_map_cache**. If
+    tmx_filename is given the cache is only used if the TMX has the mtime
+    it was compiled with, or failing that the same sha1, in which case the
+    mtime in the cache is updated.
+
+    Args:
+        cache_filename (str): Name of the compiled map.
+
+        tmx_filename (str): Name of the TMX the map was compiled from, or
+        None to skip the check.
+
+    Return:
+        (dict, memoryview): The tables and a read only view of the bytes of
+        the raw tiles, or None if the file is missing, was written by
+        another version or platform, or is stale.
+    '''
+    try:
+        with open(cache_filename, 'rb') as cache:
+            data = mmap.mmap(cache.fileno(), 0, access=mmap.ACCESS_READ)
+    except (IOError, OSError, ValueError):
+        return None
+    cdef unsigned int header_size = MAP_CACHE_HEADER.size
+    if len(data) < header_size:
+        return None
+    (magic, version, byte_order, mtime, digest, table_size, size_x, size_y,
+        tile_layers) = MAP_CACHE_HEADER.unpack(data[:header_size])
+    if (magic != MAP_CACHE_MAGIC or version != MAP_CACHE_VERSION or
+        byte_order != MAP_CACHE_BYTE_ORDER):
+        return None
+    if tmx_filename is not None:
+        try:
+            tmx_mtime = os.path.getmtime(tmx_filename)
+            if tmx_mtime != mtime:
+                if _hash_file(tmx_filename) != digest:
+                    return None
+                with open(cache_filename, 'r+b') as cache:
+                    cache.write(MAP_CACHE_HEADER.pack(magic, version,
+                        byte_order, tmx_mtime, digest, table_size, size_x,
+                        size_y, tile_layers))
+        except (IOError, OSError):
+            return None
+    tile_offset = header_size + table_size
+    tile_offset += -tile_offset % sizeof(unsigned int)
+    tile_size = size_x * size_y * tile_layers * sizeof(unsigned int)
+    if len(data) < tile_offset + tile_size:
+        return None
+    tables = json.loads(data[header_size:header_size + table_size].decode(
+        'utf-8'))
+    tables['size'] = (size_x, size_y)
+    tables['tile_layers'] = tile_layers
+    return tables, memoryview(data)[tile_offset:tile_offset + tile_size]
 
 
 cdef class MapManager(GameManager):
@@ -95,6 +227,244 @@ cdef class MapManager(GameManager):
             tile_map.objects = objects
         self._maps[name] = tile_map
 
+    def load_compiled_map(self, str name, dict tables,
+                          const unsigned char[::1] tiles):
+        '''
+        Loads a TileMap from a compiled map returned by **read_map_cache**.
+        The textures, models and animations named in tables['tile_kinds']
+        must already be loaded. Each kind is resolved once, then the raw
+        tiles are turned into TileStructs in a single pass over the memory
+        mapped file, instead of going through a list of dicts per tile.
+
+        Args:
+            name (str): Name to load the TileMap under.
+
+            tables (dict): The tables of the compiled map.
+
+            tiles (memoryview): The raw tiles of the compiled map.
+        '''
+        cdef list tile_kinds = tables['tile_kinds']
+        cdef list objects = tables['objects']
+        cdef unsigned int size_x, size_y
+        size_x, size_y = tables['size']
+        cdef unsigned int tile_layers = tables['tile_layers']
+        cdef unsigned int kind_count = len(tile_kinds)
+        cdef unsigned int count = size_x * size_y * tile_layers
+        cdef unsigned int i, kind
+        cdef FrameList frames
+        cdef TileStruct* kinds
+        cdef TileStruct* tile_data
+        cdef const unsigned int* raw
+        if tiles.shape[0] != count * sizeof(unsigned int):
+            raise ValueError('Expected %d tiles, got %d bytes' % (
+                count, tiles.shape[0]))
+        self.load_map(name, size_x, size_y, None, tile_layers, None,
+                      sum([len(layer) for layer in objects]),
+                      tables['orientation'])
+        cdef TileMap tile_map = self._maps[name]
+        kinds = <TileStruct*>malloc(sizeof(TileStruct) * (kind_count + 1))
+        if kinds == NULL:
+            raise MemoryError()
+        try:
+            kinds[0].model = NULL
+            kinds[0].texkey = 0
+            kinds[0].animation = NULL
+            for kind in range(kind_count):
+                model, texture, animation = tile_kinds[kind]
+                kinds[kind + 1].animation = NULL
+                if animation is not None:
+                    frames = self.animation_manager.animations[animation]
+                    kinds[kind + 1].animation = <void*>frames
+                    model = frames[0].model
+                    texture = frames[0].texture
+                kinds[kind + 1].model = <void*>(
+                    self.model_manager._models[model])
+                kinds[kind + 1].texkey = texture_manager.get_texkey_from_name(
+                    texture)
+            tile_data = <TileStruct*>tile_map.tiles_block.data
+            if count > 0:
+                raw = <const unsigned int*>&tiles[0]
+                for i in range(count):
+                    kind = raw[i]
+                    if kind > kind_count:
+                        raise ValueError('Tile %d has unknown kind %d' % (
+                            i, kind))
+                    tile_data[i] = kinds[kind]
+        finally:
+            free(kinds)
+        if objects:
+            tile_map.objects = objects
+        tile_map.tile_size = tuple(tables['tile_size'])
+        tile_map.z_index_map = tables['z_index_map']
+        if tables.get('stagger_index'):
+            tile_map.stagger_index = tables['stagger_index']
+        if tables.get('stagger_axis'):
+            tile_map.stagger_axis = tables['stagger_axis']
+        if tables.get('hex_side_length'):
+            tile_map.hex_side_length = tables['hex_side_length']
+
+    def bake_chunk(self, str name, unsigned int ci, unsigned int cj,
+                   unsigned int chunk_size):
+        '''
+        Bakes the static tiles of one chunk of a TileMap into VertexModels,
+        one for each tile layer and texture group used in the chunk. The
+        vertices of every tile model are copied into the baked model, moved
+        to the position of the tile relative to the center of the chunk, so
+        that a single entity placed at that center draws every tile.
+        Animated tiles are skipped, they still need an entity each.
+
+        The baked models are loaded in the ModelManager with the vertex
+        format of the tile models, which must all share one. Make sure
+        GameWorld.model_format_allocations leaves room for them: 4
+        vertices and 6 indices for every static tile of every layer when
+        the tiles are rectangles.
+
+        Args:
+            name (str): Name of the TileMap.
+
+            ci (unsigned int): col of the chunk
+
+            cj (unsigned int): row of the chunk
+
+            chunk_size (unsigned int): cols and rows of tiles in one chunk
+
+        Return:
+            list: A dict for every baked model with keys 'model' for the
+            name of the model, 'texture' for the name of a texture in the
+            group of the tiles, 'position' for the center of the chunk and
+            'layer' for the tile layer.
+        '''
+        cdef TileMap tile_map = self._maps[name]
+        cdef ModelManager model_manager = self.model_manager
+        cdef unsigned int i, j, layer, texkey, vertex, index
+        cdef unsigned int vertex_offset, index_offset, pos_offset
+        cdef unsigned int vertex_size
+        cdef TileStruct* tiles
+        cdef TileStruct* tile
+        cdef VertexModel tile_model, model
+        cdef FormatConfig format_config = None
+        cdef GLushort* indices
+        cdef GLushort* tile_indices
+        cdef GLfloat* pos
+        cdef char* vertices
+        cdef float x, y
+        cdef dict groupkeys = {}
+        cdef dict bakes = {}
+        cdef list bake, baked = []
+        i0, j0, i1, j1 = tile_map.get_chunk_tiles(ci, cj, chunk_size)
+        left, bottom, right, top = tile_map.get_chunk_bounds(ci, cj,
+                                                             chunk_size)
+        cdef float cx = (left + right) / 2.
+        cdef float cy = (bottom + top) / 2.
+
+        # Group the static tiles by layer and texture group, counting the
+        # vertices and indices each baked model will need
+        for j in range(j0, j1):
+            for i in range(i0, i1):
+                tiles = <TileStruct*>tile_map.tiles_block.get_pointer(
+                    i * tile_map.size_y + j)
+                for layer in range(tile_map.tile_layer_count):
+                    tile = &tiles[layer]
+                    if tile.model == NULL or tile.animation != NULL:
+                        continue
+                    tile_model = <VertexModel>tile.model
+                    if format_config is None:
+                        format_config = tile_model._format_config
+                    elif tile_model._format_config is not format_config:
+                        raise ValueError('Can not bake tiles of vertex format'
+                            ' %s with tiles of vertex format %s' % (
+                            tile_model._format_config._name,
+                            format_config._name))
+                    texkey = tile.texkey
+                    if texkey not in groupkeys:
+                        groupkeys[texkey] = \
+                            texture_manager.get_groupkey_from_texkey(texkey)
+                    key = (layer, groupkeys[texkey])
+                    if key not in bakes:
+                        bakes[key] = [texkey, 0, 0, []]
+                    bake = bakes[key]
+                    bake[1] += tile_model._vertex_count
+                    bake[2] += tile_model._index_count
+                    bake[3].append((i, j))
+
+        if format_config is None:
+            return baked
+        pos_attribute = format_config._format_dict.get(b'pos')
+        if pos_attribute is None or pos_attribute[1] != b'float':
+            raise ValueError('Can not bake tiles of vertex format %s, it '
+                'has no float pos attribute' % format_config._name)
+        pos_offset = pos_attribute[2]
+        vertex_size = format_config._size
+
+        for key in sorted(bakes):
+            layer, groupkey = key
+            texkey, vertex_count, index_count, positions = bakes[key]
+            if vertex_count > 65536:
+                raise ValueError('Chunk (%d, %d) of %s has %d vertices in '
+                    'layer %d, more than an index can address. Use a '
+                    'smaller chunk_size.' % (ci, cj, name, vertex_count,
+                    layer))
+            model_name = model_manager.load_model(format_config._name,
+                vertex_count, index_count,
+                '%s_bake_%d_%d_%d_%d' % (name, ci, cj, layer, groupkey),
+                do_copy=True)
+            model = model_manager._models[model_name]
+            vertices = <char*>model.vertices_block.data
+            indices = <GLushort*>model.indices_block.data
+            vertex_offset = 0
+            index_offset = 0
+            for i, j in positions:
+                tile = &(<TileStruct*>tile_map.tiles_block.get_pointer(
+                    i * tile_map.size_y + j))[layer]
+                tile_model = <VertexModel>tile.model
+                tx, ty = tile_map.get_tile_position(i, j)
+                x = tx - cx
+                y = ty - cy
+                memcpy(&vertices[vertex_offset * vertex_size],
+                    tile_model.vertices_block.data,
+                    tile_model._vertex_count * vertex_size)
+                for vertex in range(vertex_offset,
+                                    vertex_offset + tile_model._vertex_count):
+                    pos = <GLfloat*>&vertices[vertex * vertex_size +
+                                              pos_offset]
+                    pos[0] += x
+                    pos[1] += y
+                tile_indices = <GLushort*>tile_model.indices_block.data
+                for index in range(tile_model._index_count):
+                    indices[index_offset + index] = (
+                        tile_indices[index] + vertex_offset)
+                vertex_offset += tile_model._vertex_count
+                index_offset += tile_model._index_count
+            baked.append({
+                'model': model_name,
+                'texture': texture_manager.get_texname_from_texkey(texkey),
+                'position': (cx, cy),
+                'layer': layer,
+                })
+        return baked
+
+    def bake_map(self, str name, unsigned int chunk_size=16):
+        '''
+        Bakes the static tiles of every chunk of a TileMap, see
+        **bake_chunk**.
+
+        Args:
+            name (str): Name of the TileMap.
+
+            chunk_size (unsigned int): cols and rows of tiles in one chunk.
+            Defaults to 16.
+
+        Return:
+            list: The dicts returned by **bake_chunk** for every chunk.
+        '''
+        cdef TileMap tile_map = self._maps[name]
+        cdef list baked = []
+        chunks_x, chunks_y = tile_map.get_chunk_count(chunk_size)
+        for cj in range(chunks_y):
+            for ci in range(chunks_x):
+                baked.extend(self.bake_chunk(name, ci, cj, chunk_size))
+        return baked
+
     property maps:
         def __get__(self):
             return self._maps
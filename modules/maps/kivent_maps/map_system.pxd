@@ -1,4 +1,5 @@
 from kivent_core.systems.staticmemgamesystem cimport StaticMemGameSystem, MemComponent
+from kivent_maps.map_data cimport TileMap, TileStruct
 
 
 ctypedef struct MapStruct:
@@ -7,8 +8,31 @@ ctypedef struct MapStruct:
     unsigned int pos_x
     unsigned int pos_y
 
+ctypedef struct ChunkStruct:
+    float left
+    float bottom
+    float right
+    float top
+    bint loaded
+
 cdef class MapComponent(MemComponent):
     pass
 
 cdef class MapSystem(StaticMemGameSystem):
-    pass
+    cdef TileMap stream_tile_map
+    cdef ChunkStruct* chunks
+    cdef unsigned int chunks_x
+    cdef unsigned int chunks_y
+    cdef unsigned int stream_chunk_size
+    cdef bint stream_baked
+    cdef dict loaded_chunks
+    cdef dict entity_pool
+    cdef list stale_baked
+
+    cdef int make_chunks(self, TileMap tile_map, unsigned int chunk_size,
+        bint baked) except -1
+    cdef int load_chunk(self, unsigned int chunk_index) except -1
+    cdef int unload_chunk(self, unsigned int chunk_index) except -1
+    cdef int remove_baked(self, list baked) except -1
+    cdef int recycle_tile(self, unsigned int entity_id, str renderer_name,
+        TileStruct* tile, unsigned int i, unsigned int j) except -1
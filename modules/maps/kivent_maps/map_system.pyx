@@ -1,11 +1,23 @@
 from kivent_core.systems.staticmemgamesystem cimport StaticMemGameSystem, MemComponent
 from kivent_core.memory_handlers.zone cimport MemoryZone
+from kivent_core.entity cimport Entity
+from kivent_core.systems.position_systems cimport PositionStruct2D
+from kivent_core.systems.renderers cimport RenderStruct
+from kivent_core.systems.animation_sys cimport retarget_render
+from kivent_core.rendering.model cimport VertexModel
+from kivent_core.rendering.animation cimport FrameList
+from kivent_core.managers.resource_managers cimport ModelManager
+from kivent_core.managers.resource_managers import texture_manager
 from kivent_core.gameworld import GameWorld
 from kivy.properties import (StringProperty, ObjectProperty, NumericProperty,
         BooleanProperty, ListProperty)
 from kivy.factory import Factory
-from kivent_maps.map_data cimport TileMap
+from kivent_maps.map_data cimport TileMap, TileStruct
 from kivent_maps.map_manager cimport MapManager
+from libc.stdlib cimport malloc, free
+from time import perf_counter
+from array import array
+import json
 
 
 cdef class MapComponent(MemComponent):
@@ -42,16 +54,112 @@ cdef class MapSystem(StaticMemGameSystem):
     with **Gameworld.reigster_manager** that will be used to manage the various
     data loaded from .tmx files. Each component represents a coordinate
     for a tile.
+
+    Instead of creating an entity for every tile up front with
+    **map_utils.init_entities_from_map**, the tiles of a large map can be
+    streamed with **start_streaming**. The map is split into chunks of
+    **chunk_size** x **chunk_size** tiles and only the chunks near the view
+    of the GameView named by **gameview** have entities, so the number of
+    entities and the time taken to load the map depend on the size of the
+    view rather than on the size of the map. Every update the chunks that
+    left the view are unloaded and the chunks that came into view are
+    loaded, nearest first, until **stream_budget** is spent. The entities
+    of unloaded tiles are hidden and kept in a pool per renderer, loading a
+    tile takes an entity from the pool and changes its position, model and
+    texture, so entities are only created while the number of visible
+    tiles grows. Animated tiles are not pooled, their entities are removed
+    when their chunk unloads. With **bake_static** the static tiles of a
+    chunk are instead baked into one VertexModel per layer and texture
+    group with **MapManager.bake_chunk** when the chunk loads, and the
+    baked entities and models are removed when it unloads.
+
+    **Attributes:**
+        **chunk_size** (NumericProperty): The number of cols and rows of
+        tiles in one chunk, read by **start_streaming**. Defaults to 16.
+
+        **stream_margin** (NumericProperty): Chunks closer than this many
+        pixels to the view are loaded. Loaded chunks are only unloaded once
+        they are twice as far, so that moving back and forth over a chunk
+        edge does not load and unload the same chunk every frame. Defaults
+        to 0.
+
+        **stream_budget** (NumericProperty): Seconds each update may spend
+        loading chunks. At least one chunk is loaded every update while
+        chunks are waiting. Defaults to .002.
+
+        **stream_zone** (StringProperty): The zone streamed tile entities
+        are created in. Defaults to 'general'.
+
+        **bake_static** (BooleanProperty): If True the static tiles of
+        every loaded chunk are drawn by baked models instead of an entity
+        per tile, read by **start_streaming**. Defaults to False.
+
+        **stream_map** (str): The name of the TileMap being streamed, or
+        None.
+
+        **loaded_chunk_count** (unsigned int): The number of chunks that
+        currently have entities.
+
+        **pooled_entity_count** (unsigned int): The number of hidden tile
+        entities waiting to be reused.
+
+        **streamed_entity_count** (unsigned int): The number of tile
+        entities created by streaming, including the pooled ones.
+
+    **Attributes: (Cython Access Only)**
+        **stream_tile_map** (TileMap): The TileMap being streamed.
+
+        **chunks** (ChunkStruct*): The pixel bounds and loaded state of
+        every chunk of stream_tile_map, chunk (ci, cj) is at index
+        cj * chunks_x + ci.
+
+        **chunks_x** (unsigned int): The number of cols of chunks.
+
+        **chunks_y** (unsigned int): The number of rows of chunks.
+
+        **stream_chunk_size** (unsigned int): The chunk_size the chunks
+        were made with.
+
+        **stream_baked** (bint): The bake_static the chunks are loaded
+        with.
+
+        **loaded_chunks** (dict): Maps the index of a loaded chunk to a
+        tuple of the list of (entity_id, renderer system_id) for its static
+        tiles, the list of entity_id of its animated tiles and the list of
+        (entity_id, model name) for its baked models.
+
+        **entity_pool** (dict): Maps a renderer system_id to the list of
+        hidden entity_id that can be reused for a tile of that renderer.
+
+        **stale_baked** (list): The names of the models baked for the chunks
+        loaded before a snapshot was restored, unloaded by
+        **link_snapshot_state** if no entity draws them anymore.
     '''
 
     system_id = StringProperty('tile_map')
     processor = BooleanProperty(True)
-    updataeble = BooleanProperty(False)
+    updateable = BooleanProperty(False)
     type_size = NumericProperty(sizeof(MapStruct))
     component_type = ObjectProperty(MapComponent)
     system_names = ListProperty(['tile_map','renderer'])
     gameworld = ObjectProperty(None)
     memory_required = NumericProperty(500*1024)
+    chunk_size = NumericProperty(16)
+    stream_margin = NumericProperty(0.)
+    stream_budget = NumericProperty(.002)
+    stream_zone = StringProperty('general')
+    bake_static = BooleanProperty(False)
+
+    def __init__(self, **kwargs):
+        self.loaded_chunks = {}
+        self.entity_pool = {}
+        self.stale_baked = []
+        super(MapSystem, self).__init__(**kwargs)
+
+    def __dealloc__(self):
+        if self.chunks != NULL:
+            free(self.chunks)
+            self.chunks = NULL
 
     def on_gameworld(self, instance, value):
         model_manager = self.gameworld.managers["model_manager"]
@@ -75,5 +183,484 @@ cdef class MapSystem(StaticMemGameSystem):
         component.pos_x = args['pos'][0]
         component.pos_y = args['pos'][1]
 
+    def start_streaming(self, str name):
+        '''
+        Starts streaming the tiles of a TileMap. No entities are created
+        until the next **update** or **update_stream**. Only tiles are
+        streamed, create the entities for the objects of the map with
+        **map_utils.init_entities_from_map** using load_tiles=False.
+        Streaming another map stops streaming the current one.
+
+        Args:
+            name (str): Name of the TileMap in the MapManager.
+        '''
+        if self.stream_tile_map is not None:
+            self.stop_streaming()
+        map_manager = self.gameworld.managers["map_manager"]
+        self.make_chunks(map_manager.maps[name], self.chunk_size,
+            self.bake_static)
+
+    cdef int make_chunks(self, TileMap tile_map, unsigned int chunk_size,
+        bint baked) except -1:
+        '''
+        Splits a TileMap into chunks that are not loaded yet and makes it
+        the map being streamed.
+
+        Args:
+            tile_map (TileMap): The TileMap to stream.
+
+            chunk_size (unsigned int): The number of cols and rows of tiles
+            in one chunk.
+
+            baked (bint): Whether the static tiles of the chunks are baked.
+        '''
+        cdef unsigned int chunks_x, chunks_y, ci, cj
+        cdef ChunkStruct* chunk
+        chunks_x, chunks_y = tile_map.get_chunk_count(chunk_size)
+        cdef ChunkStruct* chunks = <ChunkStruct*>malloc(
+            sizeof(ChunkStruct) * max(chunks_x * chunks_y, 1))
+        if chunks == NULL:
+            raise MemoryError()
+        for cj in range(chunks_y):
+            for ci in range(chunks_x):
+                chunk = &chunks[cj * chunks_x + ci]
+                chunk.left, chunk.bottom, chunk.right, chunk.top = (
+                    tile_map.get_chunk_bounds(ci, cj, chunk_size))
+                chunk.loaded = False
+        self.chunks = chunks
+        self.chunks_x = chunks_x
+        self.chunks_y = chunks_y
+        self.stream_chunk_size = chunk_size
+        self.stream_baked = baked
+        self.stream_tile_map = tile_map
+        self.updateable = True
+        return 0
+
+    def stop_streaming(self):
+        '''
+        Stops streaming and queues every tile entity created by streaming,
+        including the pooled ones, for removal.
+        '''
+        if self.stream_tile_map is None:
+            return
+        cdef list entity_ids = []
+        for static_tiles, animated, baked in self.loaded_chunks.values():
+            entity_ids.extend([entity_id for entity_id, name in static_tiles])
+            entity_ids.extend(animated)
+            self.remove_baked(baked)
+        for pool in self.entity_pool.values():
+            entity_ids.extend(pool)
+        self.gameworld.queue_remove_entities(entity_ids)
+        self.loaded_chunks = {}
+        self.entity_pool = {}
+        free(self.chunks)
+        self.chunks = NULL
+        self.chunks_x = self.chunks_y = 0
+        self.stream_tile_map = None
+        self.updateable = False
+
+    def update(self, dt):
+        '''
+        Streams the chunks around the view of the GameView named by
+        **gameview**, see **update_stream**. Does nothing if no map is
+        streaming or gameview is not set.
+        '''
+        if self.stream_tile_map is None or self.gameview is None:
+            return
+        gameview = self.gameworld.system_manager[self.gameview]
+        self.update_stream(*gameview.get_view_bounds())
+
+    def update_stream(self, float x, float y, float half_width,
+        float half_height):
+        '''
+        Unloads the loaded chunks that are further than twice
+        **stream_margin** from the rectangle, then loads the chunks within
+        **stream_margin** of it, nearest to its center first, until
+        **stream_budget** is spent.
+
+        Args:
+            x (float): The x of the center of the rectangle.
+
+            y (float): The y of the center of the rectangle.
+
+            half_width (float): Half the width of the rectangle.
+
+            half_height (float): Half the height of the rectangle.
+
+        Return:
+            unsigned int: The number of chunks within **stream_margin** of
+            the rectangle that are still waiting to be loaded.
+        '''
+        if self.stream_tile_map is None:
+            return 0
+        cdef float margin = self.stream_margin
+        cdef float load_w = half_width + margin
+        cdef float load_h = half_height + margin
+        cdef float keep_w = load_w + margin
+        cdef float keep_h = load_h + margin
+        cdef float dx, dy
+        cdef unsigned int chunk_index
+        cdef unsigned int loaded = 0
+        cdef ChunkStruct* chunk
+        cdef list waiting = []
+        for chunk_index in range(self.chunks_x * self.chunks_y):
+            chunk = &self.chunks[chunk_index]
+            if chunk.loaded:
+                if (chunk.right < x - keep_w or chunk.left > x + keep_w or
+                    chunk.top < y - keep_h or chunk.bottom > y + keep_h):
+                    self.unload_chunk(chunk_index)
+            elif not (chunk.right < x - load_w or chunk.left > x + load_w or
+                chunk.top < y - load_h or chunk.bottom > y + load_h):
+                dx = (chunk.left + chunk.right) * .5 - x
+                dy = (chunk.bottom + chunk.top) * .5 - y
+                waiting.append((dx * dx + dy * dy, chunk_index))
+        waiting.sort()
+        cdef double budget = self.stream_budget
+        cdef double start = perf_counter()
+        for distance, chunk_index in waiting:
+            if loaded > 0 and perf_counter() - start >= budget:
+                break
+            self.load_chunk(chunk_index)
+            loaded += 1
+        return len(waiting) - loaded
+
+    cdef int load_chunk(self, unsigned int chunk_index) except -1:
+        '''
+        Gives every layer of every tile in a chunk an entity, reusing pooled
+        entities for static tiles, or bakes the static tiles if
+        **stream_baked**.
+
+        Args:
+            chunk_index (unsigned int): The index of the chunk in chunks.
+        '''
+        cdef TileMap tile_map = self.stream_tile_map
+        cdef unsigned int chunk_size = self.stream_chunk_size
+        cdef unsigned int i, j, layer, entity_id, i0, j0, i1, j1
+        cdef TileStruct* tiles
+        cdef TileStruct* tile
+        cdef list z_map = tile_map._z_index_map
+        cdef list static_tiles = []
+        cdef list animated = []
+        cdef list baked = []
+        cdef list pool
+        cdef bint bake = self.stream_baked
+        cdef dict entity_pool = self.entity_pool
+        cdef str system_id = self.system_id
+        cdef str zone = self.stream_zone
+        cdef str renderer_name
+        init_entity = self.gameworld.init_entity
+        i0, j0, i1, j1 = tile_map.get_chunk_tiles(
+            chunk_index % self.chunks_x, chunk_index // self.chunks_x,
+            chunk_size)
+        for j in range(j0, j1):
+            for i in range(i0, i1):
+                tiles = <TileStruct*>tile_map.tiles_block.get_pointer(
+                    i * tile_map.size_y + j)
+                for layer in range(tile_map.tile_layer_count):
+                    tile = &tiles[layer]
+                    if tile.model == NULL and tile.animation == NULL:
+                        continue
+                    renderer_name = 'map_layer%d' % z_map[layer]
+                    if tile.animation == NULL:
+                        if bake:
+                            continue
+                        pool = entity_pool.get(renderer_name)
+                        if pool:
+                            entity_id = pool.pop()
+                            self.recycle_tile(entity_id, renderer_name, tile,
+                                i, j)
+                            static_tiles.append((entity_id, renderer_name))
+                            continue
+                    comp_data = {
+                        'position': tile_map.get_tile_position(i, j),
+                        system_id: {'name': tile_map.name, 'pos': (i, j)},
+                        renderer_name: {
+                            'model': (<VertexModel>tile.model)._name,
+                            'texture': texture_manager\
+                                .get_texname_from_texkey(tile.texkey),
+                            }
+                        }
+                    systems = ['position', system_id, renderer_name]
+                    if tile.animation != NULL:
+                        animator_name = 'map_layer%d_animator' % z_map[layer]
+                        comp_data[animator_name] = {
+                            'name': (<FrameList>tile.animation).name,
+                            'loop': True,
+                            'group': tile_map.name,
+                            }
+                        systems.append(animator_name)
+                        animated.append(init_entity(comp_data, systems,
+                            zone=zone))
+                    else:
+                        static_tiles.append((init_entity(comp_data, systems,
+                            zone=zone), renderer_name))
+        if bake:
+            map_manager = self.gameworld.managers["map_manager"]
+            for baked_model in map_manager.bake_chunk(tile_map.name,
+                chunk_index % self.chunks_x, chunk_index // self.chunks_x,
+                chunk_size):
+                renderer_name = 'map_layer%d' % z_map[baked_model['layer']]
+                comp_data = {
+                    'position': baked_model['position'],
+                    renderer_name: {
+                        'model': baked_model['model'],
+                        'texture': baked_model['texture'],
+                        }
+                    }
+                baked.append((init_entity(comp_data,
+                    ['position', renderer_name], zone=zone),
+                    baked_model['model']))
+        self.loaded_chunks[chunk_index] = (static_tiles, animated, baked)
+        self.chunks[chunk_index].loaded = True
+        return 0
+
+    cdef int unload_chunk(self, unsigned int chunk_index) except -1:
+        '''
+        Hides the static tile entities of a chunk and returns them to the
+        pool, queues its animated tile entities for removal and removes its
+        baked entities and models.
+
+        Args:
+            chunk_index (unsigned int): The index of the chunk in chunks.
+        '''
+        static_tiles, animated, baked = self.loaded_chunks.pop(chunk_index)
+        entities = self.gameworld.entities
+        system_manager = self.gameworld.system_manager
+        cdef dict entity_pool = self.entity_pool
+        cdef StaticMemGameSystem renderer
+        cdef RenderStruct* render_comp
+        cdef Entity entity
+        cdef unsigned int entity_id
+        for entity_id, renderer_name in static_tiles:
+            entity = entities[entity_id]
+            renderer = system_manager[renderer_name]
+            render_comp = <RenderStruct*>renderer.imz_components.get_pointer(
+                entity.get_component_index(renderer_name))
+            render_comp.render = 0
+            render_comp.state_valid = False
+            if renderer_name in entity_pool:
+                entity_pool[renderer_name].append(entity_id)
+            else:
+                entity_pool[renderer_name] = [entity_id]
+        self.gameworld.queue_remove_entities(animated)
+        self.remove_baked(baked)
+        self.chunks[chunk_index].loaded = False
+        return 0
+
+    cdef int remove_baked(self, list baked) except -1:
+        '''
+        Removes the entities drawing baked models right away, so that the
+        models can be unloaded.
+
+        Args:
+            baked (list): (entity_id, model name) of the baked entities.
+        '''
+        if not baked:
+            return 0
+        model_manager = self.gameworld.model_manager
+        self.gameworld.remove_entities_bulk(
+            [entity_id for entity_id, model_name in baked])
+        for entity_id, model_name in baked:
+            model_manager.unload_model(model_name)
+        return 0
+
+    cdef int recycle_tile(self, unsigned int entity_id, str renderer_name,
+        TileStruct* tile, unsigned int i, unsigned int j) except -1:
+        '''
+        Moves a pooled entity to the tile at (i, j) and shows it with the
+        model and texture of tile.
+
+        Args:
+            entity_id (unsigned int): The pooled entity.
+
+            renderer_name (str): The system_id of the renderer of the
+            entity.
+
+            tile (TileStruct*): The layer of the tile the entity will draw.
+
+            i (unsigned int): col of the tile
+
+            j (unsigned int): row of the tile
+        '''
+        cdef Entity entity = self.gameworld.entities[entity_id]
+        system_manager = self.gameworld.system_manager
+        cdef StaticMemGameSystem position_system = system_manager['position']
+        cdef StaticMemGameSystem renderer = system_manager[renderer_name]
+        cdef ModelManager model_manager = self.gameworld.model_manager
+        cdef PositionStruct2D* pos_comp = <PositionStruct2D*>(
+            position_system.imz_components.get_pointer(
+                entity.get_component_index('position')))
+        cdef MapStruct* map_comp = <MapStruct*>(
+            self.imz_components.get_pointer(
+                entity.get_component_index(self.system_id)))
+        cdef RenderStruct* render_comp = <RenderStruct*>(
+            renderer.imz_components.get_pointer(
+                entity.get_component_index(renderer_name)))
+        cdef bint same_batch = True
+        pos_comp.x, pos_comp.y = self.stream_tile_map.get_tile_position(i, j)
+        map_comp.pos_x = i
+        map_comp.pos_y = j
+        if render_comp.model != tile.model:
+            model_manager.unregister_entity_with_model(entity_id,
+                (<VertexModel>render_comp.model)._name)
+            model_manager.register_entity_with_model(entity_id,
+                renderer_name, (<VertexModel>tile.model)._name)
+        if render_comp.texkey != tile.texkey:
+            same_batch = texture_manager.get_texkey_in_group(tile.texkey,
+                texture_manager.get_groupkey_from_texkey(render_comp.texkey))
+        retarget_render(render_comp, tile.model, tile.texkey, same_batch)
+        render_comp.render = 1
+        return 0
+
+    property stream_map:
+        def __get__(self):
+            if self.stream_tile_map is None:
+                return None
+            return self.stream_tile_map.name
+
+    property loaded_chunk_count:
+        def __get__(self):
+            return len(self.loaded_chunks)
+
+    property pooled_entity_count:
+        def __get__(self):
+            return sum([len(pool) for pool in self.entity_pool.values()])
+
+    property streamed_entity_count:
+        def __get__(self):
+            return self.pooled_entity_count + sum([
+                len(static_tiles) + len(animated) + len(baked)
+                for static_tiles, animated, baked
+                in self.loaded_chunks.values()])
+
+    def get_snapshot_state(self):
+        '''
+        Extends StaticMemGameSystem.get_snapshot_state with the name of the
+        TileMap of every active component, as the TileMaps the components
+        point to can not be saved directly, and with the chunks being
+        streamed. The names of the TileMaps and the streaming state are
+        saved as JSON followed by an array of the index of the name of
+        each component.
+
+        Return:
+            tuple: The state of the system.
+        '''
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef MapStruct* pointer
+        cdef dict name_ids = {}
+        stream_state = None
+        component_indices = array('I', memory_zone.get_active_slots())
+        map_ids = array('I')
+        for component_index in component_indices:
+            pointer = <MapStruct*>memory_zone.get_pointer(component_index)
+            name = (<TileMap>pointer.tile_map).name
+            if name not in name_ids:
+                name_ids[name] = len(name_ids)
+            map_ids.append(name_ids[name])
+        if self.stream_tile_map is not None:
+            stream_state = [self.stream_tile_map.name, self.stream_chunk_size,
+                self.stream_baked, [[chunk_index, static_tiles, animated,
+                baked] for chunk_index, (static_tiles, animated, baked)
+                in self.loaded_chunks.items()], self.entity_pool]
+        return (super(MapSystem, self).get_snapshot_state(),
+            json.dumps([sorted(name_ids, key=name_ids.get), stream_state]),
+            component_indices, map_ids)
+
+    def set_snapshot_state(self, tuple state):
+        '''
+        Restores the result of **get_snapshot_state**. The component data is
+        restored and the TileMap of every component is looked up again by
+        name in the MapManager. The chunks being streamed are replaced by
+        the ones of the snapshot, without removing any entity as the
+        entities have already been restored.
+
+        Args:
+            state (tuple): The result of **get_snapshot_state**.
+        '''
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef MapStruct* pointer
+        cdef TileMap tile_map
+        cdef unsigned int chunk_index, chunk_size
+        cdef dict loaded_chunks = {}
+        cdef dict entity_pool = {}
+        cdef list tile_maps = []
+        map_manager = self.gameworld.managers["map_manager"]
+        base_state, names, component_indices, map_ids = state
+        if len(component_indices) != len(map_ids):
+            raise ValueError('{} was not snapshot with the same setup'.format(
+                self.system_id))
+        map_names, stream_state = json.loads(names)
+        for name in map_names:
+            tile_maps.append(map_manager.maps[name])
+        for component_index, map_id in zip(component_indices, map_ids):
+            if component_index >= memory_zone.count or map_id >= len(
+                tile_maps):
+                raise ValueError('Invalid component index {}'.format(
+                    component_index))
+        if stream_state is not None:
+            name, chunk_size, baked, chunks, pool = stream_state
+            tile_map = map_manager.maps[name]
+            if chunk_size == 0:
+                raise ValueError('Invalid chunk size 0')
+            chunks_x, chunks_y = tile_map.get_chunk_count(chunk_size)
+            for chunk_index, static_tiles, animated, baked_tiles in chunks:
+                if chunk_index >= chunks_x * chunks_y:
+                    raise ValueError('Invalid chunk index {}'.format(
+                        chunk_index))
+                loaded_chunks[chunk_index] = (
+                    [(entity_id, renderer_name)
+                    for entity_id, renderer_name in static_tiles],
+                    list(animated),
+                    [(entity_id, model_name)
+                    for entity_id, model_name in baked_tiles])
+            for renderer_name in pool:
+                entity_pool[renderer_name] = list(pool[renderer_name])
+        super(MapSystem, self).set_snapshot_state(base_state)
+        for component_index in memory_zone.get_active_slots():
+            pointer = <MapStruct*>memory_zone.get_pointer(component_index)
+            pointer.tile_map = NULL
+        for component_index, map_id in zip(component_indices, map_ids):
+            pointer = <MapStruct*>memory_zone.get_pointer(component_index)
+            if pointer.entity_id == <unsigned int>-1:
+                raise ValueError('Component {} is not active'.format(
+                    component_index))
+            pointer.tile_map = <void*>tile_maps[map_id]
+        for component_index in memory_zone.get_active_slots():
+            pointer = <MapStruct*>memory_zone.get_pointer(component_index)
+            if pointer.tile_map == NULL:
+                raise ValueError('Component {} has no tile map'.format(
+                    component_index))
+        self.stale_baked = [model_name
+            for static_tiles, animated, baked_tiles
+            in self.loaded_chunks.values()
+            for entity_id, model_name in baked_tiles]
+        free(self.chunks)
+        self.chunks = NULL
+        self.chunks_x = self.chunks_y = 0
+        self.stream_tile_map = None
+        self.updateable = False
+        self.loaded_chunks = loaded_chunks
+        self.entity_pool = entity_pool
+        if stream_state is not None:
+            self.make_chunks(tile_map, chunk_size, baked)
+            for chunk_index in loaded_chunks:
+                self.chunks[chunk_index].loaded = True
+
+    def link_snapshot_state(self, tuple state):
+        '''
+        Unloads the models baked for chunks that were loaded before the
+        snapshot was restored and that no entity draws anymore.
+
+        Args:
+            state (tuple): The result of **get_snapshot_state**.
+        '''
+        super(MapSystem, self).link_snapshot_state(state[0])
+        cdef ModelManager model_manager = self.gameworld.model_manager
+        for model_name in self.stale_baked:
+            if (model_name in model_manager._models and
+                not model_manager._model_register.get(model_name)):
+                model_manager.unload_model(model_name)
+        self.stale_baked = []
+
 
 Factory.register('MapSystem', cls=MapSystem)
@@ -1,6 +1,9 @@
 import tmx
 from tmx import Layer, ObjectGroup
 from os.path import basename, dirname
+from array import array
+
+from kivent_maps.map_manager import write_map_cache, read_map_cache
 
 from kivent_core.systems.renderers import Renderer, ColorPolyRenderer
 from kivent_core.systems.animation_sys import AnimationSystem
@@ -78,7 +81,8 @@ def load_map_systems(layer_count, gameworld, renderargs, animargs, polyargs):
     return rendersystems, animsystems
 
 
-def init_entities_from_map(tile_map, init_entity):
+def init_entities_from_map(tile_map, init_entity, load_tiles=True,
+                           static_tiles=True):
     '''
     Initialise entities for every layer of every tile and add them to the
     corresponding systems.
@@ -88,17 +92,26 @@ def init_entities_from_map(tile_map, init_entity):
 
         init_entity (function): the gameworld.init_entity function
 
+        load_tiles (bool): set to False to only initialise the objects,
+        when the tiles are streamed with MapSystem.start_streaming.
+
+        static_tiles (bool): set to False to only initialise the animated
+        tiles and the objects, when the static tiles have been baked.
+
     '''
     z_map = tile_map.z_index_map
 
-    # Load tile entities
-    for j in range(tile_map.size[1]):
+    # Load tile entities, unless the MapSystem is streaming them
+    rows = tile_map.size[1] if load_tiles else 0
+    for j in range(rows):
         for i in range(tile_map.size[0]):
             # Get Tile object for position (i, j)
             tile_layers = tile_map.get_tile(i,j)
 
             # Loop through all LayerTiles
             for tile in tile_layers.layers:
+                if not (static_tiles or tile.animation):
+                    continue
                 renderer_name = 'map_layer%d' % z_map[tile.layer]
                 animator_name = 'map_layer%d_animator' % z_map[tile.layer]
                 comp_data = {
@@ -111,11 +124,13 @@ def init_entities_from_map(tile_map, init_entity):
                     }
                 systems = ['position', 'tile_map', renderer_name]
 
-                # If tile is animated add that component
+                # If tile is animated add that component, every tile
+                # with the same animation shares a single clock
                 if tile.animation:
                     comp_data[animator_name] = {
                         'name': tile.animation,
                         'loop': True,
+                        'group': tile_map.name,
                             }
                     systems.append(animator_name)
 
@@ -151,16 +166,59 @@ def init_entities_from_map(tile_map, init_entity):
 
             init_entity(comp_data, systems)
 
-def parse_tmx(filename, gameworld):
+def init_baked_entities_from_map(tile_map, gameworld, chunk_size=16):
+    '''
+    Bake the static tiles of the map with MapManager.bake_map and initialise
+    one entity for each baked model, then initialise entities for the
+    animated tiles and the objects as init_entities_from_map does. A baked
+    entity draws a whole layer of a chunk in one texture group, which cuts
+    down the number of entities and components for large maps. Turn on
+    dirty_tracking for the map Renderers so that the baked vertices are
+    not rewritten every frame.
+
+    Args:
+        tile_map (TileMap): the tile map from which to load the tiles.
+
+        gameworld (Gameworld): instance of the gameworld.
+
+        chunk_size (unsigned int): cols and rows of tiles baked together.
+
+    '''
+    map_manager = gameworld.managers['map_manager']
+    z_map = tile_map.z_index_map
+
+    for baked in map_manager.bake_map(tile_map.name, chunk_size):
+        renderer_name = 'map_layer%d' % z_map[baked['layer']]
+        comp_data = {
+            'position': baked['position'],
+            renderer_name: {
+                'model': baked['model'],
+                'texture': baked['texture'],
+                }
+            }
+        gameworld.init_entity(comp_data, ['position', renderer_name])
+
+    init_entities_from_map(tile_map, gameworld.init_entity,
+                           static_tiles=False)
+
+def parse_tmx(filename, gameworld, cache_filename=None):
     '''
     Uses the tmx library to load the TMX into an object and then calls all the
     util functions with the relevant data.
 
+    If cache_filename is given the map is loaded from that compiled map
+    instead, which skips parsing the XML and building a dict for every tile.
+    The compiled map is rebuilt with compile_tmx first if it is missing or
+    was compiled from another version of the TMX.
+
     Args:
         filename (str): Name of the tmx file.
 
         gameworld (Gameworld): instance of the gameworld.
 
+        cache_filename (str): Name of the compiled map to use, or None to
+        always parse the TMX.
+
     Return:
         str: name of the loaded map which is the filename
 
@@ -169,6 +227,32 @@ def parse_tmx(filename, gameworld):
     model_manager = gameworld.managers['model_manager']
     map_manager = gameworld.managers['map_manager']
     animation_manager = gameworld.managers['animation_manager']
+    name ='.'.join(basename(filename).split('.')[:-1])
+
+    if cache_filename is not None:
+        cached = read_map_cache(cache_filename, filename)
+        if cached is None:
+            compile_tmx(filename, cache_filename)
+            cached = read_map_cache(cache_filename, filename)
+        tables, tiles = cached
+
+        _load_tileset_data(tables['atlas'], tables['models'],
+                           tables['animations'], dirname(filename),
+                           texture_manager.load_atlas,
+                           model_manager.load_textured_rectangle,
+                           animation_manager.load_animation)
+
+        # JSON turned the vertex indices of the object models into strings
+        objmodels = tables['object_models']
+        for objmodel in objmodels.values():
+            if 'vertices' in objmodel:
+                objmodel['vertices'] = dict(
+                    (int(n), v) for n, v in objmodel['vertices'].items())
+        _load_obj_models(objmodels, model_manager.load_textured_rectangle,
+                         model_manager.load_model)
+
+        map_manager.load_compiled_map(name, tables, tiles)
+        return name
 
     # Get tilemap object with all the data from tmx
     tilemap = tmx.TileMap.load(filename)
@@ -192,7 +276,6 @@ def parse_tmx(filename, gameworld):
                      model_manager.load_model)
 
     # Load the map with map_manager
-    name ='.'.join(basename(filename).split('.')[:-1])
     map_manager.load_map(name, tilemap.width, tilemap.height,
                          tiles, len(tiles_z),
                          objects, sum([len(o) for o in objects]),
@@ -212,6 +295,63 @@ def parse_tmx(filename, gameworld):
     return name
 
 
+def compile_tmx(filename, cache_filename):
+    '''
+    Parses a TMX with the tmx library and writes it as a compiled map with
+    MapManager's write_map_cache, to be loaded by parse_tmx. Every distinct
+    combination of model, texture and animation used by the tiles becomes
+    one entry of the 'tile_kinds' table and the tiles are stored as indices
+    into it. The other tables hold the textures, models and animations of
+    the tilesets, the objects and the properties of the map.
+
+    Args:
+        filename (str): Name of the tmx file.
+
+        cache_filename (str): Name of the compiled map to write.
+
+    '''
+    tilemap = tmx.TileMap.load(filename)
+    width, height = tilemap.width, tilemap.height
+
+    tiles, tiles_z, objects, objects_z, tile_ids, objmodels = \
+            _load_tile_map(tilemap.layers, width,
+                           _load_tile_properties(tilemap.tilesets))
+    atlas_data, model_data, animation_data = \
+            _get_tileset_data(tilemap.tilesets, tile_ids)
+
+    layer_count = len(tiles_z)
+    tile_kinds = []
+    kind_index = {}
+    raw_tiles = array('I', [0]) * (width * height * layer_count)
+    for i in range(width):
+        for j in range(height):
+            for tile in tiles[i][j]:
+                kind = (tile.get('model'), tile.get('texture'),
+                        tile.get('animation'))
+                if kind not in kind_index:
+                    tile_kinds.append(kind)
+                    kind_index[kind] = len(tile_kinds)
+                raw_tiles[(i * height + j) * layer_count + tile['layer']] = \
+                        kind_index[kind]
+
+    tables = {
+        'orientation': tilemap.orientation,
+        'tile_size': (tilemap.tilewidth, tilemap.tileheight),
+        'z_index_map': tiles_z + objects_z,
+        'stagger_index': tilemap.staggerindex,
+        'stagger_axis': tilemap.staggeraxis,
+        'hex_side_length': tilemap.hexsidelength,
+        'atlas': atlas_data,
+        'models': model_data,
+        'animations': animation_data,
+        'object_models': objmodels,
+        'objects': objects,
+        'tile_kinds': tile_kinds,
+    }
+    write_map_cache(cache_filename, filename, tables, width, height,
+                    layer_count, raw_tiles)
+
+
 def _load_tilesets(tilesets, dirname, tile_ids,
                    load_atlas, load_model, load_animation):
     '''
@@ -240,6 +380,23 @@ def _load_tilesets(tilesets, dirname, tile_ids,
         load_animation (function): Takes frames of an animated tile and loads
         an animation.
 
+    '''
+    atlas_data, model_data, animation_data = _get_tileset_data(tilesets,
+                                                               tile_ids)
+    _load_tileset_data(atlas_data, model_data, animation_data, dirname,
+                       load_atlas, load_model, load_animation)
+
+
+def _get_tileset_data(tilesets, tile_ids):
+    '''
+    Collects the atlas, models and animations of the tiles in tile_ids
+    from the tilesets, see _load_tilesets. Animation frames are added to
+    tile_ids.
+
+    Return:
+        dict, dict, dict: The atlas dict, a dict of (width, height) for
+        every model and a dict of frames for every animation.
+
     '''
     atlas_data = {}
     model_data = {}
@@ -276,6 +433,15 @@ def _load_tilesets(tilesets, dirname, tile_ids,
                 atlas_data[name]['tile_%d' % (tile + fgid)] = (px, py, tw, th)
                 model_data['tile_%d' % (tile + fgid)] = (tw, th)
 
+    return atlas_data, model_data, animation_data
+
+
+def _load_tileset_data(atlas_data, model_data, animation_data, dirname,
+                       load_atlas, load_model, load_animation):
+    '''
+    Loads the data collected by _get_tileset_data into the managers, see
+    _load_tilesets.
+    '''
     load_atlas(atlas_data, 'dict', dirname)
     for model in model_data:
         tw, th = model_data[model]
@@ -1,6 +1,7 @@
 from cython cimport bint
 from kivent_core.systems.staticmemgamesystem cimport (StaticMemGameSystem, 
     MemComponent)
+from kivent_core.rng cimport RNGState
 
 include "particle_config.pxi"
 
@@ -47,6 +48,9 @@ cdef class ParticleEmitter:
     cdef unsigned char[4] _start_color_variance
     cdef unsigned char[4] _end_color
     cdef unsigned char[4] _end_color_variance
+    cdef RNGState _rng
+    cdef unsigned long long _seed
+    cdef unsigned long long _stream
 
 
 ctypedef struct EmitterStruct:
@@ -71,3 +75,4 @@ cdef class EmitterSystem(StaticMemGameSystem):
         EmitterComponent py_component) except -1
     cdef void copy_effect(self, ParticleEmitter from_emitter, 
         ParticleEmitter to_emitter)
+    cdef dict get_emitters(self)
@@ -14,22 +14,36 @@ from libc.math cimport trunc, sin, cos, fmin, fmax
 from kivent_core.systems.rotate_systems cimport RotateStruct2D
 from kivent_core.systems.position_systems cimport PositionStruct2D
 from kivent_particles.particle cimport ParticleSystem
+from kivent_core.rng cimport rng_seed
 try:
     import cPickle as pickle
 except: 
     import pickle
 from os import path
+from array import array
+import json
 
 include "particle_config.pxi"
 include "particle_math.pxi"
 
+cdef unsigned long long emitter_streams = 0
+
+
 cdef class ParticleEmitter:
     '''The ParticleEmitter class controls the creation of particles for any 
     particular effect. You should not create one directly but instead allow
     EmitterSystem to create them for you. Up to a max of MAX_EMITTERS as 
     defined in particle_config.pxi can be attached to a single entity.
 
+    Each ParticleEmitter has its own random number generator, see
+    kivent_core.rng. Every emitter is seeded with seed 0 on its own stream,
+    numbered in creation order, so a game that creates its emitters in the
+    same order produces the same particles.
+
     **Attributes:**
+        **seed** (unsigned long long): The seed of this emitter's random
+        number generator. Setting it reseeds the generator.
+
         **effect_name** (str): The name of this effect, as loaded by 
         EmitterSystem.load_effect or EmitterSystem.load_effect_from_data.
 
@@ -210,6 +224,11 @@ cdef class ParticleEmitter:
             self._start_color_variance[x] = 0
             self._end_color[x] = 255
             self._end_color_variance[x] = 0
+        global emitter_streams
+        self._seed = 0
+        self._stream = emitter_streams
+        emitter_streams += 1
+        rng_seed(&self._rng, self._seed, self._stream)
 
     def calculate_emission_rate(self):
         '''
@@ -227,6 +246,15 @@ cdef class ParticleEmitter:
         def __get__(self):
             return (self._pos[0], self._pos[1])
 
+    property seed:
+
+        def __get__(self):
+            return self._seed
+
+        def __set__(self, unsigned long long value):
+            self._seed = value
+            rng_seed(&self._rng, value, self._stream)
+
     property texture:
 
         def __get__(self):
@@ -880,6 +908,7 @@ cdef class EmitterSystem(StaticMemGameSystem):
         cdef set active_particles
         cdef ParticleSystem particle_system = self.particle_system
         cdef unsigned int particle_id
+        cdef bint pooled = particle_system.pooled
         for i in range(count):
             real_index = i*component_count
             if component_data[real_index] == NULL:
@@ -911,6 +940,11 @@ cdef class EmitterSystem(StaticMemGameSystem):
                             emitter._frame_time / time_between_particles)
                         emitter._frame_time -= (
                             time_between_particles * number_of_updates)
+                    if pooled:
+                        if number_of_updates > 0:
+                            particle_system.spawn_particles(emitter,
+                                number_of_updates)
+                        continue
                     active_particles = emitter.active_particles
                     for c in range(number_of_updates):
                         particle_id = particle_system.create_particle(emitter)
@@ -1137,6 +1171,9 @@ cdef class EmitterSystem(StaticMemGameSystem):
         cdef ParticleEmitter emitter = py_component._emitters[index]
         entities_to_remove = [x for x in emitter.active_particles]
         py_component._emitters[index] = None
+        cdef ParticleSystem particle_system = self.particle_system
+        if particle_system is not None:
+            particle_system.release_emitter(emitter)
         remove_entity = self.gameworld.remove_entity
         for each in entities_to_remove:
             remove_entity(each)
@@ -1168,5 +1205,132 @@ cdef class EmitterSystem(StaticMemGameSystem):
         self.entity_components.remove_entity(pointer.entity_id)
         super(EmitterSystem, self).remove_component(component_index)
 
+    def get_snapshot_state(self):
+        '''
+        Extends StaticMemGameSystem.get_snapshot_state with the emitters of
+        every active component, as they are Python objects the components
+        point to. Each emitter is saved as the dict written by
+        **pickle_effect** together with the state it changes while running:
+        its position, emission clock, particle count and random generator.
+        The emitters are saved as JSON followed by an array of the index of
+        the emitter in each of the MAX_EMITTERS slots of each component.
+
+        Return:
+            tuple: The state of the system.
+        '''
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef EmitterStruct* pointer
+        cdef ParticleEmitter emitter
+        cdef list effects = []
+        cdef unsigned int e
+        component_indices = array('I', memory_zone.get_active_slots())
+        slots = array('I')
+        for component_index in component_indices:
+            pointer = <EmitterStruct*>memory_zone.get_pointer(component_index)
+            for e in range(MAX_EMITTERS):
+                if pointer.emitters[e] == NULL:
+                    slots.append(<unsigned int>-1)
+                    continue
+                emitter = <ParticleEmitter>pointer.emitters[e]
+                slots.append(len(effects))
+                effects.append([self.flatten_effect_to_dict(emitter), [
+                    emitter._frame_time, emitter._emission_rate,
+                    emitter._emit_angle, emitter._pos[0], emitter._pos[1],
+                    emitter._current_particles, emitter._seed,
+                    emitter._stream, emitter._rng.state,
+                    emitter._rng.increment]])
+        return (super(EmitterSystem, self).get_snapshot_state(),
+            json.dumps(effects), component_indices, slots)
+
+    def set_snapshot_state(self, tuple state):
+        '''
+        Restores the result of **get_snapshot_state**. The component data is
+        restored and a new ParticleEmitter is made for every saved emitter
+        and put back in the same slot of its component. The ParticleSystem
+        links its particles to them again in its **link_snapshot_state**.
+
+        Args:
+            state (tuple): The result of **get_snapshot_state**.
+        '''
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef EmitterStruct* pointer
+        cdef EmitterComponent py_component
+        cdef ParticleEmitter emitter
+        cdef list emitters = []
+        cdef unsigned int e, slot
+        base_state, effects, component_indices, slots = state
+        if len(slots) != len(component_indices) * MAX_EMITTERS:
+            raise ValueError('{} was not snapshot with the same setup'.format(
+                self.system_id))
+        for effect, runtime in json.loads(effects):
+            emitter = ParticleEmitter(effect['effect_name'])
+            for key in self.attributes_to_save:
+                setattr(emitter, key, effect[key])
+            (frame_time, emission_rate, emit_angle, x, y, current_particles,
+                seed, stream, rng_state, rng_increment) = runtime
+            emitter._frame_time = frame_time
+            emitter._emission_rate = emission_rate
+            emitter._emit_angle = emit_angle
+            emitter._pos[0] = x
+            emitter._pos[1] = y
+            emitter._current_particles = current_particles
+            emitter._seed = seed
+            emitter._stream = stream
+            emitter._rng.state = rng_state
+            emitter._rng.increment = rng_increment
+            emitters.append(emitter)
+        for i, component_index in enumerate(component_indices):
+            if component_index >= memory_zone.count:
+                raise ValueError('Invalid component index {}'.format(
+                    component_index))
+            for e in range(MAX_EMITTERS):
+                slot = slots[i * MAX_EMITTERS + e]
+                if slot != <unsigned int>-1 and slot >= len(emitters):
+                    raise ValueError('Invalid emitter index {}'.format(slot))
+        for component_index in memory_zone.get_active_slots():
+            py_component = self.components[component_index]
+            py_component._emitters = [None for x in range(MAX_EMITTERS)]
+        super(EmitterSystem, self).set_snapshot_state(base_state)
+        for component_index in memory_zone.get_active_slots():
+            pointer = <EmitterStruct*>memory_zone.get_pointer(component_index)
+            for e in range(MAX_EMITTERS):
+                pointer.emitters[e] = NULL
+        for i, component_index in enumerate(component_indices):
+            pointer = <EmitterStruct*>memory_zone.get_pointer(component_index)
+            if pointer.entity_id == <unsigned int>-1:
+                raise ValueError('Component {} is not active'.format(
+                    component_index))
+            py_component = self.components[component_index]
+            for e in range(MAX_EMITTERS):
+                slot = slots[i * MAX_EMITTERS + e]
+                if slot == <unsigned int>-1:
+                    continue
+                emitter = emitters[slot]
+                if emitter is None:
+                    raise ValueError('Emitter {} is used twice'.format(slot))
+                emitters[slot] = None
+                pointer.emitters[e] = <void*>emitter
+                py_component._emitters[e] = emitter
+
+    cdef dict get_emitters(self):
+        '''
+        Returns every emitter attached to an entity.
+
+        Return:
+            dict: The ParticleEmitter for each (entity_id, slot) pair, slot
+            being its index in the EmitterComponent's emitters.
+        '''
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef EmitterStruct* pointer
+        cdef dict emitters = {}
+        cdef unsigned int e
+        for component_index in memory_zone.get_active_slots():
+            pointer = <EmitterStruct*>memory_zone.get_pointer(component_index)
+            for e in range(MAX_EMITTERS):
+                if pointer.emitters[e] != NULL:
+                    emitters[(pointer.entity_id, e)] = (
+                        <ParticleEmitter>pointer.emitters[e])
+        return emitters
+
 
 Factory.register('EmitterSystem', cls=EmitterSystem)
\ No newline at end of file
@@ -1,6 +1,11 @@
 from kivent_core.systems.staticmemgamesystem cimport (StaticMemGameSystem, 
     MemComponent)
 from kivent_particles.emitter cimport ParticleEmitter
+from kivent_core.systems.position_systems cimport PositionStruct2D
+from kivent_core.systems.rotate_systems cimport RotateStruct2D
+from kivent_core.systems.scale_systems cimport ScaleStruct2D
+from kivent_core.systems.color_systems cimport ColorStruct
+from kivent_core.rendering.batching cimport RenderStruct
 
 ctypedef struct ParticleStruct:
     unsigned int entity_id
@@ -21,10 +26,114 @@ ctypedef struct ParticleStruct:
     float[4] color
 
 
+cdef enum:
+    FIELD_CURRENT_TIME = 0
+    FIELD_TOTAL_TIME = 1
+    FIELD_PASSED_TIME = 2
+    FIELD_X = 3
+    FIELD_Y = 4
+    FIELD_ORIGIN_X = 5
+    FIELD_ORIGIN_Y = 6
+    FIELD_VELOCITY_X = 7
+    FIELD_VELOCITY_Y = 8
+    FIELD_GRAVITY_X = 9
+    FIELD_GRAVITY_Y = 10
+    FIELD_RADIAL_ACCELERATION = 11
+    FIELD_TANGENTIAL_ACCELERATION = 12
+    FIELD_EMIT_RADIUS = 13
+    FIELD_EMIT_RADIUS_DELTA = 14
+    FIELD_EMIT_ROTATION = 15
+    FIELD_EMIT_ROTATION_DELTA = 16
+    FIELD_MIN_RADIUS = 17
+    FIELD_ROTATION = 18
+    FIELD_ROTATION_DELTA = 19
+    FIELD_SCALE = 20
+    FIELD_SCALE_DELTA = 21
+    FIELD_COLOR = 22
+    FIELD_COLOR_DELTA = 26
+    PARTICLE_FIELD_COUNT = 30
+
+
+ctypedef struct PooledParticle:
+    unsigned int entity_id
+    ParticleStruct* particle
+    PositionStruct2D* position
+    RotateStruct2D* rotate
+    ScaleStruct2D* scale
+    ColorStruct* color
+    RenderStruct* render
+    void* pool
+
+
 cdef class ParticleComponent(MemComponent):
     pass
 
 
+cdef class ParticlePool:
+    cdef str texture
+    cdef PooledParticle* free_particles
+    cdef unsigned int free_count
+    cdef unsigned int capacity
+
+    cdef int push(self, PooledParticle* particle) except -1
+    cdef int forget(self, unsigned int entity_id) except -1
+
+
+cdef class ParticleArrays:
+    cdef int emitter_type
+    cdef float* data
+    cdef PooledParticle* particles
+    cdef void** emitters
+    cdef unsigned int count
+    cdef unsigned int capacity
+
+    cdef float* field(self, unsigned int field)
+    cdef int reserve(self, unsigned int count) except -1
+    cdef int append(self, PooledParticle* particle) except -1
+    cdef int swap_remove(self, unsigned int index) except -1
+    cdef int gather(self) except -1
+    cdef void integrate(self, float dt, bint parallel)
+    cdef void scatter(self) nogil
+
+
+cdef bint advance_particle(ParticleStruct* particle_comp,
+    PositionStruct2D* pos_comp, RotateStruct2D* rotate_comp,
+    ScaleStruct2D* scale_comp, ColorStruct* color_comp, float dt)
+
+
 cdef class ParticleSystem(StaticMemGameSystem):
     cdef list _system_names
-    cdef unsigned int create_particle(self, ParticleEmitter emitter) except -1
\ No newline at end of file
+    cdef dict pools
+    cdef ParticleArrays gravity_particles
+    cdef ParticleArrays radial_particles
+    cdef PooledParticle* active_particles
+    cdef unsigned int active_count
+    cdef unsigned int active_capacity
+    cdef float* randoms
+    cdef unsigned int randoms_capacity
+    cdef str particle_archetype
+
+    cdef str get_particle_archetype(self)
+    cdef unsigned int create_particle(self, ParticleEmitter emitter) except -1
+    cdef void setup_particle(self, ParticleStruct* pointer,
+        ParticleEmitter emitter, PositionStruct2D* pos_comp,
+        RotateStruct2D* rotate_comp, ScaleStruct2D* scale_comp,
+        ColorStruct* color_comp, float* randoms)
+    cdef int reserve_randoms(self, unsigned int count) except -1
+    cdef ParticlePool get_pool(self, str texture)
+    cdef unsigned int create_pooled_entity(self, str texture) except -1
+    cdef int fetch_pooled(self, unsigned int entity_id,
+        PooledParticle* particle) except -1
+    cdef int fetch_checked(self, unsigned int entity_id,
+        PooledParticle* particle) except -1
+    cdef int reserve_active(self, unsigned int count) except -1
+    cdef int spawn_particles(self, ParticleEmitter emitter,
+        unsigned int count) except -1
+    cdef int release_particle(self, unsigned int active_index) except -1
+    cdef int release_array_particle(self, ParticleArrays arrays,
+        unsigned int index) except -1
+    cdef int update_arrays(self, ParticleArrays arrays, float dt,
+        bint parallel) except -1
+    cdef int release_emitter(self, ParticleEmitter emitter) except -1
+    cdef int forget_pooled(self, unsigned int entity_id) except -1
+    cdef dict get_emitters(self)
@@ -1,21 +1,38 @@
 # cython: embedsignature=True
 from xml.dom.minidom import parse as parse_xml
 import json
+from array import array
 from libc.math cimport trunc, sin, cos, fmin, fmax
-from kivent_particles.emitter cimport ParticleEmitter
+from kivent_particles.emitter cimport ParticleEmitter, EmitterSystem
 from kivent_core.systems.rotate_systems cimport RotateStruct2D
 from kivent_core.systems.color_systems cimport ColorStruct
 from kivent_core.systems.position_systems cimport PositionStruct2D
 from kivent_core.systems.scale_systems cimport ScaleStruct2D
 from kivent_core.systems.staticmemgamesystem cimport (StaticMemGameSystem, 
-    MemComponent)
+    MemComponent, ZonedAggregator)
 from kivy.properties import (StringProperty, NumericProperty, ListProperty,
     BooleanProperty, ObjectProperty)
 from kivy.factory import Factory
 from kivent_core.memory_handlers.zone cimport MemoryZone
+from kivent_core.memory_handlers.indexing cimport IndexedMemoryZone
+from kivent_core.managers.system_manager cimport SystemManager
+from kivent_core.rendering.batching cimport RenderStruct
+from libc.stdlib cimport malloc, realloc, free
+from libc.string cimport memcpy
+from cython.parallel cimport prange
+from kivent_core.rng cimport rng_fill_signed, rng_variance
+cimport cython
 
 include "particle_math.pxi"
 include "particle_config.pxi"
+
+cdef extern from "math.h" nogil:
+    float sqrtf(float x)
+    float fminf(float x, float y)
+    float fmaxf(float x, float y)
+
+cdef extern from *:
+    ctypedef float* float_array "float *__restrict"
     
 
 cdef class ParticleComponent(MemComponent):
@@ -239,6 +256,542 @@ cdef class ParticleComponent(MemComponent):
                 data.color_delta[i] = value[i]
 
 
+cdef bint advance_particle(ParticleStruct* particle_comp,
+    PositionStruct2D* pos_comp, RotateStruct2D* rotate_comp,
+    ScaleStruct2D* scale_comp, ColorStruct* color_comp, float dt):
+    '''
+    Moves a particle forward by dt, writing its new position, rotation,
+    scale and color to its components.
+
+    Return:
+        bint: True if the particle has reached the end of its life.
+    '''
+    cdef ParticleEmitter emitter = <ParticleEmitter>particle_comp.emitter
+    cdef float passed_time
+    cdef float start_x, start_y
+    cdef float current_x, current_y
+    cdef float distance_x, distance_y
+    cdef float distance_scalar
+    cdef float radial_x, radial_y
+    cdef float rad_accel
+    cdef float tangential_x, tangential_y
+    cdef float new_y
+    cdef float tan_accel
+    passed_time = fmin(dt,
+        particle_comp.total_time - particle_comp.current_time)
+    particle_comp.current_time += passed_time
+
+    if emitter._emitter_type == EMITTER_TYPE_RADIAL:
+        particle_comp.emit_rotation += (
+            particle_comp.emit_rotation_delta * passed_time)
+        particle_comp.emit_radius -= (
+            particle_comp.emit_radius_delta * passed_time)
+        pos_comp.x = (emitter._pos[0] - cos(
+            particle_comp.emit_rotation) * particle_comp.emit_radius)
+        pos_comp.y = (emitter._pos[1] - sin(
+            particle_comp.emit_rotation) * particle_comp.emit_radius)
+
+        if particle_comp.emit_radius < emitter._min_radius:
+            particle_comp.current_time = particle_comp.total_time
+    else:
+        if particle_comp.radial_acceleration or particle_comp.tangential_acceleration:
+            start_x = particle_comp.start_pos[0]
+            start_y = particle_comp.start_pos[1]
+            current_x = pos_comp.x
+            current_y = pos_comp.y
+            distance_x = current_x - start_x
+            distance_y = current_y - start_y
+            distance_scalar = calc_distance(start_x, start_y,
+                current_x, current_y)
+            if distance_scalar < 0.01:
+                distance_scalar = 0.01
+            radial_x = distance_x / distance_scalar
+            radial_y = distance_y / distance_scalar
+            tangential_x = radial_x
+            tangential_y = radial_y
+            rad_accel = particle_comp.radial_acceleration
+            radial_x *= rad_accel
+            radial_y *= rad_accel
+            new_y = tangential_x
+            tan_accel = particle_comp.tangential_acceleration
+            tangential_x = -tangential_y * tan_accel
+            tangential_y = new_y * tan_accel
+        else:
+            radial_x = radial_y = tangential_x = tangential_y = 0
+        particle_comp.velocity[0] += passed_time * (
+            emitter._gravity[0] + radial_x + tangential_x)
+        particle_comp.velocity[1] += passed_time * (
+            emitter._gravity[1] + radial_y + tangential_y)
+        pos_comp.x += particle_comp.velocity[0] * passed_time
+        pos_comp.y += particle_comp.velocity[1] * passed_time
+
+    scale_comp.sx += particle_comp.scale_delta * passed_time
+    scale_comp.sy += particle_comp.scale_delta * passed_time
+    rotate_comp.r += particle_comp.rotation_delta * passed_time
+    color_integrate(particle_comp.color, particle_comp.color_delta,
+        particle_comp.color, passed_time)
+    color_copy(particle_comp.color, color_comp.color)
+    return particle_comp.current_time >= particle_comp.total_time
+
+
+@cython.cdivision(True)
+cdef inline void gravity_kernel(float_array current_time,
+    float_array total_time, float_array passed_time, float_array x,
+    float_array y, float_array origin_x, float_array origin_y,
+    float_array velocity_x, float_array velocity_y, float_array gravity_x,
+    float_array gravity_y, float_array radial_acceleration,
+    float_array tangential_acceleration, unsigned int start,
+    unsigned int end, float dt) nogil:
+    '''
+    The structure of arrays version of advance_particle's gravity branch.
+    The radial and tangential accelerations are always applied, they are 0
+    for particles that do not use them.
+    '''
+    cdef unsigned int i
+    cdef float passed, distance_x, distance_y, distance_scalar
+    cdef float radial_x, radial_y
+    for i in range(start, end):
+        passed = fminf(dt, total_time[i] - current_time[i])
+        passed_time[i] = passed
+        current_time[i] += passed
+        distance_x = x[i] - origin_x[i]
+        distance_y = y[i] - origin_y[i]
+        distance_scalar = fmaxf(sqrtf(
+            distance_x * distance_x + distance_y * distance_y), 0.01)
+        radial_x = distance_x / distance_scalar
+        radial_y = distance_y / distance_scalar
+        velocity_x[i] += passed * (gravity_x[i] +
+            radial_x * radial_acceleration[i] -
+            radial_y * tangential_acceleration[i])
+        velocity_y[i] += passed * (gravity_y[i] +
+            radial_y * radial_acceleration[i] +
+            radial_x * tangential_acceleration[i])
+        x[i] += velocity_x[i] * passed
+        y[i] += velocity_y[i] * passed
+
+
+cdef inline void radial_kernel(float_array current_time,
+    float_array total_time, float_array passed_time, float_array x,
+    float_array y, float_array origin_x, float_array origin_y,
+    float_array emit_radius, float_array emit_radius_delta,
+    float_array emit_rotation, float_array emit_rotation_delta,
+    float_array min_radius, unsigned int start, unsigned int end,
+    float dt) nogil:
+    '''
+    The structure of arrays version of advance_particle's radial branch,
+    using sin_approx and cos_approx so the loop can be vectorized.
+    '''
+    cdef unsigned int i
+    cdef float passed
+    for i in range(start, end):
+        passed = fminf(dt, total_time[i] - current_time[i])
+        passed_time[i] = passed
+        current_time[i] += passed
+        emit_rotation[i] += emit_rotation_delta[i] * passed
+        emit_radius[i] -= emit_radius_delta[i] * passed
+        x[i] = origin_x[i] - cos_approx(emit_rotation[i]) * emit_radius[i]
+        y[i] = origin_y[i] - sin_approx(emit_rotation[i]) * emit_radius[i]
+        current_time[i] = (total_time[i] if emit_radius[i] < min_radius[i]
+            else current_time[i])
+
+
+cdef inline void shared_kernel(float_array passed_time,
+    float_array rotation, float_array rotation_delta, float_array scale,
+    float_array scale_delta, unsigned int start, unsigned int end) nogil:
+    '''
+    Advances rotation and scale by the passed time gravity_kernel or
+    radial_kernel stored.
+    '''
+    cdef unsigned int i
+    for i in range(start, end):
+        rotation[i] += rotation_delta[i] * passed_time[i]
+        scale[i] += scale_delta[i] * passed_time[i]
+
+
+cdef inline void color_kernel(float_array passed_time, float_array color,
+    float_array color_delta, unsigned int start, unsigned int end) nogil:
+    '''
+    Advances one color channel by the passed time, clamped to [0, 255].
+    '''
+    cdef unsigned int i
+    for i in range(start, end):
+        color[i] = fminf(fmaxf(0., color[i] + color_delta[i] * passed_time[i]),
+            255.)
+
+
+cdef inline void integrate_range(float* data, unsigned int capacity,
+    bint radial, unsigned int start, unsigned int end, float dt) nogil:
+    '''
+    Advances the particles in [start, end) of a ParticleArrays by dt. Each
+    field is passed to the kernels as its own restrict pointer, so the
+    compiler knows the arrays do not overlap and can vectorize the loops.
+    '''
+    cdef unsigned int channel
+    if radial:
+        radial_kernel(data + FIELD_CURRENT_TIME * capacity,
+            data + FIELD_TOTAL_TIME * capacity,
+            data + FIELD_PASSED_TIME * capacity,
+            data + FIELD_X * capacity, data + FIELD_Y * capacity,
+            data + FIELD_ORIGIN_X * capacity,
+            data + FIELD_ORIGIN_Y * capacity,
+            data + FIELD_EMIT_RADIUS * capacity,
+            data + FIELD_EMIT_RADIUS_DELTA * capacity,
+            data + FIELD_EMIT_ROTATION * capacity,
+            data + FIELD_EMIT_ROTATION_DELTA * capacity,
+            data + FIELD_MIN_RADIUS * capacity, start, end, dt)
+    else:
+        gravity_kernel(data + FIELD_CURRENT_TIME * capacity,
+            data + FIELD_TOTAL_TIME * capacity,
+            data + FIELD_PASSED_TIME * capacity,
+            data + FIELD_X * capacity, data + FIELD_Y * capacity,
+            data + FIELD_ORIGIN_X * capacity,
+            data + FIELD_ORIGIN_Y * capacity,
+            data + FIELD_VELOCITY_X * capacity,
+            data + FIELD_VELOCITY_Y * capacity,
+            data + FIELD_GRAVITY_X * capacity,
+            data + FIELD_GRAVITY_Y * capacity,
+            data + FIELD_RADIAL_ACCELERATION * capacity,
+            data + FIELD_TANGENTIAL_ACCELERATION * capacity, start, end, dt)
+    shared_kernel(data + FIELD_PASSED_TIME * capacity,
+        data + FIELD_ROTATION * capacity,
+        data + FIELD_ROTATION_DELTA * capacity,
+        data + FIELD_SCALE * capacity, data + FIELD_SCALE_DELTA * capacity,
+        start, end)
+    for channel in range(4):
+        color_kernel(data + FIELD_PASSED_TIME * capacity,
+            data + (FIELD_COLOR + channel) * capacity,
+            data + (FIELD_COLOR_DELTA + channel) * capacity, start, end)
+
+
+cdef class ParticleArrays:
+    '''
+    Structure of arrays storage for the active pooled particles of one
+    emitter type, used by ParticleSystem when **soa** is True. Every field
+    of the particles is kept in its own contiguous float array so the
+    integration loops are free of branches and pointer chasing and can be
+    vectorized by the compiler. The results are written back to the
+    particle's components by **scatter**.
+
+    **Attributes: (Cython Access Only)**
+        **emitter_type** (int): EMITTER_TYPE_GRAVITY or EMITTER_TYPE_RADIAL.
+
+        **data** (float*): PARTICLE_FIELD_COUNT arrays of **capacity**
+        floats, one after another. Use **field** to find an array.
+
+        **particles** (PooledParticle*): The component pointers of each
+        particle, in the same order as the arrays.
+
+        **emitters** (void**): The ParticleEmitter of each particle, in the
+        same order as the arrays.
+
+        **count** (unsigned int): The number of particles stored.
+
+        **capacity** (unsigned int): The number of particles there is room
+        for.
+    '''
+
+    def __cinit__(self, int emitter_type):
+        self.emitter_type = emitter_type
+        self.data = NULL
+        self.particles = NULL
+        self.emitters = NULL
+        self.count = 0
+        self.capacity = 0
+
+    def __dealloc__(self):
+        if self.data != NULL:
+            free(self.data)
+            self.data = NULL
+        if self.particles != NULL:
+            free(self.particles)
+            self.particles = NULL
+        if self.emitters != NULL:
+            free(self.emitters)
+            self.emitters = NULL
+
+    property count:
+        def __get__(self):
+            return self.count
+
+    cdef float* field(self, unsigned int field):
+        '''
+        Returns the array for field, one of the FIELD_ constants. The
+        pointer is invalidated when the arrays grow.
+        '''
+        return self.data + field * self.capacity
+
+    cdef int reserve(self, unsigned int count) except -1:
+        '''
+        Makes sure there is room for count particles, moving every array
+        into a larger allocation if needed.
+        '''
+        cdef unsigned int capacity = max(64, self.capacity)
+        cdef unsigned int field
+        cdef float* data
+        cdef PooledParticle* particles
+        cdef void** emitters
+        if count <= self.capacity:
+            return 1
+        while capacity < count:
+            capacity *= 2
+        data = <float*>malloc(sizeof(float) * PARTICLE_FIELD_COUNT * capacity)
+        if data == NULL:
+            raise MemoryError()
+        particles = <PooledParticle*>realloc(self.particles,
+            sizeof(PooledParticle) * capacity)
+        if particles == NULL:
+            free(data)
+            raise MemoryError()
+        self.particles = particles
+        emitters = <void**>realloc(self.emitters, sizeof(void*) * capacity)
+        if emitters == NULL:
+            free(data)
+            raise MemoryError()
+        self.emitters = emitters
+        if self.data != NULL:
+            for field in range(PARTICLE_FIELD_COUNT):
+                memcpy(data + field * capacity,
+                    self.data + field * self.capacity,
+                    sizeof(float) * self.count)
+            free(self.data)
+        self.data = data
+        self.capacity = capacity
+        return 1
+
+    cdef int append(self, PooledParticle* particle) except -1:
+        '''
+        Adds a particle that has been set up by ParticleSystem.setup_particle,
+        copying its ParticleStruct and components into the arrays.
+
+        Args:
+            particle (PooledParticle*): The particle to add.
+        '''
+        self.reserve(self.count + 1)
+        cdef unsigned int index = self.count
+        cdef unsigned int capacity = self.capacity
+        cdef float* data = self.data
+        cdef ParticleStruct* particle_comp = particle.particle
+        cdef ParticleEmitter emitter = <ParticleEmitter>particle_comp.emitter
+        cdef unsigned int channel
+        data[FIELD_CURRENT_TIME * capacity + index] = (
+            particle_comp.current_time)
+        data[FIELD_TOTAL_TIME * capacity + index] = particle_comp.total_time
+        data[FIELD_PASSED_TIME * capacity + index] = 0.
+        data[FIELD_X * capacity + index] = particle.position.x
+        data[FIELD_Y * capacity + index] = particle.position.y
+        if self.emitter_type == EMITTER_TYPE_RADIAL:
+            data[FIELD_ORIGIN_X * capacity + index] = emitter._pos[0]
+            data[FIELD_ORIGIN_Y * capacity + index] = emitter._pos[1]
+        else:
+            data[FIELD_ORIGIN_X * capacity + index] = (
+                particle_comp.start_pos[0])
+            data[FIELD_ORIGIN_Y * capacity + index] = (
+                particle_comp.start_pos[1])
+        data[FIELD_VELOCITY_X * capacity + index] = particle_comp.velocity[0]
+        data[FIELD_VELOCITY_Y * capacity + index] = particle_comp.velocity[1]
+        data[FIELD_GRAVITY_X * capacity + index] = emitter._gravity[0]
+        data[FIELD_GRAVITY_Y * capacity + index] = emitter._gravity[1]
+        data[FIELD_RADIAL_ACCELERATION * capacity + index] = (
+            particle_comp.radial_acceleration)
+        data[FIELD_TANGENTIAL_ACCELERATION * capacity + index] = (
+            particle_comp.tangential_acceleration)
+        data[FIELD_EMIT_RADIUS * capacity + index] = particle_comp.emit_radius
+        data[FIELD_EMIT_RADIUS_DELTA * capacity + index] = (
+            particle_comp.emit_radius_delta)
+        data[FIELD_EMIT_ROTATION * capacity + index] = (
+            particle_comp.emit_rotation)
+        data[FIELD_EMIT_ROTATION_DELTA * capacity + index] = (
+            particle_comp.emit_rotation_delta)
+        data[FIELD_MIN_RADIUS * capacity + index] = emitter._min_radius
+        data[FIELD_ROTATION * capacity + index] = particle.rotate.r
+        data[FIELD_ROTATION_DELTA * capacity + index] = (
+            particle_comp.rotation_delta)
+        data[FIELD_SCALE * capacity + index] = particle.scale.sx
+        data[FIELD_SCALE_DELTA * capacity + index] = particle_comp.scale_delta
+        for channel in range(4):
+            data[(FIELD_COLOR + channel) * capacity + index] = (
+                particle_comp.color[channel])
+            data[(FIELD_COLOR_DELTA + channel) * capacity + index] = (
+                particle_comp.color_delta[channel])
+        self.particles[index] = particle[0]
+        self.emitters[index] = particle_comp.emitter
+        self.count += 1
+        return 1
+
+    cdef int swap_remove(self, unsigned int index) except -1:
+        '''
+        Removes the particle at index, the last particle takes its place.
+
+        Args:
+            index (unsigned int): The particle to remove.
+        '''
+        cdef unsigned int last = self.count - 1
+        cdef unsigned int capacity = self.capacity
+        cdef unsigned int field
+        cdef float* data = self.data
+        for field in range(PARTICLE_FIELD_COUNT):
+            data[field * capacity + index] = data[field * capacity + last]
+        self.particles[index] = self.particles[last]
+        self.emitters[index] = self.emitters[last]
+        self.count = last
+        return 1
+
+    cdef int gather(self) except -1:
+        '''
+        Refreshes the fields that follow the particle's emitter: the origin
+        and minimum radius of radial particles, and the gravity of gravity
+        particles. Consecutive particles usually share an emitter so it is
+        only looked up when it changes.
+        '''
+        cdef unsigned int capacity = self.capacity
+        cdef float* data = self.data
+        cdef void* last_emitter = NULL
+        cdef void* emitter_pointer
+        cdef ParticleEmitter emitter = None
+        cdef unsigned int i
+        cdef float value_x = 0., value_y = 0., min_radius = 0.
+        cdef bint radial = self.emitter_type == EMITTER_TYPE_RADIAL
+        for i in range(self.count):
+            emitter_pointer = self.emitters[i]
+            if emitter_pointer != last_emitter:
+                emitter = <ParticleEmitter>emitter_pointer
+                last_emitter = emitter_pointer
+                if radial:
+                    value_x = emitter._pos[0]
+                    value_y = emitter._pos[1]
+                    min_radius = emitter._min_radius
+                else:
+                    value_x = emitter._gravity[0]
+                    value_y = emitter._gravity[1]
+            if radial:
+                data[FIELD_ORIGIN_X * capacity + i] = value_x
+                data[FIELD_ORIGIN_Y * capacity + i] = value_y
+                data[FIELD_MIN_RADIUS * capacity + i] = min_radius
+            else:
+                data[FIELD_GRAVITY_X * capacity + i] = value_x
+                data[FIELD_GRAVITY_Y * capacity + i] = value_y
+        return 1
+
+    cdef void integrate(self, float dt, bint parallel):
+        '''
+        Advances every particle by dt. If parallel is True the particles are
+        split into chunks of PARALLEL_CHUNK_SIZE that are integrated across
+        threads with OpenMP, this only has an effect if kivent_particles was
+        built with KIVENT_USE_OPENMP set.
+        '''
+        cdef float* data = self.data
+        cdef unsigned int capacity = self.capacity
+        cdef unsigned int count = self.count
+        cdef bint radial = self.emitter_type == EMITTER_TYPE_RADIAL
+        cdef int chunk
+        cdef int chunk_count = (count + PARALLEL_CHUNK_SIZE - 1) // (
+            PARALLEL_CHUNK_SIZE)
+        cdef unsigned int start, end
+        if parallel and chunk_count > 1:
+            for chunk in prange(chunk_count, nogil=True, schedule='static'):
+                start = chunk * PARALLEL_CHUNK_SIZE
+                end = min(start + PARALLEL_CHUNK_SIZE, count)
+                integrate_range(data, capacity, radial, start, end, dt)
+        else:
+            with nogil:
+                integrate_range(data, capacity, radial, 0, count, dt)
+
+    cdef void scatter(self) nogil:
+        '''
+        Writes the position, rotation, scale and color of every particle to
+        its components.
+        '''
+        cdef unsigned int capacity = self.capacity
+        cdef float* data = self.data
+        cdef PooledParticle* particle
+        cdef unsigned int i, channel
+        cdef float scale
+        for i in range(self.count):
+            particle = &self.particles[i]
+            particle.position.x = data[FIELD_X * capacity + i]
+            particle.position.y = data[FIELD_Y * capacity + i]
+            particle.rotate.r = data[FIELD_ROTATION * capacity + i]
+            scale = data[FIELD_SCALE * capacity + i]
+            particle.scale.sx = scale
+            particle.scale.sy = scale
+            for channel in range(4):
+                particle.color.color[channel] = <unsigned char>data[
+                    (FIELD_COLOR + channel) * capacity + i]
+
+
+cdef class ParticlePool:
+    '''
+    Holds the parked particle entities of a ParticleSystem in pool mode that
+    share a texture, ready to be reactivated. Each ParticlePool grows as
+    needed and is never shrunk.
+
+    **Attributes: (Cython Access Only)**
+        **texture** (str): The texture of every particle in this pool.
+
+        **free_particles** (PooledParticle*): The parked particles.
+
+        **free_count** (unsigned int): The number of parked particles.
+
+        **capacity** (unsigned int): The number of PooledParticle
+        **free_particles** has room for.
+    '''
+
+    def __cinit__(self, str texture):
+        self.texture = texture
+        self.free_particles = NULL
+        self.free_count = 0
+        self.capacity = 0
+
+    def __dealloc__(self):
+        if self.free_particles != NULL:
+            free(self.free_particles)
+            self.free_particles = NULL
+
+    property free_count:
+        def __get__(self):
+            return self.free_count
+
+    cdef int push(self, PooledParticle* particle) except -1:
+        '''
+        Parks a particle in this pool.
+
+        Args:
+            particle (PooledParticle*): The particle to copy into the pool.
+        '''
+        cdef unsigned int capacity
+        cdef PooledParticle* free_particles
+        if self.free_count == self.capacity:
+            capacity = max(16, self.capacity * 2)
+            free_particles = <PooledParticle*>realloc(self.free_particles,
+                sizeof(PooledParticle) * capacity)
+            if free_particles == NULL:
+                raise MemoryError()
+            self.free_particles = free_particles
+            self.capacity = capacity
+        self.free_particles[self.free_count] = particle[0]
+        self.free_count += 1
+        return 1
+
+    cdef int forget(self, unsigned int entity_id) except -1:
+        '''
+        Removes a parked particle from the pool, used when its entity is
+        removed from the GameWorld.
+
+        Args:
+            entity_id (unsigned int): The entity of the particle.
+
+        Return:
+            int: 1 if the particle was found, otherwise 0.
+        '''
+        cdef unsigned int i
+        for i in range(self.free_count):
+            if self.free_particles[i].entity_id == entity_id:
+                self.free_count -= 1
+                self.free_particles[i] = self.free_particles[self.free_count]
+                return 1
+        return 0
+
+
 cdef class ParticleSystem(StaticMemGameSystem):
     '''
     Processing Depends On: ParticleSystem, PositionSystem2D, RotateSystem2D,
@@ -253,6 +806,20 @@ cdef class ParticleSystem(StaticMemGameSystem):
     You will typically not create an entity using ParticleSystem directly,
     instead an EmitterSystem will create the particle entities for you.
 
+    When **pooled** is True particles are not created and removed as
+    entities. Instead every particle entity that dies is hidden and parked
+    in a ParticlePool for its texture, and new particles reactivate a parked
+    entity directly in C, only creating a new entity when the pool is empty.
+    The active particles are kept in a compact array which is updated in
+    order, a particle that dies is replaced by the last one. Call
+    **reserve_particles** to create the entities ahead of time.
+
+    If **soa** is also True the active particles are instead stored in a
+    ParticleArrays for each emitter type, a structure of arrays that is
+    integrated without branches or pointer chasing and then written back to
+    the particle components. Set **parallel** to spread that integration
+    across threads when kivent_particles is built with KIVENT_USE_OPENMP.
+
     **Attributes:**
 
         **renderer_name** (StringProperty): The system_id of the
@@ -261,39 +828,145 @@ cdef class ParticleSystem(StaticMemGameSystem):
         **particle_zone** (StringProperty): The zone in memory particles will
         be created in.
 
+        **pooled** (BooleanProperty): If True particle entities are reused
+        instead of being removed. Must be set before any particle is
+        created. Defaults to False.
+
+        **soa** (BooleanProperty): If True pooled particles are integrated
+        from structure of arrays storage. Only used when **pooled** is True,
+        must be set before any particle is created. While soa is used the
+        ParticleComponent of an active particle is not kept up to date.
+        Defaults to False.
+
+        **parallel** (BooleanProperty): If True, and **soa** is True, the
+        particles are integrated in chunks across threads. Defaults to
+        False.
+
+        **active_count** (unsigned int): The number of active pooled
+        particles.
+
+    **Attributes: (Cython Access Only)**
+
+        **pools** (dict): The ParticlePool for each texture.
+
+        **active_particles** (PooledParticle*): The active pooled particles,
+        the first **active_count** entries are in use.
+
+        **active_capacity** (unsigned int): The number of PooledParticle
+        **active_particles** has room for.
+
+        **randoms** (float*): Scratch space for the random numbers of a
+        batch of spawns, RANDOMS_PER_PARTICLE for each particle.
+
+        **randoms_capacity** (unsigned int): The number of floats
+        **randoms** has room for.
+
+        **particle_archetype** (str): The name of the GameWorld archetype
+        particle entities are spawned from, None until it is registered.
+
+        **gravity_particles** (ParticleArrays): The active particles of
+        gravity emitters when **soa** is True.
+
+        **radial_particles** (ParticleArrays): The active particles of
+        radial emitters when **soa** is True.
+
     '''
     system_id = StringProperty('particles')
     updateable = BooleanProperty(True)
     type_size = NumericProperty(sizeof(ParticleStruct))
     component_type = ObjectProperty(ParticleComponent)
     processor = BooleanProperty(True)
+    dense_aggregator = BooleanProperty(True)
     system_names = ListProperty(['particles','position', 'rotate', 'scale',
         'color'])
     renderer_name = StringProperty('particle_renderer')
     particle_zone = StringProperty('particles')
+    pooled = BooleanProperty(False)
+    soa = BooleanProperty(False)
+    parallel = BooleanProperty(False)
+
+    def __cinit__(self, **kwargs):
+        self.pools = {}
+        self.gravity_particles = ParticleArrays(EMITTER_TYPE_GRAVITY)
+        self.radial_particles = ParticleArrays(EMITTER_TYPE_RADIAL)
+        self.active_particles = NULL
+        self.active_count = 0
+        self.active_capacity = 0
+        self.randoms = NULL
+        self.randoms_capacity = 0
+        self.particle_archetype = None
+
+    def __dealloc__(self):
+        if self.active_particles != NULL:
+            free(self.active_particles)
+            self.active_particles = NULL
+        if self.randoms != NULL:
+            free(self.randoms)
+            self.randoms = NULL
 
     def __init__(self, **kwargs):
         super(ParticleSystem, self).__init__(**kwargs)
         self._system_names = [x for x in self.system_names]
 
-    cdef unsigned int create_particle(self, ParticleEmitter emitter) except -1:
+    property active_count:
+        def __get__(self):
+            return (self.active_count + self.gravity_particles.count +
+                self.radial_particles.count)
+
+    cdef str get_particle_archetype(self):
+        '''
+        Registers the GameWorld archetype particle entities are spawned from
+        the first time it is needed.
+
+        Return:
+            str: The name of the archetype.
+        '''
+        if self.particle_archetype is not None:
+            return self.particle_archetype
         cdef list system_names = self._system_names
         cdef str renderer_name = self.renderer_name
         create_dict = {
-            system_names[0]: emitter,
+            system_names[0]: None,
             system_names[1]: (0., 0.),
             system_names[2]: 0.,
             system_names[3]: 0.,
             system_names[4]: (255, 255, 255, 255),
-            renderer_name: {'texture': emitter._texture},
+            renderer_name: {},
         }
         create_order = [system_names[1], system_names[2], system_names[3], 
                         system_names[4], system_names[0], renderer_name]
-        return self.gameworld.init_entity(create_dict, create_order, 
+        name = '{}_particle'.format(self.system_id)
+        self.gameworld.register_archetype(name, create_order, create_dict,
             zone=self.particle_zone)
+        self.particle_archetype = name
+        return name
+
+    cdef unsigned int create_particle(self, ParticleEmitter emitter) except -1:
+        return self.gameworld.spawn(self.get_particle_archetype(), {
+            self._system_names[0]: emitter,
+            self.renderer_name: {'texture': emitter._texture},
+            })
 
     def on_system_names(self, instance, value):
         self._system_names = [x for x in value]
+        self.reset_particle_archetype()
+
+    def on_renderer_name(self, instance, value):
+        self.reset_particle_archetype()
+
+    def on_particle_zone(self, instance, value):
+        self.reset_particle_archetype()
+
+    def reset_particle_archetype(self):
+        '''
+        Forgets the archetype particles are spawned from, so that it is
+        registered again with the current **system_names**,
+        **renderer_name** and **particle_zone** next time a particle is
+        created.
+        '''
+        if self.particle_archetype is not None:
+            self.gameworld.archetypes.pop(self.particle_archetype, None)
+            self.particle_archetype = None
 
     def init_component(self, unsigned int component_index, 
         unsigned int entity_id, str zone, ParticleEmitter emitter):
@@ -304,79 +977,96 @@ cdef class ParticleSystem(StaticMemGameSystem):
         The initialization arg for a ParticleComponent is just the
         ParticleEmitter that is creating the component. Typically you will not
         initialize a particle yourself, instead EmitterSystem will call
-        ParticleSystem.create_particle (a cdef'd function).
+        ParticleSystem.create_particle (a cdef'd function). If emitter is
+        None the particle is created parked, for use by a ParticlePool.
         '''
         cdef MemoryZone memory_zone = self.imz_components.memory_zone
         cdef ParticleStruct* pointer = <ParticleStruct*>memory_zone.get_pointer(
             component_index)
         pointer.entity_id = entity_id
+        if emitter is None:
+            pointer.emitter = NULL
+            return
+        cdef unsigned int ent_comps_ind = self.entity_components.add_entity(
+            entity_id, zone)
+        cdef void** component_data = <void**>(
+            self.entity_components.memory_block.data)
+        cdef unsigned int component_count = self.entity_components.count
+        cdef unsigned int real_index = ent_comps_ind * component_count
+        cdef float randoms[RANDOMS_PER_PARTICLE]
+        rng_fill_signed(&emitter._rng, randoms, RANDOMS_PER_PARTICLE)
+        self.setup_particle(pointer, emitter,
+            <PositionStruct2D*>component_data[real_index+1],
+            <RotateStruct2D*>component_data[real_index+2],
+            <ScaleStruct2D*>component_data[real_index+3],
+            <ColorStruct*>component_data[real_index+4], randoms)
+
+    cdef void setup_particle(self, ParticleStruct* pointer,
+        ParticleEmitter emitter, PositionStruct2D* pos_comp,
+        RotateStruct2D* rotate_comp, ScaleStruct2D* scale_comp,
+        ColorStruct* color_comp, float* randoms):
+        '''
+        Starts a new particle from emitter, randomizing its ParticleStruct
+        and writing the starting position, rotation, scale and color to its
+        components.
+
+        Args:
+            randoms (float*): RANDOMS_PER_PARTICLE random numbers in [-1, 1)
+            drawn from the emitter's generator, so that a batch of spawns
+            can draw all of its random numbers in one call to
+            rng_fill_signed.
+        '''
         pointer.emitter = <void*>emitter
         pointer.current_time = 0.0
         pointer.start_pos[0] = emitter._pos[0]
         pointer.start_pos[1] = emitter._pos[1]
-        cdef float angle = random_variance(emitter._emit_angle, 
-            emitter._emit_angle_variance)
-        cdef float speed = random_variance(emitter._speed, 
-            emitter._speed_variance)
+        cdef float angle = (emitter._emit_angle +
+            emitter._emit_angle_variance * randoms[0])
+        cdef float speed = (emitter._speed +
+            emitter._speed_variance * randoms[1])
         pointer.velocity[0] = speed * cos(angle)
         pointer.velocity[1] = speed * sin(angle)
-        cdef float life_span = random_variance(emitter._life_span, 
-            emitter._life_span_variance)
+        cdef float life_span = (emitter._life_span +
+            emitter._life_span_variance * randoms[2])
         while life_span <= 0.0:
-            life_span = random_variance(emitter._life_span, 
+            life_span = rng_variance(&emitter._rng, emitter._life_span,
                 emitter._life_span_variance)
         pointer.total_time = life_span
-        pointer.emit_radius = random_variance(emitter._max_radius, 
-            emitter._max_radius_variance)
+        pointer.emit_radius = (emitter._max_radius +
+            emitter._max_radius_variance * randoms[3])
         pointer.emit_radius_delta = (emitter._max_radius - 
             emitter._min_radius) / life_span
         pointer.emit_rotation = angle
-        pointer.emit_rotation_delta = random_variance(
-            emitter._rotate_per_second, emitter._rotate_per_second_variance)
-        pointer.radial_acceleration = random_variance(
-            emitter._radial_acceleration, emitter._radial_acceleration_variance)
-        pointer.tangential_acceleration = random_variance(
-            emitter._tangential_acceleration, 
-            emitter._tangential_acceleration_variance)
-        cdef float start_scale = fmax(MIN_PARTICLE_SIZE, random_variance(
-            emitter._start_scale, emitter._start_scale_variance))
-        cdef float end_scale = fmax(MIN_PARTICLE_SIZE, random_variance(
-            emitter._end_scale, emitter._end_scale_variance))
+        pointer.emit_rotation_delta = (emitter._rotate_per_second +
+            emitter._rotate_per_second_variance * randoms[4])
+        pointer.radial_acceleration = (emitter._radial_acceleration +
+            emitter._radial_acceleration_variance * randoms[5])
+        pointer.tangential_acceleration = (emitter._tangential_acceleration +
+            emitter._tangential_acceleration_variance * randoms[6])
+        cdef float start_scale = fmax(MIN_PARTICLE_SIZE,
+            emitter._start_scale + emitter._start_scale_variance * randoms[7])
+        cdef float end_scale = fmax(MIN_PARTICLE_SIZE,
+            emitter._end_scale + emitter._end_scale_variance * randoms[8])
         pointer.scale_delta = (end_scale - start_scale) / life_span
         cdef unsigned char[4] start_color
         cdef unsigned char[4] end_color
-        color_variance(emitter._start_color, emitter._start_color_variance, 
-            start_color)
-        color_variance(emitter._end_color, emitter._end_color_variance, 
-            end_color)
+        color_variance(emitter._start_color,
+            emitter._start_color_variance, &randoms[9], start_color)
+        color_variance(emitter._end_color, emitter._end_color_variance,
+            &randoms[13], end_color)
         color_delta(start_color, end_color, pointer.color_delta, life_span)
-        cdef float start_rotation = random_variance(emitter._start_rotation, 
-            emitter._start_rotation_variance)
-        cdef float end_rotation = random_variance(emitter._end_rotation, 
-            emitter._end_rotation_variance)
+        cdef float start_rotation = (emitter._start_rotation +
+            emitter._start_rotation_variance * randoms[17])
+        cdef float end_rotation = (emitter._end_rotation +
+            emitter._end_rotation_variance * randoms[18])
         pointer.rotation_delta = (end_rotation - start_rotation) / life_span
-
-        cdef unsigned int ent_comps_ind = self.entity_components.add_entity(
-            entity_id, zone)
-        cdef void** component_data = <void**>(
-            self.entity_components.memory_block.data)
-        cdef unsigned int component_count = self.entity_components.count
-        cdef unsigned int real_index = ent_comps_ind * component_count
-        cdef PositionStruct2D* pos_comp = <PositionStruct2D*>component_data[
-            real_index+1]
-        cdef RotateStruct2D* rotate_comp = <RotateStruct2D*>component_data[
-            real_index+2]
-        cdef ScaleStruct2D* scale_comp = <ScaleStruct2D*>component_data[
-            real_index+3]
-        cdef ColorStruct* color_comp = <ColorStruct*>component_data[
-            real_index+4]
  
         #write scale, color, position, and rotate data to components
         if emitter._emitter_type == 0:
-            pos_comp.x = random_variance(emitter._pos[0], 
-                emitter._pos_variance[0])
-            pos_comp.y = random_variance(emitter._pos[1], 
-                emitter._pos_variance[1])
+            pos_comp.x = (emitter._pos[0] +
+                emitter._pos_variance[0] * randoms[19])
+            pos_comp.y = (emitter._pos[1] +
+                emitter._pos_variance[1] * randoms[20])
         elif emitter._emitter_type == 1:
             pos_comp.x = (emitter._pos[0] - cos(
                 pointer.emit_rotation) * pointer.emit_radius)
@@ -390,11 +1080,304 @@ cdef class ParticleSystem(StaticMemGameSystem):
             pointer.color[i] = <float>start_color[i]
             color_comp.color[i] = start_color[i]
 
+    cdef ParticlePool get_pool(self, str texture):
+        '''
+        Returns the ParticlePool for texture, creating it if needed.
+        '''
+        cdef ParticlePool pool
+        try:
+            pool = self.pools[texture]
+        except KeyError:
+            pool = ParticlePool(texture)
+            self.pools[texture] = pool
+        return pool
+
+    cdef unsigned int create_pooled_entity(self, str texture) except -1:
+        '''
+        Creates a new parked particle entity in **particle_zone**, with its
+        RenderComponent hidden.
+
+        Return:
+            unsigned int: The entity_id of the new particle.
+        '''
+        return self.gameworld.spawn(self.get_particle_archetype(), {
+            self.renderer_name: {'texture': texture, 'render': False},
+            })
+
+    cdef int fetch_pooled(self, unsigned int entity_id,
+        PooledParticle* particle) except -1:
+        '''
+        Fills in particle with pointers to the components of a particle
+        entity. The components are statically allocated so the pointers
+        stay valid for the life of the entity.
+
+        Args:
+            entity_id (unsigned int): The particle entity.
+
+            particle (PooledParticle*): The PooledParticle to fill in, its
+            pool is left unchanged.
+        '''
+        cdef IndexedMemoryZone entities = self.gameworld.entities
+        cdef unsigned int* entity = <unsigned int*>entities.get_pointer(
+            entity_id)
+        cdef SystemManager system_manager = self.gameworld.system_manager
+        cdef list system_names = self._system_names
+        cdef void* pointers[6]
+        cdef StaticMemGameSystem system
+        cdef unsigned int i, system_index
+        for i, system_name in enumerate(
+            system_names[:5] + [self.renderer_name]):
+            system_index = system_manager.get_system_index(system_name)
+            system = system_manager.systems[system_index]
+            pointers[i] = system.imz_components.get_pointer(
+                entity[system_index+1])
+        particle.entity_id = entity_id
+        particle.particle = <ParticleStruct*>pointers[0]
+        particle.position = <PositionStruct2D*>pointers[1]
+        particle.rotate = <RotateStruct2D*>pointers[2]
+        particle.scale = <ScaleStruct2D*>pointers[3]
+        particle.color = <ColorStruct*>pointers[4]
+        particle.render = <RenderStruct*>pointers[5]
+        return 1
+
+    cdef int reserve_active(self, unsigned int count) except -1:
+        '''
+        Makes sure **active_particles** has room for count particles.
+        '''
+        cdef unsigned int capacity = max(16, self.active_capacity)
+        cdef PooledParticle* active_particles
+        if count <= self.active_capacity:
+            return 1
+        while capacity < count:
+            capacity *= 2
+        active_particles = <PooledParticle*>realloc(self.active_particles,
+            sizeof(PooledParticle) * capacity)
+        if active_particles == NULL:
+            raise MemoryError()
+        self.active_particles = active_particles
+        self.active_capacity = capacity
+        return 1
+
+    cdef int reserve_randoms(self, unsigned int count) except -1:
+        '''
+        Makes sure **randoms** has room for count floats.
+        '''
+        cdef float* randoms
+        if count <= self.randoms_capacity:
+            return 1
+        randoms = <float*>realloc(self.randoms, sizeof(float) * count)
+        if randoms == NULL:
+            raise MemoryError()
+        self.randoms = randoms
+        self.randoms_capacity = count
+        return 1
+
+    def reserve_particles(self, str texture, unsigned int count):
+        '''
+        Creates count parked particle entities for texture so that later
+        particles using that texture do not create any entities.
+
+        Args:
+            texture (str): The texture of the emitters that will use the
+            particles.
+
+            count (unsigned int): The number of particles to create.
+        '''
+        cdef ParticlePool pool = self.get_pool(texture)
+        cdef PooledParticle particle
+        cdef unsigned int i
+        particle.pool = <void*>pool
+        for i in range(count):
+            self.fetch_pooled(self.create_pooled_entity(texture), &particle)
+            pool.push(&particle)
+
+    cdef int spawn_particles(self, ParticleEmitter emitter,
+        unsigned int count) except -1:
+        '''
+        Activates count pooled particles for emitter, taking them from the
+        ParticlePool of its texture or creating new entities if the pool
+        runs out.
+
+        Args:
+            emitter (ParticleEmitter): The emitter creating the particles.
+
+            count (unsigned int): The number of particles to create.
+        '''
+        cdef ParticlePool pool = self.get_pool(emitter._texture)
+        cdef PooledParticle* particle
+        cdef PooledParticle spawned
+        cdef ParticleArrays arrays = None
+        cdef unsigned int i, entity_id
+        self.reserve_randoms(count * RANDOMS_PER_PARTICLE)
+        rng_fill_signed(&emitter._rng, self.randoms,
+            count * RANDOMS_PER_PARTICLE)
+        if self.soa:
+            if emitter._emitter_type == EMITTER_TYPE_RADIAL:
+                arrays = self.radial_particles
+            else:
+                arrays = self.gravity_particles
+            arrays.reserve(arrays.count + count)
+            particle = &spawned
+        else:
+            self.reserve_active(self.active_count + count)
+        for i in range(count):
+            if arrays is None:
+                particle = &self.active_particles[self.active_count]
+            if pool.free_count > 0:
+                pool.free_count -= 1
+                particle[0] = pool.free_particles[pool.free_count]
+            else:
+                entity_id = self.create_pooled_entity(emitter._texture)
+                self.fetch_pooled(entity_id, particle)
+                particle.pool = <void*>pool
+            if arrays is None:
+                self.active_count += 1
+            self.setup_particle(particle.particle, emitter, particle.position,
+                particle.rotate, particle.scale, particle.color,
+                &self.randoms[i * RANDOMS_PER_PARTICLE])
+            particle.render.render = True
+            particle.render.state_valid = False
+            if arrays is not None:
+                arrays.append(particle)
+        return 1
+
+    cdef int release_particle(self, unsigned int active_index) except -1:
+        '''
+        Hides the active particle at active_index and parks it in its
+        ParticlePool, the last active particle takes its place.
+
+        Args:
+            active_index (unsigned int): Index into **active_particles**.
+        '''
+        cdef PooledParticle* particle = &self.active_particles[active_index]
+        cdef ParticlePool pool = <ParticlePool>particle.pool
+        particle.render.render = False
+        particle.particle.emitter = NULL
+        pool.push(particle)
+        self.active_count -= 1
+        self.active_particles[active_index] = (
+            self.active_particles[self.active_count])
+        return 1
+
+    cdef int release_array_particle(self, ParticleArrays arrays,
+        unsigned int index) except -1:
+        '''
+        The ParticleArrays version of release_particle, hides the particle at
+        index and parks it in its ParticlePool.
+
+        Args:
+            arrays (ParticleArrays): The arrays holding the particle.
+
+            index (unsigned int): Index of the particle in arrays.
+        '''
+        cdef PooledParticle* particle = &arrays.particles[index]
+        cdef ParticlePool pool = <ParticlePool>particle.pool
+        particle.render.render = False
+        particle.particle.emitter = NULL
+        pool.push(particle)
+        arrays.swap_remove(index)
+        return 1
+
+    cdef int update_arrays(self, ParticleArrays arrays, float dt,
+        bint parallel) except -1:
+        '''
+        Integrates the particles in arrays, writes them to their components
+        and then releases the particles that died.
+
+        Args:
+            arrays (ParticleArrays): The particles to update.
+
+            dt (float): The time to advance by.
+
+            parallel (bint): Whether to integrate across threads.
+        '''
+        cdef float* current_time
+        cdef float* total_time
+        cdef ParticleEmitter emitter
+        cdef unsigned int i = 0
+        if arrays.count == 0:
+            return 0
+        arrays.gather()
+        arrays.integrate(dt, parallel)
+        arrays.scatter()
+        current_time = arrays.field(FIELD_CURRENT_TIME)
+        total_time = arrays.field(FIELD_TOTAL_TIME)
+        while i < arrays.count:
+            if current_time[i] >= total_time[i]:
+                emitter = <ParticleEmitter>arrays.emitters[i]
+                emitter._current_particles -= 1
+                self.release_array_particle(arrays, i)
+            else:
+                i += 1
+        return 1
+
+    cdef int release_emitter(self, ParticleEmitter emitter) except -1:
+        '''
+        Parks every active pooled particle created by emitter, used when the
+        emitter is removed.
+
+        Args:
+            emitter (ParticleEmitter): The emitter being removed.
+        '''
+        cdef unsigned int i = 0
+        cdef ParticleArrays arrays
+        while i < self.active_count:
+            if self.active_particles[i].particle.emitter == <void*>emitter:
+                emitter._current_particles -= 1
+                self.release_particle(i)
+            else:
+                i += 1
+        for arrays in (self.gravity_particles, self.radial_particles):
+            i = 0
+            while i < arrays.count:
+                if arrays.emitters[i] == <void*>emitter:
+                    emitter._current_particles -= 1
+                    self.release_array_particle(arrays, i)
+                else:
+                    i += 1
+        return 1
+
+    cdef int forget_pooled(self, unsigned int entity_id) except -1:
+        '''
+        Drops a pooled particle whose entity is being removed from the
+        GameWorld, whether it is active or parked.
+
+        Args:
+            entity_id (unsigned int): The particle entity.
+        '''
+        cdef unsigned int i
+        cdef ParticleEmitter emitter
+        cdef ParticlePool pool
+        cdef ParticleArrays arrays
+        for arrays in (self.gravity_particles, self.radial_particles):
+            for i in range(arrays.count):
+                if arrays.particles[i].entity_id == entity_id:
+                    emitter = <ParticleEmitter>arrays.emitters[i]
+                    emitter._current_particles -= 1
+                    arrays.swap_remove(i)
+                    return 1
+        for i in range(self.active_count):
+            if self.active_particles[i].entity_id == entity_id:
+                emitter = <ParticleEmitter>(
+                    self.active_particles[i].particle.emitter)
+                emitter._current_particles -= 1
+                self.active_count -= 1
+                self.active_particles[i] = (
+                    self.active_particles[self.active_count])
+                return 1
+        for pool in self.pools.values():
+            if pool.forget(entity_id):
+                return 1
+        return 0
+
     def remove_component(self, unsigned int component_index):
         cdef MemoryZone memory_zone = self.imz_components.memory_zone
         cdef ParticleStruct* pointer = <ParticleStruct*>memory_zone.get_pointer(
             component_index)
-        self.entity_components.remove_entity(pointer.entity_id)
+        if self.entity_components.has_entity(pointer.entity_id):
+            self.entity_components.remove_entity(pointer.entity_id)
+        else:
+            self.forget_pooled(pointer.entity_id)
         super(ParticleSystem, self).remove_component(component_index)
 
     def clear_component(self, unsigned int component_index):
@@ -423,100 +1406,322 @@ cdef class ParticleSystem(StaticMemGameSystem):
 
     def update(self, float dt):
         cdef ParticleEmitter emitter
-        cdef float passed_time, total_time
-        cdef float start_x, start_y
-        cdef float current_x, current_y
-        cdef float distance_x, distance_y
-        cdef float distance_scalar
-        cdef float radial_x, radial_y
-        cdef float rad_accel
-        cdef float tangential_x, tangential_y
-        cdef float new_y
-        cdef float tan_accel
-
+        cdef ZonedAggregator entity_components = self.entity_components
         cdef void** component_data = <void**>(
-            self.entity_components.memory_block.data)
-        cdef unsigned int component_count = self.entity_components.count
-        cdef unsigned int count = self.entity_components.memory_block.count
-        cdef unsigned int i, real_index
-
+            entity_components.memory_block.data)
+        cdef unsigned int component_count = entity_components.count
+        cdef unsigned int zone, start, end, i, real_index
         cdef ParticleStruct* particle_comp
-        cdef PositionStruct2D* pos_comp
-        cdef RotateStruct2D* rotate_comp
-        cdef ScaleStruct2D* scale_comp
-        cdef ColorStruct* color_comp
+        cdef PooledParticle* particle
 
         gameworld = self.gameworld
         remove_entity = gameworld.remove_entity
-        for i in range(count):
-            real_index = i*component_count
-            if component_data[real_index] == NULL:
+        for zone in range(entity_components.live_index.zone_count):
+            end = entity_components.get_live_range(zone, &start)
+            #backwards, removing an entity only moves one already visited
+            i = end
+            while i > start:
+                i -= 1
+                real_index = i*component_count
+                if component_data[real_index] == NULL:
+                    continue
+                particle_comp = <ParticleStruct*>component_data[real_index]
+                if advance_particle(particle_comp,
+                    <PositionStruct2D*>component_data[real_index+1],
+                    <RotateStruct2D*>component_data[real_index+2],
+                    <ScaleStruct2D*>component_data[real_index+3],
+                    <ColorStruct*>component_data[real_index+4], dt):
+                    emitter = <ParticleEmitter>particle_comp.emitter
+                    emitter._current_particles -= 1
+                    emitter.active_particles.remove(particle_comp.entity_id)
+                    remove_entity(particle_comp.entity_id)
+
+        i = 0
+        while i < self.active_count:
+            particle = &self.active_particles[i]
+            if advance_particle(particle.particle, particle.position,
+                particle.rotate, particle.scale, particle.color, dt):
+                emitter = <ParticleEmitter>particle.particle.emitter
+                emitter._current_particles -= 1
+                self.release_particle(i)
+            else:
+                i += 1
+
+        cdef bint parallel = self.parallel
+        self.update_arrays(self.gravity_particles, dt, parallel)
+        self.update_arrays(self.radial_particles, dt, parallel)
+
+    cdef dict get_emitters(self):
+        '''
+        Returns the emitters of every EmitterSystem whose particle_system is
+        this ParticleSystem.
+
+        Return:
+            dict: The ParticleEmitter for each (entity_id, slot) pair, see
+            EmitterSystem.get_emitters.
+        '''
+        cdef dict emitters = {}
+        cdef EmitterSystem emitter_system
+        for system in self.gameworld.system_manager.systems:
+            if (isinstance(system, EmitterSystem) and
+                system.particle_system is self):
+                emitter_system = system
+                emitters.update(emitter_system.get_emitters())
+        return emitters
+
+    cdef int fetch_checked(self, unsigned int entity_id,
+        PooledParticle* particle) except -1:
+        '''
+        The version of fetch_pooled used when restoring a snapshot, first
+        checking that entity_id is a pooled particle entity.
+
+        Args:
+            entity_id (unsigned int): The particle entity.
+
+            particle (PooledParticle*): The PooledParticle to fill in.
+        '''
+        cdef IndexedMemoryZone entities = self.gameworld.entities
+        cdef SystemManager system_manager = self.gameworld.system_manager
+        cdef unsigned int* entity
+        if entity_id >= entities.memory_zone.count:
+            raise ValueError('Invalid particle entity {}'.format(entity_id))
+        entity = <unsigned int*>entities.get_pointer(entity_id)
+        if (entity[0] != entity_id or
+            self.entity_components.has_entity(entity_id)):
+            raise ValueError('Invalid particle entity {}'.format(entity_id))
+        for system_name in self._system_names[:5] + [self.renderer_name]:
+            if entity[system_manager.get_system_index(system_name)+1] == (
+                <unsigned int>-1):
+                raise ValueError('Invalid particle entity {}'.format(
+                    entity_id))
+        return self.fetch_pooled(entity_id, particle)
+
+    def get_snapshot_state(self):
+        '''
+        Extends StaticMemGameSystem.get_snapshot_state with the emitter of
+        every particle, saved as the entity_id of the entity owning the
+        emitter and the emitter's slot in its EmitterComponent, and with the
+        pooled particles: the entity_id and pool of the parked and active
+        particles, and the fields of the particles in the ParticleArrays.
+        The textures of the pools are saved as JSON.
+
+        Return:
+            tuple: The state of the system.
+        '''
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef ParticleStruct* pointer
+        cdef ParticleArrays arrays
+        cdef ParticlePool pool
+        cdef PooledParticle* particle
+        cdef dict emitter_slots = {}
+        cdef dict pool_ids = {}
+        cdef list arrays_states = []
+        cdef unsigned int i, field
+        for key, emitter in self.get_emitters().items():
+            emitter_slots[<size_t><void*>emitter] = key
+        component_indices = array('I', memory_zone.get_active_slots())
+        emitter_entities = array('I')
+        emitter_indices = array('I')
+        for component_index in component_indices:
+            pointer = <ParticleStruct*>memory_zone.get_pointer(
+                component_index)
+            if pointer.emitter == NULL:
+                emitter_entities.append(<unsigned int>-1)
+                emitter_indices.append(<unsigned int>-1)
                 continue
-            particle_comp = <ParticleStruct*>component_data[real_index]
-            pos_comp = <PositionStruct2D*>component_data[real_index+1]
-            rotate_comp = <RotateStruct2D*>component_data[real_index+2]
-            scale_comp = <ScaleStruct2D*>component_data[real_index+3]
-            color_comp = <ColorStruct*>component_data[real_index+4]
-            passed_time = fmin(dt, 
-                particle_comp.total_time - particle_comp.current_time)
-            emitter = <ParticleEmitter>particle_comp.emitter
-            particle_comp.current_time += passed_time
+            entity_id, slot = emitter_slots[<size_t>pointer.emitter]
+            emitter_entities.append(entity_id)
+            emitter_indices.append(slot)
+        parked = array('I')
+        parked_pools = array('I')
+        for texture in self.pools:
+            pool = self.pools[texture]
+            pool_ids[texture] = len(pool_ids)
+            for i in range(pool.free_count):
+                parked.append(pool.free_particles[i].entity_id)
+                parked_pools.append(pool_ids[texture])
+        active = array('I')
+        active_pools = array('I')
+        for i in range(self.active_count):
+            particle = &self.active_particles[i]
+            active.append(particle.entity_id)
+            active_pools.append(pool_ids[
+                (<ParticlePool>particle.pool).texture])
+        for arrays in (self.gravity_particles, self.radial_particles):
+            entity_ids = array('I')
+            entity_pools = array('I')
+            fields = array('f')
+            for i in range(arrays.count):
+                particle = &arrays.particles[i]
+                entity_ids.append(particle.entity_id)
+                entity_pools.append(pool_ids[
+                    (<ParticlePool>particle.pool).texture])
+            if arrays.count:
+                for field in range(PARTICLE_FIELD_COUNT):
+                    fields.frombytes((<char*>arrays.field(field))[
+                        :arrays.count * sizeof(float)])
+            arrays_states.append((entity_ids, entity_pools, fields))
+        return (super(ParticleSystem, self).get_snapshot_state(),
+            json.dumps(list(self.pools)), component_indices,
+            emitter_entities, emitter_indices, parked, parked_pools, active,
+            active_pools, arrays_states[0], arrays_states[1])
+
+    def set_snapshot_state(self, tuple state):
+        '''
+        Restores the component data of the result of **get_snapshot_state**
+        and empties the pools and active particles, which are filled again
+        by **link_snapshot_state** once the emitters and the components of
+        the particle entities are restored.
 
-            if emitter._emitter_type == EMITTER_TYPE_RADIAL:
-                particle_comp.emit_rotation += (
-                    particle_comp.emit_rotation_delta * passed_time)
-                particle_comp.emit_radius -= (
-                    particle_comp.emit_radius_delta * passed_time)
-                pos_comp.x = (emitter._pos[0] - cos(
-                    particle_comp.emit_rotation) * particle_comp.emit_radius)
-                pos_comp.y = (emitter._pos[1] - sin(
-                    particle_comp.emit_rotation) * particle_comp.emit_radius)
-
-                if particle_comp.emit_radius < emitter._min_radius:
-                    particle_comp.current_time = particle_comp.total_time
-            else:
-                if particle_comp.radial_acceleration or particle_comp.tangential_acceleration:
-                    start_x = particle_comp.start_pos[0]
-                    start_y = particle_comp.start_pos[1]
-                    current_x = pos_comp.x
-                    current_y = pos_comp.y
-                    distance_x = current_x - start_x
-                    distance_y = current_y - start_y
-                    distance_scalar = calc_distance(start_x, start_y, 
-                        current_x, current_y)
-                    if distance_scalar < 0.01:
-                        distance_scalar = 0.01
-                    radial_x = distance_x / distance_scalar
-                    radial_y = distance_y / distance_scalar
-                    tangential_x = radial_x
-                    tangential_y = radial_y
-                    rad_accel = particle_comp.radial_acceleration
-                    radial_x *= rad_accel
-                    radial_y *= rad_accel
-                    new_y = tangential_x
-                    tan_accel = particle_comp.tangential_acceleration
-                    tangential_x = -tangential_y * tan_accel
-                    tangential_y = new_y * tan_accel
-                else:
-                    radial_x = radial_y = tangential_x = tangential_y = 0
-                particle_comp.velocity[0] += passed_time * (
-                    emitter._gravity[0] + radial_x + tangential_x)
-                particle_comp.velocity[1] += passed_time * (
-                    emitter._gravity[1] + radial_y + tangential_y)
-                pos_comp.x += particle_comp.velocity[0] * passed_time
-                pos_comp.y += particle_comp.velocity[1] * passed_time
-
-            scale_comp.sx += particle_comp.scale_delta * passed_time
-            scale_comp.sy += particle_comp.scale_delta * passed_time
-            rotate_comp.r += particle_comp.rotation_delta * passed_time
-            color_integrate(particle_comp.color, particle_comp.color_delta, 
-                particle_comp.color, passed_time)
-            color_copy(particle_comp.color, color_comp.color)
-            if particle_comp.current_time >= particle_comp.total_time:
-                emitter._current_particles -= 1
-                emitter.active_particles.remove(particle_comp.entity_id)
-                remove_entity(particle_comp.entity_id)
+        Args:
+            state (tuple): The result of **get_snapshot_state**.
+        '''
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef ParticleStruct* pointer
+        cdef ParticlePool pool
+        (base_state, textures, component_indices, emitter_entities,
+            emitter_indices, parked, parked_pools, active, active_pools,
+            gravity_state, radial_state) = state
+        texture_count = len(json.loads(textures))
+        if not (len(component_indices) == len(emitter_entities) == len(
+            emitter_indices) and len(parked) == len(parked_pools) and len(
+            active) == len(active_pools)) or (active and self.soa) or (
+            not self.pooled and (parked or active)):
+            raise ValueError('{} was not snapshot with the same setup'.format(
+                self.system_id))
+        for entity_ids, entity_pools, fields in (gravity_state, radial_state):
+            if (len(entity_ids) != len(entity_pools) or
+                fields.typecode != 'f' or
+                len(fields) != len(entity_ids) * PARTICLE_FIELD_COUNT or
+                entity_ids and not self.soa):
+                raise ValueError(
+                    '{} was not snapshot with the same setup'.format(
+                    self.system_id))
+            for pool_id in entity_pools:
+                if pool_id >= texture_count:
+                    raise ValueError('Invalid pool index {}'.format(pool_id))
+        for pool_id in list(parked_pools) + list(active_pools):
+            if pool_id >= texture_count:
+                raise ValueError('Invalid pool index {}'.format(pool_id))
+        for component_index, slot in zip(component_indices, emitter_indices):
+            if component_index >= memory_zone.count or (
+                slot != <unsigned int>-1 and slot >= MAX_EMITTERS):
+                raise ValueError('Invalid component index {}'.format(
+                    component_index))
+        self.active_count = 0
+        self.gravity_particles.count = 0
+        self.radial_particles.count = 0
+        for pool in self.pools.values():
+            pool.free_count = 0
+        super(ParticleSystem, self).set_snapshot_state(base_state)
+        for component_index in memory_zone.get_active_slots():
+            pointer = <ParticleStruct*>memory_zone.get_pointer(
+                component_index)
+            pointer.emitter = NULL
+
+    def link_snapshot_state(self, tuple state):
+        '''
+        Links every particle to its emitter again, adds the particles that
+        are entities of their own back to the active_particles of their
+        emitter and fills the pools, active particles and ParticleArrays
+        again.
 
+        Args:
+            state (tuple): The result of **get_snapshot_state**.
+        '''
+        super(ParticleSystem, self).link_snapshot_state(state[0])
+        cdef MemoryZone memory_zone = self.imz_components.memory_zone
+        cdef ZonedAggregator entity_components = self.entity_components
+        cdef void** component_data = <void**>(
+            entity_components.memory_block.data)
+        cdef unsigned int component_count = entity_components.count
+        cdef unsigned int zone, start, end, i, real_index, field, count
+        cdef ParticleStruct* pointer
+        cdef PooledParticle* particle
+        cdef PooledParticle parked_particle
+        cdef ParticleArrays arrays
+        cdef ParticlePool pool
+        cdef dict emitters = self.get_emitters()
+        cdef set seen = set()
+        cdef bytes data
+        (base_state, textures, component_indices, emitter_entities,
+            emitter_indices, parked, parked_pools, active, active_pools,
+            gravity_state, radial_state) = state
+        cdef list pools = [self.get_pool(texture)
+            for texture in json.loads(textures)]
+        for component_index, entity_id, slot in zip(component_indices,
+            emitter_entities, emitter_indices):
+            if entity_id == <unsigned int>-1:
+                continue
+            pointer = <ParticleStruct*>memory_zone.get_pointer(
+                component_index)
+            if (entity_id, slot) not in emitters:
+                raise ValueError('Entity {} has no emitter {}'.format(
+                    entity_id, slot))
+            pointer.emitter = <void*>emitters[(entity_id, slot)]
+        for zone in range(entity_components.live_index.zone_count):
+            end = entity_components.get_live_range(zone, &start)
+            for i in range(start, end):
+                real_index = i*component_count
+                if component_data[real_index] == NULL:
+                    continue
+                pointer = <ParticleStruct*>component_data[real_index]
+                if pointer.emitter == NULL:
+                    raise ValueError('Particle {} has no emitter'.format(
+                        pointer.entity_id))
+                (<ParticleEmitter>pointer.emitter).active_particles.add(
+                    pointer.entity_id)
+        for entity_id, pool_id in zip(parked, parked_pools):
+            if entity_id in seen:
+                raise ValueError('Invalid particle entity {}'.format(
+                    entity_id))
+            seen.add(entity_id)
+            pool = pools[pool_id]
+            self.fetch_checked(entity_id, &parked_particle)
+            if parked_particle.particle.emitter != NULL:
+                raise ValueError('Invalid particle entity {}'.format(
+                    entity_id))
+            parked_particle.pool = <void*>pool
+            pool.push(&parked_particle)
+        self.reserve_active(len(active))
+        for entity_id, pool_id in zip(active, active_pools):
+            if entity_id in seen:
+                raise ValueError('Invalid particle entity {}'.format(
+                    entity_id))
+            seen.add(entity_id)
+            particle = &self.active_particles[self.active_count]
+            self.fetch_checked(entity_id, particle)
+            if particle.particle.emitter == NULL:
+                raise ValueError('Particle {} has no emitter'.format(
+                    entity_id))
+            particle.pool = <void*>pools[pool_id]
+            self.active_count += 1
+        for arrays, (entity_ids, entity_pools, fields) in (
+            (self.gravity_particles, gravity_state),
+            (self.radial_particles, radial_state)):
+            count = len(entity_ids)
+            if count == 0:
+                continue
+            arrays.reserve(count)
+            for i in range(count):
+                entity_id = entity_ids[i]
+                if entity_id in seen:
+                    raise ValueError('Invalid particle entity {}'.format(
+                        entity_id))
+                seen.add(entity_id)
+                particle = &arrays.particles[i]
+                self.fetch_checked(entity_id, particle)
+                if particle.particle.emitter == NULL:
+                    raise ValueError('Particle {} has no emitter'.format(
+                        entity_id))
+                particle.pool = <void*>pools[entity_pools[i]]
+                arrays.emitters[i] = particle.particle.emitter
+                arrays.count = i + 1
+            data = fields.tobytes()
+            for field in range(PARTICLE_FIELD_COUNT):
+                memcpy(arrays.field(field),
+                    <char*>data + field * count * sizeof(float),
+                    count * sizeof(float))
 
 
 Factory.register('ParticleSystem', cls=ParticleSystem)
@@ -1,4 +1,6 @@
 DEF MAX_EMITTERS = 8
 DEF EMITTER_TYPE_GRAVITY = 0
 DEF EMITTER_TYPE_RADIAL = 1
-DEF MIN_PARTICLE_SIZE = .1
\ No newline at end of file
+DEF MIN_PARTICLE_SIZE = .1
+DEF PARALLEL_CHUNK_SIZE = 1024
+DEF RANDOMS_PER_PARTICLE = 21
\ No newline at end of file
@@ -1,4 +1,4 @@
-from kivy.graphics.cgl cimport GLfloat, GLubyte
+from kivy.graphics.cgl cimport GLfloat, GLubyte, GLushort
 
 
 ctypedef struct VertexFormat9F4UB:
@@ -7,4 +7,12 @@ ctypedef struct VertexFormat9F4UB:
     GLfloat[2] center
     GLfloat[2] scale
     GLubyte[4] v_color
-    GLfloat rotate
\ No newline at end of file
+    GLfloat rotate
+
+
+ctypedef struct VertexFormat4F4UB1US:
+    GLfloat[2] center
+    GLfloat rotate
+    GLfloat scale
+    GLubyte[4] v_color
+    GLushort uv_index
@@ -21,4 +21,27 @@ vertex_format_9f4ub = [
     ]
 
 format_registrar.register_vertex_format('vertex_format_9f4ub', 
-	vertex_format_9f4ub, sizeof(VertexFormat9F4UB))
\ No newline at end of file
+	vertex_format_9f4ub, sizeof(VertexFormat9F4UB))
+
+cdef VertexFormat4F4UB1US* tmp2 = <VertexFormat4F4UB1US*>NULL
+point_center_offset = <Py_ssize_t> (
+    <Py_intptr_t>(tmp2.center) - <Py_intptr_t>(tmp2))
+point_rotate_offset = <Py_ssize_t> (
+    <Py_intptr_t>(&tmp2.rotate) - <Py_intptr_t>(tmp2))
+point_scale_offset = <Py_ssize_t> (
+    <Py_intptr_t>(&tmp2.scale) - <Py_intptr_t>(tmp2))
+point_color_offset = <Py_ssize_t> (
+    <Py_intptr_t>(tmp2.v_color) - <Py_intptr_t>(tmp2))
+point_uv_index_offset = <Py_ssize_t> (
+    <Py_intptr_t>(&tmp2.uv_index) - <Py_intptr_t>(tmp2))
+
+vertex_format_4f4ub1us = [
+    (b'center', 2, b'float', point_center_offset, False),
+    (b'rotate', 1, b'float', point_rotate_offset, False),
+    (b'scale', 1, b'float', point_scale_offset, False),
+    (b'v_color', 4, b'ubyte', point_color_offset, True),
+    (b'uv_index', 1, b'ushort', point_uv_index_offset, False),
+    ]
+
+format_registrar.register_vertex_format('vertex_format_4f4ub1us',
+    vertex_format_4f4ub1us, sizeof(VertexFormat4F4UB1US))
\ No newline at end of file
@@ -1,13 +1,8 @@
 from libc.math cimport fmax, fmin, sqrt
-from libc.stdlib cimport rand, RAND_MAX
-from libc.math cimport sin, cos, pow
+from libc.math cimport sin, cos, pow, copysignf
 
 DEF PI = 3.14159265358979323846
 
-cdef inline float cy_random():
-    return <float>rand()/<float>RAND_MAX
-
-
 cdef inline float cy_radians(float degrees):
     return degrees*(PI/180.0)
 
@@ -15,6 +10,27 @@ cdef inline float cy_degrees(float radians):
     return radians*(180./PI)
 
 
+cdef inline float sin_approx(float radians) nogil:
+    '''
+    Branch free sine that the compiler can vectorize, accurate to about
+    1e-5. The angle is wrapped to [-PI, PI] and reflected into
+    [-PI/2, PI/2] before evaluating a degree 9 Taylor polynomial.
+    '''
+    cdef float turns = radians * <float>(1. / (2. * PI))
+    cdef float x = radians - <float>(2. * PI) * <float><int>(
+        turns + copysignf(.5, turns))
+    cdef float x2
+    x = <float>PI - x if x > <float>(PI / 2.) else x
+    x = <float>-PI - x if x < <float>(-PI / 2.) else x
+    x2 = x * x
+    return x * (1. + x2 * (-1. / 6. + x2 * (1. / 120. + x2 * (
+        -1. / 5040. + x2 * (1. / 362880.)))))
+
+
+cdef inline float cos_approx(float radians) nogil:
+    return sin_approx(radians + <float>(PI / 2.))
+
+
 cdef inline void rotate_offset(float* offset, float angle_radians, 
     float* output):
     cdef float cs = cos(angle_radians)
@@ -28,10 +44,6 @@ cdef inline unsigned char char_lerp(unsigned char v0, unsigned char v1,
     return <unsigned char>((1-t)*v0 + t * v1)
 
 
-cdef inline float random_variance(float base, float variance):
-    return base + variance * (cy_random() * 2.0 - 1.0)
-
-
 cdef inline void color_delta(unsigned char* color1, unsigned char* color2, 
     float* output, float dt):
     cdef int i 
@@ -40,11 +52,11 @@ cdef inline void color_delta(unsigned char* color1, unsigned char* color2,
 
 
 cdef inline void color_variance(unsigned char* base, unsigned char* variance, 
-    unsigned char* output):
+    float* randoms, unsigned char* output):
     cdef int i
     for i in range(4):
-        output[i] = <unsigned char>fmin(fmax(0., random_variance(<float>base[i], 
-            <float>variance[i])), 255.)
+        output[i] = <unsigned char>fmin(fmax(0., <float>base[i] +
+            <float>variance[i] * randoms[i]), 255.)
 
 
 cdef inline void color_integrate(float* current, float* delta, 
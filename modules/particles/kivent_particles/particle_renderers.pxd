@@ -1,5 +1,34 @@
 from kivent_core.systems.renderers cimport Renderer
+from kivent_core.systems.position_systems cimport PositionStruct2D
+from kivent_core.systems.scale_systems cimport ScaleStruct2D
+from kivent_core.systems.rotate_systems cimport RotateStruct2D
+from kivent_core.systems.color_systems cimport ColorStruct
+from kivent_particles.particle_formats cimport VertexFormat4F4UB1US
+from libc.math cimport fabs
 
 
 cdef class ParticleRenderer(Renderer):
-    pass
\ No newline at end of file
+    pass
+
+
+cdef class PointParticleRenderer(Renderer):
+    cdef dict sprite_indices
+    cdef list uv_rects
+    cdef list sprite_sizes
+
+
+cdef inline void pack_particle_record(VertexFormat4F4UB1US* record,
+    VertexFormat4F4UB1US* sprite, PositionStruct2D* pos_comp,
+    RotateStruct2D* rot_comp, ScaleStruct2D* scale_comp,
+    ColorStruct* color_comp) nogil:
+    cdef int i
+    record.center[0] = pos_comp.x
+    record.center[1] = pos_comp.y
+    record.rotate = rot_comp.r
+    if fabs(scale_comp.sx) > fabs(scale_comp.sy):
+        record.scale = fabs(scale_comp.sx)
+    else:
+        record.scale = fabs(scale_comp.sy)
+    for i in range(4):
+        record.v_color[i] = color_comp.color[i]
+    record.uv_index = sprite.uv_index
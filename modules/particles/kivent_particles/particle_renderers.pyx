@@ -1,7 +1,10 @@
 # cython: embedsignature=True
-from kivent_core.systems.renderers cimport Renderer, RenderStruct
-from kivent_particles.particle_formats cimport VertexFormat9F4UB
-from kivent_particles.particle_formats import vertex_format_9f4ub
+from kivent_core.systems.renderers cimport (Renderer, RenderStruct,
+    CullRect, in_view, DirtyRange, needs_redraw, write_indices)
+from kivent_particles.particle_formats cimport (VertexFormat9F4UB,
+    VertexFormat4F4UB1US)
+from kivent_particles.particle_formats import (vertex_format_9f4ub,
+    vertex_format_4f4ub1us)
 from kivy.graphics.cgl cimport GLushort
 from kivent_core.rendering.batching cimport BatchManager, IndexedBatch
 from kivent_core.rendering.vertex_format cimport KEVertexFormat
@@ -14,9 +17,20 @@ from kivent_core.rendering.cmesh cimport CMesh
 from kivent_core.systems.staticmemgamesystem cimport ComponentPointerAggregator
 from kivent_core.rendering.model cimport VertexModel
 from kivent_core.memory_handlers.membuffer cimport Buffer
+from kivent_core.managers.resource_managers cimport ModelManager
+from kivent_core.managers.resource_managers import texture_manager
+from kivy.graphics.opengl import glEnable, glDisable
+from kivy.utils import platform
+from libc.math cimport fabs, sqrt
 from kivy.factory import Factory
 from kivy.properties import StringProperty, NumericProperty, ListProperty
 
+#Not exposed by kivy.graphics.opengl, only needed on desktop GL, GLES always
+#takes the point size from the vertex shader.
+GL_VERTEX_PROGRAM_POINT_SIZE = 0x8642
+GL_POINT_SPRITE = 0x8861
+desktop_gl = platform in ('win', 'linux', 'macosx')
+
 cdef class ParticleRenderer(Renderer):
     '''
     Processing Depends On: ParticlesRenderer, PositionSystem2D, ScaleSystem2D,
@@ -66,17 +80,22 @@ cdef class ParticleRenderer(Renderer):
         cdef GLushort* frame_indices
         cdef VertexFormat9F4UB* vertex
         cdef VertexModel model
-        cdef GLushort* model_indices
         cdef VertexFormat9F4UB* model_vertices
         cdef VertexFormat9F4UB model_vertex
         cdef unsigned int used, i, real_index, component_count, n, c
         cdef ComponentPointerAggregator entity_components
         cdef BatchManager batch_manager = self.batch_manager
         cdef dict batch_groups = batch_manager.batch_groups
-        cdef CMesh mesh_instruction
         cdef MemoryBlock components_block
         cdef void** component_data
         cdef bint static_rendering = self.static_rendering
+        cdef CullRect cull_rect
+        cdef bint track_changes = batch_manager.dirty_tracking
+        cdef unsigned int stamp = self.next_update_stamp()
+        cdef unsigned int frame_stamp = 0
+        cdef DirtyRange index_range
+        cdef unsigned int batches_drawn = 0, vertices_written = 0
+        self.get_cull_rect(&cull_rect)
         
         for batch_key in batch_groups:
             batches = batch_groups[batch_key]
@@ -91,6 +110,10 @@ cdef class ParticleRenderer(Renderer):
                         batch.get_vbo_frame_to_draw())
                     frame_indices = <GLushort*>batch.get_indices_frame_to_draw()
                     index_offset = 0
+                    if track_changes:
+                        frame_stamp = batch.get_frame_stamp()
+                        index_range.start = <unsigned int>-1
+                        index_range.end = 0
                     for c in range(used):
                         real_index = c * component_count
                         if component_data[real_index] == NULL:
@@ -108,12 +131,24 @@ cdef class ParticleRenderer(Renderer):
                                 real_index+3]
                             color_comp = <ColorStruct*>component_data[
                                 real_index+4]
+                            if cull_rect.active and not in_view(&cull_rect,
+                                pos_comp.x, pos_comp.y,
+                                model.get_bounding_radius() * max(
+                                fabs(scale_comp.sx), fabs(scale_comp.sy))):
+                                render_comp.state_valid = False
+                                continue
+                            if track_changes and not needs_redraw(render_comp,
+                                model, stamp, frame_stamp, pos_comp.x,
+                                pos_comp.y, rot_comp.r, scale_comp.sx,
+                                scale_comp.sy, color_comp.color):
+                                write_indices(frame_indices, model,
+                                    index_offset, vert_offset, &index_range)
+                                index_offset += model._index_count
+                                continue
                             model_vertices = <VertexFormat9F4UB*>(
                                 model.vertices_block.data)
-                            model_indices = <GLushort*>model.indices_block.data
-                            for i in range(model._index_count):
-                                frame_indices[i+index_offset] = (
-                                    model_indices[i] + vert_offset)
+                            write_indices(frame_indices, model, index_offset,
+                                vert_offset, &index_range)
                             for n in range(model._vertex_count):
                                 vertex = &frame_data[n + vert_offset]
                                 model_vertex = model_vertices[n]
@@ -127,10 +162,258 @@ cdef class ParticleRenderer(Renderer):
                                 vertex.rotate = rot_comp.r
                                 for i in range(4):
                                     vertex.v_color[i] = color_comp.color[i]
+                            vertices_written += model._vertex_count
+                            if track_changes:
+                                batch.mark_vertices_dirty(vert_offset,
+                                    model._vertex_count)
                             index_offset += model._index_count
                     batch.set_index_count_for_frame(index_offset)
-                mesh_instruction = batch.mesh_instruction
-                mesh_instruction.flag_update()
+                    batches_drawn += 1
+                    if track_changes:
+                        batch.finish_frame(stamp, index_range.start,
+                            index_range.end)
+                batch.flag_update()
+        self.batches_drawn = batches_drawn
+        self.vertices_written = vertices_written
+
+
+cdef class PointParticleRenderer(Renderer):
+    '''
+    Processing Depends On: PointParticleRenderer, PositionSystem2D,
+    ScaleSystem2D, RotateSystem2D, ColorSystem
+
+    A replacement for ParticleRenderer that writes a single compact record
+    per particle, drawn as a point sprite, instead of 4 VertexFormat9F4UB
+    vertices and 6 indices. The shader expands each point to the rotated,
+    scaled sprite, so about 6 times fewer bytes are written and uploaded
+    every frame. The renderer draws with the VertexFormat4F4UB1US:
+
+    .. code-block:: cython
+
+        ctypedef struct VertexFormat4F4UB1US:
+            GLfloat[2] center
+            GLfloat rotate
+            GLfloat scale
+            GLubyte[4] v_color
+            GLushort uv_index
+
+    Records are written by the inline pack_particle_record, which can be
+    cimported from kivent_particles.particle_renderers and does not touch
+    GL. A point sprite can not be stretched, the larger of the sx and sy
+    of the ScaleComponent2D is used.
+
+    Every texture used is added to a sprite table, the uvs of sprite i
+    are uploaded to the 'uv_rects' vec4 array uniform and its width and
+    height to the 'sprite_sizes' vec2 array uniform. uv_index is the index
+    of the particle's sprite. See examples/10_particles_demo/assets/glsl/
+    pointparticle.glsl for a matching shader. The size of the points is
+    limited by the GL implementation, very large particles may be clipped.
+
+    **Attributes:**
+        **max_sprites** (NumericProperty): The maximum number of entries in
+        the sprite table, must not be larger than the arrays in the shader.
+        Defaults to 32.
+
+    **Attributes: (Cython Access Only)**
+        **sprite_indices** (dict): The index in the sprite table of each
+        (texkey, width, height).
+
+        **uv_rects** (list): The uvs of each sprite.
+
+        **sprite_sizes** (list): The width and height of each sprite.
+    '''
+    system_names = ListProperty(['particle_renderer', 'position', 'scale',
+        'rotate', 'color'])
+    system_id = StringProperty('particle_renderer')
+    model_format = StringProperty('vertex_format_4f4ub1us')
+    vertex_format_size = NumericProperty(sizeof(VertexFormat4F4UB1US))
+    smallest_vertex_count = NumericProperty(1)
+    max_sprites = NumericProperty(32)
+
+    def __init__(self, **kwargs):
+        self.sprite_indices = {}
+        self.uv_rects = []
+        self.sprite_sizes = []
+        super(PointParticleRenderer, self).__init__(**kwargs)
+
+    def _set_blend_func(self, instruction):
+        if desktop_gl:
+            glEnable(GL_VERTEX_PROGRAM_POINT_SIZE)
+            glEnable(GL_POINT_SPRITE)
+        super(PointParticleRenderer, self)._set_blend_func(instruction)
+
+    def _reset_blend_func(self, instruction):
+        if desktop_gl:
+            glDisable(GL_VERTEX_PROGRAM_POINT_SIZE)
+            glDisable(GL_POINT_SPRITE)
+        super(PointParticleRenderer, self)._reset_blend_func(instruction)
+
+    cdef void* setup_batch_manager(self, Buffer master_buffer) except NULL:
+        cdef KEVertexFormat batch_vertex_format = KEVertexFormat(
+            sizeof(VertexFormat4F4UB1US), *vertex_format_4f4ub1us)
+        self.batch_manager = BatchManager(
+            self.size_of_batches, self.max_batches, self.frame_count,
+            batch_vertex_format, master_buffer, 'points', self.canvas,
+            [x for x in self.system_names],
+            self.smallest_vertex_count, self.gameworld)
+        return <void*>self.batch_manager
+
+    def register_sprite(self, int texkey, float width, float height):
+        '''
+        Adds the uvs of texkey and the size width x height to the sprite
+        table, and uploads the table to the shader. Called by
+        **load_model_from_args** the first time a texture is used.
+
+        Args:
+            texkey (int): The texkey of the texture.
+
+            width (float): The width of the sprite.
+
+            height (float): The height of the sprite.
+
+        Return:
+            int: The index of the sprite in the table.
+        '''
+        key = (texkey, width, height)
+        if key in self.sprite_indices:
+            return self.sprite_indices[key]
+        cdef int index = len(self.uv_rects)
+        if index >= self.max_sprites:
+            raise ValueError('PointParticleRenderer {} can not draw more '
+                'than {} sprites, increase max_sprites and the size of the '
+                'arrays in the shader'.format(self.system_id,
+                self.max_sprites))
+        self.uv_rects.append([float(x) for x in texture_manager.get_uvs(
+            texkey)])
+        self.sprite_sizes.append([width, height])
+        self.sprite_indices[key] = index
+        if not self.headless:
+            self.canvas['uv_rects'] = self.uv_rects
+            self.canvas['sprite_sizes'] = self.sprite_sizes
+        return index
+
+    def load_model_from_args(self, dict args):
+        '''
+        Every particle using a texture shares a single vertex model whose
+        uv_index is the texture's index in the sprite table and whose scale
+        is the diagonal of the sprite, used for culling. 'size' overrides
+        the size of the texture the first time it is loaded.
+
+        Return:
+            tuple: (model_key, texkey, render)
+        '''
+        cdef float w, h
+        cdef int texkey
+        cdef ModelManager model_manager = self.gameworld.model_manager
+        texture_key = args['texture']
+        texkey = texture_manager.get_texkey_from_name(texture_key)
+        w, h = texture_manager.get_size(texkey)
+        if 'size' in args:
+            w, h = args['size']
+        render = args.get('render', True)
+        model_key = self.model_format + '_' + texture_key
+        if model_key not in model_manager._models:
+            model_manager.load_model(self.model_format, 1, 1, model_key,
+                indices=[0])
+            sprite = model_manager._models[model_key][0]
+            sprite.uv_index = [self.register_sprite(texkey, w, h)]
+            sprite.scale = [sqrt(w * w + h * h)]
+        return model_key, texkey, render
+
+    def update(self, force_update, dt):
+        cdef IndexedBatch batch
+        cdef list batches
+        cdef unsigned int batch_key
+        cdef unsigned int index_offset, vert_offset
+        cdef RenderStruct* render_comp
+        cdef PositionStruct2D* pos_comp
+        cdef RotateStruct2D* rot_comp
+        cdef ColorStruct* color_comp
+        cdef ScaleStruct2D* scale_comp
+        cdef VertexFormat4F4UB1US* frame_data
+        cdef GLushort* frame_indices
+        cdef VertexFormat4F4UB1US* sprite
+        cdef VertexModel model
+        cdef unsigned int used, real_index, component_count, c
+        cdef ComponentPointerAggregator entity_components
+        cdef BatchManager batch_manager = self.batch_manager
+        cdef dict batch_groups = batch_manager.batch_groups
+        cdef MemoryBlock components_block
+        cdef void** component_data
+        cdef bint static_rendering = self.static_rendering
+        cdef CullRect cull_rect
+        cdef bint track_changes = batch_manager.dirty_tracking
+        cdef unsigned int stamp = self.next_update_stamp()
+        cdef unsigned int frame_stamp = 0
+        cdef DirtyRange index_range
+        cdef unsigned int batches_drawn = 0, vertices_written = 0
+        self.get_cull_rect(&cull_rect)
+
+        for batch_key in batch_groups:
+            batches = batch_groups[batch_key]
+            for batch in batches:
+                if not static_rendering or force_update:
+                    entity_components = batch.entity_components
+                    components_block = entity_components.memory_block
+                    used = components_block.used_count
+                    component_count = entity_components.count
+                    component_data = <void**>components_block.data
+                    frame_data = <VertexFormat4F4UB1US*>(
+                        batch.get_vbo_frame_to_draw())
+                    frame_indices = <GLushort*>batch.get_indices_frame_to_draw()
+                    index_offset = 0
+                    if track_changes:
+                        frame_stamp = batch.get_frame_stamp()
+                        index_range.start = <unsigned int>-1
+                        index_range.end = 0
+                    for c in range(used):
+                        real_index = c * component_count
+                        if component_data[real_index] == NULL:
+                            continue
+                        render_comp = <RenderStruct*>component_data[
+                            real_index+0]
+                        vert_offset = render_comp.vert_index
+                        model = <VertexModel>render_comp.model
+                        if render_comp.render:
+                            pos_comp = <PositionStruct2D*>component_data[
+                                real_index+1]
+                            scale_comp = <ScaleStruct2D*>component_data[
+                                real_index+2]
+                            rot_comp = <RotateStruct2D*>component_data[
+                                real_index+3]
+                            color_comp = <ColorStruct*>component_data[
+                                real_index+4]
+                            sprite = <VertexFormat4F4UB1US*>(
+                                model.vertices_block.data)
+                            if cull_rect.active and not in_view(&cull_rect,
+                                pos_comp.x, pos_comp.y,
+                                .5 * sprite.scale * max(
+                                fabs(scale_comp.sx), fabs(scale_comp.sy))):
+                                render_comp.state_valid = False
+                                continue
+                            write_indices(frame_indices, model, index_offset,
+                                vert_offset, &index_range)
+                            index_offset += 1
+                            if track_changes and not needs_redraw(render_comp,
+                                model, stamp, frame_stamp, pos_comp.x,
+                                pos_comp.y, rot_comp.r, scale_comp.sx,
+                                scale_comp.sy, color_comp.color):
+                                continue
+                            pack_particle_record(&frame_data[vert_offset],
+                                sprite, pos_comp, rot_comp, scale_comp,
+                                color_comp)
+                            vertices_written += 1
+                            if track_changes:
+                                batch.mark_vertices_dirty(vert_offset, 1)
+                    batch.set_index_count_for_frame(index_offset)
+                    batches_drawn += 1
+                    if track_changes:
+                        batch.finish_frame(stamp, index_range.start,
+                            index_range.end)
+                batch.flag_update()
+        self.batches_drawn = batches_drawn
+        self.vertices_written = vertices_written
 
 
-Factory.register('ParticleRenderer', cls=ParticleRenderer)
\ No newline at end of file
+Factory.register('ParticleRenderer', cls=ParticleRenderer)
+Factory.register('PointParticleRenderer', cls=PointParticleRenderer)
\ No newline at end of file
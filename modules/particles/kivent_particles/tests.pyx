@@ -0,0 +1,191 @@
+from libc.stdlib cimport malloc, free
+from libc.math cimport fabs
+from kivent_particles.emitter cimport ParticleEmitter
+from kivent_particles.particle cimport (ParticleStruct, PooledParticle,
+    ParticleArrays, advance_particle, FIELD_CURRENT_TIME, FIELD_TOTAL_TIME)
+from kivent_core.systems.position_systems cimport PositionStruct2D
+from kivent_core.systems.rotate_systems cimport RotateStruct2D
+from kivent_core.systems.scale_systems cimport ScaleStruct2D
+from kivent_core.systems.color_systems cimport ColorStruct
+from kivent_core.rng cimport RNGState, rng_seed, rng_variance, rng_next
+from kivent_particles.particle_formats cimport (VertexFormat9F4UB,
+    VertexFormat4F4UB1US)
+from kivent_particles.particle_renderers cimport pack_particle_record
+from kivy.graphics.cgl cimport GLushort
+
+include "particle_config.pxi"
+
+ctypedef struct TestParticle:
+    ParticleStruct particle
+    PositionStruct2D position
+    RotateStruct2D rotate
+    ScaleStruct2D scale
+    ColorStruct color
+
+
+cdef ParticleEmitter make_test_emitter(int emitter_type):
+    cdef ParticleEmitter emitter = ParticleEmitter('test')
+    emitter._emitter_type = emitter_type
+    emitter._pos[0] = 100.
+    emitter._pos[1] = 150.
+    emitter._gravity[0] = 5.
+    emitter._gravity[1] = -40.
+    emitter._min_radius = 10.
+    return emitter
+
+
+cdef void init_test_particle(TestParticle* test, ParticleEmitter emitter,
+    RNGState* rng):
+    cdef ParticleStruct* particle = &test.particle
+    cdef int i
+    particle.emitter = <void*>emitter
+    particle.current_time = 0.
+    particle.total_time = rng_variance(rng, 1., .8)
+    particle.start_pos[0] = emitter._pos[0]
+    particle.start_pos[1] = emitter._pos[1]
+    particle.velocity[0] = rng_variance(rng, 0., 100.)
+    particle.velocity[1] = rng_variance(rng, 0., 100.)
+    particle.radial_acceleration = rng_variance(rng, 0., 50.)
+    particle.tangential_acceleration = rng_variance(rng, 0., 50.)
+    particle.emit_radius = rng_variance(rng, 80., 40.)
+    particle.emit_radius_delta = rng_variance(rng, 60., 20.)
+    particle.emit_rotation = rng_variance(rng, 0., 3.)
+    particle.emit_rotation_delta = rng_variance(rng, 0., 4.)
+    particle.rotation_delta = rng_variance(rng, 0., 90.)
+    particle.scale_delta = rng_variance(rng, 0., 1.)
+    test.position.x = rng_variance(rng, emitter._pos[0], 20.)
+    test.position.y = rng_variance(rng, emitter._pos[1], 20.)
+    test.rotate.r = rng_variance(rng, 0., 180.)
+    test.scale.sx = test.scale.sy = rng_variance(rng, 1., .5)
+    for i in range(4):
+        particle.color[i] = rng_variance(rng, 128., 127.)
+        particle.color_delta[i] = rng_variance(rng, 0., 200.)
+        test.color.color[i] = <unsigned char>particle.color[i]
+
+
+cdef int assert_close(float a, float b, float tolerance) except -1:
+    assert(fabs(a - b) <= tolerance * max(1., fabs(a))), (a, b)
+    return 1
+
+
+def test_soa_integration(unsigned int count, unsigned int steps,
+    bint parallel):
+    '''
+    Integrates the same particles with advance_particle and with a
+    ParticleArrays, for both emitter types, and checks that the components
+    agree within tolerance at every step.
+    '''
+    cdef int emitter_type
+    cdef ParticleEmitter emitter
+    cdef TestParticle* expected
+    cdef TestParticle* actual
+    cdef ParticleArrays arrays
+    cdef PooledParticle pooled
+    cdef unsigned int i, step, channel
+    cdef float dt = 1. / 60.
+    cdef float* current_time
+    cdef float* total_time
+    cdef bint* dead
+    cdef RNGState rng
+    for emitter_type in (EMITTER_TYPE_GRAVITY, EMITTER_TYPE_RADIAL):
+        rng_seed(&rng, 0, emitter_type)
+        emitter = make_test_emitter(emitter_type)
+        expected = <TestParticle*>malloc(sizeof(TestParticle) * count)
+        actual = <TestParticle*>malloc(sizeof(TestParticle) * count)
+        dead = <bint*>malloc(sizeof(bint) * count)
+        arrays = ParticleArrays(emitter_type)
+        for i in range(count):
+            init_test_particle(&expected[i], emitter, &rng)
+            actual[i] = expected[i]
+            dead[i] = False
+            pooled.entity_id = i
+            pooled.particle = &actual[i].particle
+            pooled.position = &actual[i].position
+            pooled.rotate = &actual[i].rotate
+            pooled.scale = &actual[i].scale
+            pooled.color = &actual[i].color
+            pooled.render = NULL
+            pooled.pool = NULL
+            arrays.append(&pooled)
+        for step in range(steps):
+            for i in range(count):
+                if not dead[i]:
+                    dead[i] = advance_particle(&expected[i].particle,
+                        &expected[i].position, &expected[i].rotate,
+                        &expected[i].scale, &expected[i].color, dt)
+            arrays.gather()
+            arrays.integrate(dt, parallel)
+            arrays.scatter()
+            current_time = arrays.field(FIELD_CURRENT_TIME)
+            total_time = arrays.field(FIELD_TOTAL_TIME)
+            i = 0
+            while i < arrays.count:
+                if current_time[i] >= total_time[i]:
+                    assert(dead[arrays.particles[i].entity_id])
+                    arrays.swap_remove(i)
+                else:
+                    i += 1
+            for i in range(count):
+                assert_close(expected[i].position.x, actual[i].position.x,
+                    1e-3)
+                assert_close(expected[i].position.y, actual[i].position.y,
+                    1e-3)
+                assert_close(expected[i].rotate.r, actual[i].rotate.r, 1e-4)
+                assert_close(expected[i].scale.sx, actual[i].scale.sx, 1e-4)
+                for channel in range(4):
+                    assert(abs(<int>expected[i].color.color[channel] -
+                        <int>actual[i].color.color[channel]) <= 1)
+        assert(arrays.count == sum(not dead[i] for i in range(count)))
+        free(expected)
+        free(actual)
+        free(dead)
+
+
+def test_rng():
+    '''
+    Checks the generator against the PCG32 reference output, and that
+    ParticleEmitter generators are reproducible from their seed.
+    '''
+    cdef RNGState rng
+    rng_seed(&rng, 42, 54)
+    assert([rng_next(&rng) for i in range(6)] == [0xa15c02b7, 0x7b47f409,
+        0xba1d3330, 0x83d2f293, 0xbfa4784b, 0xcbed606e])
+    cdef ParticleEmitter first = ParticleEmitter('test')
+    cdef ParticleEmitter second = ParticleEmitter('test')
+    cdef list first_values = [rng_next(&first._rng) for i in range(8)]
+    assert(first_values != [rng_next(&second._rng) for i in range(8)])
+    first.seed = second.seed = 7
+    first_values = [rng_next(&first._rng) for i in range(8)]
+    assert(first_values != [rng_next(&second._rng) for i in range(8)])
+    first.seed = 7
+    assert(first_values == [rng_next(&first._rng) for i in range(8)])
+
+
+def test_pack_particle_record():
+    '''
+    Packs the components of a particle into a VertexFormat4F4UB1US record
+    and checks every field, and that a record with its index is at least 4
+    times smaller than the 4 vertices and 6 indices of a ParticleRenderer
+    quad.
+    '''
+    cdef TestParticle test
+    cdef VertexFormat4F4UB1US sprite
+    cdef VertexFormat4F4UB1US record
+    cdef RNGState rng
+    cdef int i
+    rng_seed(&rng, 0, 0)
+    init_test_particle(&test, make_test_emitter(EMITTER_TYPE_GRAVITY), &rng)
+    sprite.uv_index = 3
+    test.scale.sx = .5
+    test.scale.sy = -1.5
+    pack_particle_record(&record, &sprite, &test.position, &test.rotate,
+        &test.scale, &test.color)
+    assert(record.center[0] == test.position.x)
+    assert(record.center[1] == test.position.y)
+    assert(record.rotate == test.rotate.r)
+    assert(record.scale == 1.5)
+    assert(record.uv_index == 3)
+    for i in range(4):
+        assert(record.v_color[i] == test.color.color[i])
+    assert((sizeof(VertexFormat4F4UB1US) + sizeof(GLushort)) * 4 <=
+        4 * sizeof(VertexFormat9F4UB) + 6 * sizeof(GLushort))
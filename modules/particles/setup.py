@@ -85,6 +85,10 @@ elif platform == 'darwin':
                        '-framework', 'OpenGL']
     libraries = []
 
+if environ.get('KIVENT_USE_OPENMP'):
+    extra_compile_args = extra_compile_args + ['-fopenmp']
+    extra_link_args = extra_link_args + ['-fopenmp']
+
 do_clear_existing = True
 
 particles_modules = {
@@ -96,6 +100,7 @@ particles_modules = {
     'kivent_particles.particle_renderers': [
         'kivent_particles/particle_renderers.pyx',
     ],
+    'kivent_particles.tests': ['kivent_particles/tests.pyx', ],
 }
 
 particles_modules_c = {
@@ -107,6 +112,7 @@ particles_modules_c = {
     'kivent_particles.particle_renderers': [
         'kivent_particles/particle_renderers.c',
     ],
+    'kivent_particles.tests': ['kivent_particles/tests.c', ],
 }
 
 check_for_removal = [
@@ -114,6 +120,7 @@ check_for_removal = [
     'kivent_particles.emitter.c',
     'kivent_particles/particle_formats.c',
     'kivent_particles/particle_renderers.c',
+    'kivent_particles/tests.c',
 ]
 
 
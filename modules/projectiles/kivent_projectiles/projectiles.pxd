@@ -38,9 +38,11 @@ cdef class ProjectileComponent(MemComponent):
 
 cdef class ProjectileSystem(StaticMemGameSystem):
     cdef dict projectile_templates
+    cdef dict projectile_archetypes
     cdef dict projectile_keys
     cdef dict collision_type_index
     cdef int projectile_count
+    cdef str get_projectile_archetype(self, int ammo_type)
     cdef unsigned int create_projectile(self, int ammo_type, tuple position,
         float rotation, unsigned int firing_entity)
 
@@ -114,6 +114,7 @@ cdef class ProjectileSystem(StaticMemGameSystem):
     def __init__(self, **kwargs):
         super(ProjectileSystem, self).__init__(**kwargs)
         self.projectile_templates = {}
+        self.projectile_archetypes = {}
         self.projectile_keys = {}
         self.projectile_count = 0
         self.collision_type_index = {}
@@ -243,10 +244,18 @@ cdef class ProjectileSystem(StaticMemGameSystem):
                 sound_manager.play_direct(hit_sound, volume)
         return True
 
-    cdef unsigned int create_projectile(self, int ammo_type, tuple position,
-        float rotation, unsigned int firing_entity):
+    cdef str get_projectile_archetype(self, int ammo_type):
+        '''
+        Registers a GameWorld archetype for the projectiles of ammo_type the
+        first time it is fired.
+
+        Return:
+            str: The name of the archetype.
+        '''
+        cdef str name = self.projectile_archetypes.get(ammo_type)
+        if name is not None:
+            return name
         cdef ProjectileTemplate template = self.projectile_templates[ammo_type]
-        gameworld = self.gameworld
         box_dict = {
             'width': template.width, 
             'height': template.height,
@@ -258,7 +267,7 @@ cdef class ProjectileSystem(StaticMemGameSystem):
             }
         physics_component_dict = {
             'main_shape': 'box', 
-            'velocity': (0, 0), 'position': position, 'angle': rotation, 
+            'velocity': (0, 0), 'position': (0., 0.), 'angle': 0., 
             'angular_velocity': 0, 'mass': template.mass, 
             'vel_limit': template.speed, 
             'ang_vel_limit': math.radians(template.rot_speed), 
@@ -267,12 +276,11 @@ cdef class ProjectileSystem(StaticMemGameSystem):
             'damage': template.damage,
             'projectile_type': template.projectile_type,
             'armor_pierce': template.armor_pierce,
-            'origin_entity': firing_entity,
             'hit_sound': template.hit_sound
         }
         create_component_dict = {
-            'position': position,
-            'rotate': rotation,
+            'position': (0., 0.),
+            'rotate': 0.,
             'cymunk_physics': physics_component_dict,
             'projectiles': projectile_dict,
             'emitters': [],
@@ -292,10 +300,23 @@ cdef class ProjectileSystem(StaticMemGameSystem):
             ]
         if template.model is None and template.texture is None:
             component_order.remove('rotate_renderer')
-        cdef unsigned int entity_id = gameworld.init_entity(
-            create_component_dict, component_order, 
-            zone=self.projectile_zone,
-                )
+        name = '{}_{}'.format(self.system_id, ammo_type)
+        self.gameworld.register_archetype(name, component_order,
+            create_component_dict, zone=self.projectile_zone)
+        self.projectile_archetypes[ammo_type] = name
+        return name
+
+    cdef unsigned int create_projectile(self, int ammo_type, tuple position,
+        float rotation, unsigned int firing_entity):
+        cdef ProjectileTemplate template = self.projectile_templates[ammo_type]
+        gameworld = self.gameworld
+        cdef unsigned int entity_id = gameworld.spawn(
+            self.get_projectile_archetype(ammo_type), {
+                'position': position,
+                'rotate': rotation,
+                'cymunk_physics': {'position': position, 'angle': rotation},
+                'projectiles': {'origin_entity': firing_entity},
+                })
         cdef Entity entity
         cdef ProjectileComponent component
         cdef ProjectileStruct* projectiles
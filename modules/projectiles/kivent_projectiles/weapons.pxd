@@ -1,6 +1,6 @@
 from kivent_core.systems.staticmemgamesystem cimport (StaticMemGameSystem, 
     MemComponent)
-from libc.stdlib cimport rand, RAND_MAX
+from kivent_core.rng cimport RNGState
 from kivent_projectiles.projectiles cimport ProjectileSystem
 from kivent_core.managers.sound_manager cimport SoundManager
 from kivent_cymunk.physics cimport PhysicsStruct
@@ -29,6 +29,7 @@ ctypedef struct ProjectileWeapon:
     int reload_end_sound
     int fire_sound
     int display_name_id
+    RNGState rng
 
 
 cdef class Weapon:
@@ -57,7 +58,7 @@ cdef class ProjectileWeaponSystem(StaticMemGameSystem):
     cdef list weapon_display_names
     cdef int weapon_count
     cdef void copy_template_to_weapon(self, str template_name, 
-        ProjectileWeapon *weapon)
+        ProjectileWeapon *weapon, unsigned long long stream)
     cdef void fire_projectile(self, unsigned int entity_id, float accel)
     cdef void handle_multi_shot(self, ProjectileWeaponStruct* system_comp,
         ProjectileWeapon* weapon, PhysicsStruct* physics_comp, 
@@ -71,11 +72,4 @@ cdef class ProjectileWeaponSystem(StaticMemGameSystem):
         ProjectileWeapon* weapon, PhysicsStruct* physics_comp, 
         SoundManager sound_manager, ProjectileSystem projectile_system,
         float dt)
-    cdef void fire_missle(self, unsigned int entity_id, float accel)
-
-
-cdef inline float cy_random():
-    return <float>rand()/<float>RAND_MAX
-
-cdef inline float random_variance(float base, float variance):
-    return base + variance * (cy_random() * 2.0 - 1.0)
\ No newline at end of file
+    cdef void fire_missle(self, unsigned int entity_id, float accel)
\ No newline at end of file
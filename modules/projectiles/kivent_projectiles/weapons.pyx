@@ -21,6 +21,7 @@ from cymunk.cymunk cimport (
 from kivent_projectiles.projectiles cimport ProjectileSystem
 from libc.math cimport cos, sin
 from kivent_core.managers.sound_manager cimport SoundManager
+from kivent_core.rng cimport rng_seed, rng_variance
 include "projectile_config.pxi"
 
 
@@ -248,6 +249,17 @@ cdef cpVect get_rotated_vector(float angle, float x, float y):
 
 
 cdef class ProjectileWeaponSystem(StaticMemGameSystem):
+    '''
+    Every weapon has its own random number generator for its spread, see
+    kivent_core.rng. A weapon is seeded with **seed** on a stream chosen by
+    its entity_id and slot when it is equipped, so replays that create the
+    same entities fire the same shots.
+
+    **Attributes:**
+        **seed** (NumericProperty): The seed for the weapons' random number
+        generators. Only affects weapons equipped after it is set. Defaults
+        to 0.
+    '''
     system_id = StringProperty('projectile_weapons')
     updateable = BooleanProperty(True)
     processor = BooleanProperty(True)
@@ -258,6 +270,7 @@ cdef class ProjectileWeaponSystem(StaticMemGameSystem):
     player_entity = NumericProperty(None, allownone=True)
     player_system = ObjectProperty(None)
     sound_distance = NumericProperty(1250.)
+    seed = NumericProperty(0)
 
     def __init__(self, **kwargs):
         super(ProjectileWeaponSystem, self).__init__(**kwargs)
@@ -267,9 +280,10 @@ cdef class ProjectileWeaponSystem(StaticMemGameSystem):
 
 
     cdef void copy_template_to_weapon(self, str template_name, 
-        ProjectileWeapon *weapon):
+        ProjectileWeapon *weapon, unsigned long long stream):
         cdef WeaponTemplate template = self.weapon_templates[template_name]
         memcpy(<char *>weapon, &template.weapon_data, sizeof(ProjectileWeapon))
+        rng_seed(&weapon.rng, <unsigned long long>self.seed, stream)
 
 
     def register_weapon_template(
@@ -311,7 +325,8 @@ cdef class ProjectileWeaponSystem(StaticMemGameSystem):
         cdef ProjectileWeaponStruct* data = <ProjectileWeaponStruct*>(
             weapon_comp.pointer
             )
-        self.copy_template_to_weapon(weapon_name, &data.weapons[index])
+        self.copy_template_to_weapon(weapon_name, &data.weapons[index],
+            entity_id * MAX_WEAPONS + index)
 
     def get_current_weapon_name(self, unsigned int entity_id):
         entity = self.gameworld.entities[entity_id]
@@ -346,7 +361,8 @@ cdef class ProjectileWeaponSystem(StaticMemGameSystem):
                 '''.format(max=MAX_WEAPONS)
                 )
         for index, each in enumerate(weapons_to_initialize):
-            self.copy_template_to_weapon(each, &component.weapons[index])
+            self.copy_template_to_weapon(each, &component.weapons[index],
+                entity_id * MAX_WEAPONS + index)
         return self.entity_components.add_entity(entity_id, zone_name)
 
 
@@ -412,7 +428,7 @@ cdef class ProjectileWeaponSystem(StaticMemGameSystem):
                 y_offset = weapon.barrel_offsets[2*x+1]
                 
                 rotated_vec = get_rotated_vector(
-                    random_variance(body.a, weapon.spread),
+                    rng_variance(&weapon.rng, body.a, weapon.spread),
                     x_offset, y_offset
                     )
                 bullet_position = cpvadd(rotated_vec, body.p)
@@ -450,7 +466,7 @@ cdef class ProjectileWeaponSystem(StaticMemGameSystem):
                 y_offset = weapon.barrel_offsets[2*x+1]
                 
                 rotated_vec = get_rotated_vector(
-                    random_variance(body.a, weapon.spread),
+                    rng_variance(&weapon.rng, body.a, weapon.spread),
                     x_offset, y_offset
                     )
                 bullet_position = cpvadd(rotated_vec, body.p)
@@ -487,7 +503,7 @@ cdef class ProjectileWeaponSystem(StaticMemGameSystem):
                 y_offset = weapon.barrel_offsets[2*x+1]
                 body = physics_comp.body
                 rotated_vec = get_rotated_vector(
-                    random_variance(body.a, weapon.spread),
+                    rng_variance(&weapon.rng, body.a, weapon.spread),
                     x_offset, y_offset
                     )
                 bullet_position = cpvadd(rotated_vec, body.p)